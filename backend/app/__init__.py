@@ -1,10 +1,19 @@
+import os
 from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Import blueprints
 from app.routes.audio_routes import audio_bp
 from app.routes.json_routes import json_bp
+from app.routes.analytics_routes import analytics_bp
+from app.routes.metrics_routes import metrics_bp
+from app.routes.profiling_routes import profiling_bp
 from app.services.calendar_api import calendar_api
+from app.utils.tracing import init_tracing
+from app.utils.metrics import init_metrics
+from app.utils.profiling import init_profiling
+from app.utils.memory import init_memory
 
 def create_app():
     app = Flask(__name__)
@@ -16,9 +25,33 @@ def create_app():
     # Set file upload limit to 50MB
     app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024
 
+    # Behind N trusted reverse proxies, take the client address from the
+    # last N X-Forwarded-For entries (admission limits key on remote_addr)
+    try:
+        trusted_proxies = int(os.environ.get("TRUSTED_PROXY_COUNT", 0))
+    except ValueError:
+        trusted_proxies = 0
+    if trusted_proxies > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies)
+
     # Register blueprints
     app.register_blueprint(audio_bp)
     app.register_blueprint(json_bp)
+    app.register_blueprint(analytics_bp)
     app.register_blueprint(calendar_api)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(profiling_bp)
+
+    # Per-stage timings (Server-Timing header + request_stages events)
+    init_tracing(app)
+
+    # Prometheus request latency (served on /metrics)
+    init_metrics(app)
+
+    # Opt-in cProfile/tracemalloc capture of single requests
+    init_profiling(app)
+
+    # Periodic per-worker memory report (stage memory is recorded with the spans)
+    init_memory(app)
 
     return app
@@ -0,0 +1,185 @@
+"""
+asgi.py
+
+Optional ASGI entry point for the AI Meeting Summarizer backend.
+
+The default production entry point is `run:app` under the gunicorn launcher
+(gthread workers, see gunicorn.conf.py and the Dockerfile). This module is for
+deployments that want ASGI workers under the same launcher instead.
+
+Features:
+- Adapts the Flask (WSGI) app to ASGI without extra dependencies: the event
+  loop accepts connections and reads request bodies, and each view runs on
+  the bounded request executor (ASGI_THREADS), so many slow I/O-bound
+  requests (CalDAV, event log scans) can be in flight per worker process.
+- CPU-bound transcription is further limited by the offload CPU executor
+  (OFFLOAD_CPU_WORKERS), so it cannot starve the request threads.
+- Streaming responses (e.g. /process-json with "stream") are sent chunk by chunk.
+- Request bodies above 1MB are spooled to a temporary file.
+- Lifespan support: executors are shut down cleanly on server stop.
+
+Usage:
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \\
+        gunicorn -c gunicorn.conf.py app.asgi:app
+    uvicorn app.asgi:app --port 5000     # single process, local testing
+
+Dependencies: app (create_app), app.services.offload, an ASGI server (uvicorn)
+"""
+
+import asyncio
+import sys
+import tempfile
+from app import create_app
+from app.services import offload
+
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+def build_environ(scope, body):
+    """
+    Build a WSGI environ for an ASGI HTTP scope.
+
+    Args:
+        scope (dict): ASGI HTTP connection scope.
+        body (file): Seekable file object holding the request body.
+
+    Returns:
+        dict: PEP 3333 environ.
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    path = scope.get("path", "/")
+    root_path = scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            key = "CONTENT_TYPE"
+        elif name == "CONTENT_LENGTH":
+            key = "CONTENT_LENGTH"
+        else:
+            key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    if body is not None and "CONTENT_LENGTH" not in environ:
+        # The body is fully buffered, so chunked uploads get an exact length too
+        body.seek(0, 2)
+        environ["CONTENT_LENGTH"] = str(body.tell())
+        body.seek(0)
+    return environ
+
+
+class WsgiToAsgi:
+    """
+    Minimal ASGI adapter that runs a WSGI app on a bounded thread pool.
+
+    Args:
+        wsgi_app (callable): WSGI application.
+        executor_factory (callable): Returns the executor that runs the WSGI app.
+    """
+
+    def __init__(self, wsgi_app, executor_factory=offload.get_request_executor):
+        self.wsgi_app = wsgi_app
+        self.executor_factory = executor_factory
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                offload.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            body.write(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body.seek(0)
+        return body
+
+    async def _http(self, scope, receive, send):
+        body = await self._read_body(receive)
+        loop = asyncio.get_running_loop()
+        executor = self.executor_factory()
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers
+            ]
+            return lambda data: response.setdefault("written", []).append(data)
+
+        async def send_start():
+            await send({"type": "http.response.start", "status": response["status"],
+                        "headers": response["headers"]})
+            for data in response.pop("written", []):
+                await send({"type": "http.response.body", "body": data, "more_body": True})
+
+        iterable = await loop.run_in_executor(executor, self.wsgi_app, build_environ(scope, body), start_response)
+        try:
+            if isinstance(iterable, (list, tuple)):
+                await send_start()
+                for chunk in iterable:
+                    if chunk:
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            else:
+                # Generators (streamed responses) may block: advance them on the executor
+                iterator = iter(iterable)
+                done = object()
+                started = False
+                while True:
+                    chunk = await loop.run_in_executor(executor, next, iterator, done)
+                    if chunk is done:
+                        break
+                    if not started:
+                        await send_start()
+                        started = True
+                    if chunk:
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                if not started:
+                    await send_start()
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                await loop.run_in_executor(executor, close)
+            body.close()
+
+
+flask_app = create_app()
+app = WsgiToAsgi(flask_app)
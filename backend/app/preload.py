@@ -0,0 +1,121 @@
+"""
+preload.py
+
+Preloading of heavy, read-only resources in the master process of the
+preforked production server (see gunicorn.conf.py).
+
+Features:
+- Loads the Whisper model (app.routes.audio_routes.get_whisper_model), which
+  importing the app no longer does.
+- Checks (and optionally downloads) the NLTK resources the NLP pipeline uses.
+- Warms NLTK's tokenizers/taggers once, so their data is loaded before fork.
+- Freezes the garbage collector's view of everything loaded so far, so
+  forked workers share those pages copy-on-write instead of dirtying them
+  during collections.
+
+Usage:
+    from app.preload import preload_resources
+    preload_resources()
+
+Dependencies: nltk, gc, app.routes.audio_routes
+"""
+
+import gc
+import nltk
+from app.utils.logger import logger
+
+# (nltk.data path, downloader package) pairs used by nlp_analysis / entity_utils
+NLTK_RESOURCES = [
+    ("tokenizers/punkt_tab", "punkt_tab"),
+    ("taggers/averaged_perceptron_tagger_eng", "averaged_perceptron_tagger_eng"),
+    ("chunkers/maxent_ne_chunker_tab", "maxent_ne_chunker_tab"),
+    ("corpora/words", "words"),
+]
+
+WARMUP_TEXT = "Bob will send the report to Alice tomorrow. We decided to ship it."
+
+
+def ensure_nltk_resources(download=False):
+    """
+    Verify NLTK resources are installed, optionally downloading missing ones.
+
+    Args:
+        download (bool): Try to download missing resources.
+
+    Returns:
+        list: Downloader package names that are still missing.
+    """
+    missing = []
+    for path, package in NLTK_RESOURCES:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            if download and nltk.download(package, quiet=True):
+                continue
+            missing.append(package)
+    if missing:
+        logger.warning("Missing NLTK resources: %s", ", ".join(missing))
+    return missing
+
+
+def warm_nltk():
+    """
+    Run the NLTK calls the pipeline uses once, loading their data into memory.
+
+    Returns:
+        bool: True if the warm-up succeeded.
+    """
+    try:
+        tokens = nltk.word_tokenize(WARMUP_TEXT)
+        nltk.sent_tokenize(WARMUP_TEXT)
+        nltk.ne_chunk(nltk.pos_tag(tokens))
+        return True
+    except Exception as e:
+        logger.warning("NLTK warm-up failed: %s", e)
+        return False
+
+
+def freeze_heap():
+    """
+    Collect garbage, then move all surviving objects to the permanent generation.
+
+    After fork, the collector no longer touches (and so no longer copies)
+    the preloaded objects.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def load_whisper():
+    """
+    Load the shared Whisper model.
+
+    Returns:
+        bool: True if the model is loaded.
+    """
+    from app.routes.audio_routes import get_whisper_model
+    try:
+        get_whisper_model()
+        return True
+    except Exception as e:
+        logger.warning("Whisper model preload failed: %s", e)
+        return False
+
+
+def preload_resources(download=False):
+    """
+    Load everything workers should share before the server forks.
+
+    Args:
+        download (bool): Download missing NLTK resources first.
+
+    Returns:
+        dict: {"whisper_loaded": bool, "nltk_missing": [...], "nltk_warm": bool}
+    """
+    whisper_loaded = load_whisper()
+    missing = ensure_nltk_resources(download=download)
+    warm = warm_nltk() if not missing else False
+    freeze_heap()
+    logger.info("Preloaded shared resources (whisper=%s, nltk_warm=%s, frozen_objects=%d)",
+                whisper_loaded, warm, gc.get_freeze_count())
+    return {"whisper_loaded": whisper_loaded, "nltk_missing": missing, "nltk_warm": warm}
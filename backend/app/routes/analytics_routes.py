@@ -0,0 +1,90 @@
+"""
+analytics_routes.py
+
+Flask Blueprint for querying event log analytics in the AI Meeting Summarizer.
+
+Features:
+- /api/events/query: filter events by type, analytics event name, outcome and
+  time range, and return aggregates computed server-side (counts, p50/p95/p99
+  processing times, bytes uploaded, optional time buckets).
+- Backed by an incrementally refreshed in-memory index, so the dashboard no
+  longer needs to download raw event logs.
+
+Dependencies: Flask, app.utils.event_index
+"""
+
+from flask import Blueprint, request, jsonify
+from app.utils.event_index import get_event_index, parse_time
+
+analytics_bp = Blueprint('analytics', __name__)
+
+BUCKETS = {"day", "hour"}
+
+
+def _multi_arg(name):
+    """
+    Read a query parameter that may be repeated or comma-separated.
+
+    Returns:
+        set | None: The values, or None if the parameter is absent.
+    """
+    values = [v.strip() for raw in request.args.getlist(name) for v in raw.split(",") if v.strip()]
+    return set(values) if values else None
+
+
+@analytics_bp.route("/api/events/query", methods=["GET"])
+def query_events():
+    """
+    Return aggregate statistics over the structured event logs.
+
+    Query parameters (all optional):
+        type: Event type(s), repeated or comma-separated (e.g. audio_upload_success).
+        event: Analytics event name(s) written by log_analytics_event.
+        outcome: Outcome to match ("success", "failure", "exception").
+        since: Inclusive ISO 8601 lower bound on logged_at (naive values are server
+            local time; "Z" or offset-bearing values are converted).
+        until: Inclusive ISO 8601 upper bound on logged_at, as for since.
+        bucket: "day" or "hour" for per-period counts.
+
+    Returns:
+        200: {
+            "filters": {...},
+            "count": int,
+            "by_type": {...},
+            "by_outcome": {...},
+            "bytes_uploaded": int,
+            "processing_time_sec": {"count", "min", "max", "mean", "p50", "p95", "p99"},
+            "transcribe_time_sec": {...},
+            "duration": {...},
+            "buckets": {...}    # only with bucket
+        }
+        400: {"error": "..."} (invalid time range or bucket)
+    """
+    since = request.args.get("since") or None
+    until = request.args.get("until") or None
+    for label, value in (("since", since), ("until", until)):
+        if value is not None:
+            try:
+                parse_time(value)
+            except ValueError:
+                return jsonify({"error": f"Invalid '{label}' timestamp, expected ISO 8601"}), 400
+    bucket = request.args.get("bucket") or None
+    if bucket is not None and bucket not in BUCKETS:
+        return jsonify({"error": "Invalid bucket, must be 'day' or 'hour'"}), 400
+
+    types = _multi_arg("type")
+    events = _multi_arg("event")
+    outcome = request.args.get("outcome") or None
+
+    result = get_event_index().query(
+        types=types, events=events, outcome=outcome, since=since, until=until, bucket=bucket
+    )
+    result["filters"] = {
+        "type": sorted(types) if types else None,
+        "event": sorted(events) if events else None,
+        "outcome": outcome,
+        "since": since,
+        "until": until,
+        "bucket": bucket,
+    }
+    return jsonify(result), 200
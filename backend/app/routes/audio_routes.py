@@ -9,30 +9,61 @@ Date: 2024-05-18
 
 Features:
 - Upload and validate audio files (type, size, basic metadata).
-- Analyze audio quality (duration, sample rate, bitrate, RMS, silence).
+- Analyze audio quality: header checks (duration, sample rate, bitrate) run
+  from the admission probe before any capacity is reserved; decode checks
+  (RMS, silence) run in the pipeline.
 - Convert to mono 16kHz WAV and trim silence.
-- Transcribe using OpenAI Whisper model.
-- Log all uploads (success and failure) as structured events.
+- Transcribe using OpenAI Whisper model (on the bounded CPU offload executor).
+- Pipelined processing: quality analysis, conversion and a speculative first
+  transcription window overlap; rejected uploads cancel the speculative work.
+- Only detected speech regions are transcribed; segment timestamps refer to
+  the original recording.
+- Admission control: each upload's transcription cost is estimated from its
+  probed duration and refused with 429/503 + Retry-After when it does not fit
+  the node's in-flight budget (see app.services.admission).
+- Admitted uploads queue for a node-wide transcription slot, shortest
+  estimated job first within fairness and aging bounds. Each upload is a
+  job (id from the optional X-Job-Id header, else generated) whose state and
+  estimated start/finish are at GET /api/transcription/jobs/<id> while it
+  runs, and in the upload response; GET /api/transcription/queue shows the
+  whole queue.
+- Job cost comes from the node's processing-time model (fitted on past
+  uploads); uploads responses carry the prediction and
+  GET /api/transcription/model reports the model and the node's capacity.
+- Log all uploads (success and failure) as structured events; bytes
+  ingested are counted on /metrics.
 - Robust error handling and temp file cleanup.
 
 Dependencies: Flask, whisper, app.utils.logger, app.utils.logging_utils,
-app.services.audio_processor
+app.services.audio_processor, app.services.audio_pipeline, app.services.offload,
+app.services.admission, app.services.transcription_scheduler, app.services.eta_model,
+app.utils.metrics
 """
 
 from flask import Blueprint, request, jsonify
 import os
 from datetime import datetime, timezone, timedelta
 import time
+import uuid
 from app.utils.logger import logger
 from app.utils.logging_utils import log_transcript_to_file, log_event
 from app.services.audio_processor import (
-    check_audio_quality, convert_to_wav, trim_silence,
-    get_audio_duration, get_sample_rate_channels, get_bitrate
+    run_quality_gate, probe_session, get_audio_duration, get_sample_rate_channels, get_bitrate
 )
+from app.services.audio_pipeline import AudioPipeline, TranscriptionError
+from app.services.offload import run_cpu
+from app.services.admission import get_admission_controller, estimate_duration
+from app.services.transcription_scheduler import get_scheduler, JOB_ID_PATTERN
+from app.services.eta_model import get_eta_model
+from app.utils.tracing import span
+from app.utils.metrics import BYTES_INGESTED
+import threading
 import whisper
 
-# Load OpenAI Whisper model (base)
-whisper_model = whisper.load_model("base")
+# OpenAI Whisper model (base), loaded on first use (see get_whisper_model)
+WHISPER_MODEL_NAME = "base"
+_whisper_model = None
+_whisper_lock = threading.Lock()
 
 # Flask Blueprint for audio endpoints
 audio_bp = Blueprint('audio', __name__)
@@ -50,6 +81,147 @@ def get_client_ip():
     """
     return request.headers.get('X-Forwarded-For', request.remote_addr)
 
+def get_client_key():
+    """
+    Client identity for admission and scheduling limits.
+
+    The raw X-Forwarded-For header is set by the client and cannot be trusted
+    for limits; the peer address is, and behind trusted proxies it is the
+    forwarded client address (see TRUSTED_PROXY_COUNT in create_app).
+
+    Returns:
+        str: Client address.
+    """
+    return request.remote_addr or "unknown"
+
+def analyze_upload(path, tiers=("decode",)):
+    """
+    Run quality gate rules and collect file metadata for an uploaded file.
+
+    By default only the decode-based rules run: process_audio runs the header
+    rules itself before admission. Header metadata the gate did not reach is
+    filled in from the same shared probe, so it costs no extra ffprobe.
+
+    Args:
+        path (str): Uploaded file.
+        tiers (tuple, optional): Rule tiers to run (None for all).
+
+    Returns:
+        dict: {"ok", "reason", "duration", "sample_rate", "channels", "bitrate",
+               "quality_rule", "quality_timings"}
+    """
+    with probe_session():
+        gate = run_quality_gate(path, tiers=tiers)
+        measurements = gate["measurements"]
+        if os.path.isfile(path):
+            if "duration" not in measurements:
+                measurements["duration"] = get_audio_duration(path)
+            if "sample_rate" not in measurements:
+                measurements["sample_rate"], measurements["channels"] = get_sample_rate_channels(path)
+            if "bitrate" not in measurements:
+                measurements["bitrate"] = get_bitrate(path)
+    return {
+        "ok": gate["ok"],
+        "reason": gate["reason"],
+        "duration": measurements.get("duration"),
+        "sample_rate": measurements.get("sample_rate"),
+        "channels": measurements.get("channels"),
+        "bitrate": measurements.get("bitrate"),
+        "quality_rule": gate["rule"],
+        "quality_timings": gate["timings"]
+    }
+
+def get_whisper_model():
+    """
+    Return the shared Whisper model, loading it on first use.
+
+    The production server loads it in the master before forking (see
+    app.preload), so workers share one copy; merely importing the app
+    (benchmarks, tooling) does not load it.
+
+    Returns:
+        The loaded Whisper model.
+    """
+    global _whisper_model
+    with _whisper_lock:
+        if _whisper_model is None:
+            _whisper_model = whisper.load_model(WHISPER_MODEL_NAME)
+        return _whisper_model
+
+def transcribe_audio(audio):
+    """
+    Transcribe a file path or 16 kHz sample array with the shared Whisper model.
+
+    Returns:
+        dict: Whisper's result ("text" and timestamped "segments").
+    """
+    with span("whisper.transcribe"):
+        return run_cpu(get_whisper_model().transcribe, audio)
+
+def _epoch_iso(seconds):
+    """
+    Epoch seconds as an ISO 8601 UTC timestamp (None stays None).
+    """
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat(timespec="seconds")
+
+def _file_meta(file, reported_size, quality):
+    """
+    Upload metadata shared by the upload events.
+    """
+    return {
+        "filename": getattr(file, "filename", None),
+        "content_type": getattr(file, "content_type", None),
+        "reported_size": reported_size,
+        "duration": quality.get("duration"),
+        "sample_rate": quality.get("sample_rate"),
+        "channels": quality.get("channels"),
+        "bitrate": quality.get("bitrate")
+    }
+
+def _quality_rejected(file, reported_size, quality, reason, client_ip, timestamp, pipeline=None):
+    """
+    Log an upload that failed the quality gate and build its 400 response.
+    """
+    logger.warning("Audio rejected: %s", reason)
+    log_event({
+        "type": "audio_quality_failed",
+        "timestamp": timestamp,
+        "user_agent": request.headers.get("User-Agent"),
+        "ip": client_ip,
+        **_file_meta(file, reported_size, quality),
+        "reason": reason,
+        "quality_rule": quality.get("quality_rule"),
+        "quality_timings": quality.get("quality_timings"),
+        "outcome": "failure",
+        "pipeline": pipeline
+    })
+    return jsonify({"error": reason, "quality_warning": reason}), 400
+
+def _admission_rejected(decision, file, reported_size):
+    """
+    Log a refused upload and build its 429/503 response with Retry-After.
+    """
+    logger.warning("Upload refused (%s): %s", decision.status, decision.reason)
+    log_event({
+        "type": "audio_admission_rejected",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "user_agent": request.headers.get("User-Agent"),
+        "ip": get_client_ip(),
+        "filename": getattr(file, "filename", None),
+        "reported_size": reported_size,
+        "status": decision.status,
+        "reason": decision.reason,
+        "estimated_cpu_sec": decision.cost.cpu_sec,
+        "in_flight": decision.in_flight,
+        "retry_after": decision.retry_after,
+        "outcome": "rejected"
+    })
+    body = {"error": decision.reason, "retry_after": decision.retry_after,
+            "estimated_processing_sec": decision.cost.cpu_sec}
+    return jsonify(body), decision.status, {"Retry-After": str(decision.retry_after)}
+
 @audio_bp.route('/process-audio', methods=['POST'])
 def process_audio():
     """
@@ -59,28 +231,43 @@ def process_audio():
     Workflow:
         1. Accept file upload (POST).
         2. Check file type and size.
-        3. Save file as WAV for processing.
-        4. Analyze audio quality (duration, sample rate, bitrate, RMS, silence).
-        5. Reject/return error if fails quality check (with structured event log).
-        6. Convert and trim audio using ffmpeg.
-        7. Transcribe using Whisper.
-        8. Log transcript and success analytics.
-        9. Clean up temporary files.
-        10. Return JSON with transcript (and entities placeholder).
+        3. Save file as WAV for processing and probe its header; reject it on
+           the header quality checks (duration, sample rate, bitrate).
+        4. Predict its processing time and reserve transcription capacity
+           (admission control).
+        5. Queue as a job (X-Job-Id header, else a generated id; pollable at
+           GET /api/transcription/jobs/<id>) and wait for a node-wide
+           transcription slot (shortest job first, fairness-bounded).
+        6. Run the decode quality checks (RMS, silence); reject/return error
+           on failure (with structured event log).
+        7. Convert and trim audio using ffmpeg.
+        8. Transcribe using Whisper.
+        9. Log transcript and success analytics.
+        10. Clean up temporary files.
+        11. Return JSON with transcript (and entities placeholder).
 
     Returns:
-        200: {'transcript': str, 'entities': list}
-        400: {"error": "..."} (invalid, quality fail, or missing file)
+        200: {'transcript': str, 'segments': [{'start', 'end', 'text'}], 'entities': list,
+              'queue_wait_sec': float, 'eta': {'processing_sec', 'p90_sec', 'source'},
+              'job_id': str, 'estimated_start': str, 'estimated_finish': str}
+              (estimates as forecast when the job was queued, ISO 8601 UTC)
+        400: {"error": "..."} (invalid, quality fail, missing file, or malformed X-Job-Id)
         413: {"error": "..."} (file too large)
+        409: {"error": "..."} (X-Job-Id already queued)
+        429/503: {"error": "...", "retry_after": int} (client/node over capacity; Retry-After header)
         500: {"error": "..."} (unexpected server error)
     """
     original_path = converted_path = trimmed_path = None
+    ticket = None
+    job = None
+    pipeline = None
+    scheduler = get_scheduler()
+    admission = get_admission_controller()
     upload_start = time.time()
     try:
         file = request.files.get('audio')
-        print("audio_file:", file)
-        print("audio_file.mimetype:", getattr(file, "mimetype", None))
-        print("audio_file.filename:", getattr(file, "filename", None))
+        logger.debug("Audio upload: %s (filename=%s, mimetype=%s)", file,
+                     getattr(file, "filename", None), getattr(file, "mimetype", None))
         if not file or not file.content_type.startswith('audio/'):
             return jsonify({"error": "Invalid file or missing."}), 400
 
@@ -89,66 +276,71 @@ def process_audio():
         if reported_size > 25 * 1024 * 1024:
             return jsonify({"error": "File too large! Max 25MB allowed."}), 413
         file.seek(0)
+        job_id = request.headers.get("X-Job-Id")
+        if job_id is not None and not JOB_ID_PATTERN.match(job_id):
+            return jsonify({"error": "Invalid X-Job-Id (1-64 letters, digits, '-' or '_')."}), 400
+        # Shed before spending disk and probe time on an upload that cannot run
+        decision = admission.precheck(get_client_key())
+        if not decision.ok:
+            return _admission_rejected(decision, file, reported_size)
+        BYTES_INGESTED.inc(reported_size)
 
-        original_path = "original_audio.wav"
-        converted_path = "converted_audio.wav"
-        trimmed_path = "trimmed_audio.wav"
+        # Per-request file names so concurrent uploads never overwrite each other
+        request_key = uuid.uuid4().hex
+        original_path = os.path.join(UPLOAD_FOLDER, f"{request_key}_original.wav")
+        converted_path = os.path.join(UPLOAD_FOLDER, f"{request_key}_converted.wav")
+        trimmed_path = os.path.join(UPLOAD_FOLDER, f"{request_key}_trimmed.wav")
         file.save(original_path)
 
-        # --- Audio quality check and metadata ---
-        ok, reason = check_audio_quality(original_path)
-        duration = get_audio_duration(original_path)
-        sample_rate, channels = get_sample_rate_channels(original_path)
-        bitrate = get_bitrate(original_path)
-        file_meta = {
-            "filename": getattr(file, "filename", None),
-            "content_type": getattr(file, "content_type", None),
-            "reported_size": reported_size,
-            "duration": duration,
-            "sample_rate": sample_rate,
-            "channels": channels,
-            "bitrate": bitrate
-        }
+        # --- Quality check, conversion and transcription (pipelined) ---
+        pipeline = AudioPipeline(transcribe_audio, analyze_upload)
         client_ip = get_client_ip()
+        client_key = get_client_key()
         timestamp = datetime.now(timezone.utc).isoformat()
+        # One probe session: the header probe serves the header checks, admission and the pipeline
+        with probe_session():
+            # Header-only rules first, so a bad upload never reserves capacity or a slot
+            header = analyze_upload(original_path, tiers=("header",))
+            if not header["ok"]:
+                return _quality_rejected(file, reported_size, header, header["reason"], client_ip, timestamp)
+            duration = estimate_duration(header["duration"], reported_size)
+            eta = get_eta_model().predict(duration, header["sample_rate"])
+            decision = admission.admit(duration, client_key, cpu_sec=eta["processing_sec"])
+            if not decision.ok:
+                return _admission_rejected(decision, file, reported_size)
+            ticket = decision.ticket
+            try:
+                job = scheduler.submit(decision.cost.cpu_sec, client_key, job_id)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 409
+            try:
+                scheduler.wait(job)
+                outcome = pipeline.run(original_path, converted_path, trimmed_path)
+            except TranscriptionError as whisper_error:
+                logger.exception("Whisper transcription failed")
+                log_event({
+                    "type": "whisper_transcribe_exception",
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "user_agent": request.headers.get("User-Agent"),
+                    "ip": get_client_ip(),
+                    "filename": getattr(file, "filename", None),
+                    "content_type": getattr(file, "content_type", None),
+                    "reported_size": reported_size,
+                    "error": str(whisper_error),
+                    "outcome": "exception"
+                })
+                return jsonify({"error": f"Transcription failed: {whisper_error}"}), 500
+
+        quality = {**outcome["quality"],
+                   "quality_timings": {**header["quality_timings"], **(outcome["quality"].get("quality_timings") or {})}}
+        file_meta = _file_meta(file, reported_size, quality)
+
+        if not outcome["ok"]:
+            return _quality_rejected(file, reported_size, quality, outcome["reason"], client_ip, timestamp,
+                                     outcome["speculative"])
 
-        if not ok:
-            logger.warning(f"Audio rejected: {reason}")
-            log_event({
-                "type": "audio_quality_failed",
-                "timestamp": timestamp,
-                "user_agent": request.headers.get("User-Agent"),
-                "ip": client_ip,
-                **file_meta,
-                "reason": reason,
-                "outcome": "failure"
-            })
-            return jsonify({"error": reason, "quality_warning": reason}), 400
-
-        # Convert and trim
-        convert_to_wav(original_path, converted_path)
-        trim_success = trim_silence(converted_path, trimmed_path)
-        final_path = trimmed_path if trim_success else converted_path
-
-        # Whisper transcription (main failure point)
-        transcribe_start = time.time()
-        try:
-            result = whisper_model.transcribe(final_path)
-            transcript = result["text"]
-        except Exception as whisper_error:
-            logger.exception("Whisper transcription failed")
-            log_event({
-                "type": "whisper_transcribe_exception",
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "user_agent": request.headers.get("User-Agent"),
-                "ip": get_client_ip(),
-                **file_meta,
-                "error": str(whisper_error),
-                "outcome": "exception"
-            })
-            return jsonify({"error": f"Transcription failed: {whisper_error}"}), 500
-
-        transcribe_time = time.time() - transcribe_start
+        transcript = outcome["transcript"]
+        transcribe_time = outcome["timings"].get("transcribe", 0.0)
         transcript_length = len(transcript.split())
 
         log_transcript_to_file(transcript)
@@ -163,10 +355,21 @@ def process_audio():
             "outcome": "success",
             "transcript_length": transcript_length,
             "transcribe_time_sec": round(transcribe_time, 2),
-            "processing_time_sec": round(time.time() - upload_start, 2)
+            "processing_time_sec": round(time.time() - upload_start, 2),
+            "queue_wait_sec": round(job.waited_sec, 2),
+            "job_id": job.id,
+            "predicted_processing_sec": eta["processing_sec"],
+            "stage_timings": outcome["timings"],
+            "quality_timings": quality.get("quality_timings"),
+            "speech": outcome["speech"],
+            "fast_path": outcome["fast_path"],
+            "pipeline": outcome["speculative"]
         })
 
-        return jsonify({'transcript': transcript, 'entities': []})
+        return jsonify({'transcript': transcript, 'segments': outcome["segments"], 'entities': [],
+                        'queue_wait_sec': round(job.waited_sec, 2), 'eta': eta,
+                        'job_id': job.id, 'estimated_start': _epoch_iso(job.estimated_start),
+                        'estimated_finish': _epoch_iso(job.estimated_finish)})
 
     except Exception as e:
         logger.exception("Unhandled error in /process-audio")
@@ -182,9 +385,61 @@ def process_audio():
         return jsonify({"error": "Unexpected server error", "details": str(e)}), 500
 
     finally:
+        def release_capacity(job=job, ticket=ticket):
+            if job is not None:
+                scheduler.release(job)
+            admission.release(ticket)
+        # A rejected upload's speculative transcription may still be running:
+        # keep its slot and CPU reservation until it ends
+        if pipeline is not None:
+            pipeline.when_idle(release_capacity)
+        else:
+            release_capacity()
         for path in filter(None, [original_path, converted_path, trimmed_path]):
             if path and os.path.exists(path):
                 try:
                     os.remove(path)
                 except Exception as cleanup_err:
-                    logger.warning(f"Failed to delete temp file {path}: {cleanup_err}")
+                    logger.warning("Failed to delete temp file %s: %s", path, cleanup_err)
+
+@audio_bp.route('/api/transcription/queue', methods=['GET'])
+def transcription_queue():
+    """
+    Show the transcription queue with estimated start and finish times.
+
+    With a shared queue ("shared": true, the gunicorn default) this is the
+    whole node's queue, whichever worker answers.
+
+    Returns:
+        200: {"slots": int, "shared": bool, "running": int, "queued": int,
+              "jobs": [{"id", "state", "cost_sec", "estimated_start_in_sec", "estimated_finish_in_sec"}]}
+    """
+    return jsonify(get_scheduler().snapshot())
+
+@audio_bp.route('/api/transcription/jobs/<job_id>', methods=['GET'])
+def transcription_job(job_id):
+    """
+    State and estimated start/finish of one queued or running upload.
+
+    Returns:
+        200: {"id", "state": "queued"|"running", "cost_sec", "estimated_start", "estimated_finish",
+              "estimated_start_in_sec", "estimated_finish_in_sec"} (ISO 8601 UTC timestamps)
+        404: {"error": "..."} (unknown, or already finished)
+    """
+    status = get_scheduler().job_status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown or finished job"}), 404
+    status["estimated_start"] = _epoch_iso(status["estimated_start"])
+    status["estimated_finish"] = _epoch_iso(status["estimated_finish"])
+    return jsonify(status)
+
+@audio_bp.route('/api/transcription/model', methods=['GET'])
+def transcription_model():
+    """
+    Report this node's processing-time model and the transcription capacity it implies.
+
+    Returns:
+        200: {"node", "samples", "fitted", "coefficients", "residual_std_sec",
+              "realtime_factor", "capacity_audio_hours_per_hour"}
+    """
+    return jsonify(get_eta_model().summary(slots=get_scheduler().slots))
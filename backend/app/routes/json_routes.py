@@ -8,60 +8,164 @@ Created by Eric Morse
 Date: 2024-05-18
 
 Features:
-- /process-json: NLP analysis of meeting transcripts, with event log retrieval.
+- /process-json: NLP analysis of meeting transcripts, with event log retrieval
+  (optionally excluded, paginated, or streamed as incremental JSON / NDJSON).
 - /feedback: Accepts and logs user feedback on a meeting.
-- Utility to fetch per-meeting event logs for auditability and traceability.
+- Utility to fetch per-meeting event logs (live and archived) for auditability and traceability.
 
-Dependencies: Flask, app.services.nlp_analysis, app.utils.logging_utils, os, json
+Dependencies: Flask, app.services.nlp_analysis, app.utils.logging_utils,
+app.utils.event_archive, app.utils.json_stream, app.utils.request_journal, os, json
 """
 from werkzeug.exceptions import BadRequest
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from app.services.nlp_analysis import analyze_transcript
 from app.utils.logging_utils import log_event
+from app.utils.event_archive import iter_archived_events, has_archive
+from app.utils.json_stream import iter_json_object, iter_ndjson, paginate
+from app.utils.logger import logger
+from app.utils.request_journal import get_request_journal
+from app.utils.tracing import span
 import os
 import json
-from datetime import datetime
 
 # Create a Blueprint for JSON routes
 json_bp = Blueprint('json', __name__)
 
 def log_process_json(data, error=None):
     """
-    Utility to log the payload and errors for /process-json requests.
+    Journal a /process-json request (bounded, sampled, written off the request thread).
     """
-    log_path = os.path.join(os.path.dirname(__file__), "process_json.log")
-    with open(log_path, "a", encoding="utf-8") as f:
-        timestamp = datetime.now().isoformat()
-        f.write(f"\n[{timestamp}] Incoming data: {repr(data)}\n")
-        if error:
-            f.write(f"[{timestamp}] ERROR: {repr(error)}\n")
+    get_request_journal().record("/process-json", data, error=error)
 
-            
-def get_event_logs_for_meeting(meeting_id):
+def iter_event_logs_for_meeting(meeting_id):
     """
-    Retrieve all event log entries associated with a given meeting ID.
+    Lazily yield event log entries associated with a given meeting ID.
+
+    Reads the live JSONL logs line by line and, transparently, any compressed
+    archives; archive blocks that do not contain the meeting are never
+    decompressed. Only one entry is held in memory at a time.
 
     Args:
         meeting_id (str): Unique meeting identifier.
 
-    Returns:
-        list: List of event log dictionaries for the meeting.
+    Yields:
+        dict: Event log entries for the meeting.
     """
     directory = "event_logs"
-    events = []
     if not meeting_id or not os.path.isdir(directory):
-        return events
-    for filename in os.listdir(directory):
-        if filename.endswith(".jsonl"):
+        return
+    filenames = os.listdir(directory)
+    for filename in filenames:
+        if filename.endswith(".jsonl") and not has_archive(filename, filenames):
             with open(os.path.join(directory, filename), encoding="utf-8") as f:
                 for line in f:
                     try:
                         entry = json.loads(line)
                         if entry.get("meeting_id") == meeting_id:
-                            events.append(entry)
+                            yield entry
                     except Exception:
                         continue
-    return events
+    yield from iter_archived_events(directory, meeting_id=meeting_id)
+
+def get_event_logs_for_meeting(meeting_id):
+    """
+    Retrieve all event log entries associated with a given meeting ID.
+
+    Args:
+        meeting_id (str): Unique meeting identifier.
+
+    Returns:
+        list: List of event log dictionaries for the meeting.
+    """
+    return list(iter_event_logs_for_meeting(meeting_id))
+
+def _flag(value, default):
+    """
+    Interpret a JSON or query-string option as a boolean.
+    """
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() not in ("", "0", "false", "no", "off")
+    return bool(value)
+
+def _response_options(data):
+    """
+    Read /process-json output options from the JSON body, falling back to the query string.
+
+    Returns:
+        dict: {"stream": None|"json"|"ndjson", "include_event_logs": bool,
+               "offset": int, "limit": int|None, "paginated": bool}
+
+    Raises:
+        ValueError: If offset/limit are not non-negative integers or stream is unknown.
+    """
+    def option(name):
+        return data[name] if name in data else request.args.get(name)
+
+    stream = option("stream")
+    if isinstance(stream, str) and stream.lower() in ("json", "ndjson"):
+        stream = stream.lower()
+    elif _flag(stream, False):
+        stream = "json"
+    else:
+        stream = None
+    if stream is None and "application/x-ndjson" in request.headers.get("Accept", ""):
+        stream = "ndjson"
+
+    offset = option("event_logs_offset")
+    limit = option("event_logs_limit")
+    try:
+        offset = int(offset) if offset not in (None, "") else 0
+        limit = int(limit) if limit not in (None, "") else None
+    except (TypeError, ValueError):
+        raise ValueError("event_logs_offset and event_logs_limit must be integers")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise ValueError("event_logs_offset and event_logs_limit must be non-negative")
+    return {
+        "stream": stream,
+        "include_event_logs": _flag(option("include_event_logs"), True),
+        "offset": offset,
+        "limit": limit,
+        "paginated": offset > 0 or limit is not None,
+    }
+
+def _stream_result(result, meeting_id, options):
+    """
+    Build a streaming response for /process-json.
+
+    Event logs are read lazily while the response is written, so peak
+    memory does not depend on the meeting's event history.
+    """
+    def logged(items):
+        try:
+            yield from items
+        except Exception as e:
+            # Headers are already sent; end the list and record the problem
+            logger.error("Event log streaming failed for meeting %s: %s", meeting_id, e)
+
+    fields = {**result, "meeting_id": meeting_id}
+    if options["include_event_logs"]:
+        page = paginate(logged(iter_event_logs_for_meeting(meeting_id)), options["offset"], options["limit"])
+    else:
+        page = None
+
+    if options["stream"] == "ndjson":
+        def sections():
+            yield "result", fields
+            if page is not None:
+                for entry in page:
+                    yield "event_log", entry
+                yield "end", {"event_logs_page": page.info()}
+            else:
+                yield "end", {}
+        return Response(iter_ndjson(sections()), mimetype="application/x-ndjson")
+
+    if page is None:
+        # Nothing large left to stream
+        return jsonify(fields)
+    trailer = (lambda: {"event_logs_page": page.info()}) if options["paginated"] else None
+    return Response(iter_json_object(fields, "event_logs", page, trailer), mimetype="application/json")
 
 @json_bp.route('/process-json', methods=['POST'])
 def process_json():
@@ -74,12 +178,23 @@ def process_json():
             {
                 "transcript": "...",
                 "level": "short"|"detailed" (optional),
-                "meeting_id": "unique-id" (optional)
+                "meeting_id": "unique-id" (optional),
+                "include_event_logs": true (optional, false omits event_logs),
+                "event_logs_offset": 0, "event_logs_limit": 100 (optional paging),
+                "stream": false|"json"|"ndjson" (optional)
             }
+        The response options may also be given as query parameters; an
+        `Accept: application/x-ndjson` header selects NDJSON streaming.
+
+    Streaming modes read the meeting's event logs lazily while the body is
+    written: "json" produces the same document incrementally, "ndjson" emits
+    one {"section": ..., "data": ...} line for the result, each event log,
+    and a final "end" section. When paging, `event_logs_page` reports
+    `next_offset` (null on the last page).
 
     Returns:
         200: NLP analysis result (with summary, actions, decisions, etc).
-        400: JSON error (missing transcript or malformed JSON)
+        400: JSON error (missing transcript, malformed JSON or bad paging options)
         415: Invalid content type
         500: NLP error
     """
@@ -102,12 +217,22 @@ def process_json():
     meeting_id = data.get("meeting_id")
     if not transcript:
         return jsonify({"error": "Missing transcript"}), 400
+    try:
+        options = _response_options(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     try:
         result = analyze_transcript(transcript, level=level)
+        if options["stream"]:
+            return _stream_result(result, meeting_id, options)
         # Attach previous event logs for this meeting, if available
-        event_logs = get_event_logs_for_meeting(meeting_id) if meeting_id else []
-        result["event_logs"] = event_logs
+        if options["include_event_logs"]:
+            page = paginate(iter_event_logs_for_meeting(meeting_id), options["offset"], options["limit"])
+            with span("event_logs.read"):
+                result["event_logs"] = list(page)
+            if options["paginated"]:
+                result["event_logs_page"] = page.info()
         result["meeting_id"] = meeting_id
         return jsonify(result), 200
     except BadRequest as e:
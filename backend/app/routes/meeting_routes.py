@@ -10,15 +10,17 @@ Date: 2024-05-18
 Features:
 - API endpoint to retrieve all 'meeting_meta' event log entries.
 - Graceful handling of missing directories, parse errors, and file errors.
+- Reads compressed event log archives transparently (only `meeting_meta` blocks are decoded).
 - Logs parsing errors and file read issues as structured events for auditing.
 
-Dependencies: Flask, os, json, app.utils.logging_utils
+Dependencies: Flask, os, json, app.utils.logging_utils, app.utils.event_archive
 """
 
 from flask import Blueprint, jsonify
 import os
 import json
 from app.utils.logging_utils import log_event
+from app.utils.event_archive import iter_archived_events, has_archive
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -30,6 +32,7 @@ def get_meeting_meta_logs():
     - Handles missing log directory by returning empty logs.
     - Handles malformed log lines by counting them, skipping, and logging as error events.
     - Handles file read errors by skipping files and logging as file-level error events.
+    - Includes entries from compressed archives of closed days.
     - For each error, logs a structured error event in the log.
 
     Returns:
@@ -47,7 +50,10 @@ def get_meeting_meta_logs():
     if not os.path.isdir(directory):
         return jsonify({"logs": [], "skipped_lines": 0, "skipped_files": []})
 
-    for filename in os.listdir(directory):
+    filenames = os.listdir(directory)
+    for filename in filenames:
+        if has_archive(filename, filenames):
+            continue
         if filename.startswith("event_log_") and filename.endswith(".jsonl"):
             path = os.path.join(directory, filename)
             try:
@@ -79,6 +85,24 @@ def get_meeting_meta_logs():
                 })
                 continue
 
+    def on_archive_error(filename, error, raw_line):
+        nonlocal skipped_lines
+        skipped_files.add(filename)
+        if raw_line is None:
+            log_event({"type": "log_file_error", "file": filename, "error": error})
+            return
+        skipped_lines += 1
+        log_event({
+            "type": "log_parse_error",
+            "file": filename,
+            "error": error,
+            "raw_line": raw_line
+        })
+
+    # Archived days are appended after the live files, so `logs` is not in time
+    # order here; the sort below is what makes the response newest first.
+    logs.extend(iter_archived_events(directory, types={"meeting_meta"}, on_error=on_archive_error))
+
     logs.sort(key=lambda x: x.get("logged_at", ""), reverse=True)
     return jsonify({
         "logs": logs,
@@ -0,0 +1,28 @@
+"""
+metrics_routes.py
+
+Flask Blueprint exposing Prometheus metrics for the AI Meeting Summarizer.
+
+Features:
+- /metrics: all metrics in the Prometheus text exposition format; in
+  multiprocess mode (METRICS_DIR) the values of every worker are merged,
+  so any worker can answer the scrape.
+
+Dependencies: Flask, app.utils.metrics
+"""
+
+from flask import Blueprint, Response
+from app.utils.metrics import CONTENT_TYPE, REGISTRY
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Return the current metrics for Prometheus to scrape.
+
+    Returns:
+        200: text/plain exposition format
+    """
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
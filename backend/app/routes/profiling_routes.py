@@ -0,0 +1,77 @@
+"""
+profiling_routes.py
+
+Flask Blueprint for listing and downloading request profiles in the AI Meeting Summarizer.
+
+Features:
+- /admin/profiles: stored captures, newest first (see app.utils.profiling).
+- /admin/profiles/<id>: full summary of one capture (top functions and
+  allocation sites).
+- /admin/profiles/<id>/download: the raw pstats file.
+- Every endpoint requires the `X-Admin-Token` header to match
+  PROFILE_ADMIN_TOKEN; without a configured token they are disabled.
+
+Dependencies: Flask, app.utils.profiling
+"""
+
+import json
+from flask import Blueprint, jsonify, request, send_file
+from app.utils.profiling import capture_path, is_admin, list_captures
+
+profiling_bp = Blueprint('profiling', __name__)
+
+
+def _forbidden():
+    return jsonify({"error": "Admin token required."}), 403
+
+
+@profiling_bp.route("/admin/profiles", methods=["GET"])
+def get_profiles():
+    """
+    List stored profile captures.
+
+    Returns:
+        200: {"profiles": [summary without top lists, ...]}
+        403: {"error": "..."} (missing or invalid admin token)
+    """
+    if not is_admin(request.headers):
+        return _forbidden()
+    return jsonify({"profiles": list_captures()})
+
+
+@profiling_bp.route("/admin/profiles/<capture_id>", methods=["GET"])
+def get_profile(capture_id):
+    """
+    Return the full summary of one capture.
+
+    Returns:
+        200: summary with "top_functions" and "top_allocations"
+        403: {"error": "..."} (missing or invalid admin token)
+        404: {"error": "..."} (unknown capture)
+    """
+    if not is_admin(request.headers):
+        return _forbidden()
+    path = capture_path(capture_id, ".json")
+    if path is None:
+        return jsonify({"error": "Profile not found."}), 404
+    with open(path, encoding="utf-8") as f:
+        return jsonify(json.load(f))
+
+
+@profiling_bp.route("/admin/profiles/<capture_id>/download", methods=["GET"])
+def download_profile(capture_id):
+    """
+    Download the pstats file of one capture.
+
+    Returns:
+        200: application/octet-stream (<id>.prof)
+        403: {"error": "..."} (missing or invalid admin token)
+        404: {"error": "..."} (unknown capture)
+    """
+    if not is_admin(request.headers):
+        return _forbidden()
+    path = capture_path(capture_id, ".prof")
+    if path is None:
+        return jsonify({"error": "Profile not found."}), 404
+    return send_file(path, mimetype="application/octet-stream", as_attachment=True,
+                     download_name=f"{capture_id}.prof")
@@ -0,0 +1,395 @@
+"""
+admission.py
+
+Admission control for audio transcription in the AI Meeting Summarizer.
+
+Features:
+- Estimates the CPU time and memory of each upload from its probed
+  duration (the node's fitted processing-time model when available, else
+  a configured real-time factor plus per-job overhead).
+- Tracks the cost of in-flight jobs against a CPU budget (seconds of
+  queued transcription work) and a memory budget, and refuses uploads that
+  do not fit: 503 when the node is over budget, 429 when one client already
+  has too many jobs in flight. Both come with a Retry-After estimated from
+  when enough in-flight work will have finished.
+- A job larger than the whole budget is admitted only when nothing else is
+  running, so long recordings are slowed down, never starved.
+- Bounding transcriptions keeps request threads free, so cheap endpoints
+  (/feedback, /api/meetings/meta, ...) stay responsive during upload storms.
+- With ADMISSION_DIR set, the in-flight ledger is shared by all worker
+  processes of the node (one small file per job, guarded by a file lock);
+  entries of exited workers are ignored and removed. Under gunicorn the
+  master sets it up before forking (`prepare_shared_ledger`), so the budgets
+  are node-wide by default rather than per worker.
+
+Configuration (environment variables):
+    ADMISSION_CPU_BUDGET_SEC      Estimated CPU seconds of work allowed in flight (default 1800)
+    ADMISSION_MEMORY_BUDGET_MB    Estimated memory allowed in flight (default 2048)
+    ADMISSION_MAX_PER_CLIENT      Jobs in flight per client before 429 (default 2)
+    ADMISSION_RTF                 CPU seconds per second of audio (default 0.5)
+    ADMISSION_JOB_OVERHEAD_SEC    Fixed CPU seconds per job (default 2)
+    ADMISSION_JOB_MEMORY_MB       Fixed memory per job (default 150)
+    ADMISSION_MEMORY_MB_PER_MIN   Memory per minute of audio (default 10)
+    ADMISSION_DIR                 Shared ledger directory for multi-worker nodes (default unset;
+                                  gunicorn creates a temporary one)
+
+Dependencies: Python standard library (fcntl where available), app.utils.metrics
+"""
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from app.utils.metrics import Counter, Gauge
+
+try:
+    import fcntl
+except ImportError:  # Windows: per-process ledger only
+    fcntl = None
+
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 600
+# Used when the duration cannot be probed: bytes per second of a 128 kbps stream
+FALLBACK_BYTES_PER_SEC = 16000
+
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total", "Transcription admission decisions.", ("result",))
+ADMISSION_CPU_IN_FLIGHT = Gauge(
+    "admission_cpu_seconds_in_flight", "Estimated CPU seconds of admitted, unfinished jobs.")
+ADMISSION_MEMORY_IN_FLIGHT = Gauge(
+    "admission_memory_bytes_in_flight", "Estimated memory of admitted, unfinished jobs.")
+
+
+@dataclass
+class JobCost:
+    cpu_sec: float
+    memory_mb: float
+
+
+@dataclass
+class Admission:
+    """
+    Outcome of AdmissionController.admit().
+
+    `status` is 200 when admitted (release `ticket` when done), else 429/503
+    with `retry_after` seconds and a human-readable `reason`.
+    """
+    ok: bool
+    status: int = 200
+    retry_after: int = 0
+    reason: str = ""
+    ticket: str = None
+    cost: JobCost = None
+    in_flight: dict = field(default_factory=dict)
+
+
+def _env_number(name, default, cast=float):
+    try:
+        return cast(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class MemoryLedger:
+    """
+    In-flight jobs of this process (entries are dicts keyed by "id").
+
+    Also backs the transcription scheduler's queue on single-process servers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            yield self
+
+    def entries(self):
+        return list(self._entries.values())
+
+    def add(self, entry):
+        self._entries[entry["id"]] = entry
+
+    def remove(self, ticket):
+        self._entries.pop(ticket, None)
+
+
+class FileLedger:
+    """
+    In-flight jobs of every process on the node, one JSON file per job.
+
+    Entries carry the owning "pid"; entries of exited processes are dropped
+    on read. Also backs the node-wide transcription queue.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._lock_path = os.path.join(directory, ".lock")
+
+    @contextmanager
+    def transaction(self):
+        with self._lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield self
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.startswith("job_"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not _pid_alive(entry.get("pid", 0)):
+                # The worker died mid-job: its reservation is void
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            entries.append(entry)
+        return entries
+
+    def add(self, entry):
+        with open(os.path.join(self.directory, f"job_{entry['id']}.json"), "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+
+    def remove(self, ticket):
+        try:
+            os.remove(os.path.join(self.directory, f"job_{ticket}.json"))
+        except OSError:
+            pass
+
+
+class AdmissionController:
+    """
+    Admits transcription jobs while their estimated cost fits the budgets.
+
+    Args:
+        cpu_budget_sec (float): Estimated CPU seconds allowed in flight.
+        memory_budget_mb (float): Estimated memory allowed in flight.
+        max_per_client (int): Jobs in flight per client.
+        rtf (float): CPU seconds per second of audio.
+        job_overhead_sec (float): Fixed CPU seconds per job.
+        job_memory_mb (float): Fixed memory per job.
+        memory_mb_per_min (float): Memory per minute of audio.
+        directory (str, optional): Shared ledger directory (node-wide accounting).
+        clock (callable): Wall clock (injectable for tests).
+    """
+
+    def __init__(self, cpu_budget_sec=1800, memory_budget_mb=2048, max_per_client=2,
+                 rtf=0.5, job_overhead_sec=2.0, job_memory_mb=150, memory_mb_per_min=10,
+                 directory=None, clock=time.time):
+        self.cpu_budget_sec = cpu_budget_sec
+        self.memory_budget_mb = memory_budget_mb
+        self.max_per_client = max_per_client
+        self.rtf = rtf
+        self.job_overhead_sec = job_overhead_sec
+        self.job_memory_mb = job_memory_mb
+        self.memory_mb_per_min = memory_mb_per_min
+        self._clock = clock
+        if directory and fcntl is not None:
+            self._ledger = FileLedger(directory)
+        else:
+            self._ledger = MemoryLedger()
+
+    def estimate(self, duration_sec, cpu_sec=None):
+        """
+        Estimated cost of transcribing `duration_sec` seconds of audio.
+
+        `cpu_sec`, when given (e.g. from the node's processing-time model),
+        replaces the configured real-time-factor estimate.
+        """
+        duration_sec = max(float(duration_sec or 0), 0.0)
+        if cpu_sec is None:
+            cpu_sec = self.job_overhead_sec + self.rtf * duration_sec
+        return JobCost(
+            cpu_sec=round(cpu_sec, 2),
+            memory_mb=round(self.job_memory_mb + self.memory_mb_per_min * duration_sec / 60, 1),
+        )
+
+    @staticmethod
+    def _totals(entries):
+        return (sum(e["cpu_sec"] for e in entries), sum(e["memory_mb"] for e in entries))
+
+    def _retry_after(self, entries, cost, now):
+        """
+        Seconds until enough in-flight work should have finished for `cost` to fit.
+        """
+        cpu, memory = self._totals(entries)
+        # Jobs are expected to finish in order of their estimated end; a job
+        # larger than the budget fits once everything before it is done
+        remaining = sorted(((max(e["started"] + e["cpu_sec"] - now, 0.0), e) for e in entries),
+                           key=lambda item: item[0])
+        wait = 0.0
+        for left, entry in remaining:
+            cpu -= entry["cpu_sec"]
+            memory -= entry["memory_mb"]
+            wait = left
+            if cpu + cost.cpu_sec <= self.cpu_budget_sec and memory + cost.memory_mb <= self.memory_budget_mb:
+                break
+        return int(min(max(math.ceil(wait), MIN_RETRY_AFTER), MAX_RETRY_AFTER))
+
+    def _publish(self, entries):
+        # The gauges carry only this process's reservations: /metrics sums
+        # gauges over live workers, which gives the node-wide total
+        pid = os.getpid()
+        own_cpu, own_memory = self._totals([e for e in entries if e.get("pid") == pid])
+        ADMISSION_CPU_IN_FLIGHT.set(round(own_cpu, 2))
+        ADMISSION_MEMORY_IN_FLIGHT.set(own_memory * 2**20)
+        cpu, memory = self._totals(entries)
+        return {"jobs": len(entries), "cpu_sec": round(cpu, 2), "memory_mb": round(memory, 1)}
+
+    def _refusal(self, entries, client, cost, now, in_flight):
+        """
+        The 429/503 refusal for a job of `cost`, or None if it may run.
+        """
+        own = [e for e in entries if client is not None and e["client"] == client]
+        if len(own) >= self.max_per_client:
+            ADMISSION_DECISIONS.inc(result="rejected_client")
+            return Admission(False, 429, self._retry_after(own, JobCost(0, 0), now),
+                             f"Too many uploads in progress for this client ({len(own)}).",
+                             cost=cost, in_flight=in_flight)
+        cpu, memory = self._totals(entries)
+        fits = cpu + cost.cpu_sec <= self.cpu_budget_sec and memory + cost.memory_mb <= self.memory_budget_mb
+        # An oversized job still runs on an idle node
+        if entries and not fits:
+            ADMISSION_DECISIONS.inc(result="rejected_capacity")
+            return Admission(False, 503, self._retry_after(entries, cost, now),
+                             "Server is at transcription capacity, please retry later.",
+                             cost=cost, in_flight=in_flight)
+        return None
+
+    def precheck(self, client=None):
+        """
+        Refuse early, before an upload is saved and probed, if even the
+        smallest job would not be admitted. Reserves nothing.
+
+        Returns:
+            Admission: ok (without a ticket), or a 429/503 refusal.
+        """
+        cost = self.estimate(0)
+        with self._ledger.transaction() as ledger:
+            entries = ledger.entries()
+            in_flight = self._publish(entries)
+            refusal = self._refusal(entries, client, cost, self._clock(), in_flight)
+        return refusal or Admission(True, cost=cost, in_flight=in_flight)
+
+    def admit(self, duration_sec, client=None, cpu_sec=None):
+        """
+        Reserve capacity for one job, or refuse it.
+
+        Args:
+            duration_sec (float): Probed audio duration.
+            client (str, optional): Client key for the per-client limit.
+            cpu_sec (float, optional): Predicted processing time (see estimate()).
+
+        Returns:
+            Admission: ok with a ticket to release(), or a 429/503 refusal.
+        """
+        cost = self.estimate(duration_sec, cpu_sec)
+        now = self._clock()
+        with self._ledger.transaction() as ledger:
+            entries = ledger.entries()
+            refusal = self._refusal(entries, client, cost, now, self._publish(entries))
+            if refusal is not None:
+                return refusal
+            ticket = uuid.uuid4().hex
+            ledger.add({"id": ticket, "pid": os.getpid(), "client": client, "started": now,
+                        "cpu_sec": cost.cpu_sec, "memory_mb": cost.memory_mb})
+            in_flight = self._publish(ledger.entries())
+        ADMISSION_DECISIONS.inc(result="admitted")
+        return Admission(True, ticket=ticket, cost=cost, in_flight=in_flight)
+
+    def release(self, ticket):
+        """
+        Free the capacity reserved by an admitted job.
+        """
+        if ticket is None:
+            return
+        with self._ledger.transaction() as ledger:
+            ledger.remove(ticket)
+            self._publish(ledger.entries())
+
+
+def estimate_duration(duration, size_bytes):
+    """
+    The probed duration, or an estimate from the upload size if probing failed.
+    """
+    if duration is not None and duration > 0:
+        return duration
+    return (size_bytes or 0) / FALLBACK_BYTES_PER_SEC
+
+
+def prepare_shared_ledger():
+    """
+    Give all workers of a multi-process server one node-wide ledger (call in
+    the master before forking): use ADMISSION_DIR, clearing reservations of a
+    previous run, or create a temporary directory and export it as ADMISSION_DIR.
+
+    Returns:
+        tuple: (directory, created) - created is True for a new temporary directory.
+    """
+    directory = os.environ.get("ADMISSION_DIR")
+    if not directory:
+        directory = tempfile.mkdtemp(prefix="admission-")
+        os.environ["ADMISSION_DIR"] = directory
+        return directory, True
+    if os.path.isdir(directory):
+        # Worker pids of a previous run may be reused, so their entries would look live
+        for name in os.listdir(directory):
+            if name.startswith("job_"):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+    return directory, False
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    """
+    Return the process-wide admission controller, configured from the environment.
+    """
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(
+                cpu_budget_sec=_env_number("ADMISSION_CPU_BUDGET_SEC", 1800),
+                memory_budget_mb=_env_number("ADMISSION_MEMORY_BUDGET_MB", 2048),
+                max_per_client=_env_number("ADMISSION_MAX_PER_CLIENT", 2, int),
+                rtf=_env_number("ADMISSION_RTF", 0.5),
+                job_overhead_sec=_env_number("ADMISSION_JOB_OVERHEAD_SEC", 2.0),
+                job_memory_mb=_env_number("ADMISSION_JOB_MEMORY_MB", 150),
+                memory_mb_per_min=_env_number("ADMISSION_MEMORY_MB_PER_MIN", 10),
+                directory=os.environ.get("ADMISSION_DIR") or None,
+            )
+        return _controller
@@ -0,0 +1,345 @@
+"""
+audio_pipeline.py
+
+Upload-to-transcript pipeline for the AI Meeting Summarizer.
+
+Features:
+- Pipelined mode (default): the quality analysis, the ffmpeg conversion and a
+  speculative transcription of the first window of speech run concurrently.
+  A rejected upload cancels the conversion process and the pending
+  speculative work; an accepted one reuses the speculative transcript for
+  the head and only transcribes the rest. A speculative transcription that
+  had already started cannot be interrupted: callers hold their CPU
+  reservation until it ends (when_idle), so rejected uploads never
+  oversubscribe the transcription slots.
+- Voice activity detection (pipelined mode): only speech regions are sent
+  to Whisper, packed into one array; segment timestamps are mapped back to
+  the original recording.
+- Uploads that are already 16 kHz mono 16-bit PCM WAV skip ffmpeg: their
+  samples are memory-mapped straight from the upload.
+- Sequential mode: quality check, convert, trim, transcribe (the original flow);
+  segment timestamps are mapped back to the original recording as well.
+- Per-stage timings for logging.
+
+Configuration (environment variables):
+    AUDIO_PIPELINE_MODE            "pipelined" (default) or "sequential"
+    AUDIO_SPECULATIVE_WINDOW_SEC   Length of the speculative head window (default 30)
+    AUDIO_VAD                      "0" to transcribe the whole trimmed span (default "1")
+
+Dependencies: NumPy, concurrent.futures, app.services.audio_processor, app.services.vad
+"""
+
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from app.utils.logger import logger
+from app.services.audio_processor import (
+    start_wav_conversion, convert_to_wav, trim_silence, load_wav_samples, speech_bounds,
+    is_whisper_ready_wav, map_wav_samples
+)
+from app.services.vad import SpeechTimeline, detect_speech, vad_enabled
+from app.utils.tracing import span, bind_context
+
+SAMPLE_RATE = 16000
+DEFAULT_WINDOW_SEC = 30.0
+# The head/tail cut is moved to the quietest 20 ms frame within this many seconds
+SPLIT_SEARCH_SEC = 2.0
+# A tail shorter than this is not worth a second transcription call
+MIN_TAIL_SEC = 0.5
+
+
+class TranscriptionError(Exception):
+    """
+    Raised when the transcription step itself fails (wraps the original error).
+    """
+
+    def __init__(self, original):
+        super().__init__(str(original))
+        self.original = original
+
+
+def pipeline_mode():
+    """
+    Configured pipeline mode ("pipelined" or "sequential").
+    """
+    mode = os.environ.get("AUDIO_PIPELINE_MODE", "pipelined").lower()
+    return mode if mode in ("pipelined", "sequential") else "pipelined"
+
+
+def quiet_split_point(samples, target, sample_rate=SAMPLE_RATE, search_sec=SPLIT_SEARCH_SEC):
+    """
+    Index near `target` (at or before it) where cutting is least likely to split a word.
+
+    Args:
+        samples (np.ndarray): Mono float samples.
+        target (int): Preferred cut index.
+
+    Returns:
+        int: Start index of the quietest 20 ms frame in [target - search, target].
+    """
+    frame = sample_rate // 50
+    lo = max(0, target - int(search_sec * sample_rate))
+    region = samples[lo:target]
+    count = region.size // frame
+    if count == 0:
+        return target
+    energy = np.square(region[:count * frame].reshape(count, frame)).mean(axis=1)
+    return lo + int(np.argmin(energy)) * frame
+
+
+def _join(*texts):
+    return " ".join(t.strip() for t in texts if t and t.strip())
+
+
+def _text_and_segments(result):
+    """
+    Normalize a transcriber result (str, or Whisper's dict) to (text, segments).
+    """
+    if isinstance(result, dict):
+        return result.get("text", ""), result.get("segments") or []
+    return result, []
+
+
+class AudioPipeline:
+    """
+    Runs quality analysis, conversion and transcription for one upload.
+
+    Args:
+        transcribe (callable): transcribe(audio) -> str, or a Whisper-style
+            dict with "text" and "segments"; audio is a file path or a
+            float32 16 kHz sample array.
+        quality_check (callable): quality_check(path) -> dict with at least
+            "ok" (bool) and "reason" (str); extra keys are passed through.
+        mode (str, optional): "pipelined" or "sequential" (default from environment).
+        window_sec (float, optional): Speculative head window length.
+        converter (callable): converter(input, output) -> Popen (pipelined mode).
+        vad (bool, optional): Transcribe speech regions only (default from environment).
+    """
+
+    def __init__(self, transcribe, quality_check, mode=None, window_sec=None,
+                 converter=start_wav_conversion, vad=None):
+        self.transcribe = transcribe
+        self.quality_check = quality_check
+        self.mode = mode or pipeline_mode()
+        if window_sec is None:
+            window_sec = float(os.environ.get("AUDIO_SPECULATIVE_WINDOW_SEC", DEFAULT_WINDOW_SEC))
+        self.window_sec = window_sec
+        self.converter = converter
+        self.vad = vad_enabled() if vad is None else vad
+        # Speculative transcription still running after run() returned
+        self._inflight = None
+
+    def when_idle(self, callback):
+        """
+        Call `callback` once no work of this pipeline is running any more.
+
+        A rejected (or failed) upload may leave its speculative head
+        transcription running on the CPU executor after run() returns; the
+        callback then runs when it finishes (on the pipeline's thread),
+        otherwise right away. Release transcription capacity here, not when
+        run() returns.
+        """
+        future = self._inflight
+        if future is None:
+            callback()
+        else:
+            future.add_done_callback(lambda _future: callback())
+
+    def run(self, original_path, converted_path, trimmed_path=None):
+        """
+        Process one saved upload.
+
+        Returns:
+            dict: {
+                "ok": bool, "reason": str, "quality": dict,
+                "transcript": str | None,
+                "segments": [{"start", "end", "text"}] on the original timeline,
+                "speech": {"regions": int, "speech_sec": float} | None,
+                "timings": {stage: seconds},
+                "speculative": {"started": bool, "used": bool, "cancelled": bool},
+                "fast_path": bool (conversion skipped)
+            }
+
+        Raises:
+            TranscriptionError: If transcription fails.
+            Exception: Conversion failures of accepted uploads.
+        """
+        if self.mode == "sequential":
+            return self._run_sequential(original_path, converted_path, trimmed_path)
+        return self._run_pipelined(original_path, converted_path)
+
+    def _transcribe(self, audio, timings):
+        start = time.time()
+        try:
+            return self.transcribe(audio)
+        except Exception as e:
+            raise TranscriptionError(e) from e
+        finally:
+            timings["transcribe"] = timings.get("transcribe", 0.0) + time.time() - start
+
+    def _timed_quality(self, path):
+        start = time.time()
+        quality = self.quality_check(path)
+        quality["_elapsed"] = time.time() - start
+        return quality
+
+    def _result(self, quality, transcript, timings, speculative, segments=None, speech=None,
+                fast_path=False):
+        quality = dict(quality)
+        timings["quality"] = quality.pop("_elapsed", timings.get("quality", 0.0))
+        return {
+            "ok": bool(quality.get("ok")),
+            "reason": quality.get("reason"),
+            "quality": quality,
+            "transcript": transcript,
+            "segments": segments or [],
+            "speech": speech,
+            "timings": {k: round(v, 4) for k, v in timings.items()},
+            "speculative": speculative,
+            "fast_path": fast_path,
+        }
+
+    def _run_sequential(self, original_path, converted_path, trimmed_path):
+        timings = {}
+        speculative = {"started": False, "used": False, "cancelled": False}
+        quality = self._timed_quality(original_path)
+        if not quality.get("ok"):
+            return self._result(quality, None, timings, speculative)
+        fast_path = is_whisper_ready_wav(original_path)
+        if fast_path:
+            converted_path = original_path
+        else:
+            start = time.time()
+            convert_to_wav(original_path, converted_path)
+            timings["convert"] = time.time() - start
+        final_path = converted_path
+        if trimmed_path:
+            start = time.time()
+            if trim_silence(converted_path, trimmed_path):
+                final_path = trimmed_path
+            timings["trim"] = time.time() - start
+        transcript, segments = _text_and_segments(self._transcribe(final_path, timings))
+        if segments:
+            # Whisper's times are relative to the trimmed file: map them to the
+            # original recording through the span the trim kept, as in pipelined mode
+            samples = map_wav_samples(converted_path) if fast_path else load_wav_samples(converted_path)
+            begin, end = speech_bounds(samples, SAMPLE_RATE) if final_path == trimmed_path else (0, samples.size)
+            timeline = SpeechTimeline([(begin, end)] if end > begin else [], SAMPLE_RATE)
+            segments = timeline.map_segments(segments)
+        return self._result(quality, transcript, timings, speculative, segments=segments,
+                            fast_path=fast_path)
+
+    def _run_pipelined(self, original_path, converted_path):
+        timings = {}
+        speculative = {"started": False, "used": False, "cancelled": False}
+        started = time.time()
+        pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="audio-pipeline")
+        head_future = None
+        try:
+            quality_future = pool.submit(bind_context(self._timed_quality), original_path)
+            proc = None
+            conversion_error = None
+            fast_path = is_whisper_ready_wav(original_path)
+            if not fast_path:
+                try:
+                    proc = self.converter(original_path, converted_path)
+                except Exception as e:
+                    conversion_error = e
+
+            if proc is not None:
+                # Wait for whichever finishes first: a rejection stops the conversion
+                conversion_future = pool.submit(proc.wait)
+                pending = {quality_future, conversion_future}
+                with span("audio.convert"):
+                    while conversion_future in pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        if quality_future in done and not quality_future.result().get("ok"):
+                            speculative["cancelled"] = self._cancel_conversion(proc)
+                            return self._result(quality_future.result(), None, timings, speculative)
+                timings["convert"] = time.time() - started
+                if proc.returncode != 0:
+                    conversion_error = subprocess.CalledProcessError(proc.returncode, "ffmpeg")
+            if conversion_error is not None:
+                # A failed conversion only matters if the upload is acceptable
+                quality = quality_future.result()
+                if not quality.get("ok"):
+                    return self._result(quality, None, timings, speculative)
+                raise conversion_error
+
+            load_start = time.time()
+            if fast_path:
+                samples = map_wav_samples(original_path)
+            else:
+                samples = load_wav_samples(converted_path)
+            begin, end = speech_bounds(samples, SAMPLE_RATE)
+            timings["trim"] = time.time() - load_start
+            regions = [(begin, end)] if end > begin else []
+            if self.vad and regions:
+                vad_start = time.time()
+                # Fall back to the trimmed span if nothing crosses the VAD threshold
+                with span("audio.vad"):
+                    regions = detect_speech(samples, SAMPLE_RATE) or regions
+                timings["vad"] = time.time() - vad_start
+            timeline = SpeechTimeline(regions, SAMPLE_RATE)
+            audio = timeline.pack(samples)
+            speech = {
+                "regions": len(regions),
+                "speech_sec": round(timeline.speech_seconds, 2),
+                "audio_sec": round(samples.size / SAMPLE_RATE, 2),
+            }
+
+            split = audio.size
+            window = int(self.window_sec * SAMPLE_RATE)
+            if not quality_future.done() and audio.size > window:
+                # Verdict still pending: transcribe the first window speculatively
+                split = quiet_split_point(audio, window)
+                head_timings = {}
+                head_future = pool.submit(bind_context(self._transcribe), audio[:split], head_timings)
+                speculative["started"] = True
+
+            quality = quality_future.result()
+            if not quality.get("ok"):
+                if head_future is not None:
+                    # Dropped if not started yet; otherwise its result is discarded (see when_idle)
+                    speculative["cancelled"] = True
+                return self._result(quality, None, timings, speculative, speech=speech, fast_path=fast_path)
+
+            if audio.size == 0:
+                transcript, segments = "", []
+            elif head_future is None:
+                transcript, segments = _text_and_segments(self._transcribe(audio, timings))
+                segments = timeline.map_segments(segments)
+            else:
+                head, head_segments = _text_and_segments(head_future.result())
+                timings["transcribe"] = head_timings.get("transcribe", 0.0)
+                speculative["used"] = True
+                segments = timeline.map_segments(head_segments)
+                tail = ""
+                if audio.size - split >= MIN_TAIL_SEC * SAMPLE_RATE:
+                    tail, tail_segments = _text_and_segments(self._transcribe(audio[split:], timings))
+                    segments += timeline.map_segments(tail_segments, split / SAMPLE_RATE)
+                transcript = _join(head, tail)
+            timings["total"] = time.time() - started
+            return self._result(quality, transcript, timings, speculative, segments, speech, fast_path)
+        finally:
+            # Never block the response on abandoned speculative work, but
+            # remember it so the caller keeps its slot until it is done
+            if head_future is not None and not head_future.cancel() and not head_future.done():
+                self._inflight = head_future
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _cancel_conversion(proc):
+        """
+        Kill a still-running conversion process; returns True if it was running.
+        """
+        if proc.poll() is not None:
+            return False
+        try:
+            proc.kill()
+            proc.wait(timeout=5)
+        except Exception as e:
+            logger.warning("Failed to stop conversion process: %s", e)
+        return True
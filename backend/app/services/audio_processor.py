@@ -7,17 +7,29 @@ Created by Eric Morse
 Date: 2024-05-18
 
 Functions include:
-- Audio file quality checks
-- Audio property extraction (duration, sample rate, channels, bitrate, RMS volume, silence ratio)
-- Conversion to mono 16kHz WAV
-- Silence trimming
-
-Relies on ffmpeg/ffprobe and standard Python libraries.
+- Audio file quality checks (cost-ordered, early-exit rule gate; see quality_gate.py)
+- Audio property extraction (duration, sample rate, channels, bitrate, RMS volume, silence ratio);
+  one header probe and one decode pass are shared per file inside a probe session
+- Conversion to mono 16kHz WAV (blocking, or as a cancellable background process)
+- Silence trimming (ffmpeg, or in-process on decoded samples)
+- Loading 16kHz PCM WAV files as NumPy sample arrays (memory-mapped when the
+  upload is already 16kHz mono 16-bit PCM, skipping ffmpeg entirely)
+- Quality gate verdicts and probe cache hits are counted on /metrics
+
+Relies on ffmpeg/ffprobe, NumPy and standard Python libraries.
 """
 
 import subprocess
 import os
+import json
+import wave
+from contextlib import contextmanager
+from contextvars import ContextVar
+import numpy as np
 from app.utils.logger import logger
+from app.services.quality_gate import QualityGate, QualityRule
+from app.utils.tracing import span, traced
+from app.utils.metrics import CACHE_REQUESTS, QUALITY_CHECKS, QUALITY_REJECTIONS
 
 # Directory to store uploaded audio files
 UPLOAD_FOLDER = "uploads"
@@ -26,6 +38,12 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 # Supported audio formats for processing
 SUPPORTED_FORMATS = {'.wav', '.mp3', '.m4a', '.aac', '.flac', '.ogg'}
 
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Probe results shared within a probe_session() (None outside of one)
+_probe_cache = ContextVar("audio_probe_cache", default=None)
+
 
 def is_supported_format(path: str) -> bool:
     """
@@ -41,6 +59,93 @@ def is_supported_format(path: str) -> bool:
     return ext.lower() in SUPPORTED_FORMATS
 
 
+@contextmanager
+def probe_session():
+    """
+    Share probe results between calls in this context.
+
+    Inside the session, get_audio_duration/get_sample_rate_channels/get_bitrate
+    share one header probe per file, and get_rms_volume/get_silence_ratio
+    share one decode pass, instead of each running its own ffprobe/ffmpeg.
+    Nested sessions share the outermost one's results.
+    """
+    if _probe_cache.get() is not None:
+        yield
+        return
+    token = _probe_cache.set({})
+    try:
+        yield
+    finally:
+        _probe_cache.reset(token)
+
+
+def _cached(key, path, compute):
+    cache = _probe_cache.get()
+    if cache is None:
+        return compute()
+    key = (key, os.path.abspath(path))
+    if key not in cache:
+        CACHE_REQUESTS.inc(cache="probe", result="miss")
+        cache[key] = compute()
+    else:
+        CACHE_REQUESTS.inc(cache="probe", result="hit")
+    return cache[key]
+
+
+def _read_wav_header(path: str) -> dict:
+    with wave.open(path, "rb") as wav:
+        rate = wav.getframerate()
+        channels = wav.getnchannels()
+        return {
+            "duration": wav.getnframes() / rate,
+            "sample_rate": rate,
+            "channels": channels,
+            "bitrate": rate * channels * wav.getsampwidth() * 8,
+        }
+
+
+@traced("audio.probe")
+def probe_audio(path: str) -> dict:
+    """
+    Read duration, sample rate, channels and bitrate in one pass.
+
+    PCM WAV headers are parsed directly; other formats use a single ffprobe call.
+
+    Args:
+        path (str): Path to audio file.
+
+    Returns:
+        dict: {"duration": float, "sample_rate": int, "channels": int, "bitrate": int}
+
+    Raises:
+        Exception: If the file cannot be probed.
+    """
+    if path.lower().endswith(".wav"):
+        try:
+            return _read_wav_header(path)
+        except (wave.Error, EOFError, ZeroDivisionError, OSError):
+            pass  # Not plain PCM (or damaged): let ffprobe decide
+    result = subprocess.run([
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "format=duration,bit_rate:stream=sample_rate,channels",
+        "-of", "json", path
+    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
+    info = json.loads(result.stdout)
+    fmt = info.get("format", {})
+    streams = info.get("streams") or [{}]
+    return {
+        "duration": float(fmt["duration"]),
+        "sample_rate": int(streams[0].get("sample_rate", 0)),
+        "channels": int(streams[0].get("channels", 0)),
+        "bitrate": int(fmt.get("bit_rate", 0)),
+    }
+
+
+def _probe(path: str) -> dict:
+    return _cached("probe", path, lambda: probe_audio(path))
+
+
 def get_audio_duration(path: str) -> float:
     """
     Get the duration of the audio file in seconds.
@@ -52,14 +157,9 @@ def get_audio_duration(path: str) -> float:
         float: Duration in seconds, or -1 if duration cannot be determined.
     """
     try:
-        result = subprocess.run([
-            "ffprobe", "-v", "error", "-show_entries",
-            "format=duration", "-of",
-            "default=noprint_wrappers=1:nokey=1", path
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
-        return float(result.stdout.strip())
+        return float(_probe(path)["duration"])
     except Exception as e:
-        logger.warning(f"Failed to get duration for {path}: {e}")
+        logger.warning("Failed to get duration for %s: %s", path, e)
         return -1
 
 
@@ -74,18 +174,10 @@ def get_sample_rate_channels(path: str):
         Tuple[int, int]: (sample_rate, channels), or (0, 0) on error.
     """
     try:
-        result = subprocess.run([
-            "ffprobe", "-v", "error",
-            "-select_streams", "a:0",
-            "-show_entries", "stream=sample_rate,channels",
-            "-of", "default=noprint_wrappers=1:nokey=1", path
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
-        lines = result.stdout.strip().split('\n')
-        sample_rate = int(lines[0]) if len(lines) > 0 else 0
-        channels = int(lines[1]) if len(lines) > 1 else 0
-        return sample_rate, channels
+        info = _probe(path)
+        return int(info["sample_rate"]), int(info["channels"])
     except Exception as e:
-        logger.warning(f"Failed to get sample rate/channels for {path}: {e}")
+        logger.warning("Failed to get sample rate/channels for %s: %s", path, e)
         return 0, 0
 
 
@@ -100,18 +192,70 @@ def get_bitrate(path: str) -> int:
         int: Bitrate in bps, or 0 if not available.
     """
     try:
-        result = subprocess.run([
-            "ffprobe", "-v", "error",
-            "-select_streams", "a:0",
-            "-show_entries", "format=bit_rate",
-            "-of", "default=noprint_wrappers=1:nokey=1", path
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True)
-        return int(result.stdout.strip())
+        return int(_probe(path)["bitrate"])
     except Exception as e:
-        logger.warning(f"Failed to get bitrate for {path}: {e}")
+        logger.warning("Failed to get bitrate for %s: %s", path, e)
         return 0
 
 
+def parse_levels(stderr: str) -> dict:
+    """
+    Parse ffmpeg volumedetect/silencedetect output.
+
+    Args:
+        stderr (str): ffmpeg's stderr.
+
+    Returns:
+        dict: {"rms_db": float | None, "silence_sec": float}
+    """
+    rms_db = None
+    silence_durations = []
+    current_start = None
+    for line in stderr.splitlines():
+        if "mean_volume:" in line and rms_db is None:
+            parts = line.strip().split()
+            for i, part in enumerate(parts):
+                if part == "mean_volume:" and i + 1 < len(parts):
+                    val = parts[i+1]
+                    rms_db = float(val[:-2]) if val.endswith("dB") else float(val)
+        elif "silence_start:" in line:
+            current_start = float(line.split("silence_start:")[1].strip())
+        elif "silence_end:" in line and current_start is not None:
+            parts = line.split("silence_end:")[1].split('|')
+            end_time = float(parts[0].strip())
+            silence_durations.append(end_time - current_start)
+            current_start = None
+    return {"rms_db": rms_db, "silence_sec": sum(silence_durations)}
+
+
+@traced("audio.levels")
+def measure_levels(path: str, silence_threshold_db: float = -50.0) -> dict:
+    """
+    Measure mean volume and total silence in one ffmpeg decode pass.
+
+    Args:
+        path (str): Path to audio file.
+        silence_threshold_db (float): Silence threshold in dBFS.
+
+    Returns:
+        dict: {"rms_db": float | None, "silence_sec": float}
+
+    Raises:
+        Exception: If ffmpeg fails.
+    """
+    proc = subprocess.run([
+        "ffmpeg", "-i", path,
+        "-af", f"volumedetect,silencedetect=noise={silence_threshold_db}dB:d=0.5",
+        "-f", "null", "-"
+    ], stderr=subprocess.PIPE, stdout=subprocess.PIPE, text=True, check=True)
+    return parse_levels(proc.stderr)
+
+
+def _levels(path: str, silence_threshold_db: float = -50.0) -> dict:
+    return _cached(("levels", silence_threshold_db), path,
+                   lambda: measure_levels(path, silence_threshold_db))
+
+
 def get_rms_volume(path: str) -> float | None:
     """
     Get the mean RMS volume (dB) of the audio using ffmpeg's volumedetect.
@@ -123,23 +267,9 @@ def get_rms_volume(path: str) -> float | None:
         float | None: Mean volume in dBFS, or None if not available.
     """
     try:
-        proc = subprocess.run([
-            "ffmpeg", "-i", path, "-af", "volumedetect", "-f", "null", "-"
-        ], stderr=subprocess.PIPE, stdout=subprocess.PIPE, text=True, check=True)
-        lines = proc.stderr.splitlines()
-        for line in lines:
-            if "mean_volume:" in line:
-                parts = line.strip().split()
-                for i, part in enumerate(parts):
-                    if part == "mean_volume:" and i + 1 < len(parts):
-                        val = parts[i+1]
-                        if val.endswith("dB"):
-                            return float(val[:-2])
-                        else:
-                            return float(val)
-        return None
+        return _levels(path)["rms_db"]
     except Exception as e:
-        logger.warning(f"Failed to get RMS volume for {path}: {e}")
+        logger.warning("Failed to get RMS volume for %s: %s", path, e)
         return None
 
 
@@ -156,24 +286,7 @@ def get_silence_ratio(path: str, silence_threshold_db: float = -50.0) -> float:
                Returns 1.0 on error or unknown duration.
     """
     try:
-        proc = subprocess.run([
-            "ffmpeg", "-i", path,
-            "-af", f"silencedetect=noise={silence_threshold_db}dB:d=0.5",
-            "-f", "null", "-"
-        ], stderr=subprocess.PIPE, stdout=subprocess.PIPE, text=True, check=True)
-        output = proc.stderr
-
-        silence_durations = []
-        current_start = None
-        for line in output.splitlines():
-            if "silence_start:" in line:
-                current_start = float(line.split("silence_start:")[1].strip())
-            elif "silence_end:" in line and current_start is not None:
-                parts = line.split("silence_end:")[1].split('|')
-                end_time = float(parts[0].strip())
-                silence_durations.append(end_time - current_start)
-                current_start = None
-        total_silence = sum(silence_durations)
+        total_silence = _levels(path, silence_threshold_db)["silence_sec"]
 
         duration = get_audio_duration(path)
         if duration <= 0:
@@ -182,10 +295,123 @@ def get_silence_ratio(path: str, silence_threshold_db: float = -50.0) -> float:
         ratio = total_silence / duration
         return min(max(ratio, 0.0), 1.0)  # Clamp between 0 and 1
     except Exception as e:
-        logger.warning(f"Failed to estimate silence ratio for {path}: {e}")
+        logger.warning("Failed to estimate silence ratio for %s: %s", path, e)
         return 1.0
 
 
+# --- Quality rules (module-level helpers are looked up at call time) ---
+
+def _rule_exists(path, measurements, limits):
+    return None if os.path.isfile(path) else "File does not exist"
+
+
+def _rule_format(path, measurements, limits):
+    return None if is_supported_format(path) else "Unsupported audio format"
+
+
+def _rule_duration(path, measurements, limits):
+    duration = measurements["duration"] = get_audio_duration(path)
+    if duration < 0:
+        return "Unable to determine audio duration"
+    if duration < limits["min_duration"]:
+        return "Audio too short"
+    if duration > limits["max_duration"]:
+        return "Audio too long"
+    return None
+
+
+def _rule_sample_rate(path, measurements, limits):
+    sample_rate, channels = get_sample_rate_channels(path)
+    measurements["sample_rate"], measurements["channels"] = sample_rate, channels
+    if sample_rate < limits["min_sample_rate"]:
+        return f"Sample rate too low: {sample_rate} Hz"
+    return None
+
+
+def _rule_bitrate(path, measurements, limits):
+    bitrate = measurements["bitrate"] = get_bitrate(path)
+    if bitrate < limits["min_bitrate"]:
+        return f"Bitrate too low: {bitrate} bps"
+    return None
+
+
+def _rule_volume(path, measurements, limits):
+    rms_db = measurements["rms_db"] = get_rms_volume(path)
+    if rms_db is None or rms_db < limits["min_rms_db"]:
+        return f"Audio too quiet (mean volume {rms_db} dB)"
+    return None
+
+
+def _rule_silence(path, measurements, limits):
+    silence_ratio = measurements["silence_ratio"] = get_silence_ratio(path)
+    if silence_ratio > limits["max_silence_ratio"]:
+        return f"Audio too silent ({silence_ratio*100:.1f}% silence)"
+    return None
+
+
+QUALITY_GATE = QualityGate(
+    guards=[
+        QualityRule("exists", "file", _rule_exists),
+        QualityRule("format", "file", _rule_format),
+    ],
+    rules=[
+        QualityRule("duration", "header", _rule_duration),
+        QualityRule("sample_rate", "header", _rule_sample_rate),
+        QualityRule("bitrate", "header", _rule_bitrate),
+        QualityRule("volume", "decode", _rule_volume),
+        QualityRule("silence", "decode", _rule_silence),
+    ],
+    # Prior estimates (seconds) until real runs are measured
+    tier_costs={"header": 0.05, "decode": 2.0},
+    session=probe_session,
+)
+
+
+def run_quality_gate(
+    path: str,
+    min_duration: float = 2.0,
+    max_duration: float = 60 * 60 * 2,
+    min_sample_rate: int = 16000,
+    min_bitrate: int = 32000,
+    min_rms_db: float = -40.0,
+    max_silence_ratio: float = 0.6,
+    tiers: tuple | None = None
+) -> dict:
+    """
+    Run the quality rules cheapest first, stopping at the first failure.
+
+    Header checks share one probe and the volume/silence checks share one
+    decode pass, so a file rejected by its header is never decoded.
+
+    A run limited to the "header" tier (e.g. before an upload is admitted)
+    counts only its rejections on /metrics; the upload's later "decode" run
+    counts the final verdict, so every upload is counted once.
+
+    Args:
+        path (str): Path to audio file.
+        (thresholds as in check_audio_quality)
+        tiers (tuple, optional): Only run rules of these tiers ("header", "decode").
+
+    Returns:
+        dict: {"ok", "reason", "rule", "timings", "measurements"} (see QualityGate.run).
+    """
+    with span("audio.quality"):
+        verdict = QUALITY_GATE.run(path, {
+            "min_duration": min_duration,
+            "max_duration": max_duration,
+            "min_sample_rate": min_sample_rate,
+            "min_bitrate": min_bitrate,
+            "min_rms_db": min_rms_db,
+            "max_silence_ratio": max_silence_ratio,
+        }, tiers=tiers)
+    if verdict["ok"] and tiers is not None and "decode" not in tiers:
+        return verdict
+    QUALITY_CHECKS.inc(result="ok" if verdict["ok"] else "rejected")
+    if not verdict["ok"]:
+        QUALITY_REJECTIONS.inc(reason=verdict["rule"] or "unknown")
+    return verdict
+
+
 def check_audio_quality(
     path: str,
     min_duration: float = 2.0,
@@ -210,38 +436,11 @@ def check_audio_quality(
     Returns:
         Tuple[bool, str]: (True, "OK") if all checks pass, otherwise (False, reason).
     """
-    if not os.path.isfile(path):
-        return False, "File does not exist"
-
-    if not is_supported_format(path):
-        return False, "Unsupported audio format"
-
-    duration = get_audio_duration(path)
-    if duration < 0:
-        return False, "Unable to determine audio duration"
-    if duration < min_duration:
-        return False, "Audio too short"
-    if duration > max_duration:
-        return False, "Audio too long"
-
-    sample_rate, _channels = get_sample_rate_channels(path)
-    if sample_rate < min_sample_rate:
-        return False, f"Sample rate too low: {sample_rate} Hz"
-
-    bitrate = get_bitrate(path)
-    if bitrate < min_bitrate:
-        return False, f"Bitrate too low: {bitrate} bps"
-
-    rms_db = get_rms_volume(path)
-    if rms_db is None or rms_db < min_rms_db:
-        return False, f"Audio too quiet (mean volume {rms_db} dB)"
-
-    silence_ratio = get_silence_ratio(path)
-    if silence_ratio > max_silence_ratio:
-        return False, f"Audio too silent ({silence_ratio*100:.1f}% silence)"
-
-    return True, "OK"
+    result = run_quality_gate(path, min_duration, max_duration, min_sample_rate,
+                              min_bitrate, min_rms_db, max_silence_ratio)
+    return result["ok"], result["reason"]
 
+@traced("audio.convert")
 def convert_to_wav(input_path: str, output_path: str) -> None:
     """
     Convert input audio file to mono 16kHz WAV using ffmpeg.
@@ -253,12 +452,175 @@ def convert_to_wav(input_path: str, output_path: str) -> None:
     Raises:
         subprocess.CalledProcessError: If conversion fails.
     """
-    logger.info(f"Converting {input_path} to WAV {output_path}")
+    logger.info("Converting %s to WAV %s", input_path, output_path)
     subprocess.run([
         "ffmpeg", "-y", "-i", input_path,
         "-ac", "1", "-ar", "16000", output_path
     ], check=True)
 
+def start_wav_conversion(input_path: str, output_path: str) -> subprocess.Popen:
+    """
+    Start converting input audio to mono 16kHz WAV in a background ffmpeg process.
+
+    Unlike convert_to_wav, this returns immediately; the caller can wait on the
+    process or kill it (e.g. when the upload is rejected meanwhile).
+
+    Args:
+        input_path (str): Source audio file path.
+        output_path (str): Destination .wav file path.
+
+    Returns:
+        subprocess.Popen: The running ffmpeg process.
+    """
+    logger.info("Converting %s to WAV %s (background)", input_path, output_path)
+    return subprocess.Popen([
+        "ffmpeg", "-y", "-v", "error", "-i", input_path,
+        "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le", output_path
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wav_layout(path: str) -> dict | None:
+    """
+    Locate the PCM data of a WAV file by walking its RIFF chunks.
+
+    Args:
+        path (str): WAV file path.
+
+    Returns:
+        dict | None: {"sample_rate", "channels", "bits", "offset", "length"}
+        (offset/length of the data chunk in bytes), or None if the file is
+        not uncompressed PCM WAV.
+    """
+    try:
+        size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+                return None
+            fmt = None
+            while True:
+                chunk = f.read(8)
+                if len(chunk) < 8:
+                    return None
+                chunk_id, chunk_size = chunk[:4], int.from_bytes(chunk[4:], "little")
+                if chunk_id == b"fmt ":
+                    body = f.read(chunk_size)
+                    tag = int.from_bytes(body[0:2], "little")
+                    if tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                        tag = int.from_bytes(body[24:26], "little")
+                    if tag != WAVE_FORMAT_PCM:
+                        return None
+                    fmt = {
+                        "channels": int.from_bytes(body[2:4], "little"),
+                        "sample_rate": int.from_bytes(body[4:8], "little"),
+                        "bits": int.from_bytes(body[14:16], "little"),
+                    }
+                    f.seek(chunk_size % 2, os.SEEK_CUR)
+                elif chunk_id == b"data":
+                    if fmt is None:
+                        return None
+                    offset = f.tell()
+                    # Streaming recorders may leave the size unset or too large
+                    length = min(chunk_size, size - offset)
+                    return {**fmt, "offset": offset, "length": length}
+                else:
+                    f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+    except OSError:
+        return None
+
+
+def is_whisper_ready_wav(path: str) -> bool:
+    """
+    True if the file is already 16 kHz mono 16-bit PCM WAV (no conversion needed).
+    """
+    layout = wav_layout(path)
+    return bool(layout) and (layout["sample_rate"], layout["channels"], layout["bits"]) == (16000, 1, 16)
+
+
+@traced("audio.load")
+def map_wav_samples(path: str) -> np.ndarray:
+    """
+    Memory-map the samples of a 16 kHz mono 16-bit PCM WAV file.
+
+    Args:
+        path (str): WAV file path (see is_whisper_ready_wav).
+
+    Returns:
+        np.ndarray: float32 samples in [-1, 1], converted straight from the mapping.
+
+    Raises:
+        ValueError: If the file is not 16 kHz mono 16-bit PCM WAV.
+    """
+    layout = wav_layout(path)
+    if not layout or (layout["sample_rate"], layout["channels"], layout["bits"]) != (16000, 1, 16):
+        raise ValueError(f"{path} is not 16 kHz mono 16-bit PCM WAV")
+    count = layout["length"] // 2
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    pcm = np.memmap(path, dtype="<i2", mode="r", offset=layout["offset"], shape=(count,))
+    try:
+        samples = pcm.astype(np.float32)
+    finally:
+        del pcm  # Release the mapping (and the file) before the upload is deleted
+    samples /= 32768.0
+    return samples
+
+
+@traced("audio.load")
+def load_wav_samples(path: str) -> np.ndarray:
+    """
+    Read a 16-bit PCM WAV file as float32 samples in [-1, 1] (first channel).
+
+    Args:
+        path (str): WAV file path.
+
+    Returns:
+        np.ndarray: 1-D float32 sample array.
+
+    Raises:
+        ValueError: If the file is not 16-bit PCM.
+    """
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"Expected 16-bit PCM WAV, got {8 * wav.getsampwidth()}-bit")
+        channels = wav.getnchannels()
+        frames = wav.readframes(wav.getnframes())
+    samples = np.frombuffer(frames, dtype="<i2")
+    if channels > 1:
+        samples = samples[::channels]
+    return samples.astype(np.float32) / 32768.0
+
+
+def speech_bounds(samples: np.ndarray, sample_rate: int = 16000,
+                  threshold_db: float = -50.0, min_silence: float = 0.5) -> tuple[int, int]:
+    """
+    Find the span between leading and trailing silence, in samples.
+
+    Mirrors trim_silence's ffmpeg silenceremove settings (-50 dB, 0.5 s) on
+    decoded samples, so no second ffmpeg pass is needed.
+
+    Args:
+        samples (np.ndarray): Mono float samples.
+        sample_rate (int): Samples per second.
+        threshold_db (float): Level (dBFS) below which audio counts as silence.
+        min_silence (float): Leading/trailing silence shorter than this is kept.
+
+    Returns:
+        Tuple[int, int]: (start, end) sample indices; (0, 0) if all silent.
+    """
+    if samples.size == 0:
+        return 0, 0
+    threshold = 10 ** (threshold_db / 20)
+    loud = np.flatnonzero(np.abs(samples) > threshold)
+    if loud.size == 0:
+        return 0, 0
+    keep = int(min_silence * sample_rate)
+    start = int(loud[0]) if loud[0] >= keep else 0
+    end = int(loud[-1]) + 1 if samples.size - loud[-1] - 1 >= keep else samples.size
+    return start, end
+
+
+@traced("audio.trim")
 def trim_silence(input_path: str, output_path: str) -> bool:
     """
     Trim silence from beginning and end of audio using ffmpeg's silenceremove filter.
@@ -270,7 +632,7 @@ def trim_silence(input_path: str, output_path: str) -> bool:
     Returns:
         bool: True if trimming succeeded, False otherwise.
     """
-    logger.info(f"Trimming silence from {input_path}")
+    logger.info("Trimming silence from %s", input_path)
     try:
         subprocess.run([
             "ffmpeg", "-y", "-i", input_path,
@@ -282,5 +644,5 @@ def trim_silence(input_path: str, output_path: str) -> bool:
         ], check=True)
         return True
     except subprocess.CalledProcessError as e:
-        logger.warning(f"Silence trimming failed: {e}")
+        logger.warning("Silence trimming failed: %s", e)
         return False
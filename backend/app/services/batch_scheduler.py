@@ -0,0 +1,69 @@
+"""
+batch_scheduler.py
+
+Bounded concurrent execution of calendar scheduling batches for the
+AI Meeting Summarizer.
+
+Features:
+- Runs one worker call per item on a bounded thread pool, so a batch of
+  CalDAV writes takes roughly one round-trip instead of N.
+- Per-item results in input order, with errors captured instead of
+  aborting the whole batch (partial-failure reporting).
+- Summary counts for building API responses.
+
+Dependencies: Python standard library (concurrent.futures)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+# Upper bound on concurrent CalDAV requests per batch
+DEFAULT_MAX_WORKERS = 8
+
+
+def run_batch(items, worker, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Apply `worker` to every item concurrently and collect per-item outcomes.
+
+    Args:
+        items (list): Work items.
+        worker (callable): Called as worker(item); its return value is the item result.
+        max_workers (int): Maximum number of concurrent worker calls.
+
+    Returns:
+        list of dict: One entry per item, in input order:
+            {"index": int, "ok": True, "result": Any} or
+            {"index": int, "ok": False, "error": str}
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    def call(indexed):
+        index, item = indexed
+        try:
+            return {"index": index, "ok": True, "result": worker(item)}
+        except Exception as e:
+            return {"index": index, "ok": False, "error": str(e)}
+
+    if len(items) == 1 or max_workers <= 1:
+        return [call(pair) for pair in enumerate(items)]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix="calendar-batch") as pool:
+        # Each task runs in a copy of the caller's context (request trace)
+        futures = [pool.submit(copy_context().run, call, pair) for pair in enumerate(items)]
+        return [future.result() for future in futures]
+
+
+def summarize_batch(outcomes):
+    """
+    Count successes and failures of a batch.
+
+    Args:
+        outcomes (list): Output of run_batch().
+
+    Returns:
+        dict: {"total": int, "succeeded": int, "failed": int}
+    """
+    succeeded = sum(1 for o in outcomes if o["ok"])
+    return {"total": len(outcomes), "succeeded": succeeded, "failed": len(outcomes) - succeeded}
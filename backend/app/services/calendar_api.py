@@ -11,19 +11,29 @@ This module defines routes for event scheduling and integration with
 calendar providers. It expects ISO-format times and JSON payloads.
 
 Endpoints:
-- POST /api/schedule-actions: Schedule multiple actions as events.
+- POST /api/schedule-actions: Queue actions as events in the durable outbox
+  (returns immediately), or with "async": false create them concurrently
+  and wait for per-action results.
+- GET /api/schedule-actions/<batch_id>: Delivery status of a queued batch.
+- POST /api/propose-slots: Propose free, non-overlapping slots per owner.
 - POST /create-event: Create a single calendar event.
 
 Helper functions:
 - create_event_payload
 - generate_event_data_from_action
 
-Relies on Flask Blueprint, datetime, and a calendar_integration module.
+Relies on Flask Blueprint, datetime, and the calendar_integration,
+batch_scheduler, calendar_outbox, slot_scheduler and date_extraction modules.
 """
 
 from flask import Blueprint, request, jsonify
 from .calendar_integration import create_calendar_event
+from .batch_scheduler import run_batch, summarize_batch
+from .calendar_outbox import get_outbox
+from .slot_scheduler import get_slot_allocator
+from .date_extraction import parse_action_datetime
 from datetime import datetime, timedelta, timezone
+from app.utils.tracing import traced
 
 calendar_api = Blueprint('calendar_api', __name__)
 
@@ -56,11 +66,199 @@ def create_event_payload(owner, action, start_time, end_time):
         "attendees": [{"name": attendee_name}]
     }
 
+def _action_event_fields(action):
+    """
+    Derive (title, owner, start, end) for an included action.
+
+    Args:
+        action (dict): Action from the request payload.
+
+    Returns:
+        tuple: (title, owner, start, valid_end) with ISO 8601 times.
+
+    Raises:
+        ValueError: If the action's datetime is not valid ISO 8601.
+    """
+    title = action.get('text', 'Untitled Action')
+    owner = action.get('owner', 'Unassigned')
+    start = action['datetime']
+    end = action.get('end')
+    start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    valid_end = None
+    if end:
+        try:
+            end_dt = datetime.fromisoformat(end.replace("Z", "+00:00"))
+            if end_dt > start_dt:
+                valid_end = end  # Accept as-is (already ISO string)
+        except Exception:
+            pass
+
+    if not valid_end:
+        # Default: 1 hour after start
+        valid_end = (start_dt + timedelta(hours=1)).isoformat()
+    return title, owner, start, valid_end
+
+def _schedule_action(indexed_action):
+    """
+    Create the calendar event for one included action.
+
+    Args:
+        indexed_action (tuple): (index, action dict) from the request payload.
+
+    Returns:
+        Any: Result of create_calendar_event.
+    """
+    _index, action = indexed_action
+    title, owner, start, valid_end = _action_event_fields(action)
+    return create_calendar_event(title, owner, start, valid_end)
+
+def _enqueue_actions(selected, idempotency_key=None, unslotted=()):
+    """
+    Record included actions in the calendar outbox for background delivery.
+
+    Args:
+        selected (list): (index, action) pairs with a fixed datetime.
+        idempotency_key (str, optional): Request-level key; combined with the
+            action index so resubmitting the same request does not duplicate events.
+        unslotted (list): (index, action) pairs without a datetime; the outbox
+            dispatcher picks their slot, so no free/busy lookup happens here.
+
+    Returns:
+        tuple: (batch_id, queued records, failed items)
+    """
+    events = []
+    failed = []
+    for index, action in sorted(list(selected) + list(unslotted), key=lambda pair: pair[0]):
+        key = action.get('idempotency_key') or (f"{idempotency_key}:{index}" if idempotency_key else None)
+        owner = action.get('owner', 'Unassigned')
+        if not action.get('datetime'):
+            parsed = parse_action_datetime(action.get('text', ''))
+            events.append({
+                "title": action.get('text', 'Untitled Action'),
+                "description": owner,
+                "owner": owner,
+                "start_time": parsed.isoformat() if parsed else "",
+                "end_time": "",
+                "duration_minutes": action.get('duration_minutes'),
+                "needs_slot": True,
+                "idempotency_key": key
+            })
+            continue
+        try:
+            title, owner, start, valid_end = _action_event_fields(action)
+        except Exception as e:
+            failed.append({"index": index, "text": action.get('text'), "error": str(e)})
+            continue
+        events.append({
+            "title": title,
+            "description": owner,
+            "owner": owner,
+            "start_time": start,
+            "end_time": valid_end,
+            "idempotency_key": key
+        })
+    batch_id, queued = get_outbox().enqueue(events) if events else (None, [])
+    return batch_id, queued, failed
+
+@traced("calendar.slots")
+def _assign_slots(candidates):
+    """
+    Give each action without a datetime a free, non-overlapping slot for its owner.
+
+    Actions with an explicit datetime keep it exactly (they only reserve their
+    time); the others start at the earliest free slot at or after a date
+    mentioned in their text, else one hour from now. Free/busy comes from the
+    allocator's cache, fetched at most once per batch.
+
+    Args:
+        candidates (list): (index, action) pairs.
+
+    Returns:
+        tuple: (pairs with 'datetime'/'end' filled in, failed items)
+    """
+    requests = []
+    failed = []
+    placeable = []
+    for index, action in candidates:
+        earliest = action.get('datetime')
+        if earliest:
+            try:
+                _title, _owner, earliest, end = _action_event_fields(action)
+            except (AttributeError, ValueError):
+                failed.append({"index": index, "text": action.get('text'), "error": f"Invalid datetime: {action.get('datetime')}"})
+                continue
+            minutes = (datetime.fromisoformat(end.replace("Z", "+00:00"))
+                       - datetime.fromisoformat(earliest.replace("Z", "+00:00"))).total_seconds() / 60
+            request = {"earliest": earliest, "minutes": minutes, "fixed": True}
+        else:
+            parsed = parse_action_datetime(action.get('text', ''))
+            request = {"earliest": parsed.isoformat() if parsed else None,
+                       "minutes": action.get('duration_minutes')}
+        placeable.append((index, action))
+        requests.append({"owner": action.get('owner', 'Unassigned'), **request})
+    slots = get_slot_allocator().allocate(requests)
+
+    scheduled = []
+    for (index, action), request, slot in zip(placeable, requests, slots):
+        if request.get("fixed"):
+            scheduled.append((index, action))
+            continue
+        if slot is None:
+            failed.append({"index": index, "text": action.get('text'), "error": "No free slot found"})
+            continue
+        scheduled.append((index, {
+            **action,
+            "datetime": slot["start"].isoformat(timespec="minutes"),
+            "end": slot["end"].isoformat(timespec="minutes")
+        }))
+    return scheduled, failed
+
+@calendar_api.route('/api/propose-slots', methods=['POST'])
+def propose_slots():
+    """
+    Propose availability-aware, non-overlapping slots for actions without creating events.
+
+    Expects:
+        JSON payload: { "actions": [ {"text": ..., "owner": ..., "datetime": (optional)}, ... ] }
+
+    Returns:
+        200: { "proposals": [ {"index", "text", "owner", "datetime", "end"} ], "failed": [ ... ] }
+        500: { "error": "description" }
+    """
+    try:
+        actions = request.json.get('actions', [])
+        scheduled, failed = _assign_slots(list(enumerate(actions)))
+        proposals = [
+            {"index": i, "text": a.get('text'), "owner": a.get('owner', 'Unassigned'),
+             "datetime": a['datetime'], "end": _action_event_fields(a)[3]}
+            for i, a in scheduled
+        ]
+        return jsonify({"proposals": proposals, "failed": failed}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @calendar_api.route('/api/schedule-actions', methods=['POST'])
 def schedule_actions():
     """
     Schedule multiple meeting actions as calendar events.
 
+    Events are created concurrently on a bounded thread pool, so the batch
+    costs about one CalDAV round-trip rather than one per action. Each
+    action succeeds or fails independently.
+
+    An included action with a datetime is scheduled exactly at that time.
+    An included action without one is placed in the earliest free,
+    non-overlapping slot of its owner's calendar (at or after a date in its
+    text), instead of at a blind default time; with "auto_slot": false such
+    actions are skipped.
+
+    By default the actions are written to the durable calendar outbox and
+    the request returns immediately; a background dispatcher allocates the
+    open slots and delivers the events with retries, so free/busy lookups,
+    calendar latency and outages never reach the caller. Poll the returned
+    status_url. With "async": false the slots are allocated and the events
+    created while the request waits, with per-action results.
+
     Expects:
         JSON payload:
             {
@@ -73,48 +271,100 @@ def schedule_actions():
                         ...
                     },
                     ...
-                ]
+                ],
+                "async": true,                  (optional, false = wait for delivery)
+                "auto_slot": true,              (optional, false = skip actions without a datetime)
+                "idempotency_key": "..."        (optional, outbox mode)
             }
 
     Returns:
-        200: { "success": True, "scheduled": [ ... ] }
-        500: { "success": False, "error": "description" }
+        202: { "success": True, "batch_id": str, "status_url": str, "queued": [ ... ], "failed": [ ... ] }
+             (default, outbox mode)
+        200: { "success": True, "scheduled": [ ... ], "failed": [], "summary": {...} }
+             ("async": false)
+        207: { "success": False, "scheduled": [ ... ], "failed": [ {"index", "text", "error"} ], "summary": {...} }
+             (some actions failed)
+        500: { "success": False, "error": "description", ... } (every action failed, or bad payload)
     """
     try:
         actions = request.json.get('actions', [])
-        results = []
+        included = [(i, action) for i, action in enumerate(actions) if action.get('include')]
+        selected = [(i, action) for i, action in included if action.get('datetime')]
+        unslotted = [] if not request.json.get('auto_slot', True) else [
+            (i, action) for i, action in included if not action.get('datetime')
+        ]
 
-        for action in actions:
-            # Only process actions with an include flag and a datetime
-            if not action.get('include') or not action.get('datetime'):
-                continue
+        if request.json.get('async', True):
+            batch_id, queued, failed = _enqueue_actions(selected, request.json.get('idempotency_key'), unslotted)
+            return jsonify({
+                "success": not failed,
+                "batch_id": batch_id,
+                "status_url": f"/api/schedule-actions/{batch_id}" if batch_id else None,
+                "queued": queued,
+                "failed": failed
+            }), 202
+
+        slot_failed = []
+        if unslotted:
+            # Fixed actions go along only to reserve their time on the owner's calendar
+            slotted, slot_failed = _assign_slots(selected + unslotted)
+            fixed = {i for i, _ in selected}
+            selected = selected + [(i, action) for i, action in slotted if i not in fixed]
+            slot_failed = [f for f in slot_failed if f["index"] not in fixed]
+            selected.sort(key=lambda pair: pair[0])
+
+        outcomes = run_batch(selected, _schedule_action)
+        summary = summarize_batch(outcomes)
+        if slot_failed:
+            summary = {**summary, "total": summary["total"] + len(slot_failed),
+                       "failed": summary["failed"] + len(slot_failed)}
+        scheduled = [o["result"] for o in outcomes if o["ok"]]
+        failed = sorted(slot_failed + [
+            {
+                "index": selected[o["index"]][0],
+                "text": selected[o["index"]][1].get('text'),
+                "error": o["error"]
+            }
+            for o in outcomes if not o["ok"]
+        ], key=lambda f: f["index"])
 
-            title = action.get('text', 'Untitled Action')
-            owner = action.get('owner', 'Unassigned')
-            start = action['datetime']
-            end = action.get('end')
-            start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
-            valid_end = None
-            if end:
-                try:
-                    end_dt = datetime.fromisoformat(end.replace("Z", "+00:00"))
-                    if end_dt > start_dt:
-                        valid_end = end  # Accept as-is (already ISO string)
-                except Exception:
-                    pass
-
-            if not valid_end:
-                # Default: 1 hour after start
-                valid_end = (start_dt + timedelta(hours=1)).isoformat()
-
-            response = create_calendar_event(title, owner, start, valid_end)
-            results.append(response)
-
-        return jsonify({"success": True, "scheduled": results}), 200
+        if failed and not scheduled:
+            return jsonify({
+                "success": False,
+                "error": failed[0]["error"],
+                "scheduled": [],
+                "failed": failed,
+                "summary": summary
+            }), 500
+        return jsonify({
+            "success": not failed,
+            "scheduled": scheduled,
+            "failed": failed,
+            "summary": summary
+        }), 207 if failed else 200
 
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
+@calendar_api.route('/api/schedule-actions/<batch_id>', methods=['GET'])
+def schedule_actions_status(batch_id):
+    """
+    Report delivery status of an asynchronously scheduled batch.
+
+    Returns:
+        200: {
+            "batch_id": str,
+            "events": [ {"uid", "title", "status", "attempts", "last_error", ...} ],
+            "counts": { "pending"|"delivering"|"delivered"|"failed": int },
+            "complete": bool
+        }
+        404: { "error": "Unknown batch" }
+    """
+    status = get_outbox().batch_status(batch_id)
+    if not status["events"]:
+        return jsonify({"error": "Unknown batch"}), 404
+    return jsonify(status), 200
+
 @calendar_api.route('/create-event', methods=['POST'])
 def create_event():
     """
@@ -150,20 +400,32 @@ def create_event():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def generate_event_data_from_action(action_text):
+def generate_event_data_from_action(action_text, slot=None, owner=None):
     """
     Generate a default event data dictionary for a given action string.
 
     Args:
         action_text (str): Text of the action or decision.
+        slot (dict, optional): {"start": datetime, "end": datetime} already
+            chosen by the slot allocator. Without one, the earliest free slot
+            of the owner's calendar at or after a date mentioned in the text
+            (else one hour from now) is allocated from the shared allocator's
+            cached free/busy.
+        owner (str, optional): Owner whose calendar the slot is taken from.
 
     Returns:
         dict: Dictionary with title, description, start_time, and end_time
-              (scheduled for 1 hour, starting 1 day from now).
+              (the slot, or 1 hour starting 1 day from now if none is free).
     """
-    now = datetime.now(timezone.utc)
-    start_time = now + timedelta(days=1)
-    end_time = start_time + timedelta(hours=1)
+    if slot is None:
+        parsed = parse_action_datetime(action_text)
+        slot = get_slot_allocator().allocate([{"owner": owner, "earliest": parsed}])[0]
+    if slot:
+        start_time, end_time = slot["start"], slot["end"]
+    else:
+        now = datetime.now(timezone.utc)
+        start_time = now + timedelta(days=1)
+        end_time = start_time + timedelta(hours=1)
     start = start_time.strftime('%Y-%m-%dT%H:%M')
     end = end_time.strftime('%Y-%m-%dT%H:%M')
     return {
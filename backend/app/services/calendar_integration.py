@@ -8,8 +8,9 @@ Created by Eric Morse
 Date: 2024-05-18
 
 Features:
-- Parse dates/times from action items using dateparser.
-- Create calendar events for assigned actions/owners.
+- Parse dates/times from action items (pre-filtered, cached dateparser; batch API).
+- Create calendar events for assigned actions/owners (concurrently, bounded),
+  each in a free, non-overlapping slot of the owner's calendar.
 - Log all event creation attempts (success and failure).
 """
 
@@ -18,12 +19,18 @@ from app.utils.logger import logger
 from app.utils.logging_utils import log_event
 import re
 from app.utils.nextcloud_utils import create_calendar_event
-import dateparser
+from app.services.date_extraction import extract_event_times_batch, parse_action_datetime
+from app.services.slot_scheduler import get_slot_allocator
 from app.utils.entity_utils import extract_people_from_entities, assign_actions_to_people
+from app.services.batch_scheduler import run_batch, DEFAULT_MAX_WORKERS
 
 def extract_event_times(action_text):
     """
-    Parse a date/time from an action item using dateparser.
+    Parse a date/time from an action item.
+
+    Only date-like spans found by a regex pre-filter are handed to the
+    shared, pre-configured dateparser instance, and results are memoized
+    (see app.services.date_extraction).
 
     Args:
         action_text (str): Action description (may contain date/time phrases).
@@ -32,12 +39,7 @@ def extract_event_times(action_text):
         tuple: (start_time_iso, end_time_iso), both as ISO8601 UTC strings.
                Defaults to 1 hour from now, 30 minutes duration if not found.
     """
-    parsed_time = dateparser.parse(action_text, settings={"PREFER_DATES_FROM": "future"})
-    if not parsed_time:
-        # Default: 1 hour from now
-        parsed_time = datetime.now(timezone.utc) + timedelta(hours=1)
-    end_time = parsed_time + timedelta(minutes=30)
-    return parsed_time.isoformat() + "Z", end_time.isoformat() + "Z"
+    return extract_event_times_batch([action_text])[0]
 
 # Uncomment and adapt this function if you want fully automatic scheduling.
 # Functionality is not integrated into rest of the program
@@ -77,7 +79,58 @@ def extract_event_times(action_text):
 #                 "error": str(e)
 #             })
 
-def create_calendar_events(assigned_actions):
+def _create_follow_up_event(item):
+    """
+    Create and log the follow-up calendar event for one assigned action.
+
+    Args:
+        item (dict): {"text": str, "owner": str, "slot": {"start", "end"} | None}
+
+    Returns:
+        Any: Response of create_calendar_event().
+
+    Raises:
+        Exception: Re-raised after logging if event creation fails.
+    """
+    title = f"Follow-up: {item['owner']}" if item['owner'] != "Unassigned" else "Meeting Follow-up"
+    logger.info("Attempting to create event '%s'", title)
+    description = item['text'] + f"\n\nOwner: {item['owner']}"
+    if item.get('slot'):
+        start_time, end_time = item['slot']['start'], item['slot']['end']
+    else:
+        # No free slot within the horizon: 1 hour from now, 30 min duration
+        start_time = datetime.now(timezone.utc) + timedelta(hours=1)
+        end_time = start_time + timedelta(minutes=30)
+    try:
+        response = create_calendar_event(
+            title, description, start_time.isoformat(), end_time.isoformat()
+        )
+        log_event({
+            "type": "calendar_event",
+            "title": title,
+            "description": description,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "owner": item['owner'],
+            "status": "success",
+            "response": str(response)
+        })
+        return response
+    except Exception as e:
+        logger.error("Calendar event creation failed: %s", e)
+        log_event({
+            "type": "calendar_event",
+            "title": title,
+            "description": description,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "owner": item['owner'],
+            "status": "error",
+            "error": str(e)
+        })
+        raise
+
+def create_calendar_events(assigned_actions, max_workers=DEFAULT_MAX_WORKERS):
     """
     Create calendar events for a list of assigned actions.
 
@@ -85,45 +138,28 @@ def create_calendar_events(assigned_actions):
       - "text": The action description
       - "owner": The assigned owner or "Unassigned"
 
-    Logs both success and failure events.
+    Each action gets the earliest free, non-overlapping slot of its owner's
+    calendar at or after a date mentioned in its text (free/busy is fetched
+    once for the batch). Events are created concurrently (bounded by
+    max_workers); one failure does not stop the others. Logs both success
+    and failure events.
 
     Args:
         assigned_actions (list): List of {"text": str, "owner": str} dictionaries.
+        max_workers (int, optional): Maximum concurrent CalDAV requests.
+
+    Returns:
+        list: Per-action outcomes from batch_scheduler.run_batch(), in input order.
 
     Side Effects:
         - Calls Nextcloud via create_calendar_event()
         - Logs event creation results via log_event().
     """
-    for item in assigned_actions:
-        title = f"Follow-up: {item['owner']}" if item['owner'] != "Unassigned" else "Meeting Follow-up"
-        print(f"BACKEND: Attempting to create event '{title}'")
-        description = item['text'] + f"\n\nOwner: {item['owner']}"
-        # Default to event starting 1 hour from now, 30 min duration
-        start_time = datetime.now(timezone.utc) + timedelta(hours=1)
-        end_time = start_time + timedelta(minutes=30)
-        try:
-            response = create_calendar_event(
-                title, description, start_time.isoformat(), end_time.isoformat()
-            )
-            log_event({
-                "type": "calendar_event",
-                "title": title,
-                "description": description,
-                "start_time": start_time.isoformat(),
-                "end_time": end_time.isoformat(),
-                "owner": item['owner'],
-                "status": "success",
-                "response": str(response)
-            })
-        except Exception as e:
-            logger.error(f"Calendar event creation failed: {e}")
-            log_event({
-                "type": "calendar_event",
-                "title": title,
-                "description": description,
-                "start_time": start_time.isoformat(),
-                "end_time": end_time.isoformat(),
-                "owner": item['owner'],
-                "status": "error",
-                "error": str(e)
-            })
+    if not assigned_actions:
+        return []
+    slots = get_slot_allocator().allocate([
+        {"owner": item.get('owner'), "earliest": parse_action_datetime(item.get('text', ''))}
+        for item in assigned_actions
+    ])
+    items = [{**item, "slot": slot} for item, slot in zip(assigned_actions, slots)]
+    return run_batch(items, _create_follow_up_event, max_workers=max_workers)
@@ -0,0 +1,432 @@
+"""
+calendar_outbox.py
+
+Durable outbox for calendar event creation in the AI Meeting Summarizer.
+
+Features:
+- Records requested calendar events in a local SQLite database and returns
+  immediately, so Nextcloud latency/outages are off the request path.
+- Background dispatcher delivers pending events with retries and
+  exponential backoff (with jitter), giving up after a maximum number of attempts.
+- Idempotent delivery: every record gets a stable event UID at enqueue time,
+  so a retried write overwrites the same calendar object instead of duplicating it.
+  Clients may also pass an idempotency key so resubmitted requests are not re-enqueued.
+- Slot allocation off the request path: records queued without a time
+  (needs_slot) are placed in a free slot of their owner's calendar by the
+  dispatcher, right before delivery, together with the batch's fixed-time records.
+- Delivery status lookup per event and per batch.
+
+Dependencies: Python standard library (sqlite3, threading, hashlib, uuid),
+app.utils.nextcloud_utils, app.services.batch_scheduler, app.services.slot_scheduler
+"""
+
+import hashlib
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from app.utils.logger import logger
+from app.utils.logging_utils import log_event
+from app.utils.nextcloud_utils import create_calendar_event
+from app.services.batch_scheduler import run_batch
+from app.services.slot_scheduler import get_slot_allocator
+
+DEFAULT_DB_PATH = "calendar_outbox.db"
+
+# Retry policy
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SEC = 2.0
+BACKOFF_MAX_SEC = 15 * 60
+# A record stuck in 'delivering' longer than this (e.g. worker crash) is retried
+DELIVERY_LEASE_SEC = 120
+# How often the dispatcher polls for due records when idle
+POLL_INTERVAL_SEC = 2.0
+
+STATUS_PENDING = "pending"
+STATUS_DELIVERING = "delivering"
+STATUS_DELIVERED = "delivered"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calendar_outbox (
+    uid TEXT PRIMARY KEY,
+    batch_id TEXT,
+    title TEXT,
+    description TEXT,
+    start_time TEXT NOT NULL,
+    end_time TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    delivered_at TEXT,
+    owner TEXT,
+    duration_minutes INTEGER,
+    needs_slot INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON calendar_outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_outbox_batch ON calendar_outbox (batch_id);
+"""
+
+_COLUMNS = (
+    "uid", "batch_id", "title", "description", "start_time", "end_time", "status",
+    "attempts", "next_attempt_at", "last_error", "created_at", "updated_at", "delivered_at",
+    "owner", "duration_minutes", "needs_slot"
+)
+
+# Columns added after the first release, with their definitions (for migrating old databases)
+_ADDED_COLUMNS = (
+    ("owner", "TEXT"),
+    ("duration_minutes", "INTEGER"),
+    ("needs_slot", "INTEGER NOT NULL DEFAULT 0"),
+)
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def backoff_delay(attempts, base=BACKOFF_BASE_SEC, cap=BACKOFF_MAX_SEC, rng=random.random):
+    """
+    Exponential backoff with "full jitter" for the given number of failed attempts.
+
+    Args:
+        attempts (int): Attempts made so far (>= 1).
+        base (float): Delay after the first failure, in seconds.
+        cap (float): Maximum delay in seconds.
+        rng (callable): Returns a float in [0, 1).
+
+    Returns:
+        float: Seconds to wait before the next attempt.
+    """
+    ceiling = min(cap, base * (2 ** (attempts - 1)))
+    return ceiling / 2 + rng() * ceiling / 2
+
+
+def _minutes_between(start, end):
+    """
+    Length of an ISO 8601 start/end pair in minutes.
+    """
+    start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    end_dt = datetime.fromisoformat(end.replace("Z", "+00:00"))
+    return (end_dt - start_dt).total_seconds() / 60
+
+
+def idempotent_uid(key):
+    """
+    Derive a stable event UID from a client-supplied idempotency key.
+    """
+    digest = hashlib.sha256(str(key).encode("utf-8")).hexdigest()[:32]
+    return f"{digest}@meeting-summarizer"
+
+
+class CalendarOutbox:
+    """
+    SQLite-backed outbox of calendar events awaiting delivery.
+
+    Args:
+        db_path (str): SQLite database file.
+        deliver (callable, optional): Called as deliver(record) to write one event;
+            defaults to creating it in Nextcloud with the record's UID.
+        max_attempts (int): Attempts before a record is marked failed.
+        clock (callable): Wall-clock time source (injectable for tests).
+        slot_allocator (SlotAllocator, optional): Places needs_slot records;
+            defaults to the process-wide allocator.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, deliver=None, max_attempts=MAX_ATTEMPTS, clock=time.time,
+                 slot_allocator=None):
+        self.db_path = db_path
+        self._deliver = deliver
+        self._slot_allocator = slot_allocator
+        self.max_attempts = max_attempts
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            present = {row["name"] for row in self._conn.execute("PRAGMA table_info(calendar_outbox)")}
+            for name, definition in _ADDED_COLUMNS:
+                if name not in present:
+                    self._conn.execute(f"ALTER TABLE calendar_outbox ADD COLUMN {name} {definition}")
+            self._conn.commit()
+
+    # --- Enqueue / status ---
+
+    def enqueue(self, events, batch_id=None):
+        """
+        Durably record events for delivery and wake the dispatcher.
+
+        Args:
+            events (list of dict): Each with "title", "description", "start_time",
+                "end_time" and optionally "idempotency_key", "owner" and
+                "duration_minutes". With "needs_slot": true the dispatcher picks
+                the time; "start_time" is then only the earliest acceptable
+                start (may be empty) and "end_time" is ignored.
+            batch_id (str, optional): Groups the records for status lookup; generated if omitted.
+
+        Returns:
+            tuple: (batch_id, list of record dicts). Records already present
+                (same idempotency key) are returned as they are, not re-enqueued,
+                and a resubmitted batch keeps the batch_id it was first given.
+        """
+        now_iso = _now_iso()
+        now = self._clock()
+        uids = []
+        with self._lock:
+            for event in events:
+                key = event.get("idempotency_key")
+                uids.append(idempotent_uid(key) if key else f"{uuid.uuid4().hex}@meeting-summarizer")
+            if batch_id is None:
+                # A resubmission joins the batch its earlier records were queued under
+                existing = self._conn.execute(
+                    f"SELECT batch_id FROM calendar_outbox WHERE uid IN ({','.join('?' * len(uids))}) "
+                    "ORDER BY rowid LIMIT 1", uids
+                ).fetchone() if uids else None
+                batch_id = existing["batch_id"] if existing else uuid.uuid4().hex
+            for event, uid in zip(events, uids):
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO calendar_outbox "
+                    "(uid, batch_id, title, description, start_time, end_time, status, attempts, "
+                    "next_attempt_at, created_at, updated_at, owner, duration_minutes, needs_slot) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, ?)",
+                    (uid, batch_id, event.get("title"), event.get("description"),
+                     str(event.get("start_time") or ""), str(event.get("end_time") or ""), STATUS_PENDING,
+                     now, now_iso, now_iso, event.get("owner"), event.get("duration_minutes"),
+                     1 if event.get("needs_slot") else 0)
+                )
+            self._conn.commit()
+        self._wakeup.set()
+        return batch_id, [self.get(uid) for uid in uids]
+
+    def get(self, uid):
+        """
+        Return one outbox record as a dict, or None if unknown.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM calendar_outbox WHERE uid = ?", (uid,)).fetchone()
+        return dict(row) if row else None
+
+    def batch_status(self, batch_id):
+        """
+        Return all records of a batch plus per-status counts.
+
+        Returns:
+            dict: {"batch_id", "events": [...], "counts": {status: n}, "complete": bool}
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM calendar_outbox WHERE batch_id = ? ORDER BY created_at, rowid", (batch_id,)
+            ).fetchall()
+        events = [dict(r) for r in rows]
+        counts = {}
+        for e in events:
+            counts[e["status"]] = counts.get(e["status"], 0) + 1
+        complete = bool(events) and all(e["status"] in (STATUS_DELIVERED, STATUS_FAILED) for e in events)
+        return {"batch_id": batch_id, "events": events, "counts": counts, "complete": complete}
+
+    # --- Delivery ---
+
+    def _claim_due(self, limit):
+        """
+        Atomically move due records to 'delivering' and return them.
+        """
+        now = self._clock()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM calendar_outbox WHERE "
+                "(status = ? AND next_attempt_at <= ?) OR (status = ? AND next_attempt_at <= ?) "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (STATUS_PENDING, now, STATUS_DELIVERING, now - DELIVERY_LEASE_SEC, limit)
+            ).fetchall()
+            claimed = []
+            for row in rows:
+                # Compare-and-set so concurrent dispatchers (other workers) never double-claim
+                cur = self._conn.execute(
+                    "UPDATE calendar_outbox SET status = ?, next_attempt_at = ?, updated_at = ? "
+                    "WHERE uid = ? AND status = ? AND next_attempt_at = ?",
+                    (STATUS_DELIVERING, now, _now_iso(), row["uid"], row["status"], row["next_attempt_at"])
+                )
+                if cur.rowcount:
+                    claimed.append(dict(row))
+            self._conn.commit()
+        return claimed
+
+    def _assign_slots(self, records):
+        """
+        Place claimed needs_slot records into free slots of their owners' calendars.
+
+        Fixed-time records of the same claim are passed along as reservations,
+        so slotted events never land on top of them. Assigned times are stored
+        before delivery, so a retry reuses the same slot.
+
+        Returns:
+            tuple: (records ready for delivery, [(record, outcome)] that got no slot)
+        """
+        if not any(r.get("needs_slot") for r in records):
+            return records, []
+        try:
+            requests = [
+                {"owner": r.get("owner") or r.get("description"),
+                 "earliest": r["start_time"] or None,
+                 "minutes": r.get("duration_minutes") if r.get("needs_slot") else _minutes_between(r["start_time"], r["end_time"]),
+                 "fixed": not r.get("needs_slot")}
+                for r in records
+            ]
+            allocator = self._slot_allocator or get_slot_allocator()
+            slots = allocator.allocate(requests)
+        except Exception as e:
+            logger.warning("Slot allocation failed for %d outbox records: %s", len(records), e)
+            return ([r for r in records if not r.get("needs_slot")],
+                    [(r, {"ok": False, "error": f"Slot allocation failed: {e}"}) for r in records if r.get("needs_slot")])
+
+        ready, unplaced = [], []
+        for record, slot in zip(records, slots):
+            if not record.get("needs_slot"):
+                ready.append(record)
+                continue
+            if slot is None:
+                unplaced.append((record, {"ok": False, "error": "No free slot found"}))
+                continue
+            start = slot["start"].isoformat(timespec="minutes")
+            end = slot["end"].isoformat(timespec="minutes")
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE calendar_outbox SET start_time = ?, end_time = ?, needs_slot = 0, updated_at = ? "
+                    "WHERE uid = ?",
+                    (start, end, _now_iso(), record["uid"])
+                )
+                self._conn.commit()
+            ready.append({**record, "start_time": start, "end_time": end, "needs_slot": 0})
+        return ready, unplaced
+
+    def _deliver_one(self, record):
+        if self._deliver is not None:
+            return self._deliver(record)
+        return create_calendar_event(
+            record["title"], record["description"], record["start_time"], record["end_time"], uid=record["uid"]
+        )
+
+    def _record_outcome(self, record, outcome):
+        attempts = record["attempts"] + 1
+        now_iso = _now_iso()
+        with self._lock:
+            if outcome["ok"]:
+                self._conn.execute(
+                    "UPDATE calendar_outbox SET status = ?, attempts = ?, last_error = NULL, "
+                    "updated_at = ?, delivered_at = ? WHERE uid = ?",
+                    (STATUS_DELIVERED, attempts, now_iso, now_iso, record["uid"])
+                )
+            elif attempts >= self.max_attempts:
+                self._conn.execute(
+                    "UPDATE calendar_outbox SET status = ?, attempts = ?, last_error = ?, updated_at = ? WHERE uid = ?",
+                    (STATUS_FAILED, attempts, outcome["error"], now_iso, record["uid"])
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE calendar_outbox SET status = ?, attempts = ?, last_error = ?, "
+                    "next_attempt_at = ?, updated_at = ? WHERE uid = ?",
+                    (STATUS_PENDING, attempts, outcome["error"],
+                     self._clock() + backoff_delay(attempts), now_iso, record["uid"])
+                )
+            self._conn.commit()
+
+        if outcome["ok"] or attempts >= self.max_attempts:
+            log_event({
+                "type": "calendar_event",
+                "title": record["title"],
+                "start_time": record["start_time"],
+                "end_time": record["end_time"],
+                "uid": record["uid"],
+                "batch_id": record["batch_id"],
+                "attempts": attempts,
+                "status": "success" if outcome["ok"] else "error",
+                **({} if outcome["ok"] else {"error": outcome["error"]})
+            })
+        else:
+            logger.warning("Calendar delivery attempt %d failed for %s: %s", attempts, record['uid'], outcome['error'])
+
+    def deliver_due(self, limit=50):
+        """
+        Deliver every record that is currently due (concurrently, bounded).
+
+        Returns:
+            int: Number of records attempted.
+        """
+        records = self._claim_due(limit)
+        if not records:
+            return 0
+        ready, unplaced = self._assign_slots(records)
+        for record, outcome in unplaced:
+            self._record_outcome(record, outcome)
+        outcomes = run_batch(ready, self._deliver_one) if ready else []
+        for record, outcome in zip(ready, outcomes):
+            self._record_outcome(record, outcome)
+        return len(records)
+
+    def _next_due_in(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM calendar_outbox WHERE status = ?", (STATUS_PENDING,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return POLL_INTERVAL_SEC
+        return min(POLL_INTERVAL_SEC, max(0.0, row[0] - self._clock()))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.deliver_due():
+                    continue
+            except Exception as e:
+                logger.error("Calendar outbox dispatcher error: %s", e)
+            self._wakeup.wait(self._next_due_in())
+            self._wakeup.clear()
+
+    def start(self):
+        """
+        Start the background dispatcher thread (idempotent).
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="calendar-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """
+        Stop the dispatcher thread.
+        """
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """
+    Return the process-wide outbox, starting its dispatcher on first use.
+    """
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = CalendarOutbox(os.environ.get("CALENDAR_OUTBOX_DB", DEFAULT_DB_PATH))
+            _outbox.start()
+        return _outbox
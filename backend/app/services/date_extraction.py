@@ -0,0 +1,186 @@
+"""
+date_extraction.py
+
+Fast date/time extraction from action item text for the AI Meeting Summarizer.
+
+Features:
+- Dateparser parsers with languages and settings pinned, built once per
+  reference minute (no per-call language detection or settings construction).
+- Cheap regex pre-filter that finds candidate date/time spans
+  ("tomorrow at 3pm", "June 5th", "next Friday", "2025-06-05", ...);
+  text without a candidate never reaches dateparser.
+- Only the candidate spans are parsed, and results are memoized per minute.
+  Relative phrases ("tomorrow", "in 2 hours") are resolved against the
+  caller's reference time (dateparser's RELATIVE_BASE), truncated to the minute.
+- Batch API that resolves all actions of a meeting against a single "now".
+
+Dependencies: dateparser, re, functools
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from dateparser.date import DateDataParser
+
+PARSER_LANGUAGES = ["en"]
+PARSER_SETTINGS = {"PREFER_DATES_FROM": "future"}
+
+# Default event placement when no date is found (matches extract_event_times)
+DEFAULT_OFFSET = timedelta(hours=1)
+DEFAULT_DURATION = timedelta(minutes=30)
+
+_WEEKDAYS = r"monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+_MONTHS = (
+    r"january|february|march|april|may|june|july|august|september|october|november|december|"
+    r"jan|feb|mar|apr|jun|jul|aug|sept|sep|oct|nov|dec"
+)
+_ORDINAL = r"\d{1,2}(?:st|nd|rd|th)?"
+
+_DATE_PATTERNS = [
+    r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?)?",
+    r"\d{1,2}/\d{1,2}(?:/\d{2,4})?",
+    rf"(?:{_MONTHS})\.?\s+{_ORDINAL}(?:,?\s*\d{{4}})?",
+    rf"{_ORDINAL}\s+(?:of\s+)?(?:{_MONTHS})(?:,?\s*\d{{4}})?",
+    rf"(?:(?:next|this|coming)\s+)?(?:{_WEEKDAYS})",
+    r"day\s+after\s+tomorrow|today|tomorrow|tonight",
+    r"(?:next|this|coming)\s+(?:week|month|year)",
+    r"in\s+(?:\d+|a|an|one|two|three|four|five)\s+(?:minutes?|hours?|days?|weeks?|months?)",
+]
+_TIME_PATTERNS = [
+    r"\d{1,2}(?::\d{2})?\s*(?:a\.?m\.?|p\.?m\.?)(?![a-z])",
+    r"\d{1,2}:\d{2}",
+    r"noon|midnight",
+]
+
+_CANDIDATE_RE = re.compile(
+    r"\b(?:(?P<date>" + "|".join(_DATE_PATTERNS) + r")|(?P<time>" + "|".join(_TIME_PATTERNS) + r"))",
+    re.IGNORECASE,
+)
+# Text allowed between two tokens of the same date/time expression
+_CONNECTOR_RE = re.compile(r"^[\s,]*(?:(?:at|on|by|before|around|the|of)\b)?[\s,]*$", re.IGNORECASE)
+
+# Phrases dateparser does not understand, rewritten to equivalents it does
+_NORMALIZE = [
+    (re.compile(rf"\b(?:next|this|coming)\s+({_WEEKDAYS})\b", re.IGNORECASE), r"\1"),
+    (re.compile(r"\btonight\b", re.IGNORECASE), "today 20:00"),
+    (re.compile(r"\bcoming\s+(week|month|year)\b", re.IGNORECASE), r"next \1"),
+]
+
+@lru_cache(maxsize=8)
+def _get_parser(relative_base):
+    """
+    Build the DateDataParser for one reference minute, with languages and settings pinned.
+
+    Args:
+        relative_base (datetime): Time that relative phrases are resolved against.
+    """
+    return DateDataParser(languages=PARSER_LANGUAGES,
+                          settings={**PARSER_SETTINGS, "RELATIVE_BASE": relative_base})
+
+
+def find_candidate_spans(text):
+    """
+    Find substrings that look like date/time expressions.
+
+    Adjacent tokens separated only by connectors ("Friday at 3pm") are merged
+    into one span.
+
+    Args:
+        text (str): Action text.
+
+    Returns:
+        list of dict: [{"text": str, "dates": [str], "times": [str]}] in text order.
+    """
+    spans = []
+    current = None
+    for match in _CANDIDATE_RE.finditer(text or ""):
+        kind = "dates" if match.group("date") else "times"
+        if current is not None and _CONNECTOR_RE.match(text[current["end"]:match.start()]):
+            current["end"] = match.end()
+            current[kind].append(match.group(0))
+            continue
+        current = {"start": match.start(), "end": match.end(), "dates": [], "times": []}
+        current[kind].append(match.group(0))
+        spans.append(current)
+    return [
+        {"text": text[s["start"]:s["end"]], "dates": s["dates"], "times": s["times"]}
+        for s in spans
+    ]
+
+
+def _normalize(span):
+    for pattern, replacement in _NORMALIZE:
+        span = pattern.sub(replacement, span)
+    return span.strip().lower()
+
+
+@lru_cache(maxsize=4096)
+def _parse_span(span, relative_base):
+    """
+    Parse one normalized span relative to `relative_base` (a whole minute);
+    memoized per (span, minute).
+    """
+    return _get_parser(relative_base).get_date_data(span).date_obj
+
+
+def parse_action_datetime(text, now=None):
+    """
+    Extract the first date/time mentioned in an action, if any.
+
+    Args:
+        text (str): Action text.
+        now (datetime, optional): Reference time for relative phrases (default: now).
+
+    Returns:
+        datetime | None: Parsed datetime, or None if the text has no date/time.
+    """
+    spans = find_candidate_spans(text)
+    if not spans:
+        return None
+    bucket = (now or datetime.now()).replace(second=0, microsecond=0)
+    for span in spans:
+        parsed = _parse_span(_normalize(span["text"]), bucket)
+        if parsed:
+            return parsed
+        # Fall back to parsing the date and time parts on their own and combining them
+        date_part = next(filter(None, (_parse_span(_normalize(d), bucket) for d in span["dates"])), None)
+        time_part = next(filter(None, (_parse_span(_normalize(t), bucket) for t in span["times"])), None)
+        if date_part and time_part:
+            return datetime.combine(date_part.date(), time_part.time())
+        if date_part or time_part:
+            return date_part or time_part
+    return None
+
+
+def event_times_for(parsed_time, now):
+    """
+    Format (start, end) ISO strings the way extract_event_times always has.
+    """
+    if not parsed_time:
+        # Default: 1 hour from now
+        parsed_time = now + DEFAULT_OFFSET
+    end_time = parsed_time + DEFAULT_DURATION
+    return parsed_time.isoformat() + "Z", end_time.isoformat() + "Z"
+
+
+def extract_event_times_batch(action_texts):
+    """
+    Resolve event times for all actions of a meeting in one pass.
+
+    Identical texts are parsed once and every action shares the same "now".
+
+    Args:
+        action_texts (list of str): Action descriptions.
+
+    Returns:
+        list of tuple: (start_time_iso, end_time_iso) per action, in input order.
+    """
+    now = datetime.now(timezone.utc)
+    local_now = datetime.now()
+    resolved = {}
+    results = []
+    for text in action_texts:
+        if text not in resolved:
+            resolved[text] = event_times_for(parse_action_datetime(text, local_now), now)
+        results.append(resolved[text])
+    return results
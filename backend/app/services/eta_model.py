@@ -0,0 +1,260 @@
+"""
+eta_model.py
+
+Processing-time prediction for audio uploads in the AI Meeting Summarizer.
+
+Features:
+- Fits this node's processing time (from `audio_upload_success` events:
+  processing_time_sec minus the time spent queued for a slot) as a linear
+  function of audio duration and of duration × sample rate (the resampling
+  work grows with both), by ridge-regularised least squares.
+- Refreshed incrementally: only events added to the event log since the
+  last refresh are folded into the sufficient statistics (XᵀX, Xᵀy, yᵀy),
+  kept per log file so rewritten and archived files are recounted once.
+- Until enough uploads have been seen, predictions fall back to the
+  admission controller's configured real-time-factor estimate.
+- Predictions feed admission control and the transcription queue (job
+  cost), are returned in upload responses, and a model summary with the
+  node's estimated transcription capacity is served for capacity planning
+  (GET /api/transcription/model).
+
+Configuration (environment variables):
+    ETA_MIN_SAMPLES    Uploads needed before the fitted model is used (default 10)
+    ETA_REFRESH_SEC    Minimum seconds between event log refreshes (default 60)
+    ETA_RIDGE          Ridge regularisation strength (default 1.0)
+
+Dependencies: numpy, app.services.admission, app.utils.event_index
+"""
+
+import math
+import os
+import socket
+import threading
+import time
+import numpy as np
+from app.services.admission import get_admission_controller
+from app.utils.event_index import get_event_index
+
+DEFAULT_MIN_SAMPLES = 10
+DEFAULT_REFRESH_SEC = 60
+DEFAULT_RIDGE = 1.0
+REFERENCE_RATE = 16000
+# One-sided z for the "p90" prediction under normally distributed residuals
+Z_90 = 1.2816
+FEATURES = ("intercept", "duration_sec", "duration_x_rate")
+
+
+def _features(duration_sec, sample_rate):
+    """
+    Feature vector of one upload (sample rate relative to Whisper's 16 kHz).
+    """
+    rate = (sample_rate or REFERENCE_RATE) / REFERENCE_RATE
+    return np.array([1.0, duration_sec, duration_sec * rate])
+
+
+def _stem(filename):
+    for suffix in (".jsonl.gz", ".jsonl"):
+        if filename.endswith(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+class _Stats:
+    """
+    Least-squares sufficient statistics of a set of uploads.
+    """
+
+    def __init__(self):
+        self.xtx = np.zeros((len(FEATURES), len(FEATURES)))
+        self.xty = np.zeros(len(FEATURES))
+        self.yty = 0.0
+        self.n = 0
+
+    def add(self, x, y):
+        self.xtx += np.outer(x, x)
+        self.xty += x * y
+        self.yty += y * y
+        self.n += 1
+
+    def merge(self, other):
+        self.xtx += other.xtx
+        self.xty += other.xty
+        self.yty += other.yty
+        self.n += other.n
+
+
+def _sample(row):
+    """
+    (features, processing seconds) of an index row, or None if it is not a usable upload.
+    """
+    if row.type != "audio_upload_success" or row.processing_time_sec is None:
+        return None
+    if row.duration is None or row.duration <= 0:
+        return None
+    y = row.processing_time_sec - (row.queue_wait_sec or 0.0)
+    if y <= 0:
+        return None
+    return _features(row.duration, row.sample_rate), y
+
+
+class ProcessingTimeModel:
+    """
+    Incrementally refreshed regression of processing time on duration and sample rate.
+
+    Args:
+        index: EventLogIndex to learn from (the node's event log).
+        fallback (callable): fallback(duration_sec) -> seconds, used until fitted.
+        min_samples (int): Uploads needed before the fit is trusted.
+        refresh_sec (float): Minimum seconds between refreshes.
+        ridge (float): Regularisation strength (keeps the fit stable when
+            every upload has the same sample rate).
+        clock (callable): Monotonic clock (injectable for tests).
+    """
+
+    def __init__(self, index, fallback, min_samples=DEFAULT_MIN_SAMPLES,
+                 refresh_sec=DEFAULT_REFRESH_SEC, ridge=DEFAULT_RIDGE, clock=time.monotonic):
+        self.index = index
+        self.fallback = fallback
+        self.min_samples = min_samples
+        self.refresh_sec = refresh_sec
+        self.ridge = ridge
+        self._clock = clock
+        self._lock = threading.Lock()
+        # log file stem -> {"rows": list, "seen": int, "stats": _Stats}
+        self._files = {}
+        self._refreshed = None
+        self._coef = None
+        self._residual_std = None
+        self._n = 0
+
+    def refresh(self, force=False):
+        """
+        Fold new upload events into the fit (at most once per refresh_sec unless forced).
+        """
+        with self._lock:
+            now = self._clock()
+            if not force and self._refreshed is not None and now - self._refreshed < self.refresh_sec:
+                return
+            self._refreshed = now
+            present = set()
+            changed = False
+            for name, rows in self.index.sources():
+                stem = _stem(name)
+                present.add(stem)
+                state = self._files.get(stem)
+                if state is None or state["rows"] is not rows or state["seen"] > len(rows):
+                    # New, rewritten or archived file: count it again from the start
+                    state = {"rows": rows, "seen": 0, "stats": _Stats()}
+                    self._files[stem] = state
+                    changed = True
+                end = len(rows)
+                for row in rows[state["seen"]:end]:
+                    sample = _sample(row)
+                    if sample is not None:
+                        state["stats"].add(*sample)
+                        changed = True
+                state["seen"] = end
+            for stem in set(self._files) - present:
+                del self._files[stem]
+                changed = True
+            if changed:
+                self._fit()
+
+    def _fit(self):
+        total = _Stats()
+        for state in self._files.values():
+            total.merge(state["stats"])
+        self._n = total.n
+        if total.n < self.min_samples:
+            self._coef = self._residual_std = None
+            return
+        penalty = self.ridge * np.eye(len(FEATURES))
+        penalty[0, 0] = 0.0  # the intercept is not shrunk
+        try:
+            coef = np.linalg.solve(total.xtx + penalty, total.xty)
+        except np.linalg.LinAlgError:
+            self._coef = self._residual_std = None
+            return
+        sse = total.yty - 2 * coef @ total.xty + coef @ total.xtx @ coef
+        self._coef = coef
+        self._residual_std = math.sqrt(max(sse, 0.0) / max(total.n - len(FEATURES), 1))
+
+    def predict(self, duration_sec, sample_rate=None):
+        """
+        Predicted processing time of an upload.
+
+        Args:
+            duration_sec (float): Audio duration.
+            sample_rate (int, optional): Audio sample rate in Hz.
+
+        Returns:
+            dict: {"processing_sec", "p90_sec", "source": "model" | "fallback"}
+        """
+        self.refresh()
+        duration_sec = max(float(duration_sec or 0), 0.0)
+        fallback = float(self.fallback(duration_sec))
+        with self._lock:
+            coef, residual_std = self._coef, self._residual_std
+        if coef is None:
+            return {"processing_sec": round(fallback, 2), "p90_sec": round(fallback, 2), "source": "fallback"}
+        predicted = max(float(coef @ _features(duration_sec, sample_rate)), 0.1)
+        return {
+            "processing_sec": round(predicted, 2),
+            "p90_sec": round(predicted + Z_90 * residual_std, 2),
+            "source": "model",
+        }
+
+    def summary(self, slots=1):
+        """
+        Model state and derived capacity, for capacity planning.
+
+        Args:
+            slots (int): Concurrent transcriptions per worker.
+
+        Returns:
+            dict: {"node", "samples", "fitted", "coefficients", "residual_std_sec",
+                   "realtime_factor", "capacity_audio_hours_per_hour"}
+        """
+        self.refresh()
+        with self._lock:
+            coef, residual_std, n = self._coef, self._residual_std, self._n
+        reference = 600.0  # a 10-minute, 16 kHz meeting
+        seconds = self.predict(reference, REFERENCE_RATE)["processing_sec"]
+        return {
+            "node": socket.gethostname(),
+            "samples": n,
+            "fitted": coef is not None,
+            "coefficients": dict(zip(FEATURES, (round(float(c), 6) for c in coef))) if coef is not None else None,
+            "residual_std_sec": round(residual_std, 3) if residual_std is not None else None,
+            "realtime_factor": round(seconds / reference, 4),
+            # Audio hours one worker transcribes per hour with all slots busy
+            "capacity_audio_hours_per_hour": round(slots * reference / seconds, 2) if seconds > 0 else None,
+        }
+
+
+def _setting(name, default, cast=float):
+    try:
+        return cast(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_eta_model():
+    """
+    Return the process-wide processing-time model for this node's event log.
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = ProcessingTimeModel(
+                get_event_index(),
+                fallback=lambda duration: get_admission_controller().estimate(duration).cpu_sec,
+                min_samples=_setting("ETA_MIN_SAMPLES", DEFAULT_MIN_SAMPLES, int),
+                refresh_sec=_setting("ETA_REFRESH_SEC", DEFAULT_REFRESH_SEC),
+                ridge=_setting("ETA_RIDGE", DEFAULT_RIDGE),
+            )
+        return _model
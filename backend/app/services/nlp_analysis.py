@@ -20,6 +20,7 @@ Dependencies: nltk, re, app.utils.entity_utils
 import re
 import nltk
 from app.utils.entity_utils import extract_entities, extract_people_from_entities
+from app.utils.tracing import traced
 
 # List of key phrases and verbs that signal an action item.
 ACTION_PHRASES = [
@@ -132,6 +133,7 @@ def group_entities_by_type(entities):
         grouped.setdefault(etype, []).append(e['text'])
     return grouped
 
+@traced("nlp.actions")
 def extract_actions_nltk(transcript, entities=None):
     """
     Extract action items from a transcript using signal phrases and NLTK POS tagging.
@@ -174,6 +176,7 @@ def extract_actions_nltk(transcript, entities=None):
     if not actions:
         warnings.append("No action items detected.")
     return actions, warnings
+@traced("nlp.decisions")
 def extract_decisions(transcript):
     """
     Extract decisions from a meeting transcript by pattern matching.
@@ -197,6 +200,7 @@ def extract_decisions(transcript):
         warnings.append("No decisions detected.")
     return decisions, warnings
 
+@traced("nlp.summary")
 def extract_summary(transcript, actions=None, decisions=None, level="short"):
     """
     Simple summary extraction by removing action/decision sentences.
@@ -220,6 +224,7 @@ def extract_summary(transcript, actions=None, decisions=None, level="short"):
     else:
         return base
 
+@traced("nlp.analyze")
 def analyze_transcript(transcript, level="short"):
     """
     Full meeting transcript analysis pipeline.
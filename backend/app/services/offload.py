@@ -0,0 +1,117 @@
+"""
+offload.py
+
+Bounded executors for request handling and CPU-bound work in the AI Meeting Summarizer.
+
+Features:
+- A small CPU executor for heavy work (Whisper transcription) so only a
+  configured number of jobs run at once, no matter how many requests are
+  waiting on them.
+- A larger request executor on which the ASGI adapter runs the (blocking)
+  Flask views, so slow CalDAV calls and log scans wait on cheap threads
+  instead of occupying a worker process.
+- Sync (`run_cpu`) and async (`run_cpu_async`) helpers; jobs queued or
+  running are reported as the offload_jobs_pending gauge on /metrics.
+- Executors are created lazily per process (safe to use after fork) and
+  can be shut down from the ASGI lifespan.
+
+Configuration (environment variables):
+    OFFLOAD_CPU_WORKERS   Concurrent CPU-bound jobs per process (default 1)
+    ASGI_THREADS          Concurrent requests per process in ASGI mode (default 32)
+
+Dependencies: Python standard library (concurrent.futures, asyncio), app.utils.metrics,
+app.utils.profiling
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from app.utils.metrics import OFFLOAD_PENDING
+from app.utils.profiling import profile_thread
+
+DEFAULT_CPU_WORKERS = 1
+DEFAULT_REQUEST_THREADS = 32
+
+_lock = threading.Lock()
+_executors = {}
+_pid = None
+
+
+def _workers(name, default):
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _get_executor(kind):
+    """
+    Return this process's executor of the given kind ("cpu" or "request").
+    """
+    global _pid
+    with _lock:
+        if _pid != os.getpid():
+            # Threads do not survive fork: start fresh in a forked worker
+            _executors.clear()
+            _pid = os.getpid()
+        if kind not in _executors:
+            if kind == "cpu":
+                size = _workers("OFFLOAD_CPU_WORKERS", DEFAULT_CPU_WORKERS)
+            else:
+                size = _workers("ASGI_THREADS", DEFAULT_REQUEST_THREADS)
+            _executors[kind] = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"offload-{kind}")
+        return _executors[kind]
+
+
+def get_cpu_executor():
+    """
+    Executor for CPU-bound jobs (bounded by OFFLOAD_CPU_WORKERS).
+    """
+    return _get_executor("cpu")
+
+
+def get_request_executor():
+    """
+    Executor that runs blocking request handlers (bounded by ASGI_THREADS).
+    """
+    return _get_executor("request")
+
+
+def run_cpu(fn, *args, **kwargs):
+    """
+    Run a CPU-bound callable on the CPU executor and wait for its result.
+
+    Exceptions raised by `fn` propagate to the caller. The caller's context
+    (e.g. its request trace or profile capture) is carried over to the worker thread.
+    """
+    OFFLOAD_PENDING.inc(executor="cpu")
+    try:
+        return get_cpu_executor().submit(copy_context().run, profile_thread(fn), *args, **kwargs).result()
+    finally:
+        OFFLOAD_PENDING.dec(executor="cpu")
+
+
+async def run_cpu_async(fn, *args, **kwargs):
+    """
+    Await a CPU-bound callable without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    OFFLOAD_PENDING.inc(executor="cpu")
+    try:
+        return await loop.run_in_executor(get_cpu_executor(), partial(copy_context().run, profile_thread(fn), *args, **kwargs))
+    finally:
+        OFFLOAD_PENDING.dec(executor="cpu")
+
+
+def shutdown(wait=True):
+    """
+    Shut down this process's executors (they are recreated on next use).
+    """
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
@@ -0,0 +1,158 @@
+"""
+quality_gate.py
+
+Cost-ordered, early-exit rule engine for audio quality gating in the
+AI Meeting Summarizer.
+
+Features:
+- Rules are grouped into tiers by the probe they depend on (e.g. a header
+  read or a full decode); rules in one tier share that probe's result.
+- Tiers run cheapest first, by an exponentially weighted moving average of
+  their measured cost; tiers whose costs are within the same order of
+  magnitude keep their declared order, so the order stays deterministic.
+- Guard rules (file exists, supported format) always run first.
+- Stops at the first failing rule and reports per-rule timings.
+- A run can be limited to some tiers (e.g. only the header checks before
+  accepting an upload, and the decode checks later).
+
+Usage:
+    gate = QualityGate([QualityRule("duration", "header", check_duration)],
+                       tier_costs={"header": 0.05})
+    result = gate.run(path, thresholds)
+
+Dependencies: Python standard library (math, threading, time)
+"""
+
+import math
+import threading
+import time
+from contextlib import nullcontext
+
+DEFAULT_ALPHA = 0.2
+# Costs below this (seconds) are treated as equal
+MIN_COST = 1e-6
+
+
+class QualityRule:
+    """
+    One quality check.
+
+    Args:
+        name (str): Rule name (used in timings and results).
+        tier (str): Probe the rule depends on; rules sharing a tier share its cost.
+        check (callable): check(path, measurements, thresholds) -> None if the
+            rule passes, else the rejection reason. It may record values it
+            measured into the `measurements` dict.
+    """
+
+    def __init__(self, name, tier, check):
+        self.name = name
+        self.tier = tier
+        self.check = check
+
+    def __repr__(self):
+        return f"QualityRule({self.name!r}, tier={self.tier!r})"
+
+
+def cost_bucket(seconds):
+    """
+    Order of magnitude of a cost, used to compare tiers without ordering on noise.
+    """
+    return math.floor(math.log10(max(seconds, MIN_COST)))
+
+
+class QualityGate:
+    """
+    Runs quality rules cheapest tier first and stops at the first failure.
+
+    Args:
+        rules (list[QualityRule]): Rules in declared order.
+        guards (list[QualityRule], optional): Rules that always run first, in order.
+        tier_costs (dict, optional): Initial cost estimate (seconds) per tier.
+        alpha (float): EWMA weight of each new cost measurement.
+        session (callable, optional): Context manager factory entered around a
+            run, e.g. to share probe results between rules.
+    """
+
+    def __init__(self, rules, guards=None, tier_costs=None, alpha=DEFAULT_ALPHA, session=None):
+        self.rules = list(rules)
+        self.guards = list(guards or [])
+        self.alpha = alpha
+        self.session = session or nullcontext
+        self._costs = dict(tier_costs or {})
+        self._lock = threading.Lock()
+
+    def tier_costs(self):
+        """
+        Current cost estimate (seconds) per tier.
+        """
+        with self._lock:
+            return dict(self._costs)
+
+    def ordered_rules(self):
+        """
+        Non-guard rules in execution order.
+        """
+        tiers = []
+        for rule in self.rules:
+            if rule.tier not in tiers:
+                tiers.append(rule.tier)
+        costs = self.tier_costs()
+        # Unmeasured tiers without an estimate go last
+        ranked = sorted(
+            tiers,
+            key=lambda tier: (cost_bucket(costs[tier]) if tier in costs else math.inf, tiers.index(tier))
+        )
+        return [rule for tier in ranked for rule in self.rules if rule.tier == tier]
+
+    def _record(self, tier, seconds):
+        with self._lock:
+            previous = self._costs.get(tier)
+            if previous is None:
+                self._costs[tier] = seconds
+            else:
+                self._costs[tier] = (1 - self.alpha) * previous + self.alpha * seconds
+
+    def run(self, path, thresholds=None, tiers=None):
+        """
+        Run the rules against one file.
+
+        Args:
+            path (str): Audio file path.
+            thresholds (dict, optional): Passed to every rule.
+            tiers (iterable, optional): Only run rules of these tiers (guards always run).
+
+        Returns:
+            dict: {
+                "ok": bool, "reason": str,
+                "rule": str | None (the failing rule),
+                "timings": {rule name: seconds, in execution order},
+                "measurements": {name: value} recorded by the rules that ran
+            }
+        """
+        thresholds = thresholds or {}
+        measurements = {}
+        timings = {}
+        tier_elapsed = {}
+        failed_rule = reason = None
+        with self.session():
+            rules = [rule for rule in self.ordered_rules() if tiers is None or rule.tier in tiers]
+            for rule in self.guards + rules:
+                start = time.perf_counter()
+                reason = rule.check(path, measurements, thresholds)
+                elapsed = time.perf_counter() - start
+                timings[rule.name] = round(elapsed, 6)
+                if rule not in self.guards:
+                    tier_elapsed[rule.tier] = tier_elapsed.get(rule.tier, 0.0) + elapsed
+                if reason is not None:
+                    failed_rule = rule.name
+                    break
+        for tier, elapsed in tier_elapsed.items():
+            self._record(tier, elapsed)
+        return {
+            "ok": failed_rule is None,
+            "reason": "OK" if failed_rule is None else reason,
+            "rule": failed_rule,
+            "timings": timings,
+            "measurements": measurements,
+        }
@@ -0,0 +1,417 @@
+"""
+slot_scheduler.py
+
+Availability-aware time slot allocation for action items in the
+AI Meeting Summarizer.
+
+Features:
+- Fetches busy time through a pluggable busy provider; the default one reads
+  each owner's Nextcloud calendar via CalDAV and caches it per calendar for a
+  TTL, so consecutive batches reuse one fetch instead of querying per request.
+- Maps owners to calendars explicitly (SLOT_CALENDAR_MAP) or by display name.
+  Owners without a calendar are scheduled against their own empty set, never
+  against another calendar's free/busy.
+- Keeps every calendar's busy time as a sorted set of disjoint intervals
+  (binary search for overlap queries, merge on insert).
+- Packs actions into the earliest free, non-overlapping slot at or after
+  their preferred start, optionally within working hours. Fixed requests
+  (explicit datetimes) are kept exactly as given and only reserve their time.
+
+All datetimes are handled as naive UTC; timezone-aware inputs are converted.
+
+Configuration (environment variables):
+- SLOT_CALENDAR_MAP: Comma-separated owner=calendar pairs, e.g.
+  "Alice=Alice Work,Bob=Team" (matched case-insensitively).
+- SLOT_BUSY_TTL_SEC: How long fetched free/busy is reused (default 300; 0 disables).
+
+Dependencies: Python standard library (bisect, datetime, threading), app.utils.nextcloud_utils
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, date, timedelta, timezone
+from app.utils.logger import logger
+from app.utils.nextcloud_utils import get_calendar_client
+from app.utils.tracing import traced
+
+DEFAULT_SLOT_MINUTES = 30
+DEFAULT_GRANULARITY_MINUTES = 15
+DEFAULT_HORIZON_DAYS = 14
+DEFAULT_BUSY_TTL_SEC = 300
+
+
+def to_naive_utc(value):
+    """
+    Convert a datetime/date/ISO string to a naive UTC datetime.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_calendar_map(spec):
+    """
+    Parse an owner-to-calendar map such as "Alice=Alice Work,Bob=Team".
+
+    Args:
+        spec (str): Comma-separated owner=calendar pairs; malformed pairs are ignored.
+
+    Returns:
+        dict: {owner (lowercase): calendar display name (lowercase)}
+    """
+    mapping = {}
+    for pair in (spec or "").split(","):
+        owner, sep, calendar = pair.partition("=")
+        if sep and owner.strip() and calendar.strip():
+            mapping[owner.strip().lower()] = calendar.strip().lower()
+    return mapping
+
+
+class IntervalSet:
+    """
+    Sorted set of disjoint half-open intervals [start, end).
+
+    Overlapping or touching intervals are merged on insert, so lookups are a
+    binary search over interval starts.
+    """
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        for start, end in sorted(intervals):
+            self.add(start, end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return iter(zip(self._starts, self._ends))
+
+    def add(self, start, end):
+        """
+        Insert [start, end), merging with any overlapping or adjacent intervals.
+        """
+        if end <= start:
+            return
+        # First interval that could touch: the one before start's insertion point
+        i = bisect_right(self._starts, start) - 1
+        if i < 0 or self._ends[i] < start:
+            i += 1
+        j = i
+        while j < len(self._starts) and self._starts[j] <= end:
+            start = min(start, self._starts[j])
+            end = max(end, self._ends[j])
+            j += 1
+        self._starts[i:j] = [start]
+        self._ends[i:j] = [end]
+
+    def overlaps(self, start, end):
+        """
+        True if [start, end) intersects any interval in the set.
+        """
+        i = bisect_right(self._starts, start) - 1
+        if i >= 0 and self._ends[i] > start:
+            return True
+        return i + 1 < len(self._starts) and self._starts[i + 1] < end
+
+    def first_gap(self, start, length, limit=None):
+        """
+        Earliest `t >= start` such that [t, t + length) is free.
+
+        Args:
+            start (datetime): Earliest acceptable start.
+            length (timedelta): Required free length.
+            limit (datetime, optional): Give up if no gap starts before this.
+
+        Returns:
+            datetime | None: Start of the gap.
+        """
+        i = bisect_right(self._starts, start) - 1
+        if i >= 0 and self._ends[i] > start:
+            start = self._ends[i]
+        i += 1
+        while i < len(self._starts) and self._starts[i] < start + length:
+            start = max(start, self._ends[i])
+            i += 1
+        if limit is not None and start > limit:
+            return None
+        return start
+
+
+class CalDAVBusyProvider:
+    """
+    Busy intervals read from Nextcloud calendars, cached per calendar.
+
+    An owner's busy time comes from the calendar mapped to them in
+    calendar_map, else the calendar whose display name matches the owner
+    (case-insensitive). Owners without a calendar get no busy time of their
+    own; they are never scheduled against someone else's calendar.
+
+    Fetched intervals are reused for ttl_sec while the cached window covers
+    the requested one, and slots allocated meanwhile are added to the cache
+    (reserve), so back-to-back batches cost no CalDAV round-trips.
+
+    Args:
+        client (NextcloudCalendarClient, optional): Defaults to the shared client.
+        calendar_map (dict, optional): {owner: calendar name}; defaults to SLOT_CALENDAR_MAP.
+        ttl_sec (float, optional): Cache lifetime; defaults to SLOT_BUSY_TTL_SEC.
+        clock (callable): Monotonic time source (injectable for tests).
+    """
+
+    def __init__(self, client=None, calendar_map=None, ttl_sec=None, clock=time.monotonic):
+        self._client = client
+        if calendar_map is None:
+            self.calendar_map = parse_calendar_map(os.environ.get("SLOT_CALENDAR_MAP", ""))
+        else:
+            self.calendar_map = {k.strip().lower(): v.strip().lower() for k, v in calendar_map.items()}
+        self.ttl_sec = float(os.environ.get("SLOT_BUSY_TTL_SEC", DEFAULT_BUSY_TTL_SEC)) if ttl_sec is None else ttl_sec
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calendars = None  # (fetched_at, [calendar, ...])
+        self._cache = {}  # calendar key -> (fetched_at, start, end, [(start, end), ...])
+
+    def _calendar_for(self, owner, calendars):
+        name = (owner or "").strip().lower()
+        name = self.calendar_map.get(name, name)
+        for calendar in calendars:
+            display = getattr(calendar, "name", None)
+            if display and display.strip().lower() == name:
+                return calendar
+        return None
+
+    @staticmethod
+    def _key(calendar):
+        return ("calendar", str(getattr(calendar, "url", None) or calendar.name))
+
+    def _fresh(self, fetched_at):
+        return self._clock() - fetched_at < self.ttl_sec
+
+    def _calendar_list(self):
+        if self._calendars is not None and self._fresh(self._calendars[0]):
+            return self._calendars[1]
+        client = self._client or get_calendar_client()
+        calendars = client.calendars()
+        self._calendars = (self._clock(), calendars)
+        return calendars
+
+    @traced("calendar.busy")
+    def busy_by_calendar(self, owners, start, end):
+        """
+        Busy intervals of the calendars behind several owners, one query per stale calendar.
+
+        Returns:
+            tuple: ({owner: calendar key}, {calendar key: [(start, end), ...]}) with
+                naive UTC datetimes; owners sharing a calendar share its key.
+        """
+        with self._lock:
+            calendars = self._calendar_list()
+            calendar_of = {}
+            busy = {}
+            for owner in owners:
+                calendar = self._calendar_for(owner, calendars)
+                if calendar is None:
+                    calendar_of[owner] = ("owner", owner)
+                    busy[calendar_of[owner]] = []
+                    continue
+                key = self._key(calendar)
+                calendar_of[owner] = key
+                if key in busy:
+                    continue
+                cached = self._cache.get(key)
+                if cached and self._fresh(cached[0]) and cached[1] <= start and cached[2] >= end:
+                    busy[key] = list(cached[3])
+                else:
+                    busy[key] = self._fetch(calendar, start, end)
+                    self._cache[key] = (self._clock(), start, end, list(busy[key]))
+            return calendar_of, busy
+
+    def reserve(self, key, start, end):
+        """
+        Record a newly allocated slot in the cached busy time of a calendar.
+        """
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached:
+                cached[3].append((start, end))
+
+    def busy_for_owners(self, owners, start, end):
+        """
+        Fetch busy intervals for several owners in one pass.
+
+        Returns:
+            dict: {owner: [(start, end), ...]} as naive UTC datetimes.
+        """
+        calendar_of, busy = self.busy_by_calendar(owners, start, end)
+        return {owner: busy[key] for owner, key in calendar_of.items()}
+
+    def _fetch(self, calendar, start, end):
+        intervals = []
+        for event in calendar.search(start=start, end=end, event=True, expand=True):
+            try:
+                component = event.icalendar_component
+                dtstart = to_naive_utc(component.get("dtstart").dt)
+                dtend_prop = component.get("dtend")
+                if dtend_prop is not None:
+                    dtend = to_naive_utc(dtend_prop.dt)
+                else:
+                    dtend = dtstart + timedelta(days=1 if not isinstance(component.get("dtstart").dt, datetime) else 0)
+                intervals.append((dtstart, dtend))
+            except Exception as e:
+                logger.warning("Skipping unreadable calendar event in free/busy scan: %s", e)
+        return intervals
+
+
+class SlotAllocator:
+    """
+    Packs action items into free, non-overlapping slots per calendar.
+
+    Args:
+        busy_provider: Object with busy_by_calendar(owners, start, end) ->
+            ({owner: calendar key}, {calendar key: [(start, end)]}), or with
+            busy_for_owners(owners, start, end) -> {owner: [(start, end)]} (one
+            calendar per owner); defaults to CalDAVBusyProvider. None-returning
+            providers are treated as fully free.
+        slot_minutes (int): Default slot length.
+        granularity_minutes (int): Slot starts are rounded up to this grid.
+        horizon_days (int): How far past the preferred start to search.
+        work_hours (tuple, optional): (start_hour, end_hour) in UTC to confine slots to.
+    """
+
+    def __init__(self, busy_provider=None, slot_minutes=DEFAULT_SLOT_MINUTES,
+                 granularity_minutes=DEFAULT_GRANULARITY_MINUTES, horizon_days=DEFAULT_HORIZON_DAYS,
+                 work_hours=None):
+        self.busy_provider = busy_provider if busy_provider is not None else CalDAVBusyProvider()
+        self.slot = timedelta(minutes=slot_minutes)
+        self.granularity = timedelta(minutes=granularity_minutes)
+        self.horizon = timedelta(days=horizon_days)
+        self.work_hours = work_hours
+        # Serializes batches, so concurrent callers never hand out the same slot
+        self._lock = threading.Lock()
+
+    def _round_up(self, t):
+        step = int(self.granularity.total_seconds())
+        seconds = int((t - datetime(t.year, t.month, t.day)).total_seconds())
+        remainder = seconds % step
+        if remainder or t.microsecond:
+            t = t.replace(microsecond=0) + timedelta(seconds=step - remainder)
+        return t
+
+    def _into_work_hours(self, t, length):
+        """
+        Move t forward to the next time where [t, t + length) fits in working hours.
+        """
+        if not self.work_hours:
+            return t
+        start_hour, end_hour = self.work_hours
+        day_start = t.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+        day_end = t.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(hours=end_hour)
+        if t < day_start:
+            return day_start
+        if t + length > day_end:
+            return day_start + timedelta(days=1)
+        return t
+
+    def _place(self, busy, earliest, length):
+        limit = earliest + self.horizon
+        t = earliest
+        while t <= limit:
+            t = self._into_work_hours(self._round_up(t), length)
+            gap = busy.first_gap(t, length, limit)
+            if gap is None:
+                return None
+            if gap == t:
+                return t
+            # Pushed past a busy interval: re-align to the grid and working hours
+            t = gap
+        return None
+
+    def _busy(self, owners, start, end):
+        """
+        ({owner: calendar key}, {calendar key: intervals}) from the busy provider.
+        """
+        try:
+            if hasattr(self.busy_provider, "busy_by_calendar"):
+                calendar_of, busy = self.busy_provider.busy_by_calendar(owners, start, end)
+                return {owner: calendar_of.get(owner, owner) for owner in owners}, busy
+            return {owner: owner for owner in owners}, self.busy_provider.busy_for_owners(owners, start, end) or {}
+        except Exception as e:
+            logger.warning("Free/busy lookup failed, scheduling without availability: %s", e)
+            return {owner: owner for owner in owners}, {}
+
+    def allocate(self, requests, now=None):
+        """
+        Assign a slot to each request.
+
+        Args:
+            requests (list of dict): Each {"owner": str, "earliest": datetime|str|None,
+                "minutes": int (optional), "fixed": bool (optional)}. A fixed request
+                keeps exactly its earliest time (no grid, working hours or busy
+                check) and only reserves it. Fixed requests are reserved first;
+                among the others earlier requests get priority.
+            now (datetime, optional): Default earliest start is now + 1 hour.
+
+        Returns:
+            list: {"start": datetime, "end": datetime} per request, or None if
+                no slot was found within the horizon.
+        """
+        if not requests:
+            return []
+        now = to_naive_utc(now or datetime.now(timezone.utc))
+        default_earliest = now + timedelta(hours=1)
+        prepared = []
+        for req in requests:
+            earliest = req.get("earliest")
+            earliest = to_naive_utc(earliest) if earliest else default_earliest
+            length = timedelta(minutes=req["minutes"]) if req.get("minutes") else self.slot
+            prepared.append((req.get("owner") or "Unassigned", earliest, length, bool(req.get("fixed") and req.get("earliest"))))
+
+        owners = sorted({owner for owner, _, _, _ in prepared})
+        window_start = min(e for _, e, _, _ in prepared)
+        window_end = max(e for _, e, _, _ in prepared) + self.horizon + max(n for _, _, n, _ in prepared)
+        with self._lock:
+            # One free/busy lookup per batch, shared by all actions on the same calendar
+            calendar_of, busy_by_calendar = self._busy(owners, window_start, window_end)
+            busy = {key: IntervalSet(busy_by_calendar.get(key, [])) for key in set(calendar_of.values())}
+
+            slots = [None] * len(prepared)
+            for i, (owner, earliest, length, fixed) in enumerate(prepared):
+                if fixed:
+                    busy[calendar_of[owner]].add(earliest, earliest + length)
+                    slots[i] = {"start": earliest, "end": earliest + length}
+            for i, (owner, earliest, length, fixed) in enumerate(prepared):
+                if fixed:
+                    continue
+                start = self._place(busy[calendar_of[owner]], earliest, length)
+                if start is None:
+                    continue
+                busy[calendar_of[owner]].add(start, start + length)
+                slots[i] = {"start": start, "end": start + length}
+
+            reserve = getattr(self.busy_provider, "reserve", None)
+            if reserve is not None:
+                for (owner, _, _, _), slot in zip(prepared, slots):
+                    if slot is not None:
+                        reserve(calendar_of[owner], slot["start"], slot["end"])
+        return slots
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_slot_allocator():
+    """
+    Return the process-wide, availability-aware slot allocator used for
+    auto-scheduling (its busy provider keeps the free/busy cache).
+    """
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            _allocator = SlotAllocator()
+        return _allocator
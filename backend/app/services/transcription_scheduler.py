@@ -0,0 +1,395 @@
+"""
+transcription_scheduler.py
+
+Duration-aware scheduling of transcription jobs for the AI Meeting Summarizer.
+
+Features:
+- Admitted uploads wait for one of a fixed number of transcription slots;
+  when a slot frees up, the next job is chosen by estimated cost (from the
+  probed duration) instead of arrival order, so a 2-minute standup no
+  longer waits behind a queue of 2-hour all-hands recordings.
+- Per-client fairness: a job's cost is weighted by the number of jobs its
+  client already has running, so one client's many short uploads cannot
+  monopolise the slots.
+- Aging guarantee: a job that has waited AGING_SEC, or has been overtaken
+  by MAX_BYPASS later arrivals, is served before any unaged job (aged jobs
+  in arrival order), so long recordings wait a bounded time and are
+  never starved.
+- Node-wide queue: with a shared directory (TRANSCRIBE_QUEUE_DIR, by default
+  a "queue" directory inside the admission ledger that gunicorn sets up)
+  every worker process schedules against the same queue and slots, one
+  small file per job under a file lock (see app.services.admission.FileLedger);
+  jobs of exited workers are dropped. Without one, the queue is per process.
+- Estimated start and finish times for every queued and running job, from
+  the running jobs' remaining estimates and the current queue order
+  (GET /api/transcription/queue, and per job at GET /api/transcription/jobs/<id>).
+- Queue depth and waiting time are reported on /metrics.
+- One scheduler object per worker process (created lazily, so safe after fork).
+
+Configuration (environment variables):
+    TRANSCRIBE_SLOTS                 Concurrent transcriptions on the node, or per process without a
+                                     shared queue (default OFFLOAD_CPU_WORKERS or 1)
+    TRANSCRIBE_AGING_SEC             Wait after which a job is served before shorter ones (default 600)
+    TRANSCRIBE_MAX_BYPASS            Later jobs allowed to overtake a job before it is aged (default 20)
+    TRANSCRIBE_QUEUE_DIR             Shared queue directory (default $ADMISSION_DIR/queue when
+                                     ADMISSION_DIR is set, else per-process queue)
+
+Dependencies: Python standard library (threading, heapq, fcntl where available),
+app.services.admission, app.utils.metrics
+"""
+
+import heapq
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from app.services.admission import FileLedger, MemoryLedger, fcntl
+from app.utils.metrics import Gauge, Histogram
+
+DEFAULT_AGING_SEC = 600
+DEFAULT_MAX_BYPASS = 20
+# How often a waiting job re-checks for slots freed by other workers
+POLL_INTERVAL_SEC = 0.25
+WAIT_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+JOB_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+QUEUE_DEPTH = Gauge("transcription_queue_depth", "Transcription jobs waiting for a slot.")
+QUEUE_WAIT = Histogram(
+    "transcription_queue_wait_seconds", "Time transcription jobs waited for a slot.",
+    buckets=WAIT_BUCKETS)
+
+
+class Job:
+    """
+    One transcription job of this process, from enqueue to release.
+
+    `estimated_start` and `estimated_finish` (epoch seconds) are the forecast
+    made when the job was queued.
+    """
+
+    def __init__(self, job_id, client, cost_sec, enqueued):
+        self.id = job_id
+        self.client = client
+        self.cost_sec = cost_sec
+        self.enqueued = enqueued
+        self.started = None
+        self.bypassed = 0
+        self.estimated_start = None
+        self.estimated_finish = None
+
+    @property
+    def waited_sec(self):
+        """
+        Time spent queued (0 until the job has started).
+        """
+        return self.started - self.enqueued if self.started is not None else 0.0
+
+
+class TranscriptionScheduler:
+    """
+    Fairness-bounded shortest-job-first scheduler over `slots` transcription slots.
+
+    The queue lives in a ledger (in memory, or one shared by all workers of
+    the node when `directory` is given); whichever process submits, releases
+    or polls starts the next jobs, and each process mirrors its own jobs'
+    state into their Job objects.
+
+    Args:
+        slots (int): Jobs allowed to run at once.
+        aging_sec (float): Wait after which a job is served before unaged jobs.
+        max_bypass (int): Later jobs that may overtake a job before it is aged.
+        clock (callable): Wall clock (injectable for tests).
+        directory (str, optional): Shared queue directory (node-wide scheduling).
+        poll_sec (float): Re-check interval of waiting jobs.
+    """
+
+    def __init__(self, slots=1, aging_sec=DEFAULT_AGING_SEC, max_bypass=DEFAULT_MAX_BYPASS, clock=time.time,
+                 directory=None, poll_sec=POLL_INTERVAL_SEC):
+        self.slots = max(1, int(slots))
+        self.aging_sec = aging_sec
+        self.max_bypass = max_bypass
+        self.poll_sec = poll_sec
+        self._clock = clock
+        self._cond = threading.Condition()
+        self.shared = bool(directory and fcntl is not None)
+        self._ledger = FileLedger(directory) if self.shared else MemoryLedger()
+        self._jobs = {}
+        self._running = {}
+
+    def _aged(self, entry, now):
+        return now - entry["enqueued"] >= self.aging_sec or entry["bypassed"] >= self.max_bypass
+
+    def _order(self, waiting, running, now):
+        """
+        Waiting jobs in the order they would be started now.
+        """
+        running_by_client = {}
+        for entry in running:
+            running_by_client[entry["client"]] = running_by_client.get(entry["client"], 0) + 1
+
+        def key(entry):
+            if self._aged(entry, now):
+                return (0, 0, entry["enqueued"], entry["id"])
+            return (1, entry["cost_sec"] * (1 + running_by_client.get(entry["client"], 0)),
+                    entry["enqueued"], entry["id"])
+
+        return sorted(waiting, key=key)
+
+    def _dispatch(self, ledger):
+        """
+        Start waiting jobs while slots are free; call with the condition and ledger held.
+
+        Returns:
+            list: All ledger entries after dispatching.
+        """
+        now = self._clock()
+        entries = ledger.entries()
+        waiting = [e for e in entries if e["started"] is None]
+        running = [e for e in entries if e["started"] is not None]
+        while waiting and len(running) < self.slots:
+            entry = self._order(waiting, running, now)[0]
+            waiting.remove(entry)
+            for other in waiting:
+                if other["enqueued"] < entry["enqueued"]:
+                    other["bypassed"] += 1
+                    ledger.add(other)
+            entry["started"] = now
+            ledger.add(entry)
+            running.append(entry)
+        self._sync(entries)
+        return entries
+
+    def _sync(self, entries):
+        """
+        Mirror the ledger state of this process's jobs into their Job objects.
+        """
+        by_id = {entry["id"]: entry for entry in entries}
+        started = False
+        for job in self._jobs.values():
+            entry = by_id.get(job.id)
+            if entry is None:
+                continue
+            job.bypassed = entry["bypassed"]
+            if job.started is None and entry["started"] is not None:
+                job.started = entry["started"]
+                self._running[job.id] = job
+                QUEUE_WAIT.observe(job.started - job.enqueued)
+                started = True
+        QUEUE_DEPTH.set(sum(1 for job in self._jobs.values() if job.started is None))
+        if started:
+            self._cond.notify_all()
+
+    def submit(self, cost_sec, client=None, job_id=None):
+        """
+        Queue a job without waiting for it (see wait() and release()).
+
+        Args:
+            cost_sec (float): Estimated processing time of the job.
+            client (str, optional): Client key for per-client fairness.
+            job_id (str, optional): Id to queue the job under; generated if omitted.
+
+        Returns:
+            Job: The queued job, with its estimated start and finish.
+
+        Raises:
+            ValueError: If job_id is malformed or already queued.
+        """
+        if job_id is not None and not JOB_ID_PATTERN.match(job_id):
+            raise ValueError("Invalid job id.")
+        with self._cond, self._ledger.transaction() as ledger:
+            job_id = job_id or uuid.uuid4().hex
+            if any(entry["id"] == job_id for entry in ledger.entries()):
+                raise ValueError(f"Job {job_id} is already queued.")
+            job = Job(job_id, client, max(float(cost_sec or 0), 0.0), self._clock())
+            self._jobs[job.id] = job
+            ledger.add({"id": job.id, "pid": os.getpid(), "client": client, "cost_sec": job.cost_sec,
+                        "enqueued": job.enqueued, "started": None, "bypassed": 0})
+            entries = self._dispatch(ledger)
+            estimate = self._forecast(entries, self._clock())[job.id]
+            job.estimated_start = estimate["estimated_start"]
+            job.estimated_finish = estimate["estimated_finish"]
+            return job
+
+    def wait(self, job, timeout=None):
+        """
+        Block until `job` holds a slot.
+
+        Returns:
+            bool: True once started, False if `timeout` expired first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while job.started is None:
+                remaining = self.poll_sec
+                if deadline is not None:
+                    remaining = min(remaining, deadline - time.monotonic())
+                    if remaining <= 0:
+                        return False
+                self._cond.wait(remaining)
+                if job.started is None:
+                    # Slots freed by other workers are only seen by polling the shared queue
+                    with self._ledger.transaction() as ledger:
+                        self._dispatch(ledger)
+            return True
+
+    def release(self, job):
+        """
+        Give up `job`'s slot, or its place in the queue if it never started.
+        """
+        with self._cond, self._ledger.transaction() as ledger:
+            ledger.remove(job.id)
+            self._jobs.pop(job.id, None)
+            self._running.pop(job.id, None)
+            self._dispatch(ledger)
+
+    @contextmanager
+    def slot(self, cost_sec, client=None, job_id=None):
+        """
+        Hold a transcription slot for the duration of the block.
+
+        Args:
+            cost_sec (float): Estimated processing time of the job.
+            client (str, optional): Client key for per-client fairness.
+            job_id (str, optional): Id to queue the job under (see submit()).
+
+        Yields:
+            Job: The running job (`waited_sec` is how long it queued).
+        """
+        job = self.submit(cost_sec, client, job_id)
+        try:
+            self.wait(job)
+            yield job
+        finally:
+            self.release(job)
+
+    def _forecast(self, entries, now):
+        forecast = {}
+        free_at = []
+        running = [e for e in entries if e["started"] is not None]
+        waiting = [e for e in entries if e["started"] is None]
+        for entry in running:
+            finish = max(entry["started"] + entry["cost_sec"], now)
+            heapq.heappush(free_at, finish)
+            forecast[entry["id"]] = {"client": entry["client"], "state": "running", "cost_sec": entry["cost_sec"],
+                                     "estimated_start": entry["started"], "estimated_finish": finish}
+        free_at.extend([now] * (self.slots - len(free_at)))
+        heapq.heapify(free_at)
+        for entry in self._order(waiting, running, now):
+            start = heapq.heappop(free_at)
+            heapq.heappush(free_at, start + entry["cost_sec"])
+            forecast[entry["id"]] = {"client": entry["client"], "state": "queued", "cost_sec": entry["cost_sec"],
+                                     "estimated_start": start, "estimated_finish": start + entry["cost_sec"]}
+        return forecast
+
+    def forecast(self):
+        """
+        Estimated start and finish of every job, assuming the current order holds.
+
+        Returns:
+            dict: job id -> {"client", "state", "cost_sec", "estimated_start", "estimated_finish"}
+                  (epoch seconds; "running" jobs report their actual start).
+        """
+        with self._cond, self._ledger.transaction() as ledger:
+            return self._forecast(self._dispatch(ledger), self._clock())
+
+    def _describe(self, job_id, entry, now):
+        return {
+            "id": job_id,
+            "state": entry["state"],
+            "cost_sec": round(entry["cost_sec"], 1),
+            "estimated_start_in_sec": round(max(entry["estimated_start"] - now, 0.0), 1),
+            "estimated_finish_in_sec": round(max(entry["estimated_finish"] - now, 0.0), 1),
+        }
+
+    def job_status(self, job_id):
+        """
+        State and estimated start/finish of one queued or running job.
+
+        Returns:
+            dict | None: {"id", "state", "cost_sec", "estimated_start", "estimated_finish",
+                "estimated_start_in_sec", "estimated_finish_in_sec"} (epoch seconds),
+                or None once the job has finished or if it is unknown.
+        """
+        entry = self.forecast().get(job_id)
+        if entry is None:
+            return None
+        return {**self._describe(job_id, entry, self._clock()),
+                "estimated_start": entry["estimated_start"], "estimated_finish": entry["estimated_finish"]}
+
+    def snapshot(self):
+        """
+        Queue state for the API: slots, counts and the per-job forecast (seconds from now).
+        """
+        now = self._clock()
+        jobs = [self._describe(job_id, entry, now)
+                for job_id, entry in sorted(self.forecast().items(), key=lambda item: item[1]["estimated_start"])]
+        return {
+            "slots": self.slots,
+            "shared": self.shared,
+            "running": sum(1 for job in jobs if job["state"] == "running"),
+            "queued": sum(1 for job in jobs if job["state"] == "queued"),
+            "jobs": jobs,
+        }
+
+
+def _setting(name, default, cast=float):
+    try:
+        return cast(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def queue_directory():
+    """
+    The shared queue directory from the environment, or None for a per-process queue.
+    """
+    directory = os.environ.get("TRANSCRIBE_QUEUE_DIR")
+    if directory:
+        return directory
+    admission_dir = os.environ.get("ADMISSION_DIR")
+    return os.path.join(admission_dir, "queue") if admission_dir else None
+
+
+def prepare_shared_queue():
+    """
+    Clear jobs of a previous run from the shared queue directory (call in the
+    master before forking, after app.services.admission.prepare_shared_ledger).
+
+    Returns:
+        str | None: The queue directory, or None without a shared queue.
+    """
+    directory = queue_directory()
+    if directory and os.path.isdir(directory):
+        # Worker pids of a previous run may be reused, so their jobs would look live
+        for name in os.listdir(directory):
+            if name.startswith("job_"):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+    return directory
+
+
+_lock = threading.Lock()
+_scheduler = None
+_pid = None
+
+
+def get_scheduler():
+    """
+    Return this process's transcription scheduler, configured from the environment.
+    """
+    global _scheduler, _pid
+    with _lock:
+        if _scheduler is None or _pid != os.getpid():
+            default_slots = _setting("OFFLOAD_CPU_WORKERS", 1, int)
+            _scheduler = TranscriptionScheduler(
+                slots=_setting("TRANSCRIBE_SLOTS", default_slots, int),
+                aging_sec=_setting("TRANSCRIBE_AGING_SEC", DEFAULT_AGING_SEC),
+                max_bypass=_setting("TRANSCRIBE_MAX_BYPASS", DEFAULT_MAX_BYPASS, int),
+                directory=queue_directory(),
+            )
+            _pid = os.getpid()
+        return _scheduler
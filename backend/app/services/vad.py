@@ -0,0 +1,185 @@
+"""
+vad.py
+
+Energy-based voice activity detection for the AI Meeting Summarizer.
+
+Features:
+- Finds speech regions in 16 kHz mono samples from per-frame energy, with an
+  adaptive threshold (noise floor + margin, bounded by the loud level of the
+  recording) so it works on both quiet and noisy rooms.
+- Bridges short pauses, drops blips and pads regions so words are not clipped.
+- SpeechTimeline packs only the speech regions into one array for Whisper
+  (short silent gaps between them) and maps timestamps on that packed
+  audio back to the original recording.
+
+Configuration (environment variables):
+    AUDIO_VAD   "1" (default) to transcribe speech regions only, "0" to disable
+
+Dependencies: NumPy
+"""
+
+import os
+from bisect import bisect_right
+import numpy as np
+
+FRAME_MS = 30
+# Threshold = noise floor + margin, but never above loud level - headroom
+NOISE_MARGIN_DB = 12.0
+LOUD_HEADROOM_DB = 20.0
+ABSOLUTE_FLOOR_DB = -50.0
+MIN_SPEECH_SEC = 0.2
+MIN_SILENCE_SEC = 0.6
+PAD_SEC = 0.15
+# Silence inserted between packed regions so Whisper still hears a pause
+GAP_SEC = 0.2
+
+
+def vad_enabled():
+    """
+    Whether speech-only transcription is enabled (AUDIO_VAD, default on).
+    """
+    return os.environ.get("AUDIO_VAD", "1").lower() not in ("0", "false", "no", "off")
+
+
+def frame_energy_db(samples, sample_rate=16000, frame_ms=FRAME_MS):
+    """
+    Per-frame RMS level in dBFS.
+
+    Args:
+        samples (np.ndarray): Mono float samples in [-1, 1].
+        sample_rate (int): Samples per second.
+        frame_ms (int): Frame length in milliseconds.
+
+    Returns:
+        np.ndarray: One dB value per full frame.
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    count = samples.size // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:count * frame].reshape(count, frame).astype(np.float32)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    return 20 * np.log10(rms + 1e-10)
+
+
+def detect_speech(samples, sample_rate=16000, frame_ms=FRAME_MS,
+                  min_speech_sec=MIN_SPEECH_SEC, min_silence_sec=MIN_SILENCE_SEC,
+                  pad_sec=PAD_SEC):
+    """
+    Find speech regions in a recording.
+
+    Args:
+        samples (np.ndarray): Mono float samples in [-1, 1].
+        sample_rate (int): Samples per second.
+        frame_ms (int): Analysis frame length in milliseconds.
+        min_speech_sec (float): Shorter detections are dropped as noise.
+        min_silence_sec (float): Shorter pauses are kept inside a region.
+        pad_sec (float): Padding added around each region.
+
+    Returns:
+        list[tuple[int, int]]: Sorted, non-overlapping (start, end) sample ranges.
+    """
+    db = frame_energy_db(samples, sample_rate, frame_ms)
+    if db.size == 0:
+        return []
+    noise_floor = np.percentile(db, 10)
+    loud_level = np.percentile(db, 95)
+    threshold = max(ABSOLUTE_FLOOR_DB, min(noise_floor + NOISE_MARGIN_DB, loud_level - LOUD_HEADROOM_DB))
+    active = db > threshold
+    if not active.any():
+        return []
+
+    # Run boundaries of active frames: [start_frame, end_frame)
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    frame = int(sample_rate * frame_ms / 1000)
+    max_gap = int(min_silence_sec * 1000 / frame_ms)
+    min_len = int(min_speech_sec * 1000 / frame_ms)
+    pad = int(pad_sec * sample_rate)
+
+    merged = []
+    for start, end in zip(starts, ends):
+        if merged and start - merged[-1][1] < max_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    regions = []
+    for start, end in merged:
+        if end - start < min_len:
+            continue
+        lo = max(0, int(start) * frame - pad)
+        hi = min(samples.size, int(end) * frame + pad)
+        if regions and lo <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], hi)
+        else:
+            regions.append((lo, hi))
+    return regions
+
+
+class SpeechTimeline:
+    """
+    Packs speech regions into one array and maps packed time back to the original.
+
+    Args:
+        regions (list[tuple[int, int]]): Sorted (start, end) sample ranges.
+        sample_rate (int): Samples per second.
+        gap_sec (float): Silence inserted between regions.
+    """
+
+    def __init__(self, regions, sample_rate=16000, gap_sec=GAP_SEC):
+        self.regions = list(regions)
+        self.sample_rate = sample_rate
+        self.gap = int(gap_sec * sample_rate)
+        self._packed_starts = []
+        position = 0
+        for start, end in self.regions:
+            self._packed_starts.append(position)
+            position += (end - start) + self.gap
+        self.packed_length = max(0, position - self.gap)
+
+    @property
+    def speech_seconds(self):
+        return sum(end - start for start, end in self.regions) / self.sample_rate
+
+    def pack(self, samples):
+        """
+        Speech-only copy of `samples`, regions separated by short silent gaps.
+        """
+        packed = np.zeros(self.packed_length, dtype=np.float32)
+        for (start, end), offset in zip(self.regions, self._packed_starts):
+            packed[offset:offset + end - start] = samples[start:end]
+        return packed
+
+    def to_original(self, seconds):
+        """
+        Map a time (seconds) on the packed audio to the original recording.
+
+        Times inside an inserted gap map to the end of the preceding region.
+        """
+        if not self.regions:
+            return seconds
+        position = int(round(seconds * self.sample_rate))
+        index = max(0, bisect_right(self._packed_starts, position) - 1)
+        start, end = self.regions[index]
+        original = start + min(position - self._packed_starts[index], end - start)
+        return round(max(original, start) / self.sample_rate, 3)
+
+    def map_segments(self, segments, offset_sec=0.0):
+        """
+        Map Whisper segments (times relative to a slice of the packed audio
+        starting at `offset_sec`) to the original timeline.
+
+        Returns:
+            list[dict]: [{"start": float, "end": float, "text": str}, ...]
+        """
+        return [
+            {
+                "start": self.to_original(offset_sec + segment["start"]),
+                "end": self.to_original(offset_sec + segment["end"]),
+                "text": segment.get("text", "").strip(),
+            }
+            for segment in segments
+        ]
@@ -19,6 +19,7 @@ Dependencies: re, nltk, typing
 import re
 import nltk
 from typing import Optional, Tuple, List, Dict, Any
+from app.utils.tracing import traced
 
 # Supported common name prefixes (titles)
 TITLE_PREFIXES = {"Dr.", "Mr.", "Mrs.", "Ms.", "Miss", "Prof.", "Sir", "Madam"}
@@ -54,6 +55,7 @@ def clean_name(name: str) -> str:
             return name[len(title):].strip()
     return name
 
+@traced("nlp.entities")
 def extract_entities(text: str) -> List[Dict[str, Any]]:
     """
     Extract named PERSON entities from text using NLTK, including common title prefixes.
@@ -0,0 +1,404 @@
+"""
+event_archive.py
+
+Compressed archival of closed-day event logs for the AI Meeting Summarizer.
+
+Features:
+- Compacts `event_log_YYYY-MM-DD.jsonl` files for days that are over into
+  gzip-compressed archives (`event_log_YYYY-MM-DD.jsonl.gz`).
+- Events are grouped into blocks by `type` (and ordered by `meeting_id`),
+  each block stored as an independent gzip member.
+- A small JSON index (`event_log_YYYY-MM-DD.idx.json`) records each block's
+  offset, length, type, meeting IDs and time range, so readers can skip
+  (never decompress) blocks that cannot match a `type`/`meeting_id` filter.
+- Readers that query archives transparently alongside the live JSONL files.
+- Scheduled compaction: `start_compactor` runs the job on a background
+  thread every EVENT_ARCHIVE_INTERVAL_SEC (the gunicorn master starts it, so
+  only one process compacts).
+
+Configuration (environment variables):
+    EVENT_ARCHIVE_INTERVAL_SEC   Seconds between scheduled compactions (default 3600, 0 disables)
+
+Usage:
+    python -m app.utils.event_archive [--directory event_logs]
+
+Dependencies: Python standard library (os, gzip, json, datetime, threading)
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from app.utils.logger import logger
+
+ARCHIVE_SUFFIX = ".jsonl.gz"
+INDEX_SUFFIX = ".idx.json"
+ARCHIVE_VERSION = 1
+
+# Rows per compressed block; smaller blocks give finer-grained skipping.
+DEFAULT_BLOCK_ROWS = 1000
+
+DEFAULT_COMPACT_INTERVAL_SEC = 3600
+
+_DAY_LOG_RE = re.compile(r"^event_log_(\d{4}-\d{2}-\d{2})\.jsonl$")
+
+
+def _index_path_for(archive_path: str) -> str:
+    """
+    Return the index path belonging to an archive file.
+    """
+    return archive_path[:-len(ARCHIVE_SUFFIX)] + INDEX_SUFFIX
+
+
+def _hashable(value):
+    """
+    Normalize a field value so it can be stored in an index set.
+    """
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return json.dumps(value, sort_keys=True)
+
+
+def _build_block(rows, block_type, offset):
+    """
+    Compress a list of event dicts into one gzip member and describe it.
+
+    Args:
+        rows (list): Event dicts sharing the same type.
+        block_type (str|None): Event type of all rows in the block.
+        offset (int): Byte offset of the block inside the archive.
+
+    Returns:
+        tuple: (compressed_bytes, block_descriptor)
+    """
+    payload = "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+    data = gzip.compress(payload)
+    logged = [r.get("logged_at") for r in rows if isinstance(r.get("logged_at"), str)]
+    meeting_ids = sorted({_hashable(r.get("meeting_id")) for r in rows}, key=lambda m: (m is not None, str(m)))
+    block = {
+        "offset": offset,
+        "length": len(data),
+        "rows": len(rows),
+        "type": block_type,
+        "meeting_ids": meeting_ids,
+        "first_logged_at": min(logged) if logged else None,
+        "last_logged_at": max(logged) if logged else None,
+    }
+    return data, block
+
+
+def compact_log_file(path: str, block_rows: int = DEFAULT_BLOCK_ROWS, remove_source: bool = True) -> str:
+    """
+    Compact a single JSONL event log into a compressed, indexed archive.
+
+    Malformed lines are preserved verbatim in a dedicated block so that no
+    data is lost by compaction.
+
+    Args:
+        path (str): Path to the `.jsonl` event log.
+        block_rows (int): Maximum rows per compressed block.
+        remove_source (bool): Delete the JSONL file once the archive is written.
+
+    Returns:
+        str: Path to the written archive.
+    """
+    groups = {}
+    malformed = []
+    total = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            total += 1
+            try:
+                entry = json.loads(line)
+            except Exception:
+                malformed.append(line.rstrip("\n"))
+                continue
+            if not isinstance(entry, dict):
+                malformed.append(line.rstrip("\n"))
+                continue
+            event_type = entry.get("type")
+            groups.setdefault(_hashable(event_type), []).append(entry)
+
+    archive_path = path[:-len(".jsonl")] + ARCHIVE_SUFFIX
+    index_path = _index_path_for(archive_path)
+    tmp_archive = archive_path + ".tmp"
+    tmp_index = index_path + ".tmp"
+
+    blocks = []
+    offset = 0
+    with open(tmp_archive, "wb") as out:
+        for event_type in sorted(groups, key=lambda t: (t is not None, str(t))):
+            # Keep each meeting's rows contiguous (stable, so original order is kept)
+            rows = sorted(groups[event_type], key=lambda r: str(r.get("meeting_id") or ""))
+            for start in range(0, len(rows), block_rows):
+                data, block = _build_block(rows[start:start + block_rows], event_type, offset)
+                out.write(data)
+                blocks.append(block)
+                offset += len(data)
+        malformed_block = None
+        if malformed:
+            data = gzip.compress(("\n".join(malformed) + "\n").encode("utf-8"))
+            out.write(data)
+            malformed_block = {"offset": offset, "length": len(data), "rows": len(malformed)}
+            offset += len(data)
+
+    index = {
+        "version": ARCHIVE_VERSION,
+        "source": os.path.basename(path),
+        "rows": total,
+        "blocks": blocks,
+        "malformed": malformed_block,
+    }
+    with open(tmp_index, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+    # Index last: an archive is only visible to readers once its index exists
+    os.replace(tmp_archive, archive_path)
+    os.replace(tmp_index, index_path)
+    if remove_source:
+        os.remove(path)
+    logger.info("Compacted %s -> %s (%d rows, %d blocks)", path, archive_path, total, len(blocks))
+    return archive_path
+
+
+def compact_event_logs(directory: str = "event_logs", before=None,
+                       block_rows: int = DEFAULT_BLOCK_ROWS, remove_source: bool = True) -> list:
+    """
+    Compact every closed-day event log in a directory.
+
+    A day is closed once it is strictly before `before` (default: today),
+    since the current day's file is still being appended to.
+
+    Args:
+        directory (str): Event log directory (default "event_logs").
+        before (date|None): Only compact days before this date.
+        block_rows (int): Maximum rows per compressed block.
+        remove_source (bool): Delete JSONL files after archiving.
+
+    Returns:
+        list: Paths of the archives written.
+    """
+    if not os.path.isdir(directory):
+        return []
+    cutoff = (before or datetime.now().date()).isoformat()
+    written = []
+    for filename in sorted(os.listdir(directory)):
+        match = _DAY_LOG_RE.match(filename)
+        if not match or match.group(1) >= cutoff:
+            continue
+        try:
+            written.append(compact_log_file(
+                os.path.join(directory, filename), block_rows=block_rows, remove_source=remove_source
+            ))
+        except Exception as e:
+            logger.error("Failed to compact %s: %s", filename, e)
+    return written
+
+
+def list_archives(directory: str = "event_logs") -> list:
+    """
+    List archive files (with a readable index) in a directory.
+
+    Returns:
+        list: Archive file names, sorted.
+    """
+    if not os.path.isdir(directory):
+        return []
+    names = set(os.listdir(directory))
+    return sorted(
+        name for name in names
+        if name.endswith(ARCHIVE_SUFFIX) and _index_path_for(name) in names
+    )
+
+
+def has_archive(filename: str, names) -> bool:
+    """
+    Check whether a JSONL log has already been superseded by an archive.
+
+    Readers use this to skip source files kept with `--keep-source` (or not
+    yet deleted), so archived events are never returned twice.
+
+    Args:
+        filename (str): JSONL file name.
+        names (collection): File names present in the directory.
+
+    Returns:
+        bool: True if an archive and index exist for this file.
+    """
+    if not filename.endswith(".jsonl"):
+        return False
+    stem = filename[:-len(".jsonl")]
+    return (stem + ARCHIVE_SUFFIX) in names and (stem + INDEX_SUFFIX) in names
+
+
+def _block_matches(block, types, meeting_id, since, until):
+    """
+    Decide from the index alone whether a block can contain matching rows.
+    """
+    if types is not None and block.get("type") not in types:
+        return False
+    if meeting_id is not None and meeting_id not in block.get("meeting_ids", []):
+        return False
+    if since is not None and block.get("last_logged_at") and block["last_logged_at"] < since:
+        return False
+    if until is not None and block.get("first_logged_at") and block["first_logged_at"] > until:
+        return False
+    return True
+
+
+def read_archive(directory: str, name: str, types=None, meeting_id=None,
+                 since=None, until=None, on_malformed=None):
+    """
+    Yield matching events from a single archive, using its block index.
+
+    Args:
+        directory (str): Event log directory.
+        name (str): Archive file name (`event_log_YYYY-MM-DD.jsonl.gz`).
+        types (set|None): Event types to include (None for all).
+        meeting_id (str|None): Only events for this meeting.
+        since (str|None): Inclusive lower bound on `logged_at` (ISO 8601).
+        until (str|None): Inclusive upper bound on `logged_at` (ISO 8601).
+        on_malformed (callable|None): Called with each preserved malformed line.
+
+    Yields:
+        dict: Matching event records.
+
+    Raises:
+        OSError, ValueError: If the archive or its index cannot be read.
+    """
+    with open(os.path.join(directory, _index_path_for(name)), encoding="utf-8") as f:
+        index = json.load(f)
+    with open(os.path.join(directory, name), "rb") as archive:
+        for block in index.get("blocks", []):
+            if not _block_matches(block, types, meeting_id, since, until):
+                continue
+            archive.seek(block["offset"])
+            payload = gzip.decompress(archive.read(block["length"]))
+            for line in payload.decode("utf-8").splitlines():
+                entry = json.loads(line)
+                if meeting_id is not None and entry.get("meeting_id") != meeting_id:
+                    continue
+                logged_at = entry.get("logged_at", "")
+                if since is not None and logged_at < since:
+                    continue
+                if until is not None and logged_at > until:
+                    continue
+                yield entry
+        malformed = index.get("malformed")
+        if malformed and on_malformed is not None:
+            archive.seek(malformed["offset"])
+            payload = gzip.decompress(archive.read(malformed["length"]))
+            for line in payload.decode("utf-8").splitlines():
+                on_malformed(line)
+
+
+def iter_archived_events(directory: str = "event_logs", types=None, meeting_id=None,
+                         since=None, until=None, on_error=None):
+    """
+    Yield events stored in compressed archives, skipping non-matching blocks.
+
+    Predicates on `type`, `meeting_id` and the `logged_at` range are pushed
+    down to the block index, so blocks that cannot match are never read or
+    decompressed. Rows of matching blocks are filtered again exactly.
+
+    Args:
+        directory (str): Event log directory.
+        types (iterable|None): Event types to include (None for all).
+        meeting_id (str|None): Only events for this meeting.
+        since (str|None): Inclusive lower bound on `logged_at` (ISO 8601).
+        until (str|None): Inclusive upper bound on `logged_at` (ISO 8601).
+        on_error (callable|None): Called as on_error(filename, error, raw_line)
+            for unreadable archives and preserved malformed lines. Malformed
+            lines are only decoded when a callback is provided.
+
+    Yields:
+        dict: Matching event records.
+    """
+    type_set = set(types) if types is not None else None
+    for name in list_archives(directory):
+        on_malformed = None
+        if on_error is not None:
+            on_malformed = lambda line, name=name: on_error(name, "Malformed line preserved in archive", line)
+        try:
+            yield from read_archive(directory, name, type_set, meeting_id, since, until, on_malformed)
+        except Exception as e:
+            logger.error("Failed to read archive %s: %s", name, e)
+            if on_error is not None:
+                on_error(name, str(e), None)
+
+
+def _compact_interval():
+    try:
+        return float(os.environ.get("EVENT_ARCHIVE_INTERVAL_SEC", DEFAULT_COMPACT_INTERVAL_SEC))
+    except (TypeError, ValueError):
+        return DEFAULT_COMPACT_INTERVAL_SEC
+
+
+_compactor = None
+_compactor_lock = threading.Lock()
+
+
+def start_compactor(directory: str = "event_logs", interval_sec=None):
+    """
+    Compact closed days now and then every interval_sec on a daemon thread.
+
+    Runs at most once per process. Start it in a single process per node
+    (the gunicorn master, or the dev server), since concurrent compactions
+    of the same day would race.
+
+    Args:
+        directory (str): Event log directory.
+        interval_sec (float, optional): Seconds between runs; <= 0 disables.
+            Defaults to EVENT_ARCHIVE_INTERVAL_SEC.
+
+    Returns:
+        threading.Event | None: Set it to stop the compactor, or None if disabled
+        or already running in this process.
+    """
+    global _compactor
+    interval = _compact_interval() if interval_sec is None else interval_sec
+    if interval <= 0:
+        return None
+    with _compactor_lock:
+        if _compactor is not None and _compactor[0] == os.getpid() and not _compactor[1].is_set():
+            return None
+        stop = threading.Event()
+        _compactor = (os.getpid(), stop)
+
+    def loop():
+        while not stop.is_set():
+            try:
+                written = compact_event_logs(directory)
+                if written:
+                    logger.info("Scheduled compaction archived %d event log(s)", len(written))
+            except Exception as e:
+                logger.error("Scheduled event log compaction failed: %s", e)
+            stop.wait(interval)
+
+    threading.Thread(target=loop, name="event-archive", daemon=True).start()
+    logger.info("Event log compaction scheduled every %ss for %s", interval, directory)
+    return stop
+
+
+def main(argv=None):
+    """
+    Command-line entry point for the compaction job (e.g. run nightly from cron).
+    """
+    parser = argparse.ArgumentParser(description="Compact closed-day event logs into compressed archives.")
+    parser.add_argument("--directory", default="event_logs", help="Event log directory")
+    parser.add_argument("--block-rows", type=int, default=DEFAULT_BLOCK_ROWS, help="Rows per compressed block")
+    parser.add_argument("--keep-source", action="store_true", help="Keep the original JSONL files")
+    args = parser.parse_args(argv)
+    written = compact_event_logs(args.directory, block_rows=args.block_rows, remove_source=not args.keep_source)
+    for path in written:
+        logger.info("Archived: %s", path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,442 @@
+"""
+event_index.py
+
+In-memory query index over structured event logs for the AI Meeting Summarizer.
+
+Features:
+- Keeps a compact row per event (time, type, outcome, timing and size fields)
+  instead of full event payloads such as transcripts.
+- Refreshes incrementally: live JSONL files are only parsed from the last
+  byte offset seen, archives are indexed once (they are immutable).
+- Filters by type, analytics event name, outcome and `logged_at` time range.
+  Timestamps (rows and bounds) are parsed and normalized to naive server
+  local time before comparing, so UTC ("Z") or offset-bearing bounds work.
+- Bounded memory: only files from the EVENT_INDEX_MAX_DAYS days up to the
+  newest log are indexed, and the oldest files are evicted once more than
+  EVENT_INDEX_MAX_ROWS rows are held.
+- Server-side aggregates: counts, min/max/mean and p50/p95/p99 of processing
+  times, total bytes uploaded, optional per-day/per-hour buckets.
+- Per-file row lists for incremental consumers (the processing-time model).
+
+Configuration (environment variables):
+    EVENT_INDEX_MAX_DAYS: Days of event logs kept in the index (default 90, 0 = no limit)
+    EVENT_INDEX_MAX_ROWS: Rows kept before the oldest files are evicted (default 500000, 0 = no limit)
+
+Usage:
+    from app.utils.event_index import get_event_index
+    summary = get_event_index().query(types={"audio_upload_success"})
+
+Dependencies: Python standard library (os, json, threading, datetime), app.utils.event_archive
+"""
+
+import json
+import os
+import re
+import threading
+from collections import Counter, namedtuple
+from datetime import date, datetime, timedelta
+from app.utils.logger import logger
+from app.utils.event_archive import list_archives, has_archive, read_archive
+
+# Numeric fields written by /process-audio that are aggregated as distributions
+TIMING_FIELDS = ("processing_time_sec", "transcribe_time_sec", "duration")
+
+IndexRow = namedtuple("IndexRow", [
+    "logged_at", "type", "event", "outcome", "meeting_id",
+    "processing_time_sec", "transcribe_time_sec", "duration", "reported_size",
+    "sample_rate", "queue_wait_sec"
+])
+
+_DAY_RE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+DEFAULT_MAX_DAYS = 90
+DEFAULT_MAX_ROWS = 500000
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_time(value):
+    """
+    Parse an ISO 8601 timestamp into a naive datetime in server local time.
+
+    Offset-aware values (e.g. "2025-05-19T08:00:00Z") are converted to local
+    time; naive values are taken to be local time already, which is how
+    `logged_at` is written.
+
+    Args:
+        value (str|datetime|None): Timestamp to parse.
+
+    Returns:
+        datetime | None: Naive local datetime, or None for a missing value.
+
+    Raises:
+        ValueError: If value is not a valid ISO 8601 timestamp.
+    """
+    if value is None or value == "":
+        return None
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _row_time(value):
+    """
+    Parse a row's `logged_at`, returning None when it is missing or malformed.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return parse_time(value)
+    except ValueError:
+        return None
+
+
+def _file_day(filename):
+    """
+    Day (YYYY-MM-DD) encoded in an event log file name, or None.
+    """
+    match = _DAY_RE.search(filename)
+    return match.group(1) if match else None
+
+
+def _number(value):
+    """
+    Return value as a float if it is numeric, else None.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def _label(value):
+    """
+    Return a categorical field as a hashable label (str or None).
+    """
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+def _to_row(entry):
+    """
+    Project a full event dict onto the compact index row.
+
+    Analytics events (`log_analytics_event`) carry their fields in `data`.
+    """
+    if not isinstance(entry, dict):
+        return None
+    data = entry.get("data") if isinstance(entry.get("data"), dict) else {}
+
+    def field(name):
+        return entry[name] if name in entry else data.get(name)
+
+    return IndexRow(
+        logged_at=_row_time(entry.get("logged_at")),
+        type=_label(entry.get("type")),
+        event=_label(entry.get("event")),
+        outcome=_label(field("outcome")),
+        meeting_id=_label(entry.get("meeting_id")),
+        processing_time_sec=_number(field("processing_time_sec")),
+        transcribe_time_sec=_number(field("transcribe_time_sec")),
+        duration=_number(field("duration")),
+        reported_size=_number(field("reported_size")),
+        sample_rate=_number(field("sample_rate")),
+        queue_wait_sec=_number(field("queue_wait_sec")),
+    )
+
+
+def percentile(sorted_values, q):
+    """
+    Linear-interpolated percentile of an already sorted list.
+
+    Args:
+        sorted_values (list): Values in ascending order.
+        q (float): Percentile in [0, 100].
+
+    Returns:
+        float | None: The percentile, or None for an empty list.
+    """
+    if not sorted_values:
+        return None
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * (q / 100.0)
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    frac = pos - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * frac
+
+
+def summarize(values):
+    """
+    Distribution summary (count, min, max, mean, p50, p95, p99) of numbers.
+    """
+    values = sorted(values)
+    if not values:
+        return {"count": 0, "min": None, "max": None, "mean": None, "p50": None, "p95": None, "p99": None}
+    return {
+        "count": len(values),
+        "min": values[0],
+        "max": values[-1],
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+    }
+
+
+class EventLogIndex:
+    """
+    Incrementally maintained index of event log rows for one log directory.
+
+    Args:
+        directory (str): Event log directory.
+        max_days (int, optional): Only index files from the max_days days up to the
+            newest log day (by the day in the file name); 0 disables.
+            Defaults to EVENT_INDEX_MAX_DAYS.
+        max_rows (int, optional): Evict the oldest files once more rows are held;
+            0 disables. Defaults to EVENT_INDEX_MAX_ROWS.
+    """
+
+    def __init__(self, directory: str = "event_logs", max_days=None, max_rows=None):
+        self.directory = directory
+        self.max_days = _env_int("EVENT_INDEX_MAX_DAYS", DEFAULT_MAX_DAYS) if max_days is None else max_days
+        self.max_rows = _env_int("EVENT_INDEX_MAX_ROWS", DEFAULT_MAX_ROWS) if max_rows is None else max_rows
+        self._lock = threading.Lock()
+        # filename -> {"offset": int, "rows": [IndexRow]} for live JSONL files
+        self._live = {}
+        # filename -> {"mtime": float, "rows": [IndexRow]} for archives
+        self._archived = {}
+        # files dropped to stay under max_rows; not re-read while they stay the oldest
+        self._evicted = set()
+
+    def _refresh_live(self, filename):
+        path = os.path.join(self.directory, filename)
+        state = self._live.get(filename)
+        size = os.path.getsize(path)
+        if state is None or size < state["offset"]:
+            # New file, or truncated/rewritten: start over
+            state = {"offset": 0, "rows": []}
+            self._live[filename] = state
+        if size == state["offset"]:
+            return
+        with open(path, "rb") as f:
+            f.seek(state["offset"])
+            chunk = f.read(size - state["offset"])
+        # Only consume complete lines; a partially written line is picked up next time
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return
+        for line in chunk[:end].splitlines():
+            try:
+                row = _to_row(json.loads(line))
+            except Exception:
+                continue
+            if row is not None:
+                state["rows"].append(row)
+        state["offset"] += end + 1
+
+    def _refresh_archive(self, name):
+        mtime = os.path.getmtime(os.path.join(self.directory, name))
+        state = self._archived.get(name)
+        if state is not None and state["mtime"] == mtime:
+            return
+        rows = [row for row in map(_to_row, read_archive(self.directory, name)) if row is not None]
+        self._archived[name] = {"mtime": mtime, "rows": rows}
+
+    def _window_start(self, names):
+        """
+        First day (YYYY-MM-DD) inside the retention window, or None when unbounded.
+
+        The window ends at the newest log day on disk rather than today, so an
+        idle node still serves its most recent history.
+        """
+        days = [day for day in map(_file_day, names) if day]
+        if not self.max_days or not days:
+            return None
+        newest = date.fromisoformat(max(days))
+        return (newest - timedelta(days=self.max_days - 1)).isoformat()
+
+    def _evict(self):
+        """
+        Drop the oldest files until at most max_rows rows are held.
+
+        The newest file is always kept, so a single large day is still queryable.
+        """
+        if not self.max_rows:
+            return
+        held = [(name, states) for states in (self._live, self._archived) for name in states]
+        total = sum(len(states[name]["rows"]) for name, states in held)
+        # Oldest day first; files without a day in their name are evicted last
+        held.sort(key=lambda item: (_file_day(item[0]) is None, _file_day(item[0]) or "", item[0]))
+        for name, states in held[:-1]:
+            if total <= self.max_rows:
+                break
+            total -= len(states.pop(name)["rows"])
+            self._evicted.add(name)
+            logger.info("Event index evicted %s to stay under %d rows", name, self.max_rows)
+
+    def refresh(self):
+        """
+        Bring the index up to date with the files currently on disk.
+
+        Files older than the max_days window are dropped, then the oldest files
+        are evicted while more than max_rows rows are held.
+        """
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                self._live.clear()
+                self._archived.clear()
+                self._evicted.clear()
+                return
+            names = os.listdir(self.directory)
+            live = [n for n in names if n.endswith(".jsonl") and not has_archive(n, names)]
+            archives = list_archives(self.directory)
+            start = self._window_start(live + archives)
+            if start is not None:
+                live = [n for n in live if (_file_day(n) or start) >= start]
+                archives = [n for n in archives if (_file_day(n) or start) >= start]
+            self._evicted &= set(live) | set(archives)
+            live = [n for n in live if n not in self._evicted]
+            archives = [n for n in archives if n not in self._evicted]
+            for stale in set(self._live) - set(live):
+                del self._live[stale]
+            for filename in live:
+                try:
+                    self._refresh_live(filename)
+                except Exception as e:
+                    logger.warning("Failed to index %s: %s", filename, e)
+            for stale in set(self._archived) - set(archives):
+                del self._archived[stale]
+            for name in archives:
+                try:
+                    self._refresh_archive(name)
+                except Exception as e:
+                    logger.warning("Failed to index archive %s: %s", name, e)
+            self._evict()
+
+    def sources(self):
+        """
+        Refresh, then return the rows of every indexed file, for incremental consumers.
+
+        Returns:
+            list of (str, list): (filename, rows) pairs. A live file's row list only
+            grows; when the file is rewritten or archived, a different list is returned.
+            Files that leave the retention window or are evicted are no longer listed.
+        """
+        self.refresh()
+        with self._lock:
+            return [(name, state["rows"]) for name, state in
+                    list(self._live.items()) + list(self._archived.items())]
+
+    def _candidate_rows(self, since, until):
+        """
+        Rows from files whose day can overlap the time range (by file name).
+
+        Args:
+            since (datetime|None): Normalized lower bound.
+            until (datetime|None): Normalized upper bound.
+        """
+        since_day = since.date().isoformat() if since else None
+        until_day = until.date().isoformat() if until else None
+        for filename, state in list(self._live.items()) + list(self._archived.items()):
+            day = _file_day(filename)
+            if day and ((since_day and day < since_day) or (until_day and day > until_day)):
+                continue
+            yield from state["rows"]
+
+    def query(self, types=None, events=None, outcome=None, since=None, until=None, bucket=None) -> dict:
+        """
+        Filter indexed events and compute aggregates server-side.
+
+        Args:
+            types (set|None): Event types to include.
+            events (set|None): Analytics event names (`log_analytics_event`) to include.
+            outcome (str|None): Only events with this outcome ("success", "failure", ...).
+            since (str|datetime|None): Inclusive lower bound on `logged_at` (ISO 8601;
+                naive values are server local time, offset-aware ones are converted).
+            until (str|datetime|None): Inclusive upper bound on `logged_at`, as for since.
+            bucket (str|None): "day" or "hour" to add per-period counts.
+
+        Returns:
+            dict: {
+                "count": int,
+                "by_type": {type: count},
+                "by_outcome": {outcome: count},
+                "processing_time_sec" / "transcribe_time_sec" / "duration": distribution summaries,
+                "bytes_uploaded": int,
+                "buckets": {period: count} (only when bucket is given)
+            }
+
+        Raises:
+            ValueError: If since or until is not a valid ISO 8601 timestamp.
+        """
+        since = parse_time(since)
+        until = parse_time(until)
+        self.refresh()
+        by_type = Counter()
+        by_outcome = Counter()
+        buckets = Counter()
+        timings = {name: [] for name in TIMING_FIELDS}
+        bytes_uploaded = 0
+        bucket_format = {"day": "%Y-%m-%d", "hour": "%Y-%m-%dT%H"}.get(bucket)
+
+        with self._lock:
+            rows = list(self._candidate_rows(since, until))
+        for row in rows:
+            if types is not None and row.type not in types:
+                continue
+            if events is not None and row.event not in events:
+                continue
+            if outcome is not None and row.outcome != outcome:
+                continue
+            if since is not None and (row.logged_at is None or row.logged_at < since):
+                continue
+            if until is not None and (row.logged_at is None or row.logged_at > until):
+                continue
+            by_type[str(row.type)] += 1
+            if row.outcome is not None:
+                by_outcome[row.outcome] += 1
+            for name in TIMING_FIELDS:
+                value = getattr(row, name)
+                if value is not None:
+                    timings[name].append(value)
+            if row.reported_size is not None and row.type == "audio_upload_success":
+                bytes_uploaded += int(row.reported_size)
+            if bucket_format and row.logged_at is not None:
+                buckets[row.logged_at.strftime(bucket_format)] += 1
+
+        result = {
+            "count": sum(by_type.values()),
+            "by_type": dict(by_type),
+            "by_outcome": dict(by_outcome),
+            "bytes_uploaded": bytes_uploaded,
+        }
+        for name in TIMING_FIELDS:
+            result[name] = summarize(timings[name])
+        if bucket_format:
+            result["buckets"] = dict(sorted(buckets.items()))
+        return result
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_event_index(directory: str = "event_logs") -> EventLogIndex:
+    """
+    Return the shared (per-process) index for an event log directory.
+    """
+    key = os.path.abspath(directory)
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = EventLogIndex(directory)
+        return _indexes[key]
@@ -0,0 +1,116 @@
+"""
+json_stream.py
+
+Incremental JSON and NDJSON encoding helpers for large API responses in the
+AI Meeting Summarizer.
+
+Features:
+- Encodes a JSON object whose large list field is produced by an iterator,
+  one element at a time, so the full list is never held in memory.
+- NDJSON (one JSON document per line) framing for sectioned responses.
+- Offset/limit pagination over iterators that detects a further page
+  without materializing the input.
+
+Usage:
+    from app.utils.json_stream import iter_json_object, paginate
+    page = paginate(events, offset=0, limit=100)
+    Response(iter_json_object(result, "event_logs", page), mimetype="application/json")
+
+Dependencies: Python standard library (json, itertools)
+"""
+
+import json
+from itertools import islice
+
+
+def _dumps(value):
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+class Page:
+    """
+    Iterator over one page of an underlying iterator.
+
+    After iteration, `returned` holds the number of items yielded and
+    `has_more` tells whether the source had items beyond the page.
+
+    Args:
+        items (iterable): Source items.
+        offset (int): Items to skip.
+        limit (int | None): Maximum items to yield (None for no limit).
+    """
+
+    def __init__(self, items, offset=0, limit=None):
+        self.offset = offset
+        self.limit = limit
+        self.returned = 0
+        self.has_more = False
+        self._source = islice(iter(items), offset, None)
+
+    def __iter__(self):
+        for item in self._source:
+            if self.limit is not None and self.returned >= self.limit:
+                self.has_more = True
+                return
+            self.returned += 1
+            yield item
+
+    def info(self):
+        """
+        Pagination metadata; only meaningful once the page has been consumed.
+        """
+        return {
+            "offset": self.offset,
+            "limit": self.limit,
+            "returned": self.returned,
+            "next_offset": self.offset + self.returned if self.has_more else None,
+        }
+
+
+def paginate(items, offset=0, limit=None):
+    """
+    Wrap an iterable in a lazily consumed Page.
+    """
+    return Page(items, offset=max(0, int(offset or 0)), limit=None if limit is None else max(0, int(limit)))
+
+
+def iter_json_object(fields, stream_key, items, trailer=None):
+    """
+    Yield a JSON object chunk by chunk, streaming one list-valued field.
+
+    Args:
+        fields (dict): Small fields, encoded up front.
+        stream_key (str): Name of the list field produced from `items`.
+        items (iterable): Elements of the streamed list.
+        trailer (callable, optional): Called after `items` is exhausted; the
+            returned dict is appended as further fields (e.g. pagination info).
+
+    Yields:
+        str: Pieces of one valid JSON document.
+    """
+    head = _dumps({k: v for k, v in fields.items() if k != stream_key})
+    prefix = head[:-1] + (", " if len(head) > 2 else "")
+    yield prefix + _dumps(stream_key) + ": ["
+    first = True
+    for item in items:
+        yield ("" if first else ", ") + _dumps(item)
+        first = False
+    tail = trailer() if trailer else None
+    if tail:
+        yield "], " + _dumps(tail)[1:]
+    else:
+        yield "]}"
+
+
+def iter_ndjson(sections):
+    """
+    Yield NDJSON lines for (section, data) pairs.
+
+    Args:
+        sections (iterable): (section name, payload) tuples.
+
+    Yields:
+        str: One line per section: {"section": name, "data": payload}
+    """
+    for section, data in sections:
+        yield _dumps({"section": section, "data": data}) + "\n"
@@ -10,15 +10,35 @@ Date: 2024-05-18
 - Logs to a rotating file (`logs/server.log`) and to the console (for warnings/errors).
 - File logs are rotated after 5MB, keeping up to 2 backups.
 - Ensures that duplicate handlers are not added upon repeated imports.
+- Log calls only put the record on a bounded in-memory queue; a listener
+  thread formats and writes it. Messages use %-style arguments
+  (`logger.info("Converted %s", path)`), so the string is built on the
+  listener thread and not at all for disabled levels. When the queue is
+  full, records are dropped (and counted) instead of blocking a request.
+- Multiprocess mode (`enable_multiprocess_logging`, called by the gunicorn
+  master before forking): each worker's listener thread sends formatted
+  lines over a pipe to a listener thread in the master, the only process
+  that writes and rotates `server.log`. Other files shared by the workers
+  (the request journal) go through the same pipe via `shared_file_handler`.
+
+Configuration (environment variables):
+    LOG_QUEUE_SIZE   Records buffered per process before new ones are dropped (default 10000)
 
 Usage:
     from app.utils.logger import logger
     logger.info("message")
 """
 
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import multiprocessing
 import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s %(levelname)s: %(message)s'
+DEFAULT_QUEUE_SIZE = 10000
 
 # Ensure logs directory exists (../logs relative to this file)
 log_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'logs'))
@@ -30,13 +50,11 @@ log_file = os.path.join(log_dir, 'server.log')
 logger = logging.getLogger('MeetingSummarizer')
 logger.setLevel(logging.INFO)
 
-# Rotating file handler (5MB per file, 2 backups)
+# Rotating file handler (5MB per file, 2 backups); only the listener writes to it
 file_handler = RotatingFileHandler(
-    log_file, maxBytes=5 * 1024 * 1024, backupCount=2, encoding="utf-8"
-)
-file_handler.setFormatter(
-    logging.Formatter('%(asctime)s %(levelname)s: %(message)s')
+    log_file, maxBytes=5 * 1024 * 1024, backupCount=2, encoding="utf-8", delay=True
 )
+file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
 # Console handler for warnings and above
 console_handler = logging.StreamHandler()
@@ -45,13 +63,230 @@ console_handler.setFormatter(
     logging.Formatter('%(levelname)s: %(message)s')
 )
 
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues the record as-is (formatting happens on the
+    listener thread) and drops records when the queue is full. Shared by
+    the application logger and the request journal.
+    """
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        return record
+
+
+class _PipeListener(QueueListener):
+    """
+    QueueListener over a multiprocessing.SimpleQueue (a plain pipe, with no
+    feeder thread that could be lost across fork).
+    """
+
+    def dequeue(self, block):
+        return self.queue.get()
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class _ForwardingHandler(logging.Handler):
+    """
+    Formats records and forwards the finished lines to the master's log queue.
+    Runs on a worker's listener thread, so a full pipe never blocks a request.
+    Lines for a shared file other than server.log carry its path and rotation
+    settings (`channel`, `rotation`).
+    """
+
+    def __init__(self, mp_queue, fmt=LOG_FORMAT, channel=None, rotation=None):
+        super().__init__()
+        self.mp_queue = mp_queue
+        self.channel = channel
+        self.rotation = rotation
+        self.setFormatter(logging.Formatter(fmt))
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+            self.mp_queue.put(logging.makeLogRecord({
+                "msg": line, "levelno": record.levelno, "levelname": record.levelname,
+                "channel": self.channel, "rotation": self.rotation,
+            }))
+        except Exception:
+            self.handleError(record)
+
+
+def _line_file_handler(path, max_bytes, backup_count):
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                  encoding="utf-8", delay=True)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    return handler
+
+
+class _FileRouter(logging.Handler):
+    """
+    Master side of multiprocess mode: writes each forwarded line to server.log,
+    or to the shared file it names, which the master opens and rotates.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.files = {}
+
+    def emit(self, record):
+        path = getattr(record, "channel", None)
+        if path is None:
+            file_handler.handle(record)
+            return
+        handler = self.files.get(path)
+        if handler is None:
+            handler = self.files[path] = _line_file_handler(path, *record.rotation)
+        handler.handle(record)
+
+    def close(self):
+        for handler in self.files.values():
+            handler.close()
+        super().close()
+
+
+def _queue_size():
+    try:
+        return max(1, int(os.environ.get("LOG_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)))
+    except (TypeError, ValueError):
+        return DEFAULT_QUEUE_SIZE
+
+
+_lock = threading.Lock()
+_state = {
+    "listener": None,   # this process's QueueListener
+    "sink": file_handler,  # where this process's listener writes server.log lines
+    "mp_queue": None,   # multiprocess mode: queue to the master
+    "server": None,     # multiprocess mode, master only: listener owning server.log
+    "router": None,     # multiprocess mode, master only: the server listener's handler
+}
+
+queue_handler = DroppingQueueHandler(queue.Queue(_queue_size()))
+
+
+def _start_listener():
+    listener = QueueListener(queue_handler.queue, _state["sink"], console_handler, respect_handler_level=True)
+    listener.start()
+    _state["listener"] = listener
+
+
+def flush():
+    """
+    Block until every queued record has been handed to the file/console handlers.
+    """
+    with _lock:
+        listener = _state["listener"]
+        if listener is not None:
+            listener.stop()
+            _start_listener()
+        _state["sink"].flush()
+
+
+def enable_multiprocess_logging():
+    """
+    Make this process (the gunicorn master, before forking) the only writer of
+    server.log. Workers forked afterwards forward their lines to it.
+    """
+    with _lock:
+        if _state["mp_queue"] is not None:
+            return
+        mp_queue = multiprocessing.SimpleQueue()
+        file_handler.setFormatter(logging.Formatter('%(message)s'))
+        router = _FileRouter()
+        server = _PipeListener(mp_queue, router)
+        server.start()
+        if _state["listener"] is not None:
+            _state["listener"].stop()
+        _state.update(mp_queue=mp_queue, server=server, router=router, sink=_ForwardingHandler(mp_queue))
+        _start_listener()
+
+
+def shared_file_handler(path, max_bytes, backup_count):
+    """
+    Handler for a size-rotated file of finished lines (format "%(message)s")
+    that every worker may write to, such as the request journal.
+
+    In multiprocess mode the lines are forwarded to the master, which is the
+    only process that writes and rotates the file; otherwise this process
+    writes it directly. Attach it to a QueueListener, like server.log's sink.
+
+    Args:
+        path (str): File path.
+        max_bytes (int): Rotate after this many bytes.
+        backup_count (int): Rotated files to keep.
+
+    Returns:
+        logging.Handler: The handler to write the file through.
+    """
+    path = os.path.abspath(path)
+    with _lock:
+        mp_queue = _state["mp_queue"]
+    if mp_queue is None:
+        return _line_file_handler(path, max_bytes, backup_count)
+    return _ForwardingHandler(mp_queue, '%(message)s', channel=path, rotation=(max_bytes, backup_count))
+
+
+def _before_fork():
+    # Never fork while a listener thread is half-way through writing: the
+    # child would inherit the stream's internal buffer lock in a held state
+    # (the router first: the master's listener holds it while writing a file)
+    if _state["router"] is not None:
+        _state["router"].acquire()
+    file_handler.acquire()
+    console_handler.acquire()
+
+
+def _after_fork_in_parent():
+    console_handler.release()
+    file_handler.release()
+    if _state["router"] is not None:
+        _state["router"].release()
+
+
+def _after_fork_in_child():
+    # Listener threads do not survive fork: restart this process's listener on
+    # a fresh queue (the master's server listener stays with the master)
+    # (logging itself re-creates the handler locks taken in _before_fork)
+    global _lock
+    _lock = threading.Lock()
+    _state["server"] = _state["router"] = None
+    queue_handler.queue = queue.Queue(_queue_size())
+    _start_listener()
+
+
+def _shutdown():
+    listener = _state["listener"]
+    if listener is not None:
+        listener.stop()
+    if _state["server"] is not None:
+        _state["server"].stop()
+        _state["router"].close()
+    file_handler.close()
+
+
 # Attach handlers only once (prevents duplicate logs if re-imported)
 if not logger.handlers:
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    logger.addHandler(queue_handler)
+    _start_listener()
+    atexit.register(_shutdown)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(before=_before_fork, after_in_parent=_after_fork_in_parent,
+                            after_in_child=_after_fork_in_child)
 
 # Usage (for other modules):
 #   from app.utils.logger import logger
 #   logger.info("Info message")
-#   logger.warning("Warning message")
+#   logger.warning("Failed to read %s: %s", path, error)
 #   logger.error("Error message")
@@ -38,7 +38,7 @@ def log_transcript_to_file(transcript: str, directory: str = "transcripts") -> s
         path = os.path.join(directory, f"transcript_{timestamp}.txt")
         with open(path, "w", encoding="utf-8") as f:
             f.write(transcript)
-        logger.info(f"Transcript logged to {path}")
+        logger.info("Transcript logged to %s", path)
         # Log also as structured event
         log_event({
             "type": "transcript",
@@ -47,7 +47,7 @@ def log_transcript_to_file(transcript: str, directory: str = "transcripts") -> s
         })
         return path
     except Exception as e:
-        logger.error(f"Failed to log transcript: {e}")
+        logger.error("Failed to log transcript: %s", e)
         return ""
 
 def log_event(event: dict, directory: str = "event_logs") -> str:
@@ -72,10 +72,10 @@ def log_event(event: dict, directory: str = "event_logs") -> str:
         }
         with open(path, "a", encoding="utf-8") as f:
             f.write(json.dumps(event_record) + "\n")
-        logger.info(f"Event logged to {path}: {event_record}")
+        logger.info("Event logged to %s: %s", path, event_record)
         return path
     except Exception as e:
-        logger.error(f"Failed to log event: {e}")
+        logger.error("Failed to log event: %s", e)
         return ""
 
 # --- Example wrappers for different types (optional, for convenience) ---
@@ -0,0 +1,243 @@
+"""
+memory.py
+
+Memory accounting for request stages and worker processes of the AI Meeting Summarizer.
+
+Features:
+- Per-stage accounting: every traced stage (see tracing.py; the stages of
+  process_audio and analyze_transcript) records its RSS change and, with
+  tracemalloc enabled, the Python allocations it left behind and its peak
+  traced allocation. Values are added to the stage's span (and so to the
+  `request_stages` event) and observed in /metrics histograms.
+- Nested stages are handled: an inner stage's peak is carried to the stages
+  around it before tracemalloc's peak is reset. Stages running concurrently
+  on other threads share the process-wide counters, so their numbers are
+  approximate.
+- Per-worker report: every MEMORY_REPORT_SEC each worker logs a
+  `worker_memory` event (current and peak RSS, growth since the worker
+  started, traced Python memory) and updates the worker_rss_bytes gauge,
+  which is what worker counts are sized from and what exposes slow leaks.
+
+Configuration (environment variables):
+    MEMORY_ACCOUNTING    "0" disables per-stage accounting (default "1"; costs two
+                         /proc reads per stage)
+    MEMORY_TRACEMALLOC   "1" also tracks Python allocations per stage (default "0";
+                         tracemalloc slows allocation-heavy code noticeably)
+    MEMORY_REPORT_SEC    Seconds between worker memory reports (default 300, 0 = off)
+
+Dependencies: Flask, tracemalloc, app.utils.metrics, app.utils.logging_utils
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from app.utils.logging_utils import log_event
+from app.utils.metrics import Gauge, Histogram
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_REPORT_SEC = 300
+TRACEMALLOC_FRAMES = 1
+MB = 2**20
+BYTE_BUCKETS = tuple(b * MB for b in (1, 4, 16, 64, 128, 256, 512, 1024, 2048))
+
+STAGE_RSS_DELTA = Histogram(
+    "pipeline_stage_rss_delta_bytes", "RSS growth during a traced stage (shrinking counts as 0).",
+    ("stage",), buckets=BYTE_BUCKETS)
+STAGE_ALLOC_PEAK = Histogram(
+    "pipeline_stage_alloc_peak_bytes", "Peak traced Python allocation during a stage (MEMORY_TRACEMALLOC=1).",
+    ("stage",), buckets=BYTE_BUCKETS)
+WORKER_RSS = Gauge("worker_rss_bytes", "Resident set size of each worker process.", ("pid",))
+WORKER_PEAK_RSS = Gauge("worker_peak_rss_bytes", "Peak resident set size of each worker process.", ("pid",))
+
+_active = set()
+_active_lock = threading.Lock()
+_reporter_pid = None
+_baseline_rss = None
+
+
+def _enabled(name, default):
+    return os.environ.get(name, default).lower() not in ("0", "false", "no", "off", "")
+
+
+def accounting_enabled():
+    return _enabled("MEMORY_ACCOUNTING", "1")
+
+
+def tracemalloc_enabled():
+    return _enabled("MEMORY_TRACEMALLOC", "0")
+
+
+def current_rss_bytes():
+    """
+    Current resident set size of this process in bytes, or None if unknown.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_bytes():
+    """
+    Lifetime peak resident set size of this process in bytes, or None if unknown.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class StageProbe:
+    """
+    Memory counters of one running stage; created by stage_start().
+    """
+
+    def __init__(self, rss, traced):
+        self.rss = rss
+        self.traced = traced
+        self.peak = traced or 0
+
+
+def _fold_peak():
+    """
+    Carry the current tracemalloc peak into every running stage (call before a reset).
+    """
+    peak = tracemalloc.get_traced_memory()[1]
+    for probe in _active:
+        probe.peak = max(probe.peak, peak)
+
+
+def stage_start():
+    """
+    Start accounting one stage.
+
+    Returns:
+        StageProbe: Pass to stage_end().
+    """
+    traced = None
+    if tracemalloc_enabled():
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        with _active_lock:
+            _fold_peak()
+            tracemalloc.reset_peak()
+            traced = tracemalloc.get_traced_memory()[0]
+            probe = StageProbe(current_rss_bytes(), traced)
+            _active.add(probe)
+        return probe
+    return StageProbe(current_rss_bytes(), None)
+
+
+def stage_end(name, probe):
+    """
+    Finish accounting a stage and record it in the /metrics histograms.
+
+    Returns:
+        dict: Span attributes: "rss_delta_kb", plus "alloc_kb" (net traced
+        allocation) and "alloc_peak_kb" (peak above the stage's start) with tracemalloc.
+    """
+    record = {}
+    rss = current_rss_bytes()
+    if rss is not None and probe.rss is not None:
+        delta = rss - probe.rss
+        record["rss_delta_kb"] = round(delta / 1024, 1)
+        STAGE_RSS_DELTA.observe(max(delta, 0), stage=name)
+    if probe.traced is None:
+        return record
+    with _active_lock:
+        # Always drop the probe, even if a profile capture stopped tracemalloc meanwhile
+        _active.discard(probe)
+        if not tracemalloc.is_tracing():
+            return record
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(probe.peak, peak)
+        # The stages around this one must still see its peak
+        for other in _active:
+            other.peak = max(other.peak, peak)
+    record["alloc_kb"] = round((current - probe.traced) / 1024, 1)
+    record["alloc_peak_kb"] = round(max(peak - probe.traced, 0) / 1024, 1)
+    STAGE_ALLOC_PEAK.observe(max(peak - probe.traced, 0), stage=name)
+    return record
+
+
+def memory_report():
+    """
+    Memory snapshot of this worker (also updates the worker gauges).
+
+    Returns:
+        dict: {"pid", "rss_mb", "peak_rss_mb", "rss_growth_mb", ["traced_mb", "traced_peak_mb"]}
+    """
+    global _baseline_rss
+    pid = os.getpid()
+    rss = current_rss_bytes()
+    peak = peak_rss_bytes()
+    if _baseline_rss is None:
+        _baseline_rss = rss
+    report = {
+        "pid": pid,
+        "rss_mb": round(rss / MB, 1) if rss is not None else None,
+        "peak_rss_mb": round(peak / MB, 1) if peak is not None else None,
+        "rss_growth_mb": round((rss - _baseline_rss) / MB, 1) if rss is not None and _baseline_rss else None,
+    }
+    if tracemalloc.is_tracing():
+        current, traced_peak = tracemalloc.get_traced_memory()
+        report["traced_mb"] = round(current / MB, 1)
+        report["traced_peak_mb"] = round(traced_peak / MB, 1)
+    if rss is not None:
+        WORKER_RSS.set(rss, pid=pid)
+    if peak is not None:
+        WORKER_PEAK_RSS.set(peak, pid=pid)
+    return report
+
+
+def _report_interval():
+    try:
+        return max(0.0, float(os.environ.get("MEMORY_REPORT_SEC", DEFAULT_REPORT_SEC)))
+    except (TypeError, ValueError):
+        return DEFAULT_REPORT_SEC
+
+
+def start_reporter():
+    """
+    Start this worker's periodic memory report (once per process; safe after fork).
+    """
+    global _reporter_pid, _baseline_rss
+    interval = _report_interval()
+    if interval <= 0 or _reporter_pid == os.getpid():
+        return
+    with _active_lock:
+        if _reporter_pid == os.getpid():
+            return
+        _reporter_pid = os.getpid()
+        _baseline_rss = None
+
+    def loop():
+        while True:
+            report = memory_report()
+            log_event({
+                "type": "worker_memory",
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                **report
+            })
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name="memory-report", daemon=True).start()
+
+
+def init_memory(app):
+    """
+    Start the worker memory report when `app` serves its first request.
+    """
+
+    @app.before_request
+    def _ensure_reporter():
+        start_reporter()
@@ -0,0 +1,418 @@
+"""
+metrics.py
+
+Prometheus-compatible metrics for the AI Meeting Summarizer.
+
+Features:
+- Counter, Gauge and Histogram types with labels, rendered in the
+  Prometheus text exposition format (served by the /metrics route).
+- Updates are an in-memory dict operation under a per-metric lock, so they
+  are cheap enough for the request hot path.
+- Multiprocess mode: with METRICS_DIR set, every worker periodically writes
+  a snapshot of its own values to METRICS_DIR/metrics_<pid>.json, and a
+  scrape of any worker merges all snapshots. Counters and histograms of
+  exited workers are kept (totals never go backwards); gauges only count
+  for live workers. gunicorn clears the directory when the master starts.
+- Flask integration (`init_metrics`): request latency per route, method and
+  status, plus the number of requests in progress.
+- The application's metrics are defined here, so /metrics documents itself:
+  request and pipeline stage latency, quality rejections by rule, bytes
+  ingested, cache hits/misses and CPU executor backlog.
+
+Configuration (environment variables):
+    METRICS_DIR          Shared directory for multiprocess mode (default unset:
+                         each process reports only its own values)
+    METRICS_FLUSH_SEC    Seconds between snapshot writes in multiprocess mode (default 5)
+
+Usage:
+    from app.utils.metrics import CACHE_REQUESTS
+
+    CACHE_REQUESTS.inc(cache="probe", result="hit")
+
+Dependencies: Flask, Python standard library
+"""
+
+import atexit
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from flask import g, request
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_FLUSH_SEC = 5.0
+# Audio stages run for minutes, so the buckets reach well past the usual 10 s
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+def _flush_interval():
+    try:
+        return max(0.1, float(os.environ.get("METRICS_FLUSH_SEC", DEFAULT_FLUSH_SEC)))
+    except (TypeError, ValueError):
+        return DEFAULT_FLUSH_SEC
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """
+    Shared label handling; values are kept per label tuple.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels):
+        try:
+            key = tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError:
+            key = None
+        if key is None or len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return key
+
+    def reset(self):
+        # Fresh lock as well: after fork another thread may have held the old one
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def snapshot(self):
+        """
+        Metadata and values as plain JSON-serializable data.
+        """
+        with self._lock:
+            samples = [[list(key), self._copy(value)] for key, value in self._values.items()]
+        return {"type": self.type, "help": self.documentation,
+                "labelnames": list(self.labelnames), "samples": samples}
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count (e.g. requests, bytes).
+    """
+
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down (e.g. queue depth, requests in progress).
+    """
+
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (e.g. latencies) in fixed buckets.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last slot is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def snapshot(self):
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+    @staticmethod
+    def _copy(value):
+        return [list(value[0]), value[1], value[2]]
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+class Registry:
+    """
+    The set of metrics of one process, with multiprocess snapshot/merge support.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def reset(self):
+        """
+        Zero every metric (used in forked workers, which must not report
+        the master's values as their own).
+        """
+        for metric in list(self._metrics.values()):
+            metric.reset()
+        self._flusher = None
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+
+    def flush(self, directory=None, pid=None):
+        """
+        Write this process's snapshot to `directory` (atomically replaced).
+        """
+        directory = directory or os.environ.get("METRICS_DIR")
+        if not directory:
+            return None
+        pid = pid or os.getpid()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"metrics_{pid}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"pid": pid, "metrics": self.snapshot()}, f, separators=(",", ":"))
+        os.replace(tmp, path)
+        return path
+
+    def start_flusher(self):
+        """
+        Start the background snapshot writer of this process (multiprocess mode only).
+        """
+        if self._flusher is not None or not os.environ.get("METRICS_DIR"):
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            interval = _flush_interval()
+
+            def loop():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.flush()
+                    except OSError:
+                        pass
+
+            self._flusher = threading.Thread(target=loop, name="metrics-flush", daemon=True)
+            self._flusher.start()
+
+    def collect(self, directory=None):
+        """
+        Values of all processes, merged: counters and histograms are summed,
+        gauges are summed over live processes.
+
+        Returns:
+            dict: {name: {"type", "help", "labelnames", ["buckets"], "samples": {labels: value}}}
+        """
+        directory = directory if directory is not None else os.environ.get("METRICS_DIR")
+        if directory:
+            self.flush(directory)
+            snapshots = []
+            for name in sorted(os.listdir(directory)):
+                if not (name.startswith("metrics_") and name.endswith(".json")):
+                    continue
+                try:
+                    with open(os.path.join(directory, name), encoding="utf-8") as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue  # Being replaced or half-written: skip this scrape
+        else:
+            snapshots = [{"pid": os.getpid(), "metrics": self.snapshot()}]
+
+        merged = {}
+        for snapshot in snapshots:
+            alive = snapshot["pid"] == os.getpid() or _pid_alive(snapshot["pid"])
+            for name, data in snapshot["metrics"].items():
+                if data["type"] == "gauge" and not alive:
+                    continue
+                target = merged.setdefault(name, {**data, "samples": {}})
+                for labels, value in data["samples"]:
+                    key = tuple(labels)
+                    current = target["samples"].get(key)
+                    if data["type"] != "histogram":
+                        target["samples"][key] = (current or 0) + value
+                    elif current is None:
+                        target["samples"][key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                        current[2] += value[2]
+        return merged
+
+    def render(self, directory=None):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, data in sorted(self.collect(directory).items()):
+            lines.append(f"# HELP {name} {_escape(data['help'])}")
+            lines.append(f"# TYPE {name} {data['type']}")
+            labelnames = data["labelnames"]
+            for key, value in sorted(data["samples"].items()):
+                if data["type"] != "histogram":
+                    lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(list(data["buckets"]) + [math.inf], counts):
+                    cumulative += bucket_count
+                    le = ("le", _format_value(bound))
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labelnames, key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labelnames, key)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def clear_metrics_dir(directory=None):
+    """
+    Remove all snapshots (call once when the server starts, before workers fork).
+    """
+    directory = directory or os.environ.get("METRICS_DIR")
+    if not directory or not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.startswith("metrics_"):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+REGISTRY = Registry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=REGISTRY.reset)
+
+
+@atexit.register
+def _final_flush():
+    try:
+        REGISTRY.flush()
+    except OSError:
+        pass
+
+
+# --- Application metrics ---
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route, method and status.",
+    ("route", "method", "status"))
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests currently being handled.")
+STAGE_LATENCY = Histogram(
+    "pipeline_stage_duration_seconds", "Duration of traced request stages (see tracing.py).",
+    ("stage",))
+QUALITY_CHECKS = Counter(
+    "audio_quality_checks_total", "Audio quality gate runs by result.", ("result",))
+QUALITY_REJECTIONS = Counter(
+    "audio_quality_rejections_total", "Uploads rejected by the quality gate, by failing rule.",
+    ("reason",))
+BYTES_INGESTED = Counter(
+    "audio_bytes_ingested_total", "Bytes of accepted-size audio uploads.")
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss).",
+    ("cache", "result"))
+OFFLOAD_PENDING = Gauge(
+    "offload_jobs_pending", "CPU executor jobs queued or running.", ("executor",))
+
+
+def init_metrics(app):
+    """
+    Register request hooks that record latency and in-progress requests for `app`.
+    """
+
+    @app.before_request
+    def _start_timer():
+        REGISTRY.start_flusher()
+        g._metrics_start = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+
+    @app.after_request
+    def _record_latency(response):
+        start = g.get("_metrics_start")
+        if start is not None:
+            rule = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            REQUEST_LATENCY.observe(time.perf_counter() - start, route=rule,
+                                    method=request.method, status=response.status_code)
+        return response
+
+    @app.teardown_request
+    def _finish_request(exc=None):
+        if g.pop("_metrics_start", None) is not None:
+            REQUESTS_IN_PROGRESS.dec()
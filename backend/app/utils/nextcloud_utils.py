@@ -7,25 +7,51 @@ Created by Eric Morse
 Date: 2024-05-18
 
 Features:
-- Loads Nextcloud credentials from a local secret file.
+- Loads Nextcloud credentials from a local secret file (cached, reloaded when the file changes).
+- Long-lived CalDAV client: one DAVClient (and HTTP session/connection pool) per process,
+  with the principal and calendar handles cached for a TTL.
 - Creates calendar events in the user's Nextcloud calendar via CalDAV.
 - Designed for secure, programmatic event management.
 
 Dependencies:
     - caldav
-    - Python standard library (os, json, datetime)
+    - Python standard library (os, json, datetime, threading, time)
+    - app.utils.metrics (cache hit/miss counters)
     - Secret file: ~/.app_secrets/env.json
 """
 
 import os
 import json
+import threading
+import time
 from caldav import DAVClient
 from datetime import datetime
+from app.utils.logger import logger
+from app.utils.tracing import span
+from app.utils.metrics import CACHE_REQUESTS
 
-def load_nextcloud_secrets():
+SECRETS_PATH = "~/.app_secrets/env.json"
+
+# How long discovered principal/calendar handles are reused before re-discovery
+DISCOVERY_TTL_SEC = 300
+
+# Per-request HTTP timeout for CalDAV calls
+CALDAV_TIMEOUT_SEC = 30
+
+_secrets_cache = {}
+_secrets_lock = threading.Lock()
+
+
+def load_nextcloud_secrets(secrets_path=SECRETS_PATH):
     """
     Load Nextcloud CalDAV credentials from ~/.app_secrets/env.json.
 
+    The parsed file is cached and only re-read when its modification time
+    or size changes, so repeated calls cost a single stat().
+
+    Args:
+        secrets_path (str, optional): Path to the secrets file.
+
     Returns:
         tuple: (url, username, password)
 
@@ -33,39 +59,174 @@ def load_nextcloud_secrets():
         FileNotFoundError: If the secrets file does not exist.
         KeyError: If any of the required fields are missing in the secrets file.
     """
-    secrets_path = os.path.expanduser("~/.app_secrets/env.json")
-    with open(secrets_path, "r") as f:
+    path = os.path.expanduser(secrets_path)
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size)
+    with _secrets_lock:
+        cached = _secrets_cache.get(path)
+        if cached and cached[0] == signature:
+            CACHE_REQUESTS.inc(cache="nextcloud_secrets", result="hit")
+            return cached[1]
+    CACHE_REQUESTS.inc(cache="nextcloud_secrets", result="miss")
+    with open(path, "r") as f:
         secrets = json.load(f)
-    return (
+    credentials = (
         secrets["NEXTCLOUD_URL"],
         secrets["NEXTCLOUD_USERNAME"],
         secrets["NEXTCLOUD_PASSWORD"]
     )
+    with _secrets_lock:
+        _secrets_cache[path] = (signature, credentials)
+    return credentials
+
 
-def create_calendar_event(title, description, start_time, end_time):
+class NextcloudCalendarClient:
     """
-    Create an event in the user's Nextcloud calendar.
+    Process-wide CalDAV client that reuses connections and discovery results.
+
+    - The DAVClient (and with it the HTTP session and its keep-alive
+      connection pool) is built once and rebuilt only when the credentials
+      or the client factory change.
+    - principal() and calendars() are discovered once and cached for
+      `ttl` seconds; a failed write invalidates the cache.
+
+    Args:
+        client_factory (callable, optional): Builds the DAV client; defaults to
+            caldav.DAVClient. Tests pass a local CalDAV stand-in here.
+        secrets_loader (callable, optional): Returns (url, username, password);
+            defaults to load_nextcloud_secrets.
+        ttl (float): Discovery cache lifetime in seconds.
+        clock (callable): Monotonic time source (injectable for tests).
+    """
+
+    def __init__(self, client_factory=None, secrets_loader=None, ttl=DISCOVERY_TTL_SEC, clock=time.monotonic):
+        self._client_factory = client_factory
+        self._secrets_loader = secrets_loader
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._client = None
+        self._client_key = None
+        self._calendars = None
+        self._discovered_at = None
+        self.stats = {"clients_built": 0, "discoveries": 0, "cache_hits": 0}
+
+    def _get_client(self):
+        # Resolve module globals at call time so patched factories/loaders are honoured
+        factory = self._client_factory or DAVClient
+        loader = self._secrets_loader or load_nextcloud_secrets
+        url, username, password = loader()
+        key = (factory, url, username, password)
+        if self._client is None or key != self._client_key:
+            if self._client is not None:
+                logger.info("Nextcloud credentials changed; rebuilding CalDAV client")
+            self._client = factory(url=url, username=username, password=password, timeout=CALDAV_TIMEOUT_SEC)
+            self._client_key = key
+            self._calendars = None
+            self.stats["clients_built"] += 1
+        return self._client
+
+    def calendars(self):
+        """
+        Return the user's calendars, rediscovering only after the TTL expires.
+
+        Returns:
+            list: Calendar handles.
+        """
+        with self._lock:
+            client = self._get_client()
+            now = self._clock()
+            if self._calendars is not None and now - self._discovered_at < self.ttl:
+                self.stats["cache_hits"] += 1
+                CACHE_REQUESTS.inc(cache="calendar_discovery", result="hit")
+                return self._calendars
+            CACHE_REQUESTS.inc(cache="calendar_discovery", result="miss")
+            with span("calendar.discover"):
+                calendars = list(client.principal().calendars())
+            self.stats["discoveries"] += 1
+            # Never cache an empty result, the user may create a calendar any moment
+            if calendars:
+                self._calendars = calendars
+                self._discovered_at = now
+            return calendars
+
+    def default_calendar(self):
+        """
+        Return the first available calendar.
+
+        Raises:
+            Exception: If the user has no calendars.
+        """
+        calendars = self.calendars()
+        if not calendars:
+            raise Exception("No calendars found for this user.")
+        return calendars[0]
+
+    def add_event(self, ical):
+        """
+        Write a VCALENDAR payload to the default calendar.
+
+        Args:
+            ical (str): iCalendar text.
+
+        Returns:
+            Any: The created event object from the CalDAV library.
+        """
+        calendar = self.default_calendar()
+        try:
+            with span("calendar.add_event"):
+                return calendar.add_event(ical)
+        except Exception:
+            # Stale handle or broken connection: force re-discovery next time
+            self.invalidate()
+            raise
+
+    def invalidate(self):
+        """
+        Drop cached discovery results (the client/session is kept).
+        """
+        with self._lock:
+            self._calendars = None
+            self._discovered_at = None
+
+    def reset(self):
+        """
+        Drop the client, its session and all cached discovery results.
+        """
+        with self._lock:
+            self._client = None
+            self._client_key = None
+            self._calendars = None
+            self._discovered_at = None
+
+
+_calendar_client = NextcloudCalendarClient()
+
+
+def get_calendar_client():
+    """
+    Return the shared, process-wide NextcloudCalendarClient.
+    """
+    return _calendar_client
+
+
+def build_event_ical(title, description, start_time, end_time, uid=None):
+    """
+    Build the iCalendar text for a single event.
 
     Args:
         title (str): Event title.
         description (str): Event description/notes.
         start_time (datetime|str): Event start (UTC datetime or ISO 8601 string).
         end_time (datetime|str): Event end (UTC datetime or ISO 8601 string).
+        uid (str, optional): Event UID; generated if omitted.
 
     Returns:
-        str: Event UID (unique identifier).
+        tuple: (uid, ical_text, dtstart_str, dtend_str)
 
     Raises:
-        Exception: If calendar is not found or event creation fails.
+        ValueError: If a time string is not valid ISO 8601.
     """
-    url, username, password = load_nextcloud_secrets()
-    client = DAVClient(url=url, username=username, password=password)
-    principal = client.principal()
-    calendars = principal.calendars()
-    if not calendars:
-        raise Exception("No calendars found for this user.")
-    calendar = calendars[0]  # Default to first available calendar
-
     # Ensure start_time and end_time are datetime objects
     if isinstance(start_time, str):
         start_time = datetime.fromisoformat(start_time)
@@ -74,7 +235,7 @@ def create_calendar_event(title, description, start_time, end_time):
 
     dtstart_str = start_time.strftime('%Y%m%dT%H%M%SZ')
     dtend_str = end_time.strftime('%Y%m%dT%H%M%SZ')
-    uid = f"{datetime.now().timestamp()}@meeting-summarizer"
+    uid = uid or f"{datetime.now().timestamp()}@meeting-summarizer"
 
     event_template = f"""BEGIN:VCALENDAR
 VERSION:2.0
@@ -86,11 +247,40 @@ SUMMARY:{title}
 DESCRIPTION:{description}
 END:VEVENT
 END:VCALENDAR"""
+    return uid, event_template, dtstart_str, dtend_str
+
+
+def create_calendar_event(title, description, start_time, end_time, uid=None):
+    """
+    Create an event in the user's Nextcloud calendar.
+
+    Uses the shared CalDAV client, so credentials, the HTTP session and the
+    calendar handle are reused across events instead of rediscovered.
+
+    Args:
+        title (str): Event title.
+        description (str): Event description/notes.
+        start_time (datetime|str): Event start (UTC datetime or ISO 8601 string).
+        end_time (datetime|str): Event end (UTC datetime or ISO 8601 string).
+        uid (str, optional): Event UID. Passing the same UID again overwrites
+            the same calendar object, which makes retries idempotent.
+
+    Returns:
+        str: Event UID (unique identifier).
+
+    Raises:
+        ValueError: If start/end times are not valid ISO 8601.
+        Exception: If calendar is not found or event creation fails.
+    """
+    uid, event_template, dtstart_str, dtend_str = build_event_ical(title, description, start_time, end_time, uid=uid)
+    client = get_calendar_client()
+    calendar = client.default_calendar()
 
     try:
         calendar.add_event(event_template)
-        print(f"Event created: {title}, UID: {uid}, {dtstart_str}–{dtend_str}")
+        logger.info("Event created: %s, UID: %s, %s–%s", title, uid, dtstart_str, dtend_str)
         return uid
     except Exception as e:
-        print(f"Failed to create event: {e}")
+        logger.error("Failed to create event: %s", e)
+        client.invalidate()
         raise
@@ -0,0 +1,347 @@
+"""
+profiling.py
+
+On-demand profiling of single requests for the AI Meeting Summarizer.
+
+Features:
+- Opt-in capture of one request with cProfile and tracemalloc, triggered by
+  an admin header (`X-Profile: 1` plus a valid `X-Admin-Token`) or by a
+  sampling rate, on the configured paths only.
+- Work the request hands to the CPU offload executor or the pipeline thread
+  pools is profiled too (each worker thread gets its own profiler, merged
+  into the capture), since cProfile only sees the thread that enabled it.
+- Each capture is stored under the profiles directory as a pstats file
+  (`<id>.prof`, loadable with pstats or snakeviz) plus a JSON summary with
+  the top functions by cumulative time and the top allocation sites.
+- One capture runs at a time per process (tracemalloc is process-wide);
+  requests arriving meanwhile are simply not profiled. Only the newest
+  captures are kept.
+- Captured responses carry an `X-Profile-Id` header; streamed response
+  bodies are generated after the capture ends and are not included.
+
+Configuration (environment variables):
+    PROFILE_ADMIN_TOKEN    Token for the X-Profile header trigger and the
+                           /admin/profiles endpoints (unset: both disabled)
+    PROFILE_SAMPLE_RATE    Fraction of requests profiled automatically (default 0)
+    PROFILE_PATHS          Comma-separated paths that can be profiled
+                           (default "/process-audio,/process-json")
+    PROFILE_DIR            Where captures are stored (default "profiles")
+    PROFILE_MAX_CAPTURES   Captures kept before the oldest are deleted (default 50)
+    PROFILE_TOP_N          Functions / allocation sites in each summary (default 25)
+
+Dependencies: Flask, cProfile, pstats, tracemalloc, app.utils.logging_utils
+"""
+
+import cProfile
+import functools
+import hmac
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from flask import g, request
+from app.utils.logging_utils import log_event
+from app.utils.logger import logger
+
+DEFAULT_PATHS = "/process-audio,/process-json"
+DEFAULT_MAX_CAPTURES = 50
+DEFAULT_TOP_N = 25
+TRACEMALLOC_FRAMES = 1
+_ID_RE = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+_active_capture = ContextVar("profile_capture", default=None)
+# tracemalloc is process-wide, so only one capture may run at a time
+_capture_lock = threading.Lock()
+
+
+def _int(name, default):
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def profile_dir():
+    return os.environ.get("PROFILE_DIR", "profiles")
+
+
+def admin_token():
+    """
+    The configured admin token, or None if profiling administration is disabled.
+    """
+    return os.environ.get("PROFILE_ADMIN_TOKEN") or None
+
+
+def is_admin(headers):
+    """
+    True if the request headers carry the admin token.
+    """
+    token = admin_token()
+    supplied = headers.get("X-Admin-Token", "")
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def _sample_rate():
+    try:
+        return min(1.0, max(0.0, float(os.environ.get("PROFILE_SAMPLE_RATE", 0))))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def should_profile(path, headers, rand=random.random):
+    """
+    Decide whether this request is captured.
+
+    Returns:
+        str | None: "header" or "sample" (the trigger), or None.
+    """
+    paths = {p.strip() for p in os.environ.get("PROFILE_PATHS", DEFAULT_PATHS).split(",") if p.strip()}
+    if path not in paths:
+        return None
+    if headers.get("X-Profile") == "1" and is_admin(headers):
+        return "header"
+    rate = _sample_rate()
+    if rate > 0 and rand() < rate:
+        return "sample"
+    return None
+
+
+class ProfileCapture:
+    """
+    cProfile + tracemalloc capture of one request.
+    """
+
+    def __init__(self, method, path, trigger):
+        self.id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.profiler = cProfile.Profile()
+        self._thread_profiles = []
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+        self._baseline = None
+        self._token = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._baseline = tracemalloc.take_snapshot()
+        self._token = _active_capture.set(self)
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def run_profiled(self, fn, *args, **kwargs):
+        """
+        Run fn on the current (worker) thread under its own profiler.
+        """
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._thread_profiles.append(profiler)
+
+    def stop(self):
+        """
+        Stop profiling and return the raw results.
+
+        Returns:
+            tuple: (pstats.Stats, tracemalloc snapshot or None, peak bytes, duration sec)
+        """
+        self.profiler.disable()
+        duration = time.perf_counter() - self.started
+        try:
+            _active_capture.reset(self._token)
+        except ValueError:
+            _active_capture.set(None)
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        stats = pstats.Stats(self.profiler)
+        with self._lock:
+            for profiler in self._thread_profiles:
+                stats.add(profiler)
+        return stats, snapshot, peak, duration
+
+    def top_allocations(self, snapshot, top_n):
+        if snapshot is None:
+            return []
+        diffs = [d for d in snapshot.compare_to(self._baseline, "lineno") if d.size_diff > 0]
+        rows = []
+        for diff in diffs[:top_n]:
+            frame = diff.traceback[0]
+            rows.append({
+                "file": frame.filename,
+                "line": frame.lineno,
+                "size_kb": round(diff.size_diff / 1024, 1),
+                "count": diff.count_diff,
+            })
+        return rows
+
+
+def top_functions(stats, top_n):
+    """
+    The top_n functions by cumulative time from a pstats.Stats.
+    """
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "tottime_ms": round(total * 1000, 2),
+            "cumtime_ms": round(cumulative * 1000, 2),
+        })
+    rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+    return rows[:top_n]
+
+
+def profile_thread(fn):
+    """
+    Wrap fn so that, if the calling context is being captured, it is also
+    profiled on the worker thread it is submitted to. Outside a capture fn is
+    returned unchanged.
+    """
+    capture = _active_capture.get()
+    if capture is None:
+        return fn
+    return functools.partial(capture.run_profiled, fn)
+
+
+def _prune(directory, keep):
+    summaries = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+    for name in summaries[:-keep] if len(summaries) > keep else []:
+        capture_id = name[:-len(".json")]
+        for suffix in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(directory, capture_id + suffix))
+            except OSError:
+                pass
+
+
+def save_capture(capture, status, directory=None):
+    """
+    Stop `capture` and write its pstats file and JSON summary.
+
+    Returns:
+        dict: The summary (also written to <id>.json).
+    """
+    stats, snapshot, peak, duration = capture.stop()
+    directory = directory or profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    top_n = _int("PROFILE_TOP_N", DEFAULT_TOP_N)
+    stats.dump_stats(os.path.join(directory, f"{capture.id}.prof"))
+    summary = {
+        "id": capture.id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "method": capture.method,
+        "path": capture.path,
+        "status": status,
+        "trigger": capture.trigger,
+        "duration_ms": round(duration * 1000, 2),
+        "total_calls": stats.total_calls,
+        "peak_traced_kb": round(peak / 1024, 1),
+        "top_functions": top_functions(stats, top_n),
+        "top_allocations": capture.top_allocations(snapshot, top_n),
+    }
+    tmp = os.path.join(directory, f"{capture.id}.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp, os.path.join(directory, f"{capture.id}.json"))
+    _prune(directory, _int("PROFILE_MAX_CAPTURES", DEFAULT_MAX_CAPTURES))
+    return summary
+
+
+def list_captures(directory=None):
+    """
+    Summaries of the stored captures, newest first (without the top lists).
+    """
+    directory = directory or profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    captures = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        captures.append({k: v for k, v in summary.items() if not k.startswith("top_")})
+    return captures
+
+
+def capture_path(capture_id, suffix, directory=None):
+    """
+    Path of a stored capture file, or None if the id is invalid or unknown.
+    """
+    if not _ID_RE.match(capture_id or ""):
+        return None
+    path = os.path.abspath(os.path.join(directory or profile_dir(), f"{capture_id}{suffix}"))
+    return path if os.path.isfile(path) else None
+
+
+def init_profiling(app):
+    """
+    Register request hooks that capture opted-in requests of `app`.
+    """
+
+    @app.before_request
+    def _maybe_start_capture():
+        trigger = should_profile(request.path, request.headers)
+        if trigger is None or not _capture_lock.acquire(blocking=False):
+            return
+        capture = ProfileCapture(request.method, request.path, trigger)
+        try:
+            capture.start()
+        except Exception:
+            _capture_lock.release()
+            raise
+        g._profile_capture = capture
+
+    @app.after_request
+    def _finish_capture(response):
+        capture = g.pop("_profile_capture", None)
+        if capture is None:
+            return response
+        try:
+            summary = save_capture(capture, response.status_code)
+            response.headers["X-Profile-Id"] = capture.id
+            log_event({
+                "type": "profile_captured",
+                "timestamp": summary["timestamp"],
+                "id": capture.id,
+                "path": capture.path,
+                "status": response.status_code,
+                "trigger": capture.trigger,
+                "duration_ms": summary["duration_ms"],
+                "peak_traced_kb": summary["peak_traced_kb"],
+            })
+        except Exception as e:
+            logger.warning("Failed to save profile %s: %s", capture.id, e)
+        finally:
+            _capture_lock.release()
+        return response
+
+    @app.teardown_request
+    def _abort_capture(exc=None):
+        # Only reached with a capture if after_request never ran
+        capture = g.pop("_profile_capture", None)
+        if capture is not None:
+            try:
+                capture.stop()
+            finally:
+                _capture_lock.release()
@@ -0,0 +1,210 @@
+"""
+request_journal.py
+
+Bounded, sampled request journal for the AI Meeting Summarizer API.
+
+Features:
+- One JSON line per journaled request (timestamp, endpoint, payload digest,
+  optional error) in a size-rotated file (`logs/request_journal.jsonl`).
+- Payload fields are truncated (default), replaced by a SHA-256 digest, or
+  omitted, so transcripts are never copied into the journal in full.
+- Successful requests can be sampled; errors are always journaled.
+- Writes happen on a background listener thread fed by a bounded queue;
+  when the queue is full, entries are dropped (and counted) instead of
+  blocking the request.
+- Safe under multiple gunicorn workers: in multiprocess logging mode the
+  lines are forwarded to the master, the only process that writes and
+  rotates the journal (see app.utils.logger).
+
+Configuration (environment variables):
+    REQUEST_JOURNAL_PATH          Journal file (default: app/logs/request_journal.jsonl)
+    REQUEST_JOURNAL_MAX_BYTES     Rotate after this many bytes (default 10MB)
+    REQUEST_JOURNAL_BACKUPS       Rotated files to keep (default 3)
+    REQUEST_JOURNAL_SAMPLE_RATE   Fraction of successful requests journaled (default 1.0)
+    REQUEST_JOURNAL_PAYLOAD       "truncate" | "hash" | "omit" (default "truncate")
+    REQUEST_JOURNAL_MAX_CHARS     Max characters kept per string field (default 200)
+
+Usage:
+    from app.utils.request_journal import get_request_journal
+    get_request_journal().record("/process-json", data)
+
+Dependencies: Python standard library (logging, queue, hashlib, json), app.utils.logger
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from datetime import datetime
+from logging.handlers import QueueListener
+from app.utils.logger import DroppingQueueHandler, shared_file_handler
+
+DEFAULT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'logs', 'request_journal.jsonl'))
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+DEFAULT_MAX_CHARS = 200
+MAX_ERROR_CHARS = 1000
+QUEUE_SIZE = 1000
+PAYLOAD_MODES = ("truncate", "hash", "omit")
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8", "replace")).hexdigest()
+
+
+def summarize_payload(value, mode="truncate", max_chars=DEFAULT_MAX_CHARS, _depth=0):
+    """
+    Reduce a request payload to a bounded, journal-safe form.
+
+    Strings longer than `max_chars` are truncated (with their full length and
+    digest) or, in "hash" mode, every string is replaced by its length and
+    digest. Nested containers are summarized recursively; long lists keep
+    their first few items and a count.
+
+    Args:
+        value: Parsed JSON payload (or raw bytes/str for unparseable bodies).
+        mode (str): "truncate", "hash" or "omit".
+        max_chars (int): Maximum characters kept per string.
+
+    Returns:
+        JSON-serializable summary of the payload.
+    """
+    if mode == "omit":
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "replace")
+    if isinstance(value, str):
+        if mode == "hash":
+            return {"chars": len(value), "sha256": _digest(value)}
+        if len(value) > max_chars:
+            return {"chars": len(value), "sha256": _digest(value), "head": value[:max_chars]}
+        return value
+    if _depth >= 4:
+        return {"type": type(value).__name__}
+    if isinstance(value, dict):
+        return {str(k): summarize_payload(v, mode, max_chars, _depth + 1) for k, v in list(value.items())[:50]}
+    if isinstance(value, (list, tuple)):
+        items = [summarize_payload(v, mode, max_chars, _depth + 1) for v in value[:10]]
+        if len(value) > 10:
+            items.append({"more_items": len(value) - 10})
+        return items
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return summarize_payload(repr(value), mode, max_chars, _depth)
+
+
+class RequestJournal:
+    """
+    Size-rotated JSONL journal of API requests, written off the request thread.
+
+    Args:
+        path (str): Journal file path.
+        max_bytes (int): Rotate after this size.
+        backup_count (int): Rotated files to keep.
+        sample_rate (float): Fraction of successful requests journaled (errors always are).
+        payload_mode (str): "truncate", "hash" or "omit".
+        max_chars (int): Maximum characters kept per string field.
+        rng (callable): Returns a float in [0, 1) (injectable for tests).
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUPS,
+                 sample_rate=1.0, payload_mode="truncate", max_chars=DEFAULT_MAX_CHARS, rng=random.random):
+        if payload_mode not in PAYLOAD_MODES:
+            raise ValueError(f"payload_mode must be one of {PAYLOAD_MODES}")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.payload_mode = payload_mode
+        self.max_chars = max_chars
+        self._rng = rng
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Under gunicorn the master writes (and rotates) the file for every worker
+        file_handler = shared_file_handler(path, max_bytes, backup_count)
+        self._queue = queue.Queue(QUEUE_SIZE)
+        self._handler = DroppingQueueHandler(self._queue)
+        self._listener = QueueListener(self._queue, file_handler)
+        self._file_handler = file_handler
+        # Private, non-propagating logger so journal lines never reach server.log
+        self._logger = logging.Logger(f"request_journal:{path}")
+        self._logger.addHandler(self._handler)
+        self._listener.start()
+
+    @property
+    def dropped(self):
+        """
+        Entries dropped because the write queue was full.
+        """
+        return self._handler.dropped
+
+    def record(self, endpoint, payload, error=None):
+        """
+        Journal one request; cheap and non-blocking on the calling thread.
+
+        Args:
+            endpoint (str): Route or label of the request.
+            payload: Parsed request body (or raw bytes for unparseable bodies).
+            error (str, optional): Error message, if the request failed.
+
+        Returns:
+            bool: True if the entry was queued (not sampled out).
+        """
+        if error is None and self.sample_rate < 1.0 and self._rng() >= self.sample_rate:
+            return False
+        entry = {
+            "logged_at": datetime.now().isoformat(),
+            "endpoint": endpoint,
+            "payload": summarize_payload(payload, self.payload_mode, self.max_chars),
+        }
+        if error is not None:
+            entry["error"] = str(error)[:MAX_ERROR_CHARS]
+        self._logger.info(json.dumps(entry, default=str, ensure_ascii=False))
+        return True
+
+    def flush(self):
+        """
+        Block until every queued entry has been written (for tests and shutdown).
+        """
+        self._listener.stop()
+        self._file_handler.flush()
+        self._listener.start()
+
+    def close(self):
+        """
+        Write pending entries and stop the background listener.
+        """
+        self._listener.stop()
+        self._file_handler.close()
+
+
+_journal = None
+_journal_lock = threading.Lock()
+
+
+def _env_number(name, default, cast):
+    try:
+        return cast(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_request_journal():
+    """
+    Return the process-wide request journal, configured from the environment.
+    """
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            mode = os.environ.get("REQUEST_JOURNAL_PAYLOAD", "truncate")
+            _journal = RequestJournal(
+                path=os.environ.get("REQUEST_JOURNAL_PATH", DEFAULT_PATH),
+                max_bytes=_env_number("REQUEST_JOURNAL_MAX_BYTES", DEFAULT_MAX_BYTES, int),
+                backup_count=_env_number("REQUEST_JOURNAL_BACKUPS", DEFAULT_BACKUPS, int),
+                sample_rate=_env_number("REQUEST_JOURNAL_SAMPLE_RATE", 1.0, float),
+                payload_mode=mode if mode in PAYLOAD_MODES else "truncate",
+                max_chars=_env_number("REQUEST_JOURNAL_MAX_CHARS", DEFAULT_MAX_CHARS, int),
+            )
+            atexit.register(_journal.close)
+        return _journal
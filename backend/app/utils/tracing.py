@@ -0,0 +1,307 @@
+"""
+tracing.py
+
+Lightweight per-request stage timing for the AI Meeting Summarizer.
+
+Features:
+- `span(name)` context manager and `traced(name)` decorator that time a
+  stage of the current request; outside a request they cost one context
+  variable lookup.
+- Spans recorded on worker threads are attributed to the request when the
+  work is submitted with `bind_context` (the offload executor and the
+  audio/calendar thread pools do this).
+- Flask integration (`init_tracing`): every response gets a `Server-Timing`
+  header with per-stage durations, and requests that recorded stages emit
+  one `request_stages` event through log_event.
+- `request_stages` events are written on a background thread fed by a
+  bounded queue (dropped and counted when full), so the response hook never
+  waits on the event log; successful requests can be sampled.
+- Every span is also observed in the pipeline_stage_duration_seconds
+  histogram on /metrics, and carries the stage's memory use (see memory.py).
+
+Configuration (environment variables):
+    REQUEST_TRACING        "0" disables tracing entirely (default "1")
+    SERVER_TIMING_HEADER   "0" keeps timings out of responses (still logged)
+    REQUEST_STAGES_SAMPLE_RATE  Fraction of requests below status 500 whose
+                           request_stages event is logged (default 1.0)
+
+Usage:
+    from app.utils.tracing import span, traced
+
+    with span("audio.convert"):
+        convert_to_wav(src, dst)
+
+    @traced("nlp.actions")
+    def extract_actions_nltk(...): ...
+
+Dependencies: Flask, contextvars, queue, app.utils.logger, app.utils.logging_utils, app.utils.metrics,
+app.utils.profiling, app.utils.memory
+"""
+
+import atexit
+import functools
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from datetime import datetime, timezone
+from flask import g, request
+from app.utils.logger import logger
+from app.utils.logging_utils import log_event
+from app.utils.metrics import STAGE_LATENCY
+from app.utils.profiling import profile_thread
+from app.utils import memory
+
+_current_trace = ContextVar("request_trace", default=None)
+
+STAGE_QUEUE_SIZE = 1000
+
+
+def _enabled(name):
+    return os.environ.get(name, "1").lower() not in ("0", "false", "no", "off")
+
+
+def _sample_rate():
+    try:
+        return min(max(float(os.environ.get("REQUEST_STAGES_SAMPLE_RATE", 1.0)), 0.0), 1.0)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class StageEventWriter:
+    """
+    Writes request_stages events through log_event on a background thread.
+
+    Args:
+        size (int): Queue capacity; events submitted while it is full are dropped.
+    """
+
+    def __init__(self, size=STAGE_QUEUE_SIZE):
+        self._queue = queue.Queue(size)
+        self._dropped = 0
+        self._thread = threading.Thread(target=self._run, name="request-stages", daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self):
+        """
+        Events dropped because the queue was full.
+        """
+        return self._dropped
+
+    def submit(self, event):
+        """
+        Queue one event without blocking.
+
+        Returns:
+            bool: True if queued, False if dropped.
+        """
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self._dropped += 1
+            if self._dropped == 1 or self._dropped % 1000 == 0:
+                logger.warning("request_stages queue full, %d events dropped", self._dropped)
+            return False
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            try:
+                log_event(event)
+            except Exception as e:
+                logger.error("Failed to write request_stages event: %s", e)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """
+        Block until every queued event has been written (for tests and shutdown).
+        """
+        self._queue.join()
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def get_stage_writer():
+    """
+    Return this process's request_stages writer (recreated after fork).
+    """
+    global _writer, _writer_pid
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            _writer = StageEventWriter()
+            _writer_pid = os.getpid()
+            atexit.register(_writer.flush)
+        return _writer
+
+
+class Trace:
+    """
+    Spans recorded during one request (thread-safe).
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.started = clock()
+        self.spans = []
+
+    def add(self, name, start, duration, attrs=None):
+        record = {
+            "name": name,
+            "start_ms": round((start - self.started) * 1000, 2),
+            "dur_ms": round(duration * 1000, 2),
+        }
+        if attrs:
+            record.update(attrs)
+        with self._lock:
+            self.spans.append(record)
+
+    def elapsed_ms(self):
+        return round((self._clock() - self.started) * 1000, 2)
+
+    def summary(self):
+        """
+        Total duration and count per stage name, in first-seen order.
+
+        Returns:
+            dict: {name: {"dur_ms": float, "count": int}}, plus the summed
+            "rss_delta_kb" / "alloc_kb" and the largest "alloc_peak_kb" of
+            stages with memory accounting.
+        """
+        totals = {}
+        with self._lock:
+            spans = list(self.spans)
+        for record in spans:
+            entry = totals.setdefault(record["name"], {"dur_ms": 0.0, "count": 0})
+            entry["dur_ms"] = round(entry["dur_ms"] + record["dur_ms"], 2)
+            entry["count"] += 1
+            for key in ("rss_delta_kb", "alloc_kb"):
+                if key in record:
+                    entry[key] = round(entry.get(key, 0.0) + record[key], 1)
+            if "alloc_peak_kb" in record:
+                entry["alloc_peak_kb"] = max(entry.get("alloc_peak_kb", 0.0), record["alloc_peak_kb"])
+        return totals
+
+    def server_timing(self):
+        """
+        Server-Timing header value: one metric per stage plus the request total.
+        """
+        metrics = [f"{name};dur={entry['dur_ms']}" for name, entry in self.summary().items()]
+        metrics.append(f"total;dur={self.elapsed_ms()}")
+        return ", ".join(metrics)
+
+
+def current_trace():
+    """
+    The active request's Trace, or None outside a traced request.
+    """
+    return _current_trace.get()
+
+
+def start_trace():
+    """
+    Start a trace in the current context; returns the token for end_trace.
+    """
+    return _current_trace.set(Trace())
+
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a stage of the current request.
+
+    Args:
+        name (str): Stage name, dotted by area (e.g. "audio.convert").
+        **attrs: Extra fields stored with the span (e.g. sizes).
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    probe = memory.stage_start() if memory.accounting_enabled() else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        if probe is not None:
+            attrs = {**attrs, **memory.stage_end(name, probe)}
+        trace.add(name, start, duration, attrs)
+        STAGE_LATENCY.observe(duration, stage=name)
+
+
+def traced(name):
+    """
+    Decorator form of span(name).
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind_context(fn):
+    """
+    Bind `fn` to a copy of the caller's context, so spans it records on another
+    thread belong to the caller's request (and are profiled with it, if the
+    request is being captured). Bind once per submission.
+    """
+    return functools.partial(copy_context().run, profile_thread(fn))
+
+
+def init_tracing(app):
+    """
+    Register request hooks that trace every request of `app`.
+    """
+    if not _enabled("REQUEST_TRACING"):
+        return
+
+    @app.before_request
+    def _begin_trace():
+        g._trace_token = start_trace()
+
+    @app.after_request
+    def _finish_trace(response):
+        trace = current_trace()
+        if trace is None:
+            return response
+        if _enabled("SERVER_TIMING_HEADER"):
+            response.headers["Server-Timing"] = trace.server_timing()
+        stages = trace.summary()
+        if stages and (response.status_code >= 500 or random.random() < _sample_rate()):
+            get_stage_writer().submit({
+                "type": "request_stages",
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "total_ms": trace.elapsed_ms(),
+                "stages": stages
+            })
+        return response
+
+    @app.teardown_request
+    def _reset_trace(exc=None):
+        token = g.pop("_trace_token", None)
+        if token is not None:
+            try:
+                end_trace(token)
+            except ValueError:
+                # Token from a different context (e.g. app reused across threads)
+                _current_trace.set(None)
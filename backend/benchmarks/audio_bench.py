@@ -0,0 +1,261 @@
+"""
+audio_bench.py
+
+End-to-end benchmark of the audio pipeline stages for the AI Meeting Summarizer.
+
+Features:
+- Runs each stage (probe, quality gate, convert, trim, load, VAD,
+  transcription) over the recordings in sound_data/ plus synthetic long
+  recordings generated locally (16 kHz mono, which takes the fast path,
+  and 44.1 kHz stereo, which needs conversion).
+- Reports per-stage wall time, CPU time (including ffmpeg child processes),
+  peak RSS and real-time factor (stage wall time / audio duration) as JSON.
+- Compares a run against a stored baseline report and exits non-zero on
+  regressions, so pipeline changes can be checked before rollout.
+
+Usage (from backend/):
+    python -m benchmarks.audio_bench --output bench.json
+    python -m benchmarks.audio_bench --synthetic 60,600 --no-transcribe
+    python -m benchmarks.audio_bench --baseline bench.json --tolerance 0.1
+
+Dependencies: NumPy, ffmpeg/ffprobe, whisper (for the transcription stage),
+app.services.audio_processor, app.services.vad, benchmarks.common
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import wave
+import numpy as np
+from app.services import audio_processor
+from app.services.vad import SpeechTimeline, detect_speech
+from benchmarks.common import (
+    StageMeter, compare_measurements, environment_info, load_report, write_report,
+    DEFAULT_TOLERANCE,
+)
+
+DEFAULT_SOUND_DATA = os.path.join(os.path.dirname(__file__), "..", "..", "sound_data")
+DEFAULT_SYNTHETIC_SEC = (60, 300)
+SAMPLE_RATE = 16000
+
+
+def synthesize_recording(path, seconds, sample_rate=SAMPLE_RATE, channels=1,
+                         speech_ratio=0.65, seed=0):
+    """
+    Write a speech-like test recording: syllable-rate modulated harmonic bursts
+    separated by pauses, over a low noise floor.
+
+    Args:
+        path (str): Output WAV path.
+        seconds (float): Duration.
+        sample_rate (int): Sample rate of the file.
+        channels (int): Channel count (the same signal on every channel).
+        speech_ratio (float): Approximate fraction of time with "speech".
+        seed (int): Random seed (recordings are reproducible).
+
+    Returns:
+        str: `path`.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    signal = 0.002 * rng.standard_normal(total).astype(np.float32)
+    position = 0
+    while position < total:
+        burst = int(rng.uniform(1.5, 8.0) * sample_rate)
+        pause = int(burst * (1 - speech_ratio) / max(speech_ratio, 1e-3) * rng.uniform(0.5, 1.5))
+        end = min(total, position + burst)
+        t = np.arange(end - position) / sample_rate
+        pitch = rng.uniform(100, 220)
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 5))
+        envelope = 0.5 * (1 + np.sin(2 * np.pi * 4.0 * t)) * 0.2
+        signal[position:end] += (voiced * envelope).astype(np.float32)
+        position = end + pause
+    pcm = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+    if channels > 1:
+        pcm = np.repeat(pcm, channels)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return path
+
+
+def _stage(stages, name, duration, fn, *args):
+    """
+    Measure fn(*args) as stage `name`; errors are recorded, not raised.
+    """
+    meter = StageMeter()
+    result = error = None
+    try:
+        with meter:
+            result = fn(*args)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    entry = meter.as_dict()
+    entry["rtf"] = round(meter.wall_sec / duration, 4) if duration and duration > 0 else None
+    entry["ok"] = error is None
+    if error:
+        entry["error"] = error
+    stages[name] = entry
+    return result, error is None
+
+
+def benchmark_file(path, workdir, transcriber=None):
+    """
+    Run every stage on one recording.
+
+    Args:
+        path (str): Recording path.
+        workdir (str): Directory for intermediate files.
+        transcriber (callable, optional): transcriber(samples) -> text; the
+            transcription stage is skipped if None.
+
+    Returns:
+        dict: {"file", "duration_sec", "fast_path", "stages": {stage: measurements}}
+    """
+    stages = {}
+    base = os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+    converted = os.path.join(workdir, f"{base}_converted.wav")
+    trimmed = os.path.join(workdir, f"{base}_trimmed.wav")
+
+    info, _ = _stage(stages, "probe", None, audio_processor.probe_audio, path)
+    duration = info["duration"] if info else None
+    verdict, gate_ran = _stage(stages, "quality", duration, audio_processor.run_quality_gate, path)
+    if gate_ran:
+        stages["quality"]["verdict"] = verdict["reason"]
+        stages["quality"]["rule_timings"] = verdict["timings"]
+
+    fast_path = audio_processor.is_whisper_ready_wav(path)
+    if fast_path:
+        samples, loaded = _stage(stages, "load", duration, audio_processor.map_wav_samples, path)
+    else:
+        _, converted_ok = _stage(stages, "convert", duration, audio_processor.convert_to_wav, path, converted)
+        loaded = False
+        samples = None
+        if converted_ok:
+            _stage(stages, "trim", duration, audio_processor.trim_silence, converted, trimmed)
+            samples, loaded = _stage(stages, "load", duration, audio_processor.load_wav_samples, converted)
+
+    if loaded:
+        duration = duration or samples.size / SAMPLE_RATE
+        regions, _ = _stage(stages, "vad", duration, detect_speech, samples, SAMPLE_RATE)
+        timeline = SpeechTimeline(regions or [(0, samples.size)], SAMPLE_RATE)
+        stages["vad"]["speech_ratio"] = round(timeline.speech_seconds * SAMPLE_RATE / max(samples.size, 1), 3)
+        if transcriber is not None:
+            packed = timeline.pack(samples)
+            _stage(stages, "transcribe", duration, transcriber, packed)
+
+    return {
+        "file": os.path.basename(path),
+        "duration_sec": round(duration, 2) if duration else None,
+        "fast_path": fast_path,
+        "stages": stages,
+    }
+
+
+def load_transcriber(model_name):
+    """
+    Load a Whisper model once; returns (transcriber, load measurements).
+    """
+    import whisper
+    meter = StageMeter()
+    with meter:
+        model = whisper.load_model(model_name)
+    return (lambda samples: model.transcribe(samples)["text"]), meter.as_dict()
+
+
+def collect_inputs(directories, synthetic_sec, workdir):
+    """
+    Recording paths from the given directories plus generated synthetic recordings.
+    """
+    paths = []
+    for directory in directories:
+        if not os.path.isdir(directory):
+            print(f"Skipping missing input directory: {directory}", file=sys.stderr)
+            continue
+        for name in sorted(os.listdir(directory)):
+            if audio_processor.is_supported_format(name):
+                paths.append(os.path.join(directory, name))
+    for seconds in synthetic_sec:
+        paths.append(synthesize_recording(
+            os.path.join(workdir, f"synthetic_{seconds}s_16k_mono.wav"), seconds))
+        paths.append(synthesize_recording(
+            os.path.join(workdir, f"synthetic_{seconds}s_44k_stereo.wav"), seconds,
+            sample_rate=44100, channels=2, seed=1))
+    return paths
+
+
+def flatten(report):
+    """
+    {"file::stage": measurements} view of a report, for baseline comparison.
+    """
+    return {
+        f"{entry['file']}::{stage}": values
+        for entry in report.get("results", [])
+        for stage, values in entry["stages"].items()
+        if values.get("ok")
+    }
+
+
+def run(inputs, synthetic_sec, model_name=None):
+    """
+    Benchmark all inputs.
+
+    Args:
+        inputs (list[str]): Directories with recordings.
+        synthetic_sec (list[int]): Lengths of the synthetic recordings to generate.
+        model_name (str, optional): Whisper model; transcription is skipped if None.
+
+    Returns:
+        dict: Report {"meta": {...}, "results": [...]}
+    """
+    workdir = tempfile.mkdtemp(prefix="audio_bench_")
+    try:
+        meta = environment_info()
+        meta["ffmpeg"] = shutil.which("ffmpeg") is not None
+        transcriber = None
+        if model_name:
+            transcriber, meta["model_load"] = load_transcriber(model_name)
+            meta["model"] = model_name
+        results = [benchmark_file(path, workdir, transcriber)
+                   for path in collect_inputs(inputs, synthetic_sec, workdir)]
+        return {"meta": meta, "results": results}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the audio pipeline stages.")
+    parser.add_argument("--inputs", nargs="*", default=[DEFAULT_SOUND_DATA],
+                        help="Directories with recordings (default: sound_data/)")
+    parser.add_argument("--synthetic", default=",".join(map(str, DEFAULT_SYNTHETIC_SEC)),
+                        help="Comma-separated lengths (seconds) of synthetic recordings; '' for none")
+    parser.add_argument("--model", default="base", help="Whisper model for the transcription stage")
+    parser.add_argument("--no-transcribe", action="store_true", help="Skip the transcription stage")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="Compare against this stored report")
+    parser.add_argument("--metric", default="wall_sec", help="Measurement compared against the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a stage counts as regressed")
+    args = parser.parse_args(argv)
+
+    synthetic = [int(s) for s in args.synthetic.split(",") if s.strip()]
+    report = run(args.inputs, synthetic, None if args.no_transcribe else args.model)
+    regressions = []
+    if args.baseline:
+        comparison = compare_measurements(flatten(report), flatten(load_report(args.baseline)),
+                                          metric=args.metric, tolerance=args.tolerance)
+        report["comparison"] = comparison
+        regressions = [row for row in comparison if row["regression"]]
+        for row in regressions:
+            print(f"REGRESSION {row['key']}: {row['baseline']} -> {row['current']} "
+                  f"({row['change']:+.0%})", file=sys.stderr)
+    write_report(report, args.output)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+common.py
+
+Measurement and reporting helpers shared by the AI Meeting Summarizer benchmarks.
+
+Features:
+- StageMeter: wall time, CPU time (this process plus finished child
+  processes such as ffmpeg) and peak RSS of one benchmarked stage. Peak RSS
+  is sampled from /proc while the stage runs, so it is per stage rather
+  than the process-lifetime high-water mark.
+- JSON reports with environment metadata.
+- Comparison against a stored baseline report, flagging regressions.
+
+Dependencies: Python standard library (resource and /proc where available)
+"""
+
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RSS_SAMPLE_SEC = 0.005
+DEFAULT_TOLERANCE = 0.15
+# Absolute slowdowns below this (seconds) are treated as noise
+DEFAULT_MIN_DELTA = 0.02
+
+
+def current_rss_bytes():
+    """
+    Current resident set size of this process in bytes (0 if unknown).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        if resource is not None:
+            # ru_maxrss is the lifetime peak (KiB on Linux, bytes on macOS)
+            scale = 1 if sys.platform == "darwin" else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+        return 0
+
+
+def _children_usage():
+    if resource is None:
+        return 0.0, 0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    scale = 1 if sys.platform == "darwin" else 1024
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss * scale
+
+
+class StageMeter:
+    """
+    Context manager measuring one stage.
+
+    Usage:
+        with StageMeter() as meter:
+            run_stage()
+        meter.as_dict()  # {"wall_sec", "cpu_sec", "child_cpu_sec", "peak_rss_mb", ...}
+    """
+
+    def __init__(self, sample_sec=RSS_SAMPLE_SEC):
+        self.sample_sec = sample_sec
+        self.wall_sec = self.cpu_sec = self.child_cpu_sec = 0.0
+        self.peak_rss = self.start_rss = self.child_peak_rss = 0
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def _sample(self):
+        while not self._stop.wait(self.sample_sec):
+            self.peak_rss = max(self.peak_rss, current_rss_bytes())
+
+    def __enter__(self):
+        self.start_rss = self.peak_rss = current_rss_bytes()
+        self._child_cpu, _ = _children_usage()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_sec = time.perf_counter() - self._wall
+        self.cpu_sec = time.process_time() - self._cpu
+        self._stop.set()
+        self._sampler.join()
+        self.peak_rss = max(self.peak_rss, current_rss_bytes())
+        child_cpu, self.child_peak_rss = _children_usage()
+        self.child_cpu_sec = child_cpu - self._child_cpu
+        return False
+
+    def as_dict(self):
+        return {
+            "wall_sec": round(self.wall_sec, 4),
+            "cpu_sec": round(self.cpu_sec, 4),
+            "child_cpu_sec": round(self.child_cpu_sec, 4),
+            "peak_rss_mb": round(self.peak_rss / 2**20, 1),
+            "rss_growth_mb": round((self.peak_rss - self.start_rss) / 2**20, 1),
+        }
+
+
+def environment_info():
+    """
+    Metadata recorded with every report, so runs on different machines are not compared blindly.
+    """
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_report(report, path=None):
+    """
+    Write a report as JSON to `path`, or to stdout if no path is given.
+    """
+    text = json.dumps(report, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_measurements(current, baseline, metric="wall_sec",
+                         tolerance=DEFAULT_TOLERANCE, min_delta=DEFAULT_MIN_DELTA):
+    """
+    Compare two flat {key: {metric: value}} maps.
+
+    Args:
+        current (dict): Measurements of this run.
+        baseline (dict): Stored measurements.
+        metric (str): Field to compare.
+        tolerance (float): Allowed relative slowdown (0.15 = 15%).
+        min_delta (float): Smaller absolute differences are ignored.
+
+    Returns:
+        list[dict]: One entry per key present in both, sorted by relative change:
+            {"key", "baseline", "current", "change", "regression": bool}
+    """
+    rows = []
+    for key in sorted(set(current) & set(baseline)):
+        old = baseline[key].get(metric)
+        new = current[key].get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old > 0 else 0.0
+        rows.append({
+            "key": key,
+            "baseline": old,
+            "current": new,
+            "change": round(change, 4),
+            "regression": change > tolerance and new - old > min_delta,
+        })
+    return sorted(rows, key=lambda row: row["change"], reverse=True)
@@ -0,0 +1,354 @@
+"""
+nlp_bench.py
+
+Scaling benchmark for the NLP pipeline of the AI Meeting Summarizer.
+
+Features:
+- Generates synthetic meeting transcripts from 1 KB to 1 MB with
+  controllable name density, action-phrase density and decision density.
+- Measures extract_entities, extract_actions_nltk, extract_decisions and
+  analyze_transcript at each size: best-of-N wall time, and peak/allocated
+  memory (tracemalloc, in a separate run so tracing does not skew timing).
+- Counts sentence/word tokenizer calls, full-text tokenizations and
+  distinct regex patterns compiled per extractor call, and normalizes word
+  tokenizer calls per sentence, which exposes repeated tokenization and
+  per-sentence regex compilation.
+- Fits the scaling exponent (log time vs log size) per extractor and flags
+  super-linear scaling; counters that grow with input size, more than one
+  full-text tokenization per call and more than one word tokenization per
+  sentence are flagged too.
+- Optional comparison against a stored baseline report.
+
+Usage (from backend/):
+    python -m benchmarks.nlp_bench --output nlp.json
+    python -m benchmarks.nlp_bench --max-size 262144 --name-density 0.6
+    python -m benchmarks.nlp_bench --baseline nlp.json --fail-on-superlinear
+
+Dependencies: nltk (with the data from setup.py), NumPy,
+app.services.nlp_analysis, app.utils.entity_utils, benchmarks.common
+"""
+
+import argparse
+import math
+import random
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+import nltk
+import numpy as np
+from benchmarks.common import (
+    compare_measurements, environment_info, load_report, write_report, DEFAULT_TOLERANCE,
+)
+
+DEFAULT_SIZES = [2**10, 2**12, 2**14, 2**16, 2**18, 2**20]
+DEFAULT_REPEATS = 3
+# Exponent above which scaling counts as super-linear (1.0 = linear)
+DEFAULT_MAX_EXPONENT = 1.2
+# Every generated sentence ends in a period (used to normalize counters per sentence)
+SENTENCE_END = re.compile(r"[.!?](?=\s|$)")
+
+NAMES = ["Alice", "Bob", "Carol", "Dave", "Emily", "Frank", "Grace", "Jack", "Karen", "Mike"]
+ACTION_TEMPLATES = [
+    "{name} will send the budget report by Friday.",
+    "{name} needs to review the deployment checklist.",
+    "{name} should schedule a call with the vendor.",
+    "Please update the roadmap before the next sync.",
+    "{name} and {other} will prepare the demo.",
+]
+DECISION_TEMPLATES = [
+    "We decided to move the launch by a week.",
+    "Decision: the team keeps the current pricing.",
+]
+# Filler sentences contain none of the action phrases (checked by the tests)
+FILLER_TEMPLATES = [
+    "The quarterly numbers looked good.",
+    "{name} was happy with the feedback.",
+    "Sales were flat in the north region.",
+    "The new office is quiet.",
+    "Churn was lower in April.",
+]
+
+
+def generate_transcript(size_bytes, name_density=0.3, action_density=0.3,
+                        decision_density=0.05, seed=0):
+    """
+    Build a synthetic transcript of about `size_bytes` characters.
+
+    Args:
+        size_bytes (int): Target length.
+        name_density (float): Fraction of filler sentences that mention a person.
+        action_density (float): Fraction of sentences that are action items.
+        decision_density (float): Fraction of sentences that are decisions.
+        seed (int): Random seed (transcripts are reproducible).
+
+    Returns:
+        str: Transcript text.
+    """
+    rng = random.Random(seed)
+    sentences = []
+    length = 0
+    while length < size_bytes:
+        roll = rng.random()
+        name, other = rng.sample(NAMES, 2)
+        if roll < action_density:
+            sentence = rng.choice(ACTION_TEMPLATES)
+        elif roll < action_density + decision_density:
+            sentence = rng.choice(DECISION_TEMPLATES)
+        elif rng.random() < name_density:
+            sentence = FILLER_TEMPLATES[1]
+        else:
+            sentence = rng.choice([t for t in FILLER_TEMPLATES if "{name}" not in t])
+        sentence = sentence.format(name=name, other=other)
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)[:max(size_bytes, 1)]
+
+
+def count_sentences(text):
+    """
+    Number of sentences in a generated transcript (a truncated last one included).
+    """
+    return len(SENTENCE_END.findall(text)) + (1 if text and text[-1] != "." else 0)
+
+
+@contextmanager
+def count_calls(text=None):
+    """
+    Count tokenizer calls and distinct regex patterns compiled inside the block.
+
+    Args:
+        text (str, optional): The full input; tokenizer calls on all of it
+            are also counted as "full_text_tokenize".
+
+    Yields:
+        dict: Filled in on exit with "sent_tokenize", "word_tokenize",
+        "full_text_tokenize" and "distinct_regex" counts.
+    """
+    counts = {"sent_tokenize": 0, "word_tokenize": 0, "full_text_tokenize": 0, "distinct_regex": 0}
+    patterns = set()
+    originals = {name: getattr(nltk, name) for name in ("sent_tokenize", "word_tokenize")}
+    original_compile = getattr(re, "_compile", None)
+
+    def counting(name):
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            if text is not None and args and args[0] == text:
+                counts["full_text_tokenize"] += 1
+            return originals[name](*args, **kwargs)
+        return wrapper
+
+    def compile_wrapper(pattern, flags, *args):
+        patterns.add((pattern, flags))
+        return original_compile(pattern, flags, *args)
+
+    for name in originals:
+        setattr(nltk, name, counting(name))
+    if original_compile is not None:
+        re._compile = compile_wrapper
+    try:
+        yield counts
+    finally:
+        for name, fn in originals.items():
+            setattr(nltk, name, fn)
+        if original_compile is not None:
+            re._compile = original_compile
+        counts["distinct_regex"] = len(patterns)
+
+
+def default_extractors():
+    """
+    The extractors under test, as {name: fn(transcript)}.
+
+    Actions are measured with entities precomputed, so their cost is not
+    mixed with entity extraction (analyze_transcript covers the combination).
+    """
+    from app.services.nlp_analysis import analyze_transcript, extract_actions_nltk, extract_decisions
+    from app.utils.entity_utils import extract_entities
+    return {
+        "extract_entities": extract_entities,
+        "extract_actions_nltk": lambda text: extract_actions_nltk(text, entities=[]),
+        "extract_decisions": extract_decisions,
+        "analyze_transcript": analyze_transcript,
+    }
+
+
+def measure(fn, text, repeats=DEFAULT_REPEATS):
+    """
+    Time, memory and call counts of fn(text).
+
+    Returns:
+        dict: {"wall_sec" (best of repeats), "peak_kb" (peak traced allocation),
+               "retained_kb" (still allocated by the result), "sentences",
+               "calls": {...} (per call), "word_tokenize_per_sentence"}
+    """
+    best = math.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        with count_calls(text) as calls:
+            result = fn(text)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    sentences = count_sentences(text)
+    return {
+        "wall_sec": round(best, 6),
+        "peak_kb": round(peak / 1024, 1),
+        "retained_kb": round(current / 1024, 1),
+        "sentences": sentences,
+        "calls": calls,
+        "word_tokenize_per_sentence": round(calls["word_tokenize"] / max(sentences, 1), 3),
+    }
+
+
+def scaling_exponent(sizes, values):
+    """
+    Least-squares slope of log(value) vs log(size): ~1 linear, ~2 quadratic.
+
+    Returns:
+        float | None: The exponent, or None with fewer than two usable points.
+    """
+    points = [(math.log(s), math.log(v)) for s, v in zip(sizes, values) if s > 0 and v > 0]
+    if len(points) < 2:
+        return None
+    x, y = np.array(points).T
+    return round(float(np.polyfit(x, y, 1)[0]), 3)
+
+
+def analyze_scaling(rows, max_exponent=DEFAULT_MAX_EXPONENT):
+    """
+    Scaling verdict for one extractor's measurements (sorted by size).
+
+    Returns:
+        dict: {"time_exponent", "memory_exponent", "superlinear": bool,
+               "growing_counters": [counter names that grow with input size],
+               "repeated_tokenization": ["full_text_tokenize" if the text is
+               tokenized more than once per call, "word_tokenize" if a sentence
+               is word-tokenized more than once]}
+    """
+    sizes = [row["size_bytes"] for row in rows]
+    time_exp = scaling_exponent(sizes, [row["wall_sec"] for row in rows])
+    memory_exp = scaling_exponent(sizes, [row["peak_kb"] for row in rows])
+    growing = []
+    if len(rows) >= 2:
+        for name in rows[0]["calls"]:
+            first, last = rows[0]["calls"][name], rows[-1]["calls"][name]
+            # Per-call overheads should not scale with the transcript
+            if name != "word_tokenize" and last > max(2 * first, first + 10):
+                growing.append(name)
+    repeated = []
+    if any(row["calls"].get("full_text_tokenize", 0) > 1 for row in rows):
+        repeated.append("full_text_tokenize")
+    if any(row["calls"]["word_tokenize"] > max(row.get("sentences", 0), 1) for row in rows):
+        repeated.append("word_tokenize")
+    superlinear = any(exp is not None and exp > max_exponent for exp in (time_exp, memory_exp))
+    return {
+        "time_exponent": time_exp,
+        "memory_exponent": memory_exp,
+        "superlinear": superlinear or bool(growing) or bool(repeated),
+        "growing_counters": growing,
+        "repeated_tokenization": repeated,
+    }
+
+
+def run(sizes=DEFAULT_SIZES, extractors=None, repeats=DEFAULT_REPEATS,
+        max_exponent=DEFAULT_MAX_EXPONENT, **density):
+    """
+    Benchmark every extractor at every size.
+
+    Args:
+        sizes (list[int]): Transcript sizes in bytes.
+        extractors (dict, optional): {name: fn(text)} (default: the NLP pipeline).
+        repeats (int): Timing repeats (best is kept).
+        max_exponent (float): Scaling exponent above which an extractor is flagged.
+        **density: name_density / action_density / decision_density for the generator.
+
+    Returns:
+        dict: {"meta", "results": {extractor: [row per size]}, "scaling": {extractor: verdict}}
+    """
+    extractors = extractors or default_extractors()
+    transcripts = {size: generate_transcript(size, **density) for size in sorted(sizes)}
+    results = {}
+    for name, fn in extractors.items():
+        rows = []
+        for size, text in transcripts.items():
+            row = {"size_bytes": size, **measure(fn, text, repeats)}
+            row["us_per_kb"] = round(row["wall_sec"] * 1e6 / (size / 1024), 1)
+            rows.append(row)
+        results[name] = rows
+    meta = environment_info()
+    meta.update({"sizes": sorted(sizes), "repeats": repeats, **density})
+    return {
+        "meta": meta,
+        "results": results,
+        "scaling": {name: analyze_scaling(rows, max_exponent) for name, rows in results.items()},
+    }
+
+
+def flatten(report):
+    """
+    {"extractor::size": measurements} view of a report, for baseline comparison.
+    """
+    return {
+        f"{name}::{row['size_bytes']}": row
+        for name, rows in report.get("results", {}).items()
+        for row in rows
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark NLP extractor scaling.")
+    parser.add_argument("--min-size", type=int, default=DEFAULT_SIZES[0])
+    parser.add_argument("--max-size", type=int, default=DEFAULT_SIZES[-1])
+    parser.add_argument("--name-density", type=float, default=0.3)
+    parser.add_argument("--action-density", type=float, default=0.3)
+    parser.add_argument("--decision-density", type=float, default=0.05)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--max-exponent", type=float, default=DEFAULT_MAX_EXPONENT,
+                        help="Scaling exponent above which an extractor is flagged")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="Compare against this stored report")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--fail-on-superlinear", action="store_true",
+                        help="Exit 1 if any extractor scales super-linearly")
+    args = parser.parse_args(argv)
+
+    sizes = []
+    size = args.min_size
+    while size <= args.max_size:
+        sizes.append(size)
+        size *= 4
+    report = run(sizes, repeats=args.repeats, max_exponent=args.max_exponent,
+                 name_density=args.name_density, action_density=args.action_density,
+                 decision_density=args.decision_density)
+
+    failed = False
+    for name, verdict in report["scaling"].items():
+        if verdict["superlinear"]:
+            print(f"SUPER-LINEAR {name}: time^{verdict['time_exponent']} "
+                  f"memory^{verdict['memory_exponent']} growing={verdict['growing_counters']} "
+                  f"repeated={verdict['repeated_tokenization']}",
+                  file=sys.stderr)
+            failed = failed or args.fail_on_superlinear
+    if args.baseline:
+        comparison = compare_measurements(flatten(report), flatten(load_report(args.baseline)),
+                                          tolerance=args.tolerance)
+        report["comparison"] = comparison
+        for row in comparison:
+            if row["regression"]:
+                failed = True
+                print(f"REGRESSION {row['key']}: {row['baseline']} -> {row['current']} "
+                      f"({row['change']:+.0%})", file=sys.stderr)
+    write_report(report, args.output)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
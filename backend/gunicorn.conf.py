@@ -0,0 +1,119 @@
+"""
+gunicorn.conf.py
+
+Production launcher configuration for the AI Meeting Summarizer backend.
+
+The master process imports the app once (`preload_app`), then loads the
+Whisper model, warms NLTK and freezes the heap before forking. Workers
+share those pages copy-on-write instead of each loading its own model copy.
+
+Usage:
+    gunicorn -c gunicorn.conf.py run:app                      # production default (Docker image)
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \\
+        gunicorn -c gunicorn.conf.py app.asgi:app             # optional ASGI workers
+
+Signals (sent to the master):
+    HUP         Graceful reload: start new workers from the preloaded app, then
+                let old workers finish their in-flight requests and exit.
+                (Code changes need USR2 instead, because the app is preloaded.)
+    USR2        Re-exec a new master with fresh code; QUIT/TERM the old one after.
+    TTIN/TTOU   Add/remove one worker at runtime.
+    TERM        Graceful shutdown (waits up to graceful_timeout).
+
+Configuration (environment variables):
+    GUNICORN_BIND            Listen address (default 0.0.0.0:5000)
+    WEB_CONCURRENCY          Worker processes (default 2)
+    GUNICORN_WORKER_CLASS    gthread (default) or uvicorn.workers.UvicornWorker
+    GUNICORN_THREADS         Threads per gthread worker (default 8)
+    GUNICORN_TIMEOUT         Seconds before a silent worker is restarted (default 600,
+                             transcriptions are long)
+    GUNICORN_GRACEFUL_TIMEOUT  Seconds in-flight requests get on reload/shutdown (default 120)
+    GUNICORN_MAX_REQUESTS    Recycle workers after this many requests (default 0 = never)
+    TORCH_NUM_THREADS        Torch intra-op threads per worker (default 1)
+    NLTK_DOWNLOAD            "1" to download missing NLTK resources at startup
+    METRICS_DIR              Shared directory for multiprocess /metrics (cleared at startup)
+    ADMISSION_DIR            Node-wide admission ledger (default: a temporary directory
+                             created at startup and removed on exit)
+    TRANSCRIBE_QUEUE_DIR     Node-wide transcription queue (default: $ADMISSION_DIR/queue)
+    EVENT_ARCHIVE_INTERVAL_SEC  Seconds between event log compactions run by the master
+                             (default 3600, 0 disables)
+"""
+
+import os
+import shutil
+
+# Admission ledger directory created by on_starting (removed again by on_exit)
+_admission_tmp_dir = None
+
+
+def _int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = _int("WEB_CONCURRENCY", 2)
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = _int("GUNICORN_THREADS", 8)
+timeout = _int("GUNICORN_TIMEOUT", 600)
+graceful_timeout = _int("GUNICORN_GRACEFUL_TIMEOUT", 120)
+max_requests = _int("GUNICORN_MAX_REQUESTS", 0)
+max_requests_jitter = max_requests // 10
+preload_app = True
+accesslog = "-"
+
+
+def on_starting(server):
+    """
+    Runs in the master before forking: drop metric snapshots of a previous run,
+    make the master the only writer (and rotator) of server.log, and share one
+    admission ledger and transcription queue between the workers so the
+    budgets, slots and job order cover the whole node.
+    """
+    global _admission_tmp_dir
+    from app.utils.metrics import clear_metrics_dir
+    from app.utils.logger import enable_multiprocess_logging
+    from app.services.admission import prepare_shared_ledger
+    from app.services.transcription_scheduler import prepare_shared_queue
+    clear_metrics_dir()
+    enable_multiprocess_logging()
+    directory, created = prepare_shared_ledger()
+    if created:
+        _admission_tmp_dir = directory
+    server.log.info(f"Admission ledger: {directory}")
+    server.log.info(f"Transcription queue: {prepare_shared_queue()}")
+
+
+def on_exit(server):
+    """
+    Runs in the master on shutdown.
+    """
+    if _admission_tmp_dir:
+        shutil.rmtree(_admission_tmp_dir, ignore_errors=True)
+
+
+def when_ready(server):
+    """
+    Runs in the master after the app is imported, before forking: load the
+    Whisper model and NLTK data the workers share, and schedule event log
+    compaction (in the master only, so workers never compact concurrently).
+    """
+    from app.preload import preload_resources
+    from app.utils.event_archive import start_compactor
+    status = preload_resources(download=os.environ.get("NLTK_DOWNLOAD") == "1")
+    server.log.info(f"Shared resources preloaded: {status}")
+    start_compactor()
+
+
+def post_fork(server, worker):
+    """
+    Per-worker setup; must not touch the shared model weights.
+    """
+    try:
+        import torch
+        torch.set_num_threads(_int("TORCH_NUM_THREADS", 1))
+    except ImportError:
+        pass
+    server.log.info(f"Worker {worker.pid} started")
@@ -7,19 +7,29 @@ Created by Eric Morse
 Date: 2024-05-18
 
 This script initializes the Flask app via the application factory
-pattern (`create_app()`), and runs it in debug mode when executed
-directly.
+pattern (`create_app()`), and runs it in debug mode (with scheduled
+event log compaction) when executed directly.
 
 Usage:
     python run.py
 
-The app object is used by the WSGI server (such as gunicorn or flask run)
-for production or development deployment.
+In production the `app` object is served by the preforked gunicorn
+launcher with threaded (gthread) workers, as the Docker image does:
+
+    gunicorn -c gunicorn.conf.py run:app
+
+`app.asgi:app` (see app/asgi.py) is an optional alternative for the same
+launcher with ASGI workers; it is not used by the image.
 """
 
+import os
 from app import create_app
+from app.utils.event_archive import start_compactor
 
 app = create_app()
 
 if __name__ == '__main__':
+    # The debug reloader runs this twice; only its serving child compacts
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_compactor()
     app.run(debug=True)
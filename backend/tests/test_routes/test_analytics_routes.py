@@ -0,0 +1,42 @@
+import json
+import pytest
+from flask import Flask
+from app.routes.analytics_routes import analytics_bp
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    logs = tmp_path / "event_logs"
+    logs.mkdir()
+    with open(logs / "event_log_2025-05-19.jsonl", "w", encoding="utf-8") as f:
+        for i, t in enumerate([4.0, 8.0, 12.0]):
+            f.write(json.dumps({
+                "logged_at": f"2025-05-19T10:0{i}:00", "type": "audio_upload_success",
+                "outcome": "success", "reported_size": 100, "processing_time_sec": t
+            }) + "\n")
+        f.write(json.dumps({"logged_at": "2025-05-19T11:00:00", "type": "audio_quality_failed", "outcome": "failure"}) + "\n")
+    monkeypatch.chdir(tmp_path)
+    app = Flask(__name__)
+    app.register_blueprint(analytics_bp)
+    app.config["TESTING"] = True
+    with app.test_client() as client:
+        yield client
+
+def test_query_all(client):
+    resp = client.get("/api/events/query")
+    data = resp.get_json()
+    assert resp.status_code == 200
+    assert data["count"] == 4
+    assert data["bytes_uploaded"] == 300
+    assert data["processing_time_sec"]["p50"] == 8.0
+
+def test_query_filters(client):
+    data = client.get("/api/events/query?type=audio_upload_success,other&outcome=success&bucket=day").get_json()
+    assert data["count"] == 3
+    assert data["buckets"] == {"2025-05-19": 3}
+    assert data["filters"]["type"] == ["audio_upload_success", "other"]
+    data = client.get("/api/events/query?since=2025-05-19T10:30:00").get_json()
+    assert data["by_type"] == {"audio_quality_failed": 1}
+
+def test_query_invalid_params(client):
+    assert client.get("/api/events/query?since=yesterday").status_code == 400
+    assert client.get("/api/events/query?bucket=week").status_code == 400
@@ -0,0 +1,69 @@
+import asyncio
+import json
+from flask import Flask, Response, request
+from app.asgi import WsgiToAsgi, build_environ
+
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        return {"body": request.get_json(), "query": request.args.get("q"), "agent": request.headers.get("User-Agent")}
+
+    @app.route("/stream")
+    def stream():
+        return Response((f"{i}\n" for i in range(3)), mimetype="text/plain")
+    return app
+
+
+def call(app, method, path, body=b"", query=b"", headers=()):
+    sent = []
+    chunks = [body[i:i + 4] for i in range(0, len(body), 4)] or [b""]
+    messages = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+    scope = {"type": "http", "method": method, "path": path, "query_string": query, "headers": list(headers),
+             "http_version": "1.1", "scheme": "http", "server": ("testserver", 80), "client": ("127.0.0.1", 5)}
+    asyncio.run(WsgiToAsgi(app)(scope, receive, send))
+    return sent
+
+
+def test_adapter_passes_body_query_and_headers():
+    body = json.dumps({"transcript": "hello"}).encode()
+    sent = call(make_app(), "POST", "/echo", body, b"q=1",
+                [(b"content-type", b"application/json"), (b"user-agent", b"pytest")])
+    assert sent[0]["type"] == "http.response.start" and sent[0]["status"] == 200
+    payload = json.loads(b"".join(m.get("body", b"") for m in sent[1:]))
+    assert payload == {"body": {"transcript": "hello"}, "query": "1", "agent": "pytest"}
+    assert sent[-1]["more_body"] is False
+
+
+def test_adapter_streams_generator_responses():
+    sent = call(make_app(), "GET", "/stream")
+    bodies = [m["body"] for m in sent if m["type"] == "http.response.body" and m["body"]]
+    assert bodies == [b"0\n", b"1\n", b"2\n"]
+
+
+def test_adapter_returns_404_and_handles_lifespan():
+    assert call(make_app(), "GET", "/missing")[0]["status"] == 404
+    sent = []
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+    asyncio.run(WsgiToAsgi(make_app())({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+
+def test_build_environ_joins_repeated_headers():
+    environ = build_environ({"method": "GET", "path": "/x", "headers": [(b"x-tag", b"a"), (b"x-tag", b"b")]}, None)
+    assert environ["HTTP_X_TAG"] == "a,b"
+    assert environ["PATH_INFO"] == "/x"
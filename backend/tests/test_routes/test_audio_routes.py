@@ -170,3 +170,135 @@ def test_process_audio_final_exception_handler(client, tmp_path, monkeypatch):
     assert "error" in data
     # Optionally check for a log message in stdout/stderr
 
+
+def test_process_audio_shed_when_over_capacity(client, monkeypatch):
+    from app.services import admission
+    controller = admission.AdmissionController(cpu_budget_sec=10)
+    monkeypatch.setattr(admission, "_controller", controller)
+    ticket = controller.admit(600, "someone-else").ticket
+    try:
+        with open("tests/test_audio/All_Needs.wav", "rb") as audio_file:
+            data = {'audio': (audio_file, 'test_sample.wav')}
+            response = client.post('/process-audio', content_type='multipart/form-data', data=data)
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+        assert response.get_json()["retry_after"] == int(response.headers["Retry-After"])
+    finally:
+        controller.release(ticket)
+
+def test_transcription_queue_endpoint(client):
+    response = client.get('/api/transcription/queue')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["slots"] >= 1
+    assert isinstance(data["jobs"], list)
+
+def test_transcription_job_endpoint(client):
+    from app.services.transcription_scheduler import get_scheduler
+    scheduler = get_scheduler()
+    job = scheduler.submit(30, "tester", job_id="status-check")
+    try:
+        data = client.get('/api/transcription/jobs/status-check').get_json()
+        assert data["id"] == "status-check" and data["state"] in ("queued", "running")
+        assert data["estimated_finish"].endswith("+00:00")
+    finally:
+        scheduler.release(job)
+    assert client.get('/api/transcription/jobs/status-check').status_code == 404
+
+def test_process_audio_returns_job_id_and_estimates(client, monkeypatch):
+    from app.routes import audio_routes
+
+    class FakePipeline:
+        def __init__(self, *args):
+            pass
+
+        def run(self, *paths):
+            return {"ok": True, "quality": {"duration": 1.0}, "transcript": "hello there",
+                    "segments": [], "timings": {"transcribe": 0.1}, "speech": {},
+                    "fast_path": False, "speculative": {}}
+
+        def when_idle(self, callback):
+            callback()
+    monkeypatch.setattr(audio_routes, "AudioPipeline", FakePipeline)
+    monkeypatch.setattr(audio_routes, "log_transcript_to_file", lambda text: "")
+    with open("tests/test_audio/All_Needs.wav", "rb") as audio_file:
+        response = client.post('/process-audio', content_type='multipart/form-data',
+                               data={'audio': (audio_file, 'test_sample.wav')}, headers={"X-Job-Id": "meeting-42"})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data["job_id"] == "meeting-42"
+    assert data["estimated_start"] <= data["estimated_finish"]
+    # The job is released once the upload is done
+    assert client.get('/api/transcription/jobs/meeting-42').status_code == 404
+
+def test_process_audio_rejects_malformed_job_id(client):
+    with open("tests/test_audio/All_Needs.wav", "rb") as audio_file:
+        response = client.post('/process-audio', content_type='multipart/form-data',
+                               data={'audio': (audio_file, 'test_sample.wav')}, headers={"X-Job-Id": "../x"})
+    assert response.status_code == 400
+
+def test_header_quality_failure_is_rejected_before_admission(client, tmp_path, monkeypatch):
+    import wave
+    from app.services import admission
+    controller = admission.AdmissionController()
+    monkeypatch.setattr(admission, "_controller", controller)
+    monkeypatch.setattr(controller, "admit", lambda *a, **k: pytest.fail("should not reserve capacity"))
+    short = tmp_path / "short.wav"
+    with wave.open(str(short), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(b"\0\0" * 8000)  # 0.5 s, below the minimum duration
+    with open(short, "rb") as audio_file:
+        response = client.post('/process-audio', content_type='multipart/form-data',
+                               data={'audio': (audio_file, 'short.wav')})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Audio too short"
+
+def test_rejected_upload_keeps_its_slot_until_speculative_work_ends(client, monkeypatch):
+    from app.routes import audio_routes
+    from app.services.transcription_scheduler import TranscriptionScheduler
+    scheduler = TranscriptionScheduler(slots=1)
+    monkeypatch.setattr(audio_routes, "get_scheduler", lambda: scheduler)
+    pending = []
+
+    class RejectingPipeline:
+        def __init__(self, *args):
+            pass
+
+        def run(self, *paths):
+            return {"ok": False, "reason": "Audio too quiet", "quality": {}, "speculative": {"cancelled": True}}
+
+        def when_idle(self, callback):
+            pending.append(callback)  # the speculative head is still transcribing
+    monkeypatch.setattr(audio_routes, "AudioPipeline", RejectingPipeline)
+    with open("tests/test_audio/All_Needs.wav", "rb") as audio_file:
+        response = client.post('/process-audio', content_type='multipart/form-data',
+                               data={'audio': (audio_file, 'test_sample.wav')})
+    assert response.status_code == 400
+    assert scheduler.snapshot()["running"] == 1
+    pending[0]()
+    assert scheduler.snapshot()["running"] == 0
+
+def test_transcription_model_endpoint(client):
+    response = client.get('/api/transcription/model')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert {"samples", "fitted", "realtime_factor", "capacity_audio_hours_per_hour"} <= set(data)
+
+@pytest.mark.parametrize("trusted_proxies, forwarded_for, key", [
+    (None, "10.9.9.9", "127.0.0.1"),      # a forged header does not change the client
+    ("1", "10.0.0.1, 10.9.9.9", "10.9.9.9"),  # the address added by the trusted proxy counts
+])
+def test_client_limit_keys_on_trusted_address(monkeypatch, trusted_proxies, forwarded_for, key):
+    from app.services import admission
+    if trusted_proxies:
+        monkeypatch.setenv("TRUSTED_PROXY_COUNT", trusted_proxies)
+    controller = admission.AdmissionController(max_per_client=1)
+    monkeypatch.setattr(admission, "_controller", controller)
+    controller.admit(1, key)
+    with open("tests/test_audio/All_Needs.wav", "rb") as audio_file:
+        response = create_app().test_client().post(
+            '/process-audio', content_type='multipart/form-data',
+            data={'audio': (audio_file, 'test_sample.wav')}, headers={"X-Forwarded-For": forwarded_for})
+    assert response.status_code == 429
@@ -286,3 +286,74 @@ def test_process_json_not_json_content_type_explicit(client):
     resp = client.post('/process-json', data='{"transcript": "hello"}', content_type="text/plain")
     assert resp.status_code == 415
     assert "Invalid content type" in resp.get_json()["error"]
+
+@pytest.fixture
+def meeting_logs(tmp_path, monkeypatch):
+    """
+    Fake NLP result plus an event log with five entries for meeting "m1".
+    """
+    event_logs_dir = tmp_path / "event_logs"
+    event_logs_dir.mkdir()
+    with open(event_logs_dir / "event_log_2025-05-19.jsonl", "w", encoding="utf-8") as f:
+        for i in range(5):
+            f.write(json.dumps({"meeting_id": "m1", "n": i}) + "\n")
+        f.write(json.dumps({"meeting_id": "other"}) + "\n")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(json_routes, "analyze_transcript", lambda t, level="short": {"summary": ["s"], "actions": []})
+
+def test_process_json_exclude_and_paginate_event_logs(client, meeting_logs):
+    """
+    include_event_logs=false omits the logs; offset/limit return one page and the next offset.
+    """
+    data = client.post('/process-json', json={"transcript": "x", "meeting_id": "m1",
+                                               "include_event_logs": False}).get_json()
+    assert "event_logs" not in data
+    data = client.post('/process-json?event_logs_offset=1&event_logs_limit=2',
+                       json={"transcript": "x", "meeting_id": "m1"}).get_json()
+    assert [e["n"] for e in data["event_logs"]] == [1, 2]
+    assert data["event_logs_page"]["next_offset"] == 3
+    resp = client.post('/process-json', json={"transcript": "x", "event_logs_limit": "many"})
+    assert resp.status_code == 400
+
+def test_process_json_streaming_json(client, meeting_logs):
+    """
+    stream="json" produces the same document as the buffered response.
+    """
+    buffered = client.post('/process-json', json={"transcript": "x", "meeting_id": "m1"}).get_json()
+    resp = client.post('/process-json', json={"transcript": "x", "meeting_id": "m1", "stream": "json"})
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert json.loads(resp.get_data(as_text=True)) == buffered
+    paged = client.post('/process-json', json={"transcript": "x", "meeting_id": "m1", "stream": True,
+                                                "event_logs_offset": 3}).get_data(as_text=True)
+    assert json.loads(paged)["event_logs_page"] == {"offset": 3, "limit": None, "returned": 2, "next_offset": None}
+
+def test_process_json_streaming_ndjson(client, meeting_logs):
+    """
+    An NDJSON Accept header streams the result, each event log, then an end section.
+    """
+    resp = client.post('/process-json', json={"transcript": "x", "meeting_id": "m1", "event_logs_limit": 4},
+                       headers={"Accept": "application/x-ndjson"})
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [l["section"] for l in lines] == ["result"] + ["event_log"] * 4 + ["end"]
+    assert lines[0]["data"]["meeting_id"] == "m1"
+    assert lines[-1]["data"]["event_logs_page"]["next_offset"] == 4
+
+
+def test_process_json_reports_stage_timings(client, monkeypatch):
+    from app.utils import tracing
+
+    def analyze(transcript, level="short"):
+        with tracing.span("nlp.analyze"):
+            return {"summary": ["s"], "actions": []}
+
+    events = []
+    monkeypatch.setattr(json_routes, "analyze_transcript", analyze)
+    monkeypatch.setattr(tracing, "log_event", events.append)
+    response = client.post("/process-json", json={"transcript": "Bob will send it.", "include_event_logs": False})
+    assert response.status_code == 200
+    assert "nlp.analyze;dur=" in response.headers["Server-Timing"]
+    tracing.get_stage_writer().flush()
+    assert events[-1]["type"] == "request_stages"
+    assert events[-1]["path"] == "/process-json"
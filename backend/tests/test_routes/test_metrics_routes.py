@@ -0,0 +1,20 @@
+from app.utils.metrics import QUALITY_REJECTIONS
+from app.services import audio_processor
+
+
+def test_metrics_endpoint_exposes_request_and_quality_metrics(client, tmp_path, monkeypatch):
+    monkeypatch.delenv("METRICS_DIR", raising=False)
+    missing = str(tmp_path / "missing.wav")
+    before = QUALITY_REJECTIONS.value(reason="exists")
+    assert audio_processor.check_audio_quality(missing)[0] is False
+    assert QUALITY_REJECTIONS.value(reason="exists") == before + 1
+
+    client.get("/api/events/query")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.get_data(as_text=True)
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'http_request_duration_seconds_count{route="/api/events/query",method="GET",status="200"}' in text
+    assert 'audio_quality_rejections_total{reason="exists"}' in text
+    assert "# TYPE audio_bytes_ingested_total counter" in text
@@ -0,0 +1,37 @@
+import json
+
+
+def _store_capture(directory, capture_id):
+    with open(directory / f"{capture_id}.json", "w") as f:
+        json.dump({"id": capture_id, "path": "/process-json", "status": 200,
+                   "top_functions": [{"function": "f"}], "top_allocations": []}, f)
+    (directory / f"{capture_id}.prof").write_bytes(b"pstats")
+
+
+def test_profiles_require_admin_token(client, monkeypatch, tmp_path):
+    monkeypatch.delenv("PROFILE_ADMIN_TOKEN", raising=False)
+    assert client.get("/admin/profiles").status_code == 403
+    monkeypatch.setenv("PROFILE_ADMIN_TOKEN", "secret")
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "nope"}).status_code == 403
+
+
+def test_list_show_and_download_profiles(client, monkeypatch, tmp_path):
+    monkeypatch.setenv("PROFILE_ADMIN_TOKEN", "secret")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    _store_capture(tmp_path, "20260101T000000_aaaa")
+    _store_capture(tmp_path, "20260102T000000_bbbb")
+    headers = {"X-Admin-Token": "secret"}
+
+    listing = client.get("/admin/profiles", headers=headers).get_json()["profiles"]
+    assert [p["id"] for p in listing] == ["20260102T000000_bbbb", "20260101T000000_aaaa"]
+    assert "top_functions" not in listing[0]
+
+    detail = client.get("/admin/profiles/20260101T000000_aaaa", headers=headers)
+    assert detail.get_json()["top_functions"] == [{"function": "f"}]
+
+    download = client.get("/admin/profiles/20260101T000000_aaaa/download", headers=headers)
+    assert download.status_code == 200
+    assert download.data == b"pstats"
+    assert "attachment" in download.headers["Content-Disposition"]
+
+    assert client.get("/admin/profiles/unknown", headers=headers).status_code == 404
@@ -0,0 +1,134 @@
+import os
+import pytest
+from app.services import admission
+from app.services.admission import AdmissionController
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_controller(clock, **kwargs):
+    options = dict(cpu_budget_sec=100, memory_budget_mb=1000, max_per_client=2, rtf=0.5,
+                   job_overhead_sec=0, job_memory_mb=100, memory_mb_per_min=0, clock=clock)
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+def test_cost_grows_with_duration(clock):
+    controller = make_controller(clock, memory_mb_per_min=10)
+    short, long = controller.estimate(60), controller.estimate(600)
+    assert short.cpu_sec == 30 and long.cpu_sec == 300
+    assert long.memory_mb > short.memory_mb
+
+
+def test_node_budget_rejects_with_503_and_retry_after(clock):
+    controller = make_controller(clock)
+    first = controller.admit(120, "a")   # 60 cpu-sec
+    assert first.ok and first.ticket
+    clock.now += 20
+    second = controller.admit(120, "b")  # would make 120 > 100
+    assert not second.ok and second.status == 503
+    # The first job is expected to finish 40 s from now
+    assert second.retry_after == 40
+
+    controller.release(first.ticket)
+    assert controller.admit(120, "b").ok
+
+
+def test_memory_budget_is_enforced(clock):
+    controller = make_controller(clock, memory_budget_mb=150)
+    assert controller.admit(1, "a").ok
+    assert controller.admit(1, "b").status == 503
+
+
+def test_per_client_limit_rejects_with_429(clock):
+    controller = make_controller(clock, cpu_budget_sec=10000)
+    assert controller.admit(10, "a").ok
+    assert controller.admit(10, "a").ok
+    third = controller.admit(10, "a")
+    assert not third.ok and third.status == 429
+    assert third.retry_after >= 1
+    assert controller.admit(10, "b").ok
+
+
+def test_oversized_job_runs_only_on_idle_node(clock):
+    controller = make_controller(clock)
+    huge = controller.admit(3600, "a")
+    assert huge.ok
+    assert controller.admit(10, "b").status == 503
+    controller.release(huge.ticket)
+    small = controller.admit(10, "b")
+    assert small.ok
+    assert controller.admit(3600, "a").status == 503
+
+
+def test_precheck_reserves_nothing(clock):
+    controller = make_controller(clock, max_per_client=1)
+    assert controller.precheck("a").ok
+    assert controller.admit(10, "a").ok
+    assert controller.precheck("a").status == 429
+    assert controller.precheck("b").ok
+    assert controller.precheck("c").in_flight["jobs"] == 1
+
+
+def test_retry_after_is_clamped(clock):
+    controller = make_controller(clock, cpu_budget_sec=5000)
+    assert controller.admit(7200, "a").ok
+    refused = controller.admit(7200, "b")
+    assert refused.retry_after == admission.MAX_RETRY_AFTER
+
+
+def test_estimate_duration_falls_back_to_size():
+    assert admission.estimate_duration(12.5, 10) == 12.5
+    assert admission.estimate_duration(-1, 160000) == 10
+
+
+@pytest.mark.skipif(admission.fcntl is None, reason="needs fcntl")
+def test_file_ledger_is_shared_and_ignores_dead_workers(clock, tmp_path, monkeypatch):
+    first = make_controller(clock, directory=str(tmp_path))
+    second = make_controller(clock, directory=str(tmp_path))
+    ticket = first.admit(120, "a").ticket
+    assert second.admit(120, "b").status == 503
+
+    # A reservation left behind by an exited worker is void
+    monkeypatch.setattr(admission, "_pid_alive", lambda pid: pid != os.getpid())
+    assert second.admit(120, "b").ok
+    assert not (tmp_path / f"job_{ticket}.json").exists()
+
+
+def test_shared_ledger_defaults_to_a_fresh_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("ADMISSION_DIR", "")
+    monkeypatch.setattr(admission.tempfile, "tempdir", str(tmp_path))
+    directory, created = admission.prepare_shared_ledger()
+    assert created and os.path.isdir(directory)
+    assert os.environ["ADMISSION_DIR"] == directory
+
+    # A configured directory is kept, minus the reservations of a previous run
+    stale = tmp_path / "ledger" / "job_old.json"
+    stale.parent.mkdir()
+    stale.write_text("{}")
+    monkeypatch.setenv("ADMISSION_DIR", str(stale.parent))
+    assert admission.prepare_shared_ledger() == (str(stale.parent), False)
+    assert not stale.exists()
+
+
+@pytest.mark.skipif(admission.fcntl is None, reason="needs fcntl")
+def test_gauges_count_only_this_workers_jobs(clock, tmp_path):
+    # Another live worker's reservation is in the shared ledger
+    (tmp_path / "job_other.json").write_text(
+        '{"id": "other", "pid": %d, "client": "x", "started": 0, "cpu_sec": 100, "memory_mb": 10}' % os.getppid())
+    controller = make_controller(clock, cpu_budget_sec=1000, directory=str(tmp_path))
+    decision = controller.admit(120, "a")
+    assert decision.in_flight["cpu_sec"] == 100 + decision.cost.cpu_sec
+    # /metrics sums the workers' gauges, so each reports only its own jobs
+    assert admission.ADMISSION_CPU_IN_FLIGHT.value() == decision.cost.cpu_sec
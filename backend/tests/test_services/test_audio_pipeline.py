@@ -0,0 +1,350 @@
+import threading
+import time
+import wave
+import numpy as np
+import pytest
+from app.services import audio_processor
+from app.services.audio_pipeline import AudioPipeline, TranscriptionError, quiet_split_point
+
+RATE = 16000
+
+
+def write_wav(path, samples):
+    data = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes(data.tobytes())
+
+
+def speech(seconds, lead=1.0, trail=1.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t)
+    return np.concatenate([np.zeros(int(lead * RATE)), tone, np.zeros(int(trail * RATE))])
+
+
+class FakeProc:
+    """Popen-like conversion that finishes after `delay` seconds unless killed."""
+
+    def __init__(self, output, samples, delay=0.0, returncode=0):
+        self.output = output
+        self.samples = samples
+        self.killed = False
+        self.returncode = None
+        self._final = returncode
+        self._done = threading.Event()
+        threading.Timer(delay, self._finish).start()
+
+    def _finish(self):
+        if not self.killed:
+            if self._final == 0:
+                write_wav(self.output, self.samples)
+            self.returncode = self._final
+        self._done.set()
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        return self.returncode
+
+    def poll(self):
+        return self.returncode
+
+    def kill(self):
+        self.killed = True
+        self.returncode = -9
+        self._done.set()
+
+
+def make_converter(samples, delay=0.0, returncode=0, procs=None):
+    def converter(src, dst):
+        proc = FakeProc(dst, samples, delay, returncode)
+        if procs is not None:
+            procs.append(proc)
+        return proc
+    return converter
+
+
+def make_quality(ok=True, delay=0.0):
+    def quality_check(path):
+        time.sleep(delay)
+        return {"ok": ok, "reason": "OK" if ok else "Audio too quiet", "duration": 12.0}
+    return quality_check
+
+
+def recording_transcriber(calls, text="words"):
+    def transcribe(audio):
+        calls.append(len(audio))
+        return text
+    return transcribe
+
+
+def test_rejection_kills_running_conversion(tmp_path):
+    procs = []
+    pipeline = AudioPipeline(
+        transcribe=lambda audio: pytest.fail("must not transcribe"),
+        quality_check=make_quality(ok=False),
+        mode="pipelined",
+        converter=make_converter(speech(5), delay=5.0, procs=procs),
+    )
+    start = time.time()
+    result = pipeline.run(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"))
+    assert time.time() - start < 2
+    assert result["ok"] is False
+    assert result["reason"] == "Audio too quiet"
+    assert result["speculative"]["cancelled"] is True
+    assert procs[0].killed
+
+
+def test_speculative_head_reused_on_accept(tmp_path):
+    calls = []
+    pipeline = AudioPipeline(
+        transcribe=recording_transcriber(calls),
+        quality_check=make_quality(ok=True, delay=0.3),
+        mode="pipelined",
+        window_sec=4.0,
+        converter=make_converter(speech(10)),
+    )
+    result = pipeline.run(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"))
+    assert result["ok"] is True
+    assert result["speculative"] == {"started": True, "used": True, "cancelled": False}
+    assert result["transcript"] == "words words"
+    assert len(calls) == 2
+    # Head and tail together cover the speech, not the leading/trailing silence
+    assert sum(calls) < 11 * RATE
+    assert result["quality"]["duration"] == 12.0
+    assert "transcribe" in result["timings"]
+
+
+def test_speculative_head_cancelled_on_late_rejection(tmp_path):
+    calls = []
+    pipeline = AudioPipeline(
+        transcribe=recording_transcriber(calls),
+        quality_check=make_quality(ok=False, delay=0.3),
+        mode="pipelined",
+        window_sec=4.0,
+        converter=make_converter(speech(10)),
+    )
+    result = pipeline.run(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"))
+    assert result["ok"] is False
+    assert result["transcript"] is None
+    assert result["speculative"]["started"] is True
+    assert result["speculative"]["cancelled"] is True
+
+
+def test_running_head_keeps_the_pipeline_busy_after_rejection(tmp_path):
+    head_started = threading.Event()
+    finish_head = threading.Event()
+
+    def slow_transcribe(audio):
+        head_started.set()
+        finish_head.wait(5)
+        return "words"
+
+    def quality_check(path):
+        head_started.wait(5)  # reject only once the head transcription is running
+        return {"ok": False, "reason": "Audio too quiet"}
+
+    pipeline = AudioPipeline(transcribe=slow_transcribe, quality_check=quality_check, mode="pipelined",
+                             window_sec=4.0, converter=make_converter(speech(10)))
+    result = pipeline.run(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"))
+    assert result["ok"] is False and result["speculative"]["cancelled"] is True
+    idle = threading.Event()
+    pipeline.when_idle(idle.set)
+    # The rejection is answered at once, but the CPU is busy until the head ends
+    assert not idle.wait(0.2)
+    finish_head.set()
+    assert idle.wait(5)
+
+
+def test_when_idle_runs_at_once_without_background_work(tmp_path):
+    calls = []
+    pipeline = AudioPipeline(transcribe=recording_transcriber(calls), quality_check=make_quality(ok=True),
+                             mode="pipelined", converter=make_converter(speech(2)))
+    pipeline.run(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"))
+    idle = []
+    pipeline.when_idle(lambda: idle.append(True))
+    assert idle == [True]
+
+
+def test_short_audio_transcribed_once(tmp_path):
+    calls = []
+    pipeline = AudioPipeline(
+        transcribe=recording_transcriber(calls, text=" hello "),
+        quality_check=make_quality(ok=True),
+        mode="pipelined",
+        window_sec=30.0,
+        converter=make_converter(speech(3)),
+    )
+    result = pipeline.run(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"))
+    assert result["transcript"] == " hello "
+    assert len(calls) == 1
+    assert result["speculative"]["started"] is False
+
+
+def test_conversion_failure_of_rejected_upload_returns_rejection(tmp_path):
+    pipeline = AudioPipeline(
+        transcribe=lambda audio: "x",
+        quality_check=make_quality(ok=False, delay=0.2),
+        mode="pipelined",
+        converter=make_converter(speech(3), returncode=1),
+    )
+    result = pipeline.run(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"))
+    assert result["ok"] is False
+    assert result["reason"] == "Audio too quiet"
+
+
+def test_conversion_failure_of_accepted_upload_raises(tmp_path):
+    pipeline = AudioPipeline(
+        transcribe=lambda audio: "x",
+        quality_check=make_quality(ok=True),
+        mode="pipelined",
+        converter=make_converter(speech(3), returncode=1),
+    )
+    with pytest.raises(Exception):
+        pipeline.run(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"))
+
+
+def test_transcription_error_is_wrapped(tmp_path):
+    def broken(audio):
+        raise RuntimeError("model exploded")
+    pipeline = AudioPipeline(
+        transcribe=broken,
+        quality_check=make_quality(ok=True),
+        mode="pipelined",
+        converter=make_converter(speech(3)),
+    )
+    with pytest.raises(TranscriptionError) as exc:
+        pipeline.run(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"))
+    assert isinstance(exc.value.original, RuntimeError)
+
+
+def test_sequential_mode_uses_file_paths(tmp_path, monkeypatch):
+    import app.services.audio_pipeline as audio_pipeline
+    steps = []
+    monkeypatch.setattr(audio_pipeline, "convert_to_wav", lambda src, dst: steps.append("convert"))
+    monkeypatch.setattr(audio_pipeline, "trim_silence", lambda src, dst: steps.append("trim") or True)
+    paths = []
+    pipeline = AudioPipeline(
+        transcribe=lambda audio: paths.append(audio) or "text",
+        quality_check=make_quality(ok=True),
+        mode="sequential",
+    )
+    result = pipeline.run("in.wav", "converted.wav", "trimmed.wav")
+    assert result["transcript"] == "text"
+    assert steps == ["convert", "trim"]
+    assert paths == ["trimmed.wav"]
+
+
+def test_sequential_mode_maps_segments_to_the_original_timeline(tmp_path, monkeypatch):
+    import app.services.audio_pipeline as audio_pipeline
+    original = tmp_path / "in.wav"
+    write_wav(original, speech(3, lead=1.0))
+    monkeypatch.setattr(audio_pipeline, "trim_silence", lambda src, dst: True)
+    pipeline = AudioPipeline(
+        transcribe=lambda audio: {"text": "hi", "segments": [{"start": 0.0, "end": 1.5, "text": " hi "}]},
+        quality_check=make_quality(ok=True),
+        mode="sequential",
+    )
+    result = pipeline.run(str(original), "converted.wav", str(tmp_path / "trimmed.wav"))
+    # The trim removed the 1 s of leading silence; segment times point into the upload
+    assert result["segments"] == [{"start": 1.0, "end": 2.5, "text": "hi"}]
+
+
+def test_quiet_split_point_prefers_silence():
+    samples = 0.5 * np.ones(4 * RATE, dtype=np.float32)
+    samples[int(2.5 * RATE):int(2.6 * RATE)] = 0.0
+    split = quiet_split_point(samples, 3 * RATE)
+    assert int(2.5 * RATE) <= split < int(2.6 * RATE)
+
+
+def test_load_wav_samples_and_speech_bounds(tmp_path):
+    path = tmp_path / "speech.wav"
+    write_wav(path, speech(2, lead=1.5, trail=1.5))
+    samples = audio_processor.load_wav_samples(str(path))
+    assert samples.dtype == np.float32
+    assert samples.size == 5 * RATE
+    begin, end = audio_processor.speech_bounds(samples, RATE)
+    assert 1.4 * RATE <= begin <= 1.51 * RATE
+    assert 3.49 * RATE <= end <= 3.6 * RATE
+
+
+def test_speech_bounds_all_silent():
+    begin, end = audio_processor.speech_bounds(np.zeros(RATE, dtype=np.float32), RATE)
+    assert begin == end
+
+
+def test_vad_skips_pause_and_maps_segments(tmp_path):
+    samples = np.concatenate([speech(2, lead=1.0, trail=0.0), np.zeros(4 * RATE), speech(2, lead=0.0, trail=1.0)])
+    lengths = []
+
+    def transcribe(audio):
+        lengths.append(len(audio))
+        return {"text": "two parts", "segments": [
+            {"start": 0.0, "end": 1.0, "text": " one"},
+            {"start": 2.6, "end": 3.5, "text": " two"},
+        ]}
+
+    pipeline = AudioPipeline(
+        transcribe=transcribe,
+        quality_check=make_quality(ok=True),
+        mode="pipelined",
+        converter=make_converter(samples),
+    )
+    result = pipeline.run(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"))
+    assert result["transcript"] == "two parts"
+    assert result["speech"]["regions"] == 2
+    assert lengths[0] < 5 * RATE
+    first, second = result["segments"]
+    assert abs(first["start"] - 0.85) < 0.2
+    assert second["start"] > 6.5
+    assert second["text"] == "two"
+
+
+def test_vad_disabled_transcribes_trimmed_span(tmp_path):
+    samples = np.concatenate([speech(2, lead=1.0, trail=0.0), np.zeros(4 * RATE), speech(2, lead=0.0, trail=1.0)])
+    lengths = []
+    pipeline = AudioPipeline(
+        transcribe=recording_transcriber(lengths),
+        quality_check=make_quality(ok=True),
+        mode="pipelined",
+        converter=make_converter(samples),
+        vad=False,
+    )
+    result = pipeline.run(str(tmp_path / "in.wav"), str(tmp_path / "out.wav"))
+    assert result["speech"]["regions"] == 1
+    assert lengths[0] > 7.9 * RATE
+
+
+def test_conformant_wav_skips_conversion(tmp_path):
+    original = tmp_path / "in.wav"
+    write_wav(original, speech(3))
+    lengths = []
+    pipeline = AudioPipeline(
+        transcribe=recording_transcriber(lengths),
+        quality_check=make_quality(ok=True),
+        mode="pipelined",
+        converter=lambda src, dst: pytest.fail("ffmpeg must not run"),
+    )
+    result = pipeline.run(str(original), str(tmp_path / "out.wav"))
+    assert result["fast_path"] is True
+    assert result["transcript"] == "words"
+    assert "convert" not in result["timings"]
+    assert not (tmp_path / "out.wav").exists()
+
+
+def test_sequential_mode_skips_conversion_for_conformant_wav(tmp_path, monkeypatch):
+    import app.services.audio_pipeline as audio_pipeline
+    original = tmp_path / "in.wav"
+    write_wav(original, speech(3))
+    monkeypatch.setattr(audio_pipeline, "convert_to_wav", lambda src, dst: pytest.fail("must not convert"))
+    monkeypatch.setattr(audio_pipeline, "trim_silence", lambda src, dst: False)
+    paths = []
+    pipeline = AudioPipeline(
+        transcribe=lambda audio: paths.append(audio) or "text",
+        quality_check=make_quality(ok=True),
+        mode="sequential",
+    )
+    result = pipeline.run(str(original), "converted.wav", "trimmed.wav")
+    assert result["fast_path"] is True
+    assert paths == [str(original)]
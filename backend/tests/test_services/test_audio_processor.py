@@ -166,3 +166,92 @@ def test_convert_to_wav_raises(tmp_path, monkeypatch):
     output_file = tmp_path / "fail.wav"
     with pytest.raises(subprocess.CalledProcessError):
         audio_processor.convert_to_wav(str(input_file), str(output_file))
+
+
+def _write_pcm_wav(path, seconds=3, rate=16000, channels=1):
+    import wave
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * channels * rate * seconds)
+
+
+def test_probe_audio_reads_wav_header_without_ffprobe(tmp_path, monkeypatch):
+    path = tmp_path / "header.wav"
+    _write_pcm_wav(path, seconds=3, rate=16000, channels=2)
+    monkeypatch.setattr("subprocess.run", lambda *a, **k: pytest.fail("ffprobe must not run"))
+    info = audio_processor.probe_audio(str(path))
+    assert info == {"duration": 3.0, "sample_rate": 16000, "channels": 2, "bitrate": 512000}
+
+
+def test_probe_session_shares_one_probe(monkeypatch):
+    calls = []
+
+    class DummyResult:
+        stdout = '{"format": {"duration": "12.5", "bit_rate": "64000"}, "streams": [{"sample_rate": "44100", "channels": 2}]}'
+
+    def fake_run(*a, **k):
+        calls.append(a[0][0])
+        return DummyResult()
+
+    monkeypatch.setattr("subprocess.run", fake_run)
+    with audio_processor.probe_session():
+        assert audio_processor.get_audio_duration("clip.mp3") == 12.5
+        assert audio_processor.get_sample_rate_channels("clip.mp3") == (44100, 2)
+        assert audio_processor.get_bitrate("clip.mp3") == 64000
+    assert calls == ["ffprobe"]
+
+
+def test_volume_and_silence_share_one_decode(monkeypatch):
+    calls = []
+
+    class DummyResult:
+        stderr = (
+            "[Parsed_volumedetect_0] mean_volume: -20.5 dB\n"
+            "[silencedetect] silence_start: 1.0\n"
+            "[silencedetect] silence_end: 3.0 | silence_duration: 2.0\n"
+        )
+
+    def fake_run(*a, **k):
+        calls.append(a[0][0])
+        return DummyResult()
+
+    monkeypatch.setattr("subprocess.run", fake_run)
+    monkeypatch.setattr(audio_processor, "get_audio_duration", lambda p: 10.0)
+    with audio_processor.probe_session():
+        assert audio_processor.get_rms_volume("clip.mp3") == -20.5
+        assert audio_processor.get_silence_ratio("clip.mp3") == pytest.approx(0.2)
+    assert calls == ["ffmpeg"]
+
+
+def test_header_rejection_skips_decode(tmp_path, monkeypatch):
+    path = tmp_path / "short.wav"
+    _write_pcm_wav(path, seconds=1)
+    monkeypatch.setattr("subprocess.run", lambda *a, **k: pytest.fail("must not decode"))
+    result = audio_processor.run_quality_gate(str(path))
+    assert not result["ok"]
+    assert result["rule"] == "duration"
+    assert result["reason"] == "Audio too short"
+    assert list(result["timings"]) == ["exists", "format", "duration"]
+
+
+def test_wav_layout_and_memory_mapped_samples(tmp_path):
+    import numpy as np
+    ready = tmp_path / "ready.wav"
+    _write_pcm_wav(ready, seconds=2, rate=16000, channels=1)
+    layout = audio_processor.wav_layout(str(ready))
+    assert layout["offset"] == 44 and layout["length"] == 2 * 16000 * 2
+    assert audio_processor.is_whisper_ready_wav(str(ready))
+    samples = audio_processor.map_wav_samples(str(ready))
+    assert samples.dtype == np.float32 and samples.size == 32000
+
+    stereo = tmp_path / "stereo.wav"
+    _write_pcm_wav(stereo, seconds=1, rate=16000, channels=2)
+    assert not audio_processor.is_whisper_ready_wav(str(stereo))
+    with pytest.raises(ValueError):
+        audio_processor.map_wav_samples(str(stereo))
+
+    not_wav = tmp_path / "fake.wav"
+    not_wav.write_bytes(b"\0" * 64)
+    assert audio_processor.wav_layout(str(not_wav)) is None
@@ -0,0 +1,51 @@
+import threading
+import time
+from app.services.batch_scheduler import run_batch, summarize_batch
+from app.services import calendar_integration as ci
+
+def test_run_batch_preserves_order_and_reports_failures():
+    def worker(x):
+        if x == 2:
+            raise ValueError("bad item")
+        return x * 10
+    outcomes = run_batch([1, 2, 3], worker)
+    assert [o["index"] for o in outcomes] == [0, 1, 2]
+    assert outcomes[0] == {"index": 0, "ok": True, "result": 10}
+    assert outcomes[1] == {"index": 1, "ok": False, "error": "bad item"}
+    assert summarize_batch(outcomes) == {"total": 3, "succeeded": 2, "failed": 1}
+
+def test_run_batch_runs_concurrently_and_is_bounded():
+    active = []
+    peak = []
+    lock = threading.Lock()
+    def worker(x):
+        with lock:
+            active.append(x)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(x)
+        return x
+    start = time.monotonic()
+    outcomes = run_batch(range(8), worker, max_workers=4)
+    elapsed = time.monotonic() - start
+    assert all(o["ok"] for o in outcomes)
+    assert max(peak) <= 4
+    assert elapsed < 0.05 * 8 / 2
+
+def test_run_batch_empty():
+    assert run_batch([], lambda x: x) == []
+
+def test_create_calendar_events_partial_failure(monkeypatch):
+    def create(title, description, start, end):
+        if "Bob" in title:
+            raise RuntimeError("CalDAV down")
+        return "uid-1"
+    monkeypatch.setattr(ci, "create_calendar_event", create)
+    monkeypatch.setattr(ci, "log_event", lambda *a, **k: None)
+    outcomes = ci.create_calendar_events([
+        {"text": "Send notes", "owner": "Alice"},
+        {"text": "Book room", "owner": "Bob"},
+    ])
+    assert outcomes[0]["ok"] and outcomes[0]["result"] == "uid-1"
+    assert not outcomes[1]["ok"] and "CalDAV down" in outcomes[1]["error"]
@@ -253,7 +253,7 @@ def test_schedule_actions_api_success(client, monkeypatch):
         {"include": False, "datetime": "2025-06-05T10:00:00", "text": "Skip", "owner": "Bob"},
         {"include": True, "datetime": "2025-06-05T11:00:00", "text": "Review", "owner": "Charlie"}
     ]
-    resp = client.post('/api/schedule-actions', data=json.dumps({"actions": actions}), content_type='application/json')
+    resp = client.post('/api/schedule-actions', data=json.dumps({"actions": actions, "async": False}), content_type='application/json')
     data = resp.get_json()
     assert resp.status_code == 200
     assert data["success"]
@@ -267,7 +267,7 @@ def test_schedule_actions_api_internal_error(client, monkeypatch):
     actions = [
         {"include": True, "datetime": "2025-06-05T09:00:00", "text": "Discuss", "owner": "Alice"}
     ]
-    resp = client.post('/api/schedule-actions', data=json.dumps({"actions": actions}), content_type='application/json')
+    resp = client.post('/api/schedule-actions', data=json.dumps({"actions": actions, "async": False}), content_type='application/json')
     data = resp.get_json()
     assert resp.status_code == 500
     assert not data["success"]
@@ -281,3 +281,23 @@ def test_generate_event_data_from_action():
     assert "start_time" in data
     assert "end_time" in data
     assert data["description"].startswith("Auto-created")
+
+def test_schedule_actions_api_partial_failure(client, monkeypatch):
+    def mock_create(title, owner, start, end):
+        if owner == "Bob":
+            raise Exception("Calendar unavailable")
+        return {"title": title}
+    from app.services import calendar_api
+    monkeypatch.setattr(calendar_api, "create_calendar_event", mock_create)
+    actions = [
+        {"include": True, "datetime": "2025-06-05T09:00:00", "text": "Discuss", "owner": "Alice"},
+        {"include": True, "datetime": "2025-06-05T10:00:00", "text": "Review", "owner": "Bob"},
+        {"include": True, "datetime": "not-a-date", "text": "Broken", "owner": "Carol"}
+    ]
+    resp = client.post('/api/schedule-actions', data=json.dumps({"actions": actions, "async": False}), content_type='application/json')
+    data = resp.get_json()
+    assert resp.status_code == 207
+    assert not data["success"]
+    assert data["scheduled"] == [{"title": "Discuss"}]
+    assert [f["index"] for f in data["failed"]] == [1, 2]
+    assert data["summary"] == {"total": 3, "succeeded": 1, "failed": 2}
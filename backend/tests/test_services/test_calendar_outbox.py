@@ -0,0 +1,137 @@
+import json
+import pytest
+from app.services import calendar_outbox
+from app.services.calendar_outbox import CalendarOutbox, backoff_delay, idempotent_uid
+
+EVENT = {"title": "Send notes", "description": "Alice", "start_time": "2025-06-05T09:00:00", "end_time": "2025-06-05T10:00:00"}
+
+class FlakyCalendar:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.writes = {}
+    def deliver(self, record):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Nextcloud unavailable")
+        self.writes[record["uid"]] = record["title"]
+        return record["uid"]
+
+@pytest.fixture
+def clock():
+    return [1000.0]
+
+def make_outbox(tmp_path, calendar, clock, **kwargs):
+    outbox = CalendarOutbox(str(tmp_path / "outbox.db"), deliver=calendar.deliver, clock=lambda: clock[0], **kwargs)
+    return outbox
+
+def test_enqueue_and_deliver(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(calendar_outbox, "log_event", lambda *a, **k: None)
+    calendar = FlakyCalendar()
+    outbox = make_outbox(tmp_path, calendar, clock)
+    batch_id, records = outbox.enqueue([EVENT, EVENT])
+    assert [r["status"] for r in records] == ["pending", "pending"]
+    assert outbox.deliver_due() == 2
+    status = outbox.batch_status(batch_id)
+    assert status["complete"] and status["counts"] == {"delivered": 2}
+    assert len(calendar.writes) == 2
+
+def test_retry_with_backoff_then_success(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(calendar_outbox, "log_event", lambda *a, **k: None)
+    calendar = FlakyCalendar(failures=2)
+    outbox = make_outbox(tmp_path, calendar, clock)
+    _, [record] = outbox.enqueue([EVENT])
+    outbox.deliver_due()
+    record = outbox.get(record["uid"])
+    assert record["status"] == "pending" and record["attempts"] == 1
+    assert "unavailable" in record["last_error"]
+    # Not due yet: nothing is attempted
+    assert outbox.deliver_due() == 0
+    clock[0] += 10**4
+    outbox.deliver_due()
+    clock[0] += 10**4
+    outbox.deliver_due()
+    record = outbox.get(record["uid"])
+    assert record["status"] == "delivered" and record["attempts"] == 3
+    assert list(calendar.writes) == [record["uid"]]
+
+def test_gives_up_after_max_attempts(tmp_path, clock, monkeypatch):
+    logged = []
+    monkeypatch.setattr(calendar_outbox, "log_event", logged.append)
+    outbox = make_outbox(tmp_path, FlakyCalendar(failures=10), clock, max_attempts=2)
+    batch_id, [record] = outbox.enqueue([EVENT])
+    for _ in range(3):
+        outbox.deliver_due()
+        clock[0] += 10**4
+    assert outbox.get(record["uid"])["status"] == "failed"
+    assert outbox.batch_status(batch_id)["complete"]
+    assert logged and logged[-1]["status"] == "error"
+
+def test_idempotency_key_dedupes(tmp_path, clock):
+    outbox = make_outbox(tmp_path, FlakyCalendar(), clock)
+    first_batch, first = outbox.enqueue([{**EVENT, "idempotency_key": "req-1:0"}])
+    second_batch, second = outbox.enqueue([{**EVENT, "idempotency_key": "req-1:0"}])
+    assert first[0]["uid"] == second[0]["uid"] == idempotent_uid("req-1:0")
+    assert first[0]["batch_id"] == second[0]["batch_id"]
+    # The resubmission reports the batch its records actually belong to
+    assert second_batch == first_batch
+    assert len(outbox.batch_status(second_batch)["events"]) == 1
+
+def test_stale_delivering_record_is_reclaimed(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(calendar_outbox, "log_event", lambda *a, **k: None)
+    outbox = make_outbox(tmp_path, FlakyCalendar(), clock)
+    _, [record] = outbox.enqueue([EVENT])
+    assert len(outbox._claim_due(10)) == 1  # simulate a worker that crashed mid-delivery
+    assert outbox.deliver_due() == 0
+    clock[0] += calendar_outbox.DELIVERY_LEASE_SEC + 1
+    assert outbox.deliver_due() == 1
+    assert outbox.get(record["uid"])["status"] == "delivered"
+
+def test_backoff_delay_grows_and_is_capped():
+    assert backoff_delay(1, rng=lambda: 0.0) == 1.0
+    assert backoff_delay(3, rng=lambda: 0.999) < 8.0
+    assert backoff_delay(50, rng=lambda: 1.0) == calendar_outbox.BACKOFF_MAX_SEC
+
+def test_schedule_actions_queues_by_default(client, tmp_path, clock, monkeypatch):
+    from app.services import calendar_api
+    outbox = make_outbox(tmp_path, FlakyCalendar(), clock)
+    monkeypatch.setattr(calendar_api, "get_outbox", lambda: outbox)
+    monkeypatch.setattr(calendar_outbox, "log_event", lambda *a, **k: None)
+    actions = [
+        {"include": True, "datetime": "2025-06-05T09:00:00", "text": "Discuss", "owner": "Alice"},
+        {"include": True, "datetime": "bad", "text": "Broken", "owner": "Bob"}
+    ]
+    resp = client.post('/api/schedule-actions', data=json.dumps({"actions": actions}),
+                       content_type='application/json')
+    data = resp.get_json()
+    assert resp.status_code == 202
+    assert len(data["queued"]) == 1 and data["failed"][0]["index"] == 1
+    status = client.get(data["status_url"]).get_json()
+    assert status["counts"] == {"pending": 1}
+    outbox.deliver_due()
+    assert client.get(data["status_url"]).get_json()["complete"]
+    assert client.get('/api/schedule-actions/unknown').status_code == 404
+
+def test_resubmitted_request_gets_a_working_status_url(client, tmp_path, clock, monkeypatch):
+    from app.services import calendar_api
+    outbox = make_outbox(tmp_path, FlakyCalendar(), clock)
+    monkeypatch.setattr(calendar_api, "get_outbox", lambda: outbox)
+    body = json.dumps({"actions": [{"include": True, "datetime": "2025-06-05T09:00:00", "text": "Discuss",
+                                    "owner": "Alice"}], "auto_slot": False, "idempotency_key": "req-7"})
+    first = client.post('/api/schedule-actions', data=body, content_type='application/json').get_json()
+    second = client.post('/api/schedule-actions', data=body, content_type='application/json').get_json()
+    assert second["status_url"] == first["status_url"]
+    assert client.get(second["status_url"]).status_code == 200
+
+def test_existing_database_gains_slot_columns(tmp_path, clock):
+    import sqlite3
+    path = str(tmp_path / "outbox.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE calendar_outbox (uid TEXT PRIMARY KEY, batch_id TEXT, title TEXT, description TEXT, "
+                 "start_time TEXT NOT NULL, end_time TEXT NOT NULL, status TEXT NOT NULL, "
+                 "attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL, last_error TEXT, "
+                 "created_at TEXT NOT NULL, updated_at TEXT NOT NULL, delivered_at TEXT)")
+    conn.commit()
+    conn.close()
+    outbox = CalendarOutbox(path, deliver=FlakyCalendar().deliver, clock=lambda: clock[0])
+    _, [record] = outbox.enqueue([{**EVENT, "owner": "Alice"}])
+    assert record["owner"] == "Alice" and record["needs_slot"] == 0
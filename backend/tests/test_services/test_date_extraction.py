@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+import pytest
+from app.services import date_extraction as de
+
+@pytest.mark.parametrize("text, expected", [
+    ("Bob will send the report tomorrow at 3pm", ["tomorrow at 3pm"]),
+    ("Alice should book the room by Friday, 10:30", ["Friday, 10:30"]),
+    ("Review the budget on June 5th", ["June 5th"]),
+    ("Deploy 2025-06-05 then report next week", ["2025-06-05", "next week"]),
+    ("Carol will follow up", []),
+    ("We may need more amazing ideas", []),
+])
+def test_find_candidate_spans(text, expected):
+    assert [s["text"] for s in de.find_candidate_spans(text)] == expected
+
+def test_parse_action_datetime_relative():
+    tomorrow = (datetime.now() + timedelta(days=1)).date()
+    parsed = de.parse_action_datetime("Bob will send the report tomorrow at 3pm")
+    assert parsed.date() == tomorrow and parsed.hour == 15
+
+def test_relative_phrases_use_the_given_now():
+    now = datetime(2025, 6, 1, 9, 0, 42)
+    assert de.parse_action_datetime("Bob will send the report tomorrow at 3pm", now) == datetime(2025, 6, 2, 15, 0)
+    assert de.parse_action_datetime("Ping Carol in 2 hours", now) == datetime(2025, 6, 1, 11, 0)
+
+def test_parse_action_datetime_next_weekday_combines_time():
+    parsed = de.parse_action_datetime("Sync with Dave next Friday at 3pm")
+    assert parsed.weekday() == 4 and parsed.hour == 15
+
+def test_parse_action_datetime_no_candidate_skips_dateparser(monkeypatch):
+    monkeypatch.setattr(de, "_get_parser", lambda base: pytest.fail("dateparser should not be called"))
+    assert de.parse_action_datetime("Frank must order lunch") is None
+
+def test_parse_is_memoized(monkeypatch):
+    de._parse_span.cache_clear()
+    calls = []
+    real = de._get_parser(datetime(2025, 6, 1, 9, 0))
+    class CountingParser:
+        def get_date_data(self, span):
+            calls.append(span)
+            return real.get_date_data(span)
+    monkeypatch.setattr(de, "_get_parser", lambda base: CountingParser())
+    now = datetime(2025, 6, 1, 9, 0)
+    for _ in range(5):
+        de.parse_action_datetime("Call the vendor on June 5th", now)
+    assert calls == ["june 5th"]
+    de._parse_span.cache_clear()
+
+def test_extract_event_times_batch_defaults_and_dedupes():
+    results = de.extract_event_times_batch(["No date here", "No date here", "Ship it on 2030-01-02"])
+    assert results[0] == results[1]
+    assert results[0][0].endswith("Z")
+    assert results[2][0].startswith("2030-01-02T00:00:00")
+    assert results[2][1].startswith("2030-01-02T00:30:00")
@@ -0,0 +1,70 @@
+import json
+import pytest
+from app.services.eta_model import ProcessingTimeModel
+from app.utils.event_index import EventLogIndex
+
+
+def upload(duration, processing, sample_rate=16000, queue_wait=0.0):
+    return {
+        "logged_at": "2026-10-19T10:00:00", "type": "audio_upload_success", "outcome": "success",
+        "duration": duration, "sample_rate": sample_rate,
+        "processing_time_sec": processing + queue_wait, "queue_wait_sec": queue_wait,
+    }
+
+
+def append_events(path, events):
+    with open(path, "a", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+@pytest.fixture
+def model(tmp_path):
+    return ProcessingTimeModel(EventLogIndex(str(tmp_path)), fallback=lambda d: 2 + 0.5 * d,
+                               min_samples=5, refresh_sec=0)
+
+
+def test_falls_back_until_enough_samples(tmp_path, model):
+    append_events(tmp_path / "event_log_2026-10-19.jsonl", [upload(60, 20)] * 3)
+    eta = model.predict(100)
+    assert eta == {"processing_sec": 52.0, "p90_sec": 52.0, "source": "fallback"}
+
+
+def test_fits_duration_and_sample_rate_without_queue_wait(tmp_path, model):
+    # processing = 3 + 0.2 * duration + 0.1 * duration * (rate / 16 kHz)
+    events = []
+    for duration in (30, 60, 120, 300, 600):
+        for rate in (16000, 48000):
+            processing = 3 + 0.2 * duration + 0.1 * duration * rate / 16000
+            events.append(upload(duration, processing, rate, queue_wait=duration / 10))
+    append_events(tmp_path / "event_log_2026-10-19.jsonl", events)
+
+    eta = model.predict(1000, 48000)
+    assert eta["source"] == "model"
+    assert eta["processing_sec"] == pytest.approx(503, rel=0.01)
+    assert model.predict(1000, 16000)["processing_sec"] == pytest.approx(303, rel=0.01)
+    assert eta["p90_sec"] >= eta["processing_sec"]
+
+
+def test_refresh_is_incremental_and_recounts_rewritten_files(tmp_path, model):
+    log = tmp_path / "event_log_2026-10-19.jsonl"
+    append_events(log, [upload(100, 10)] * 5)
+    assert model.predict(100)["processing_sec"] == pytest.approx(10, rel=0.01)
+    assert model.summary()["samples"] == 5
+
+    append_events(log, [upload(100, 10)] * 2 + [{"type": "audio_quality_failed", "duration": 5}])
+    assert model.summary()["samples"] == 7
+
+    log.write_text("")
+    append_events(log, [upload(100, 40)] * 5)
+    assert model.summary()["samples"] == 5
+    assert model.predict(100)["processing_sec"] == pytest.approx(40, rel=0.01)
+
+
+def test_summary_reports_capacity(tmp_path, model):
+    append_events(tmp_path / "event_log_2026-10-19.jsonl",
+                  [upload(d, d / 4) for d in (60, 120, 240, 480, 960, 1200)])
+    summary = model.summary(slots=2)
+    assert summary["fitted"] is True
+    assert summary["realtime_factor"] == pytest.approx(0.25, abs=0.01)
+    assert summary["capacity_audio_hours_per_hour"] == pytest.approx(8, rel=0.05)
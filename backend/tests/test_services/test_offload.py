@@ -0,0 +1,69 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from app.services import offload
+
+
+@pytest.fixture(autouse=True)
+def fresh_executors():
+    offload.shutdown()
+    yield
+    offload.shutdown()
+
+
+def test_run_cpu_bounds_concurrency(monkeypatch):
+    monkeypatch.setenv("OFFLOAD_CPU_WORKERS", "2")
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def job():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.pop()
+        return threading.current_thread().name
+
+    callers = [threading.Thread(target=offload.run_cpu, args=(job,)) for _ in range(6)]
+    for t in callers:
+        t.start()
+    for t in callers:
+        t.join()
+    assert max(peak) == 2
+    assert offload.run_cpu(job).startswith("offload-cpu")
+
+
+def test_run_cpu_propagates_errors():
+    def boom():
+        raise RuntimeError("model failed")
+    with pytest.raises(RuntimeError, match="model failed"):
+        offload.run_cpu(boom)
+
+
+def test_run_cpu_async_does_not_block_loop():
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+        task = asyncio.create_task(ticker())
+        result = await offload.run_cpu_async(lambda x: time.sleep(0.1) or x * 2, 21)
+        task.cancel()
+        return result, ticks
+    result, ticks = asyncio.run(main())
+    assert result == 42
+    assert ticks > 5
+
+
+def test_executors_are_recreated_after_fork(monkeypatch):
+    first = offload.get_request_executor()
+    assert offload.get_request_executor() is first
+    monkeypatch.setattr(os, "getpid", lambda: -1)
+    assert offload.get_request_executor() is not first
@@ -0,0 +1,104 @@
+import time
+from app.services.quality_gate import QualityGate, QualityRule, cost_bucket
+
+
+def rule(name, tier, calls, reason=None, delay=0.0):
+    def check(path, measurements, thresholds):
+        calls.append(name)
+        time.sleep(delay)
+        measurements[name] = True
+        return reason
+    return QualityRule(name, tier, check)
+
+
+def test_cheapest_tier_runs_first():
+    calls = []
+    gate = QualityGate(
+        rules=[rule("volume", "decode", calls), rule("duration", "header", calls)],
+        tier_costs={"decode": 2.0, "header": 0.01},
+    )
+    result = gate.run("a.wav")
+    assert result["ok"] and result["reason"] == "OK"
+    assert calls == ["duration", "volume"]
+    assert list(result["timings"]) == ["duration", "volume"]
+
+
+def test_stops_at_first_failure():
+    calls = []
+    gate = QualityGate(
+        rules=[
+            rule("duration", "header", calls, reason="Audio too short"),
+            rule("volume", "decode", calls),
+        ],
+        tier_costs={"header": 0.01, "decode": 2.0},
+    )
+    result = gate.run("a.wav")
+    assert not result["ok"]
+    assert result["reason"] == "Audio too short"
+    assert result["rule"] == "duration"
+    assert calls == ["duration"]
+    assert result["measurements"] == {"duration": True}
+
+
+def test_guards_always_run_first():
+    calls = []
+    gate = QualityGate(
+        guards=[rule("exists", "file", calls, reason="File does not exist")],
+        rules=[rule("duration", "header", calls)],
+        tier_costs={"header": 0.0},
+    )
+    result = gate.run("missing.wav")
+    assert result["rule"] == "exists"
+    assert calls == ["exists"]
+
+
+def test_measured_cost_reorders_tiers():
+    calls = []
+    gate = QualityGate(
+        rules=[rule("slow", "a", calls, delay=0.02), rule("fast", "b", calls)],
+        tier_costs={"a": 0.0001, "b": 0.001},
+        alpha=1.0,
+    )
+    gate.run("x.wav")
+    assert calls == ["slow", "fast"]
+    calls.clear()
+    gate.run("x.wav")
+    assert calls == ["fast", "slow"]
+
+
+def test_same_magnitude_keeps_declared_order():
+    calls = []
+    gate = QualityGate(
+        rules=[rule("first", "a", calls), rule("second", "b", calls)],
+        tier_costs={"a": 0.0009, "b": 0.0002},
+    )
+    gate.run("x.wav")
+    assert calls == ["first", "second"]
+    assert cost_bucket(0.0009) == cost_bucket(0.0002)
+
+
+def test_session_wraps_run():
+    events = []
+
+    class Session:
+        def __enter__(self):
+            events.append("enter")
+
+        def __exit__(self, *exc):
+            events.append("exit")
+
+    gate = QualityGate(rules=[rule("duration", "header", events)], session=Session)
+    gate.run("x.wav")
+    assert events == ["enter", "duration", "exit"]
+
+
+def test_run_can_be_limited_to_tiers():
+    calls = []
+    gate = QualityGate(
+        guards=[rule("exists", "file", calls)],
+        rules=[rule("duration", "header", calls), rule("volume", "decode", calls)],
+        tier_costs={"header": 0.01, "decode": 2.0},
+    )
+    assert gate.run("a.wav", tiers=("header",))["ok"]
+    assert gate.run("a.wav", tiers=("decode",))["ok"]
+    assert calls == ["exists", "duration", "exists", "volume"]
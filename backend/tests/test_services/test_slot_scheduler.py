@@ -0,0 +1,272 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from app.services import calendar_api
+from app.services.slot_scheduler import IntervalSet, SlotAllocator, CalDAVBusyProvider, parse_calendar_map, to_naive_utc
+
+NOW = datetime(2025, 6, 2, 8, 0)  # Monday
+
+
+def dt(hour, minute=0, day=2):
+    return datetime(2025, 6, day, hour, minute)
+
+
+class FakeBusy:
+    def __init__(self, busy=None, fail=False):
+        self.busy = busy or {}
+        self.fail = fail
+        self.calls = []
+
+    def busy_for_owners(self, owners, start, end):
+        self.calls.append((tuple(owners), start, end))
+        if self.fail:
+            raise ConnectionError("calendar down")
+        return {owner: self.busy.get(owner, []) for owner in owners}
+
+
+def test_interval_set_merges_and_finds_gaps():
+    busy = IntervalSet([(dt(10), dt(11)), (dt(9), dt(10)), (dt(13), dt(14)), (dt(10, 30), dt(12))])
+    assert list(busy) == [(dt(9), dt(12)), (dt(13), dt(14))]
+    assert busy.overlaps(dt(11, 30), dt(12, 30))
+    assert not busy.overlaps(dt(12), dt(13))
+    assert busy.first_gap(dt(9, 30), timedelta(minutes=30)) == dt(12)
+    assert busy.first_gap(dt(9, 30), timedelta(hours=2)) == dt(14)
+    assert busy.first_gap(dt(9, 30), timedelta(hours=2), limit=dt(13)) is None
+
+
+def test_allocator_avoids_busy_time_and_packs_same_owner():
+    provider = FakeBusy({"Alice": [(dt(9), dt(10))]})
+    allocator = SlotAllocator(provider)
+    slots = allocator.allocate([
+        {"owner": "Alice", "earliest": dt(9, 10)},
+        {"owner": "Alice", "earliest": dt(9, 10)},
+        {"owner": "Bob", "earliest": dt(9, 10), "minutes": 60},
+    ], now=NOW)
+    assert [s["start"] for s in slots] == [dt(10), dt(10, 30), dt(9, 15)]
+    assert slots[2]["end"] == dt(10, 15)
+    assert len(provider.calls) == 1  # one free/busy fetch for the whole batch
+
+
+def test_allocator_respects_work_hours_and_default_start():
+    allocator = SlotAllocator(FakeBusy({"Alice": [(dt(16), dt(17))]}), work_hours=(9, 17))
+    slots = allocator.allocate([
+        {"owner": "Alice", "earliest": dt(16, 45)},
+        {"owner": "Alice", "earliest": None},
+    ], now=NOW)
+    assert slots[0]["start"] == dt(9, day=3)
+    assert slots[1]["start"] == dt(9)  # now + 1h, moved into working hours
+
+
+def test_allocator_converts_aware_times_and_tolerates_provider_failure():
+    allocator = SlotAllocator(FakeBusy(fail=True))
+    slots = allocator.allocate([{"owner": "Alice", "earliest": "2025-06-02T09:00:00+02:00"}], now=NOW)
+    assert slots[0]["start"] == dt(7)
+
+
+def test_allocator_gives_up_past_horizon():
+    allocator = SlotAllocator(FakeBusy({"Alice": [(dt(0), dt(0, day=30))]}), horizon_days=2)
+    assert allocator.allocate([{"owner": "Alice", "earliest": dt(9)}], now=NOW) == [None]
+
+
+def test_allocator_hundreds_of_actions_never_overlap():
+    busy = {f"owner{i}": [(dt(9 + h, day=2 + d), dt(9 + h, 45, day=2 + d)) for d in range(5) for h in range(0, 8, 2)]
+            for i in range(5)}
+    requests = [{"owner": f"owner{i % 5}", "earliest": dt(9)} for i in range(500)]
+    started = time.perf_counter()
+    slots = SlotAllocator(FakeBusy(busy), work_hours=(9, 17)).allocate(requests, now=NOW)
+    assert time.perf_counter() - started < 2
+    for i in range(5):
+        mine = sorted((s["start"], s["end"]) for s, r in zip(slots, requests) if r["owner"] == f"owner{i}")
+        assert all(a_end <= b_start for (_, a_end), (b_start, _) in zip(mine, mine[1:]))
+        assert not any(IntervalSet(busy[f"owner{i}"]).overlaps(start, end) for start, end in mine)
+        assert all(9 <= start.hour and (end.hour < 17 or end == end.replace(hour=17, minute=0)) for start, end in mine)
+
+
+def make_calendar(name, spans):
+    events = [
+        SimpleNamespace(icalendar_component={"dtstart": SimpleNamespace(dt=s), "dtend": SimpleNamespace(dt=e)})
+        for s, e in spans
+    ]
+    calendar = SimpleNamespace(name=name, searches=0)
+
+    def search(**kwargs):
+        calendar.searches += 1
+        return events
+    calendar.search = search
+    return calendar
+
+
+def test_caldav_busy_provider_matches_calendars_by_owner():
+    alice = make_calendar("Alice", [(datetime(2025, 6, 2, 9, tzinfo=timezone.utc), datetime(2025, 6, 2, 10, tzinfo=timezone.utc))])
+    team = make_calendar("Team", [(dt(14), dt(15))])
+    shared = make_calendar("Personal", [(dt(12), dt(13))])
+    client = SimpleNamespace(calendars=lambda: [shared, alice, team])
+    provider = CalDAVBusyProvider(client, calendar_map={"Bob": "team"}, ttl_sec=0)
+    busy = provider.busy_for_owners(["alice", "Bob", "Carol"], dt(0), dt(0, day=3))
+    assert busy["alice"] == [(dt(9), dt(10))]
+    assert busy["Bob"] == [(dt(14), dt(15))]
+    # No calendar of her own: never scheduled against someone else's free/busy
+    assert busy["Carol"] == []
+    assert shared.searches == 0 and alice.searches == 1 and team.searches == 1
+
+
+def test_parse_calendar_map():
+    assert parse_calendar_map("Alice=Alice Work, Bob = Team,broken,=x") == {"alice": "alice work", "bob": "team"}
+
+
+def test_caldav_busy_provider_caches_free_busy_per_calendar():
+    now = [0.0]
+    alice = make_calendar("Alice", [(dt(9), dt(10))])
+    listed = []
+    client = SimpleNamespace(calendars=lambda: listed.append(1) or [alice])
+    allocator = SlotAllocator(CalDAVBusyProvider(client, ttl_sec=60, clock=lambda: now[0]))
+    first = allocator.allocate([{"owner": "Alice", "earliest": dt(9)}], now=NOW)
+    second = allocator.allocate([{"owner": "Alice", "earliest": dt(9)}], now=NOW)
+    # The second batch reuses the cached busy time plus the slot handed out by the first
+    assert [first[0]["start"], second[0]["start"]] == [dt(10), dt(10, 30)]
+    assert alice.searches == 1 and len(listed) == 1
+    now[0] += 61
+    allocator.allocate([{"owner": "Alice", "earliest": dt(9)}], now=NOW)
+    assert alice.searches == 2 and len(listed) == 2
+
+
+def test_to_naive_utc_accepts_dates_and_strings():
+    assert to_naive_utc("2025-06-02T10:00:00Z") == dt(10)
+    assert to_naive_utc(datetime(2025, 6, 2).date()) == dt(0)
+
+
+@pytest.fixture
+def fixed_allocator(monkeypatch):
+    provider = FakeBusy({"Alice": [(dt(9), dt(10))]})
+    monkeypatch.setattr(calendar_api, "get_slot_allocator", lambda: SlotAllocator(provider))
+    return provider
+
+
+def test_schedule_actions_allocates_slots_for_actions_without_a_datetime(client, monkeypatch, fixed_allocator):
+    created = []
+
+    def mock_create(title, owner, start, end):
+        created.append((owner, start, end))
+        return {"title": title, "start_time": start}
+    monkeypatch.setattr(calendar_api, "create_calendar_event", mock_create)
+    actions = [
+        {"include": True, "datetime": "2025-06-02T10:07", "text": "Discuss", "owner": "Alice"},
+        {"include": True, "text": "Review on 2025-06-02 at 9:00", "owner": "Alice"},
+        {"include": False, "text": "Skip", "owner": "Bob"},
+        {"include": True, "datetime": "not-a-date", "text": "Broken", "owner": "Carol"},
+    ]
+    resp = client.post('/api/schedule-actions', data=json.dumps({"actions": actions, "async": False}),
+                       content_type='application/json')
+    assert resp.status_code == 207
+    # The explicit datetime is kept as given (off-grid, over busy time); the open action avoids it
+    assert sorted(created) == [("Alice", "2025-06-02T10:07", "2025-06-02T11:07:00"),
+                               ("Alice", "2025-06-02T11:15", "2025-06-02T11:45")]
+    assert [f["index"] for f in resp.get_json()["failed"]] == [3]
+    assert resp.get_json()["summary"] == {"total": 3, "succeeded": 2, "failed": 1}
+
+
+def test_schedule_actions_with_explicit_datetimes_skips_free_busy(client, monkeypatch, fixed_allocator):
+    monkeypatch.setattr(calendar_api, "create_calendar_event", lambda title, owner, start, end: start)
+    actions = [{"include": True, "datetime": "2025-06-02T09:07", "text": "Discuss", "owner": "Alice"}]
+    resp = client.post('/api/schedule-actions', data=json.dumps({"actions": actions, "async": False}),
+                       content_type='application/json')
+    assert resp.get_json()["scheduled"] == ["2025-06-02T09:07"]
+    assert fixed_allocator.calls == []
+
+
+def test_schedule_actions_leaves_slot_allocation_to_the_outbox(client, tmp_path, monkeypatch):
+    from app.services import calendar_outbox
+    from app.services.calendar_outbox import CalendarOutbox
+    provider = FakeBusy({"Alice": [(dt(9), dt(10))]})
+    created = []
+    outbox = CalendarOutbox(str(tmp_path / "outbox.db"), deliver=created.append,
+                            slot_allocator=SlotAllocator(provider))
+    monkeypatch.setattr(calendar_api, "get_outbox", lambda: outbox)
+    monkeypatch.setattr(calendar_outbox, "log_event", lambda *a, **k: None)
+    actions = [
+        {"include": True, "datetime": "2025-06-02T10:00", "text": "Discuss", "owner": "Alice"},
+        {"include": True, "text": "Review on 2025-06-02 at 9:00", "owner": "Alice", "duration_minutes": 45},
+    ]
+    resp = client.post('/api/schedule-actions', data=json.dumps({"actions": actions}), content_type='application/json')
+    data = resp.get_json()
+    assert resp.status_code == 202 and data["failed"] == []
+    assert provider.calls == []  # no free/busy lookup on the request path
+    assert data["queued"][1]["needs_slot"] == 1
+    outbox.deliver_due()
+    assert sorted((r["title"], r["start_time"], r["end_time"]) for r in created) == [
+        ("Discuss", "2025-06-02T10:00", "2025-06-02T11:00:00"),
+        ("Review on 2025-06-02 at 9:00", "2025-06-02T11:00", "2025-06-02T11:45"),
+    ]
+    assert client.get(data["status_url"]).get_json()["counts"] == {"delivered": 2}
+
+
+def test_outbox_records_without_a_free_slot_are_retried(tmp_path, monkeypatch):
+    from app.services import calendar_outbox
+    from app.services.calendar_outbox import CalendarOutbox
+    monkeypatch.setattr(calendar_outbox, "log_event", lambda *a, **k: None)
+    allocator = SlotAllocator(FakeBusy({"Alice": [(dt(0), dt(0, day=30))]}), horizon_days=2)
+    created = []
+    outbox = CalendarOutbox(str(tmp_path / "outbox.db"), deliver=created.append, slot_allocator=allocator)
+    _, [record] = outbox.enqueue([{"title": "Review", "owner": "Alice", "start_time": "2025-06-02T09:00",
+                                   "end_time": "", "needs_slot": True}])
+    outbox.deliver_due()
+    record = outbox.get(record["uid"])
+    assert created == []
+    assert record["status"] == "pending" and record["last_error"] == "No free slot found"
+    assert record["needs_slot"] == 1
+
+
+def test_fixed_requests_keep_their_time_and_reserve_it():
+    allocator = SlotAllocator(FakeBusy({"Alice": [(dt(9), dt(10))]}))
+    slots = allocator.allocate([
+        {"owner": "Alice", "earliest": dt(9, 30)},
+        {"owner": "Alice", "earliest": dt(10, 7), "minutes": 60, "fixed": True},
+    ], now=NOW)
+    assert slots[1] == {"start": dt(10, 7), "end": dt(11, 7)}
+    assert slots[0]["start"] == dt(11, 15)
+
+
+def test_owners_mapped_to_one_calendar_get_separate_slots():
+    shared = make_calendar("Team", [(dt(9), dt(10))])
+    provider = CalDAVBusyProvider(SimpleNamespace(calendars=lambda: [shared]),
+                                  calendar_map={"Bob": "Team", "Carol": "Team"}, ttl_sec=0)
+    slots = SlotAllocator(provider).allocate([
+        {"owner": "Bob", "earliest": dt(9)},
+        {"owner": "Carol", "earliest": dt(9)},
+    ], now=NOW)
+    assert [s["start"] for s in slots] == [dt(10), dt(10, 30)]
+    assert shared.searches == 1
+
+
+def test_generate_event_data_allocates_a_slot_by_default(fixed_allocator):
+    data = calendar_api.generate_event_data_from_action("Alice reviews the plan on 2025-06-02 at 9:00", owner="Alice")
+    assert (data["start_time"], data["end_time"]) == ("2025-06-02T10:00", "2025-06-02T10:30")
+
+
+def test_follow_up_events_are_placed_in_free_slots(monkeypatch):
+    from app.services import calendar_integration as ci
+    provider = FakeBusy({"Alice": [(dt(9), dt(10))]})
+    monkeypatch.setattr(ci, "get_slot_allocator", lambda: SlotAllocator(provider))
+    monkeypatch.setattr(ci, "log_event", lambda *a, **k: None)
+    created = []
+    monkeypatch.setattr(ci, "create_calendar_event", lambda title, desc, start, end: created.append((start, end)))
+    ci.create_calendar_events([
+        {"text": "Send notes on 2025-06-02 at 9:00", "owner": "Alice"},
+        {"text": "Book room on 2025-06-02 at 9:00", "owner": "Alice"},
+    ])
+    assert sorted(created) == [("2025-06-02T10:00:00", "2025-06-02T10:30:00"),
+                               ("2025-06-02T10:30:00", "2025-06-02T11:00:00")]
+    assert len(provider.calls) == 1
+
+
+def test_propose_slots_does_not_create_events(client, monkeypatch, fixed_allocator):
+    monkeypatch.setattr(calendar_api, "create_calendar_event", lambda *a: pytest.fail("should not create"))
+    actions = [{"text": "Discuss", "owner": "Alice", "datetime": "2025-06-02T09:00"},
+               {"text": "Review on 2025-06-02 at 9:00", "owner": "Alice"}]
+    resp = client.post('/api/propose-slots', data=json.dumps({"actions": actions}), content_type='application/json')
+    data = resp.get_json()
+    assert resp.status_code == 200
+    assert [p["datetime"] for p in data["proposals"]] == ["2025-06-02T09:00", "2025-06-02T10:00"]
+    assert data["failed"] == []
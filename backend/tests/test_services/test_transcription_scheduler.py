@@ -0,0 +1,185 @@
+import threading
+import time
+import pytest
+from app.services import admission
+from app.services.admission import fcntl
+from app.services.transcription_scheduler import TranscriptionScheduler, prepare_shared_queue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def started(jobs):
+    return [job.id for job in jobs if job.started is not None]
+
+
+def test_shortest_job_starts_first(clock):
+    scheduler = TranscriptionScheduler(slots=1, clock=clock)
+    running = scheduler.submit(100, "a")
+    clock.now += 1
+    long_job = scheduler.submit(3600, "b")
+    clock.now += 1
+    short_job = scheduler.submit(60, "c")
+
+    scheduler.release(running)
+    assert started([long_job, short_job]) == [short_job.id]
+    assert short_job.waited_sec == 0.0  # clock did not move between submit and start
+    scheduler.release(short_job)
+    assert long_job.started is not None
+
+
+def test_client_with_running_jobs_is_deprioritised(clock):
+    scheduler = TranscriptionScheduler(slots=2, clock=clock)
+    busy = scheduler.submit(10, "a")
+    blocker = scheduler.submit(10, "b")
+    clock.now += 1
+    same_client = scheduler.submit(50, "a")   # weighted 50 * 2 = 100
+    other_client = scheduler.submit(80, "c")  # weighted 80
+    scheduler.release(blocker)
+    assert started([same_client, other_client]) == [other_client.id]
+    scheduler.release(busy)
+
+
+def test_aging_bounds_the_wait_of_long_jobs(clock):
+    scheduler = TranscriptionScheduler(slots=1, aging_sec=300, clock=clock)
+    running = scheduler.submit(10, "a")
+    long_job = scheduler.submit(3600, "b")
+    clock.now += 301
+    short_job = scheduler.submit(5, "c")
+    scheduler.release(running)
+    assert long_job.started is not None and short_job.started is None
+
+
+def test_bypass_limit_bounds_overtaking(clock):
+    scheduler = TranscriptionScheduler(slots=1, max_bypass=2, clock=clock)
+    current = scheduler.submit(1, "x")
+    long_job = scheduler.submit(1000, "b")
+    for i in range(3):
+        clock.now += 1
+        scheduler.submit(1, f"short{i}")
+        scheduler.release(current)
+        current = next(iter(scheduler._running.values()))
+        if current is long_job:
+            break
+    assert current is long_job
+    assert long_job.bypassed == 2
+
+
+def test_forecast_reports_start_and_finish(clock):
+    scheduler = TranscriptionScheduler(slots=1, clock=clock)
+    running = scheduler.submit(100, "a")
+    clock.now += 40
+    long_job = scheduler.submit(300, "b")
+    short_job = scheduler.submit(20, "c")
+
+    forecast = scheduler.forecast()
+    assert forecast[running.id]["estimated_finish"] == 1100
+    assert forecast[short_job.id]["estimated_start"] == 1100
+    assert forecast[long_job.id]["estimated_start"] == 1120
+    assert forecast[long_job.id]["estimated_finish"] == 1420
+
+    snapshot = scheduler.snapshot()
+    assert (snapshot["running"], snapshot["queued"]) == (1, 2)
+    assert [job["estimated_start_in_sec"] for job in snapshot["jobs"]] == [0.0, 60.0, 80.0]
+
+
+def test_slot_blocks_until_a_slot_frees():
+    scheduler = TranscriptionScheduler(slots=1)
+    order = []
+    release_first = threading.Event()
+
+    def first():
+        with scheduler.slot(10, "a"):
+            order.append("first")
+            release_first.wait(5)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    while not order:
+        time.sleep(0.01)
+
+    def second():
+        with scheduler.slot(1, "b") as job:
+            order.append(("second", job.waited_sec > 0))
+
+    waiter = threading.Thread(target=second)
+    waiter.start()
+    time.sleep(0.05)
+    assert order == ["first"]
+    release_first.set()
+    thread.join(5)
+    waiter.join(5)
+    assert order == ["first", ("second", True)]
+    assert scheduler.snapshot()["jobs"] == []
+
+
+def test_submit_reports_estimates_and_job_status(clock):
+    scheduler = TranscriptionScheduler(slots=1, clock=clock)
+    running = scheduler.submit(100, "a", job_id="upload-1")
+    queued = scheduler.submit(50, "b")
+    assert running.id == "upload-1"
+    assert (queued.estimated_start, queued.estimated_finish) == (1100, 1150)
+    clock.now += 30
+    status = scheduler.job_status(queued.id)
+    assert status["state"] == "queued" and status["estimated_start_in_sec"] == 70.0
+    with pytest.raises(ValueError):
+        scheduler.submit(10, "c", job_id="upload-1")
+    with pytest.raises(ValueError):
+        scheduler.submit(10, "c", job_id="../etc")
+    scheduler.release(running)
+    scheduler.release(queued)
+    assert scheduler.job_status(queued.id) is None
+
+
+@pytest.mark.skipif(fcntl is None, reason="needs fcntl")
+def test_shared_directory_makes_the_queue_node_wide(clock, tmp_path):
+    # Two workers of one node
+    first = TranscriptionScheduler(slots=1, clock=clock, directory=str(tmp_path), poll_sec=0.01)
+    second = TranscriptionScheduler(slots=1, clock=clock, directory=str(tmp_path), poll_sec=0.01)
+    running = first.submit(100, "a")
+    clock.now += 1
+    long_job = first.submit(600, "b")
+    short_job = second.submit(60, "c")
+    assert short_job.started is None
+    assert short_job.estimated_start == 1100  # behind the other worker's running job
+    assert second.snapshot()["queued"] == 2
+
+    first.release(running)
+    # The shorter job of the other worker goes first, picked up when it polls
+    assert second.wait(short_job, timeout=1)
+    assert long_job.started is None
+    second.release(short_job)
+    assert first.wait(long_job, timeout=1)
+    first.release(long_job)
+
+
+@pytest.mark.skipif(fcntl is None, reason="needs fcntl")
+def test_jobs_of_exited_workers_free_their_slot(clock, tmp_path, monkeypatch):
+    (tmp_path / "job_dead.json").write_text(
+        '{"id": "dead", "pid": 1, "client": "x", "cost_sec": 100, "enqueued": 0, "started": 0, "bypassed": 0}')
+    monkeypatch.setattr(admission, "_pid_alive", lambda pid: pid != 1)
+    scheduler = TranscriptionScheduler(slots=1, clock=clock, directory=str(tmp_path))
+    job = scheduler.submit(10, "a")
+    assert job.started is not None
+    assert not (tmp_path / "job_dead.json").exists()
+    scheduler.release(job)
+
+
+def test_prepare_shared_queue_clears_a_previous_run(tmp_path, monkeypatch):
+    monkeypatch.delenv("TRANSCRIBE_QUEUE_DIR", raising=False)
+    monkeypatch.setenv("ADMISSION_DIR", str(tmp_path))
+    stale = tmp_path / "queue" / "job_old.json"
+    stale.parent.mkdir()
+    stale.write_text("{}")
+    assert prepare_shared_queue() == str(stale.parent)
+    assert not stale.exists()
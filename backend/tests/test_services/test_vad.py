@@ -0,0 +1,55 @@
+import numpy as np
+from app.services.vad import SpeechTimeline, detect_speech, frame_energy_db
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def noise(seconds, amplitude=0.001, seed=0):
+    return (amplitude * np.random.default_rng(seed).standard_normal(int(seconds * RATE))).astype(np.float32)
+
+
+def test_frame_energy_db_levels():
+    db = frame_energy_db(np.concatenate([np.zeros(RATE, dtype=np.float32), tone(1)]), RATE)
+    assert db[:10].max() < -150
+    assert db[-10:].min() > -15
+
+
+def test_detects_regions_around_long_pause():
+    samples = np.concatenate([noise(1), tone(2), noise(3, seed=1), tone(1.5), noise(1, seed=2)])
+    regions = detect_speech(samples, RATE)
+    assert len(regions) == 2
+    (s1, e1), (s2, e2) = regions
+    assert abs(s1 / RATE - 1.0) < 0.25 and abs(e1 / RATE - 3.0) < 0.25
+    assert abs(s2 / RATE - 6.0) < 0.25 and abs(e2 / RATE - 7.5) < 0.25
+
+
+def test_short_pause_is_bridged_and_blips_dropped():
+    blip = tone(0.05)
+    samples = np.concatenate([noise(1), tone(1), noise(0.3, seed=1), tone(1), noise(2, seed=2), blip, noise(1, seed=3)])
+    regions = detect_speech(samples, RATE)
+    assert len(regions) == 1
+
+
+def test_silence_has_no_regions():
+    assert detect_speech(np.zeros(2 * RATE, dtype=np.float32), RATE) == []
+    assert detect_speech(np.zeros(10, dtype=np.float32), RATE) == []
+
+
+def test_timeline_packs_and_maps_back():
+    samples = np.arange(10 * RATE, dtype=np.float32)
+    timeline = SpeechTimeline([(1 * RATE, 3 * RATE), (6 * RATE, 7 * RATE)], RATE, gap_sec=0.5)
+    packed = timeline.pack(samples)
+    assert packed.size == int(3.5 * RATE)
+    assert packed[0] == 1 * RATE
+    assert packed[int(2.5 * RATE)] == 6 * RATE
+    assert timeline.speech_seconds == 3.0
+    assert timeline.to_original(0.5) == 1.5
+    assert timeline.to_original(2.2) == 3.0  # inside the gap
+    assert timeline.to_original(3.0) == 6.5
+    segments = timeline.map_segments([{"start": 0.0, "end": 0.5, "text": " hi "}], offset_sec=2.5)
+    assert segments == [{"start": 6.0, "end": 6.5, "text": "hi"}]
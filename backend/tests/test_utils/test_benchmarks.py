@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+from benchmarks import audio_bench
+from benchmarks.common import StageMeter, compare_measurements
+
+
+def test_stage_meter_measures_wall_cpu_and_memory():
+    with StageMeter() as meter:
+        block = np.ones(8 * 2**20, dtype=np.uint8)  # 8 MB, touched
+        block.sum()
+        time.sleep(0.02)
+    values = meter.as_dict()
+    assert values["wall_sec"] >= 0.02
+    assert values["cpu_sec"] >= 0
+    assert values["peak_rss_mb"] > 0
+
+
+def test_compare_measurements_flags_regressions_only_beyond_tolerance():
+    baseline = {"a::convert": {"wall_sec": 1.0}, "a::vad": {"wall_sec": 0.001}, "b::load": {"wall_sec": 1.0}}
+    current = {"a::convert": {"wall_sec": 1.5}, "a::vad": {"wall_sec": 0.003}, "b::load": {"wall_sec": 1.05}}
+    rows = {row["key"]: row for row in compare_measurements(current, baseline, tolerance=0.15)}
+    assert rows["a::convert"]["regression"] is True
+    assert rows["a::convert"]["change"] == 0.5
+    # Large relative change but below the absolute noise floor
+    assert rows["a::vad"]["regression"] is False
+    assert rows["b::load"]["regression"] is False
+
+
+def test_benchmark_file_on_synthetic_fast_path_recording(tmp_path):
+    path = audio_bench.synthesize_recording(str(tmp_path / "synthetic.wav"), 6, speech_ratio=0.5)
+    result = audio_bench.benchmark_file(path, str(tmp_path), transcriber=lambda samples: "text")
+    assert result["fast_path"] is True
+    assert result["duration_sec"] == 6.0
+    stages = result["stages"]
+    assert {"probe", "quality", "load", "vad", "transcribe"} <= set(stages)
+    assert "convert" not in stages
+    assert stages["transcribe"]["ok"]
+    assert stages["transcribe"]["rtf"] is not None
+    assert 0.2 < stages["vad"]["speech_ratio"] < 0.9
+
+
+def test_flatten_skips_failed_stages():
+    report = {"results": [{"file": "a.wav", "stages": {
+        "probe": {"ok": True, "wall_sec": 0.1},
+        "convert": {"ok": False, "wall_sec": 0.0, "error": "no ffmpeg"},
+    }}]}
+    assert list(audio_bench.flatten(report)) == ["a.wav::probe"]
+
+
+def test_importing_the_benchmark_does_not_load_whisper():
+    # The app package is imported on the way to the services; the model must stay unloaded
+    code = ("import whisper\n"
+            "def refuse(*args, **kwargs):\n"
+            "    raise SystemExit('whisper model loaded')\n"
+            "whisper.load_model = refuse\n"
+            "import benchmarks.audio_bench\n")
+    backend = os.path.join(os.path.dirname(__file__), "..", "..")
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,124 @@
+import os
+import gzip
+import json
+import time
+from datetime import date
+import pytest
+from app.utils import event_archive
+
+
+def write_log(directory, day, entries, extra_lines=()):
+    path = directory / f"event_log_{day}.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        for line in extra_lines:
+            f.write(line + "\n")
+    return path
+
+@pytest.fixture
+def log_dir(tmp_path):
+    directory = tmp_path / "event_logs"
+    directory.mkdir()
+    entries = [
+        {"logged_at": "2025-05-19T10:00:00", "type": "meeting_meta", "meeting_id": "m1"},
+        {"logged_at": "2025-05-19T10:01:00", "type": "action", "meeting_id": "m1", "text": "a"},
+        {"logged_at": "2025-05-19T10:02:00", "type": "action", "meeting_id": "m2", "text": "b"},
+        {"logged_at": "2025-05-19T10:03:00", "type": "feedback", "meeting_id": None},
+    ]
+    write_log(directory, "2025-05-19", entries, extra_lines=["not json"])
+    write_log(directory, "2099-01-01", [{"type": "action", "meeting_id": "m1"}])
+    return directory
+
+def test_compact_only_closed_days(log_dir):
+    written = event_archive.compact_event_logs(str(log_dir), before=date(2025, 6, 1))
+    assert len(written) == 1
+    names = set(os.listdir(log_dir))
+    assert "event_log_2025-05-19.jsonl.gz" in names
+    assert "event_log_2025-05-19.idx.json" in names
+    assert "event_log_2025-05-19.jsonl" not in names
+    assert "event_log_2099-01-01.jsonl" in names
+
+def test_compact_keep_source(log_dir):
+    event_archive.compact_event_logs(str(log_dir), before=date(2025, 6, 1), remove_source=False)
+    names = os.listdir(log_dir)
+    assert "event_log_2025-05-19.jsonl" in names
+    assert event_archive.has_archive("event_log_2025-05-19.jsonl", names)
+    assert not event_archive.has_archive("event_log_2099-01-01.jsonl", names)
+
+def test_archive_roundtrip_and_filters(log_dir):
+    event_archive.compact_event_logs(str(log_dir), before=date(2025, 6, 1))
+    all_events = list(event_archive.iter_archived_events(str(log_dir)))
+    assert len(all_events) == 4
+    m1 = list(event_archive.iter_archived_events(str(log_dir), meeting_id="m1"))
+    assert {e["type"] for e in m1} == {"meeting_meta", "action"}
+    actions = list(event_archive.iter_archived_events(str(log_dir), types={"action"}, meeting_id="m2"))
+    assert [e["text"] for e in actions] == ["b"]
+    late = list(event_archive.iter_archived_events(str(log_dir), since="2025-05-19T10:02:00"))
+    assert len(late) == 2
+
+def test_blocks_are_skipped_without_decompression(log_dir, monkeypatch):
+    event_archive.compact_event_logs(str(log_dir), before=date(2025, 6, 1), block_rows=1)
+    calls = []
+    real_decompress = gzip.decompress
+    monkeypatch.setattr(event_archive.gzip, "decompress", lambda data: calls.append(1) or real_decompress(data))
+    events = list(event_archive.iter_archived_events(str(log_dir), types={"meeting_meta"}))
+    assert len(events) == 1
+    assert len(calls) == 1
+
+def test_malformed_lines_preserved(log_dir):
+    event_archive.compact_event_logs(str(log_dir), before=date(2025, 6, 1))
+    errors = []
+    list(event_archive.iter_archived_events(str(log_dir), on_error=lambda f, e, raw: errors.append(raw)))
+    assert errors == ["not json"]
+
+def test_unreadable_archive_reports_error(log_dir):
+    event_archive.compact_event_logs(str(log_dir), before=date(2025, 6, 1))
+    (log_dir / "event_log_2025-05-19.idx.json").write_text("{broken")
+    errors = []
+    assert list(event_archive.iter_archived_events(str(log_dir), on_error=lambda f, e, raw: errors.append(f))) == []
+    assert errors == ["event_log_2025-05-19.jsonl.gz"]
+
+def test_readers_include_archives(log_dir, monkeypatch):
+    from flask import Flask
+    from app.routes.json_routes import get_event_logs_for_meeting
+    from app.routes.meeting_routes import dashboard_bp
+    event_archive.compact_event_logs(str(log_dir), before=date(2025, 6, 1))
+    monkeypatch.chdir(log_dir.parent)
+    monkeypatch.setattr("app.routes.meeting_routes.log_event", lambda *a, **k: None)
+
+    logs = get_event_logs_for_meeting("m1")
+    assert len(logs) == 3  # two archived rows plus the live 2099 row
+
+    app = Flask(__name__)
+    app.register_blueprint(dashboard_bp)
+    data = app.test_client().get("/api/meetings/meta").get_json()
+    assert [e["meeting_id"] for e in data["logs"]] == ["m1"]
+    assert data["skipped_lines"] == 1
+
+def test_compact_missing_directory(tmp_path):
+    assert event_archive.compact_event_logs(str(tmp_path / "missing")) == []
+    assert list(event_archive.iter_archived_events(str(tmp_path / "missing"))) == []
+
+def test_compactor_runs_on_a_schedule(log_dir):
+    stop = event_archive.start_compactor(str(log_dir), interval_sec=0.05)
+    try:
+        assert event_archive.start_compactor(str(log_dir), interval_sec=0.05) is None
+        for _ in range(100):
+            if "event_log_2025-05-19.jsonl" not in os.listdir(log_dir):
+                break
+            time.sleep(0.05)
+        names = os.listdir(log_dir)
+        assert "event_log_2025-05-19.jsonl" not in names
+        assert "event_log_2099-01-01.jsonl" in names
+    finally:
+        stop.set()
+    assert event_archive.start_compactor(str(log_dir), interval_sec=0) is None
+
+def test_main_logs_archived_paths(log_dir, monkeypatch, capsys):
+    messages = []
+    monkeypatch.setattr(event_archive.logger, "info", lambda msg, *args: messages.append(msg % args))
+    monkeypatch.setattr(event_archive, "compact_event_logs", lambda *a, **k: ["x.jsonl.gz"])
+    assert event_archive.main(["--directory", str(log_dir)]) == 0
+    assert "Archived: x.jsonl.gz" in messages
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,101 @@
+import json
+from datetime import date, datetime, timezone
+import pytest
+from app.utils import event_archive
+from app.utils.event_index import EventLogIndex, percentile, summarize
+
+
+def append_events(path, events):
+    with open(path, "a", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+def upload(logged_at, processing, size=1000, outcome="success"):
+    return {
+        "logged_at": logged_at, "type": "audio_upload_success", "outcome": outcome,
+        "reported_size": size, "duration": 60.0,
+        "transcribe_time_sec": processing / 2, "processing_time_sec": processing,
+    }
+
+def test_percentile_interpolates():
+    values = [1, 2, 3, 4]
+    assert percentile(values, 0) == 1
+    assert percentile(values, 100) == 4
+    assert percentile(values, 50) == 2.5
+    assert percentile([], 50) is None
+    assert summarize([])["count"] == 0
+
+def test_query_aggregates(tmp_path):
+    log = tmp_path / "event_log_2025-05-19.jsonl"
+    append_events(log, [
+        upload("2025-05-19T10:00:00", 10.0),
+        upload("2025-05-19T11:00:00", 20.0, size=500),
+        {"logged_at": "2025-05-19T11:30:00", "type": "audio_quality_failed", "outcome": "failure"},
+        {"logged_at": "2025-05-19T12:00:00", "type": "analytics", "event": "export", "data": {"outcome": "success"}},
+    ])
+    log.open("a").write("garbage\n")
+    index = EventLogIndex(str(tmp_path))
+
+    result = index.query()
+    assert result["count"] == 4
+    assert result["by_type"]["audio_upload_success"] == 2
+    assert result["by_outcome"] == {"success": 3, "failure": 1}
+    assert result["bytes_uploaded"] == 1500
+    assert result["processing_time_sec"]["p50"] == 15.0
+    assert result["processing_time_sec"]["max"] == 20.0
+
+    assert index.query(events={"export"})["count"] == 1
+    assert index.query(outcome="failure")["by_type"] == {"audio_quality_failed": 1}
+    ranged = index.query(since="2025-05-19T10:30:00", until="2025-05-19T11:15:00")
+    assert ranged["count"] == 1
+    assert index.query(bucket="hour")["buckets"]["2025-05-19T11"] == 2
+
+def test_incremental_refresh(tmp_path):
+    log = tmp_path / "event_log_2025-05-19.jsonl"
+    append_events(log, [upload("2025-05-19T10:00:00", 10.0)])
+    index = EventLogIndex(str(tmp_path))
+    assert index.query()["count"] == 1
+    # Partial line is not consumed until it is complete
+    with open(log, "a", encoding="utf-8") as f:
+        f.write(json.dumps(upload("2025-05-19T10:05:00", 12.0))[:20])
+    assert index.query()["count"] == 1
+    log.write_text(json.dumps(upload("2025-05-19T10:00:00", 10.0)) + "\n" + json.dumps(upload("2025-05-19T10:05:00", 12.0)) + "\n")
+    assert index.query()["count"] == 2
+
+def test_time_range_prunes_files_and_reads_archives(tmp_path):
+    append_events(tmp_path / "event_log_2025-05-18.jsonl", [upload("2025-05-18T09:00:00", 5.0)])
+    append_events(tmp_path / "event_log_2025-05-19.jsonl", [upload("2025-05-19T09:00:00", 7.0)])
+    event_archive.compact_event_logs(str(tmp_path), before=date(2025, 5, 19))
+    index = EventLogIndex(str(tmp_path))
+    assert index.query()["count"] == 2
+    assert index.query(since="2025-05-19T00:00:00")["processing_time_sec"]["max"] == 7.0
+    assert index.query(until="2025-05-18T23:59:59")["processing_time_sec"]["max"] == 5.0
+
+def test_missing_directory(tmp_path):
+    index = EventLogIndex(str(tmp_path / "missing"))
+    assert index.query()["count"] == 0
+
+def test_offset_bounds_are_normalized_to_local_time(tmp_path):
+    append_events(tmp_path / "event_log_2025-05-19.jsonl", [
+        upload("2025-05-19T10:00:00", 10.0),
+        upload("2025-05-19T12:00:00", 20.0),
+    ])
+    index = EventLogIndex(str(tmp_path))
+    bound = datetime(2025, 5, 19, 11, 0).astimezone()
+    assert index.query(since=bound.astimezone(timezone.utc).isoformat())["processing_time_sec"]["max"] == 20.0
+    assert index.query(until=bound.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"))["count"] == 1
+    with pytest.raises(ValueError):
+        index.query(since="yesterday")
+
+def test_retention_window_and_row_cap_bound_memory(tmp_path):
+    for day in ("2025-05-10", "2025-05-18", "2025-05-19"):
+        append_events(tmp_path / f"event_log_{day}.jsonl", [upload(f"{day}T09:00:00", 5.0)] * 3)
+    windowed = EventLogIndex(str(tmp_path), max_days=2, max_rows=0)
+    assert sorted(name for name, _ in windowed.sources()) == ["event_log_2025-05-18.jsonl", "event_log_2025-05-19.jsonl"]
+
+    capped = EventLogIndex(str(tmp_path), max_days=0, max_rows=5)
+    assert capped.query()["count"] == 3
+    assert [name for name, _ in capped.sources()] == ["event_log_2025-05-19.jsonl"]
+    append_events(tmp_path / "event_log_2025-05-19.jsonl", [upload("2025-05-19T10:00:00", 6.0)])
+    # Evicted files are not re-read on later refreshes
+    assert capped.query()["count"] == 4
@@ -0,0 +1,33 @@
+import json
+from app.utils.json_stream import iter_json_object, iter_ndjson, paginate
+
+
+def test_iter_json_object_streams_list_field():
+    doc = "".join(iter_json_object({"a": 1, "items": "ignored"}, "items", iter(range(3))))
+    assert json.loads(doc) == {"a": 1, "items": [0, 1, 2]}
+    assert json.loads("".join(iter_json_object({}, "items", []))) == {"items": []}
+
+
+def test_iter_json_object_trailer_and_non_json_values():
+    page = paginate(({"n": i} for i in range(10)), offset=2, limit=3)
+    doc = json.loads("".join(iter_json_object({"when": object.__name__}, "rows", page, lambda: {"page": page.info()})))
+    assert [r["n"] for r in doc["rows"]] == [2, 3, 4]
+    assert doc["page"] == {"offset": 2, "limit": 3, "returned": 3, "next_offset": 5}
+
+
+def test_paginate_is_lazy():
+    consumed = []
+
+    def source():
+        for i in range(1000):
+            consumed.append(i)
+            yield i
+    page = paginate(source(), limit=2)
+    assert list(page) == [0, 1]
+    assert page.has_more
+    assert len(consumed) == 3
+
+
+def test_iter_ndjson_lines():
+    lines = list(iter_ndjson([("result", {"a": 1}), ("end", {})]))
+    assert lines == ['{"section": "result", "data": {"a": 1}}\n', '{"section": "end", "data": {}}\n']
@@ -0,0 +1,82 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import uuid
+import pytest
+from app.utils import logger as logger_module
+from app.utils.logger import logger
+
+
+class _Recorder:
+    """
+    Log argument that records when (and on which thread) it is formatted.
+    """
+
+    def __init__(self, marker):
+        self.marker = marker
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return self.marker
+
+
+def test_formatting_happens_on_listener_thread(monkeypatch):
+    # Keep pytest's own (synchronous) capture handlers on the root logger out of this
+    monkeypatch.setattr(logger, "propagate", False)
+    marker = uuid.uuid4().hex
+    arg = _Recorder(marker)
+    logger.info("queued record %s", arg)
+    logger_module.flush()
+
+    assert arg.threads and threading.current_thread() not in arg.threads
+    with open(logger_module.log_file, encoding="utf-8") as f:
+        assert any(marker in line and " INFO: queued record " in line for line in f)
+
+
+def test_disabled_levels_are_never_formatted(monkeypatch):
+    monkeypatch.setattr(logger, "propagate", False)
+    arg = _Recorder("debug")
+    logger.debug("not emitted %s", arg)
+    logger_module.flush()
+    assert arg.threads == []
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = logger_module.DroppingQueueHandler(queue.Queue(1))
+    record = logging.makeLogRecord({"msg": "x"})
+    handler.emit(record)
+    handler.emit(record)
+    assert handler.dropped == 1
+
+
+def _log_from_worker(marker):
+    logger.warning("from worker %s", marker)
+    logger_module.flush()
+
+
+def _run_master(path, marker):
+    # A forked stand-in for the gunicorn master: point server.log at `path`,
+    # switch to multiprocess mode and fork a worker that logs one line
+    logger_module.file_handler.close()
+    logger_module.file_handler.baseFilename = str(path)
+    logger_module.enable_multiprocess_logging()
+    worker = multiprocessing.get_context("fork").Process(target=_log_from_worker, args=(marker,))
+    worker.start()
+    worker.join(10)
+    logger_module._shutdown()
+    if worker.exitcode != 0:
+        raise SystemExit(1)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_worker_lines_reach_the_single_writer(tmp_path):
+    path = tmp_path / "server.log"
+    marker = uuid.uuid4().hex
+    master = multiprocessing.get_context("fork").Process(target=_run_master, args=(path, marker))
+    master.start()
+    master.join(30)
+    assert master.exitcode == 0
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert any(line.endswith(f" WARNING: from worker {marker}") for line in lines)
@@ -0,0 +1,109 @@
+import os
+import time
+import tracemalloc
+import pytest
+from flask import Flask
+from app.utils import memory, tracing
+from app.utils.tracing import span
+
+
+@pytest.fixture
+def traced_memory(monkeypatch):
+    monkeypatch.setenv("MEMORY_ACCOUNTING", "1")
+    monkeypatch.setenv("MEMORY_TRACEMALLOC", "1")
+    was_tracing = tracemalloc.is_tracing()
+    token = tracing.start_trace()
+    yield tracing.current_trace()
+    tracing.end_trace(token)
+    if not was_tracing:
+        tracemalloc.stop()
+
+
+def test_current_rss_is_reported():
+    rss = memory.current_rss_bytes()
+    if os.path.exists("/proc/self/statm"):
+        assert rss > 0
+
+
+def test_stage_records_allocations_and_peak(traced_memory):
+    before = memory.STAGE_ALLOC_PEAK.count(stage="test.alloc")
+    with span("test.alloc"):
+        kept = bytearray(2 * 2**20)
+        temporary = bytearray(4 * 2**20)
+        del temporary
+
+    record = traced_memory.spans[0]
+    assert record["alloc_kb"] >= 2000
+    assert record["alloc_peak_kb"] >= 6000
+    assert "rss_delta_kb" in record
+    summary = traced_memory.summary()["test.alloc"]
+    assert summary["alloc_peak_kb"] == record["alloc_peak_kb"]
+    assert memory.STAGE_ALLOC_PEAK.count(stage="test.alloc") == before + 1
+    del kept
+
+
+def test_inner_stage_peak_is_carried_to_outer_stage(traced_memory):
+    with span("test.outer"):
+        with span("test.inner.1"):
+            temporary = bytearray(8 * 2**20)
+            del temporary
+        with span("test.inner.2"):
+            pass
+
+    records = {r["name"]: r for r in traced_memory.spans}
+    assert records["test.inner.1"]["alloc_peak_kb"] >= 8000
+    assert records["test.inner.2"]["alloc_peak_kb"] < 1000
+    # Resetting tracemalloc's peak for the inner stages must not hide it from the outer one
+    assert records["test.outer"]["alloc_peak_kb"] >= 8000
+
+
+def test_probe_is_released_when_tracing_stops_mid_stage(traced_memory):
+    probe = memory.stage_start()
+    assert probe in memory._active
+    tracemalloc.stop()  # e.g. a profile capture that ends tracing
+    record = memory.stage_end("test.stopped", probe)
+    assert probe not in memory._active
+    assert "alloc_kb" not in record
+
+
+def test_accounting_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("MEMORY_ACCOUNTING", "0")
+    token = tracing.start_trace()
+    try:
+        with span("test.off"):
+            pass
+        assert "rss_delta_kb" not in tracing.current_trace().spans[0]
+    finally:
+        tracing.end_trace(token)
+
+
+def test_memory_report_updates_worker_gauge():
+    report = memory.memory_report()
+    assert report["pid"] == os.getpid()
+    if report["rss_mb"] is not None:
+        assert memory.WORKER_RSS.value(pid=os.getpid()) > 0
+
+
+def test_reporter_logs_worker_memory_once_per_process(monkeypatch):
+    events = []
+    monkeypatch.setattr(memory, "log_event", events.append)
+    monkeypatch.setattr(memory, "_reporter_pid", None)
+    monkeypatch.setenv("MEMORY_REPORT_SEC", "3600")
+    app = Flask(__name__)
+    memory.init_memory(app)
+    app.add_url_rule("/", "index", lambda: "ok")
+    client = app.test_client()
+    client.get("/")
+    client.get("/")
+    deadline = time.time() + 5
+    while not events and time.time() < deadline:
+        time.sleep(0.01)
+    assert [e["type"] for e in events] == ["worker_memory"]
+    assert events[0]["pid"] == os.getpid()
+
+
+def test_reporter_disabled_with_zero_interval(monkeypatch):
+    monkeypatch.setattr(memory, "_reporter_pid", None)
+    monkeypatch.setenv("MEMORY_REPORT_SEC", "0")
+    memory.start_reporter()
+    assert memory._reporter_pid is None
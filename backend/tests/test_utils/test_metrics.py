@@ -0,0 +1,99 @@
+import json
+import os
+import pytest
+from flask import Flask, jsonify
+from app.utils import metrics
+from app.utils.metrics import Counter, Gauge, Histogram, Registry
+
+
+def _registry():
+    registry = Registry()
+    requests = Counter("requests_total", "Requests.", ("route",), registry=registry)
+    depth = Gauge("queue_depth", "Queue depth.", registry=registry)
+    latency = Histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0), registry=registry)
+    return registry, requests, depth, latency
+
+
+def test_render_text_format():
+    registry, requests, depth, latency = _registry()
+    requests.inc(route="/a")
+    requests.inc(2, route='/b"x')
+    depth.set(3)
+    depth.dec()
+    for value in (0.05, 0.5, 5):
+        latency.observe(value, stage="convert")
+
+    text = registry.render(directory="")
+    lines = text.splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/a"} 1' in lines
+    assert 'requests_total{route="/b\\"x"} 2' in lines
+    assert "queue_depth 2" in lines
+    assert 'latency_seconds_bucket{stage="convert",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="convert",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="convert",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="convert"} 3' in lines
+    assert 'latency_seconds_sum{stage="convert"} 5.55' in lines
+    assert text.endswith("\n")
+
+
+def test_labels_and_counter_validation():
+    registry, requests, _, _ = _registry()
+    with pytest.raises(ValueError):
+        requests.inc(stage="x")
+    with pytest.raises(ValueError):
+        requests.inc(-1, route="/a")
+    with pytest.raises(ValueError):
+        Counter("requests_total", "Duplicate.", registry=registry)
+
+
+def test_multiprocess_snapshots_are_merged(tmp_path):
+    registry, requests, depth, latency = _registry()
+    requests.inc(route="/a")
+    depth.set(4)
+    latency.observe(0.5, stage="convert")
+
+    # Another worker (still alive: our parent) and an exited one
+    other = registry.snapshot()
+    for pid in (os.getppid(), 2**22 + 12345):
+        with open(tmp_path / f"metrics_{pid}.json", "w") as f:
+            json.dump({"pid": pid, "metrics": other}, f)
+
+    merged = registry.collect(str(tmp_path))
+    assert os.path.exists(tmp_path / f"metrics_{os.getpid()}.json")
+    assert merged["requests_total"]["samples"][("/a",)] == 3
+    # Gauges only count for live processes
+    assert merged["queue_depth"]["samples"][()] == 8
+    counts, total, count = merged["latency_seconds"]["samples"][("convert",)]
+    assert count == 3 and counts == [0, 3, 0] and total == pytest.approx(1.5)
+
+    metrics.clear_metrics_dir(str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_reset_zeroes_values():
+    registry, requests, _, latency = _registry()
+    requests.inc(route="/a")
+    latency.observe(1, stage="x")
+    registry.reset()
+    assert requests.value(route="/a") == 0
+    assert latency.count(stage="x") == 0
+
+
+def test_init_metrics_records_route_latency():
+    app = Flask(__name__)
+    metrics.init_metrics(app)
+
+    @app.route("/items/<int:item_id>")
+    def item(item_id):
+        return jsonify({"id": item_id})
+
+    before = metrics.REQUEST_LATENCY.count(route="/items/<int:item_id>", method="GET", status=200)
+    client = app.test_client()
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+    assert client.get("/missing").status_code == 404
+
+    assert metrics.REQUEST_LATENCY.count(route="/items/<int:item_id>", method="GET", status=200) == before + 2
+    assert metrics.REQUEST_LATENCY.count(route="unmatched", method="GET", status=404) >= 1
+    assert metrics.REQUESTS_IN_PROGRESS.value() == 0
@@ -108,3 +108,80 @@ def test_create_calendar_event_add_event_exception(monkeypatch):
     import pytest
     with pytest.raises(RuntimeError, match="CalDAV error!"):
         nextcloud_utils.create_calendar_event("title", "desc", "2024-01-01T00:00:00", "2024-01-01T01:00:00")
+
+class FakeCalendar:
+    def __init__(self):
+        self.events = []
+    def add_event(self, ical):
+        self.events.append(ical)
+        return ical
+
+class FakeDAVServer:
+    """Local CalDAV stand-in that counts discovery round-trips."""
+    def __init__(self):
+        self.calendar = FakeCalendar()
+        self.principal_calls = 0
+        self.clients = []
+    def client(self, url=None, username=None, password=None, **kwargs):
+        server = self
+        self.clients.append((url, username, password))
+        class Principal:
+            def calendars(self):
+                return [server.calendar]
+        class Client:
+            def principal(self):
+                server.principal_calls += 1
+                return Principal()
+        return Client()
+
+def test_calendar_client_reuses_discovery():
+    server = FakeDAVServer()
+    now = [0.0]
+    client = nextcloud_utils.NextcloudCalendarClient(
+        client_factory=server.client, secrets_loader=lambda: ("url", "user", "pw"), ttl=60, clock=lambda: now[0]
+    )
+    for i in range(20):
+        client.add_event(f"event {i}")
+    assert len(server.calendar.events) == 20
+    assert server.principal_calls == 1
+    assert len(server.clients) == 1
+    now[0] = 61.0
+    client.add_event("after ttl")
+    assert server.principal_calls == 2
+
+def test_calendar_client_rebuilds_on_credential_change():
+    server = FakeDAVServer()
+    creds = [("url", "user", "pw")]
+    client = nextcloud_utils.NextcloudCalendarClient(client_factory=server.client, secrets_loader=lambda: creds[0])
+    client.default_calendar()
+    creds[0] = ("url", "user", "new-pw")
+    client.default_calendar()
+    assert server.clients == [("url", "user", "pw"), ("url", "user", "new-pw")]
+
+def test_calendar_client_invalidates_on_write_failure():
+    server = FakeDAVServer()
+    client = nextcloud_utils.NextcloudCalendarClient(client_factory=server.client, secrets_loader=lambda: ("u", "n", "p"))
+    def fail(ical): raise RuntimeError("connection reset")
+    server.calendar.add_event = fail
+    with pytest.raises(RuntimeError):
+        client.add_event("x")
+    client.default_calendar()
+    assert server.principal_calls == 2
+
+def test_create_calendar_event_uses_shared_client(monkeypatch):
+    server = FakeDAVServer()
+    monkeypatch.setattr(nextcloud_utils, "DAVClient", server.client)
+    monkeypatch.setattr(nextcloud_utils, "load_nextcloud_secrets", lambda: ("url", "user", "pw"))
+    for _ in range(3):
+        uid = nextcloud_utils.create_calendar_event("t", "d", "2024-01-01T00:00:00", "2024-01-01T01:00:00")
+        assert uid.endswith("@meeting-summarizer")
+    assert len(server.calendar.events) == 3
+    assert server.principal_calls == 1
+
+def test_load_nextcloud_secrets_reloads_on_change(tmp_path):
+    secrets = tmp_path / "env.json"
+    secrets.write_text('{"NEXTCLOUD_URL": "http://a", "NEXTCLOUD_USERNAME": "u", "NEXTCLOUD_PASSWORD": "p"}')
+    assert nextcloud_utils.load_nextcloud_secrets(str(secrets)) == ("http://a", "u", "p")
+    secrets.write_text('{"NEXTCLOUD_URL": "http://b", "NEXTCLOUD_USERNAME": "u", "NEXTCLOUD_PASSWORD": "p2"}')
+    os.utime(secrets, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+    assert nextcloud_utils.load_nextcloud_secrets(str(secrets)) == ("http://b", "u", "p2")
@@ -0,0 +1,92 @@
+import re
+import nltk
+from benchmarks import nlp_bench
+from app.services.nlp_analysis import ACTION_PHRASES
+
+
+def test_generate_transcript_size_and_density():
+    text = nlp_bench.generate_transcript(4096, action_density=0.0, decision_density=0.0, name_density=0.0)
+    assert 4000 <= len(text) <= 4096
+    assert not any(name in text for name in nlp_bench.NAMES)
+    dense = nlp_bench.generate_transcript(4096, action_density=0.0, decision_density=0.0, name_density=1.0)
+    assert sum(dense.count(name) for name in nlp_bench.NAMES) > 50
+    assert nlp_bench.generate_transcript(2048, seed=1) == nlp_bench.generate_transcript(2048, seed=1)
+
+
+def test_filler_sentences_contain_no_action_phrases():
+    for template in nlp_bench.FILLER_TEMPLATES:
+        sentence = template.format(name="Alice").lower()
+        assert not any(phrase in sentence for phrase in ACTION_PHRASES), sentence
+
+
+def test_count_calls_counts_tokenizers_and_distinct_patterns(monkeypatch):
+    monkeypatch.setattr(nltk, "sent_tokenize", lambda text: text.split(". "))
+    with nlp_bench.count_calls() as calls:
+        for i in range(5):
+            nltk.sent_tokenize("a. b")
+            re.search(f"x{i}", "x1")
+            re.search("fixed", "fixed")
+    assert calls["sent_tokenize"] == 5
+    assert calls["distinct_regex"] == 6
+
+
+def test_scaling_exponent():
+    sizes = [1, 2, 4, 8]
+    assert nlp_bench.scaling_exponent(sizes, [2, 4, 8, 16]) == 1.0
+    assert nlp_bench.scaling_exponent(sizes, [1, 4, 16, 64]) == 2.0
+    assert nlp_bench.scaling_exponent([1], [1]) is None
+
+
+def test_run_flags_superlinear_and_per_sentence_regex():
+    def linear(text):
+        return text.split()
+
+    def quadratic(text):
+        words = text.split()
+        return sum(1 for a in words for b in words if a == b)
+
+    def per_sentence_regex(text):
+        return [re.search(re.escape(sentence[:12]) + "$", sentence) for sentence in text.split(". ")]
+
+    report = nlp_bench.run(
+        sizes=[1024, 2048, 4096],
+        extractors={"linear": linear, "quadratic": quadratic, "regex": per_sentence_regex},
+        repeats=1,
+    )
+    scaling = report["scaling"]
+    assert scaling["quadratic"]["time_exponent"] > 1.5
+    assert scaling["quadratic"]["superlinear"]
+    assert "distinct_regex" in scaling["regex"]["growing_counters"]
+    assert scaling["regex"]["superlinear"]
+    assert report["results"]["linear"][0]["size_bytes"] == 1024
+    assert set(nlp_bench.flatten(report)) >= {"linear::1024", "quadratic::4096"}
+
+
+def test_run_flags_repeated_tokenization(monkeypatch):
+    monkeypatch.setattr(nltk, "sent_tokenize", lambda text: text.split(". "))
+    monkeypatch.setattr(nltk, "word_tokenize", lambda text: text.split())
+
+    def once(text):
+        return [nltk.word_tokenize(sentence) for sentence in nltk.sent_tokenize(text)]
+
+    def three_passes(text):
+        return [nltk.sent_tokenize(text) for _ in range(3)]
+
+    def twice_per_sentence(text):
+        return [(nltk.word_tokenize(s), nltk.word_tokenize(s.lower())) for s in nltk.sent_tokenize(text)]
+
+    report = nlp_bench.run(
+        sizes=[1024, 4096],
+        extractors={"once": once, "three_passes": three_passes, "twice": twice_per_sentence},
+        repeats=1,
+    )
+    scaling = report["scaling"]
+    assert scaling["once"]["repeated_tokenization"] == []
+    # A fixed number of full-text passes per call does not grow with size, but is still flagged
+    assert scaling["three_passes"]["growing_counters"] == []
+    assert scaling["three_passes"]["repeated_tokenization"] == ["full_text_tokenize"]
+    assert scaling["twice"]["repeated_tokenization"] == ["word_tokenize"]
+    assert scaling["twice"]["superlinear"]
+    row = report["results"]["twice"][-1]
+    assert row["calls"]["full_text_tokenize"] == 1
+    assert 1.9 < row["word_tokenize_per_sentence"] <= 2.0
@@ -0,0 +1,55 @@
+import gc
+import importlib.util
+import os
+from app import preload
+
+
+def test_ensure_nltk_resources_reports_and_downloads_missing(monkeypatch):
+    installed = {"tokenizers/punkt_tab", "corpora/words"}
+
+    def find(path):
+        if path not in installed:
+            raise LookupError(path)
+    downloads = []
+    monkeypatch.setattr(preload.nltk.data, "find", find)
+    monkeypatch.setattr(preload.nltk, "download", lambda pkg, quiet=True: downloads.append(pkg) or pkg != "maxent_ne_chunker_tab")
+    assert preload.ensure_nltk_resources() == ["averaged_perceptron_tagger_eng", "maxent_ne_chunker_tab"]
+    assert downloads == []
+    assert preload.ensure_nltk_resources(download=True) == ["maxent_ne_chunker_tab"]
+    assert downloads == ["averaged_perceptron_tagger_eng", "maxent_ne_chunker_tab"]
+
+
+def test_preload_resources_freezes_heap(monkeypatch):
+    monkeypatch.setattr(preload, "ensure_nltk_resources", lambda download=False: [])
+    monkeypatch.setattr(preload, "warm_nltk", lambda: True)
+    monkeypatch.setattr(preload, "load_whisper", lambda: True)
+    try:
+        status = preload.preload_resources()
+        assert status == {"whisper_loaded": True, "nltk_missing": [], "nltk_warm": True}
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_gunicorn_config_reads_environment(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "5")
+    monkeypatch.setenv("GUNICORN_MAX_REQUESTS", "1000")
+    monkeypatch.setenv("GUNICORN_THREADS", "not-a-number")
+    path = os.path.join(os.path.dirname(__file__), "..", "..", "gunicorn.conf.py")
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", path)
+    conf = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(conf)
+    assert conf.preload_app is True
+    assert conf.workers == 5
+    assert conf.threads == 8
+    assert (conf.max_requests, conf.max_requests_jitter) == (1000, 100)
+
+
+def test_whisper_model_is_loaded_once_by_preload(monkeypatch):
+    from app.routes import audio_routes
+    loads = []
+    monkeypatch.setattr(audio_routes, "_whisper_model", None)
+    monkeypatch.setattr(audio_routes.whisper, "load_model", lambda name: loads.append(name) or object())
+    assert preload.load_whisper() and loads == ["base"]
+    assert audio_routes.get_whisper_model() is audio_routes.get_whisper_model()
+    assert loads == ["base"]
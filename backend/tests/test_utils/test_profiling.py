@@ -0,0 +1,85 @@
+import json
+import os
+import pstats
+import pytest
+from flask import Flask, jsonify
+from app.services.offload import run_cpu
+from app.utils import profiling
+
+
+@pytest.fixture
+def profile_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_ADMIN_TOKEN", "secret")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_PATHS", "/work")
+    monkeypatch.delenv("PROFILE_SAMPLE_RATE", raising=False)
+    return tmp_path
+
+
+def _offloaded_work():
+    return sum(len(str(i) * 10) for i in range(20000))
+
+
+def _app():
+    app = Flask(__name__)
+    profiling.init_profiling(app)
+
+    @app.route("/work")
+    def work():
+        return jsonify({"total": run_cpu(_offloaded_work)})
+
+    return app
+
+
+def test_should_profile_triggers(profile_env, monkeypatch):
+    admin = {"X-Profile": "1", "X-Admin-Token": "secret"}
+    assert profiling.should_profile("/work", admin) == "header"
+    assert profiling.should_profile("/other", admin) is None
+    assert profiling.should_profile("/work", {"X-Profile": "1", "X-Admin-Token": "wrong"}) is None
+    assert profiling.should_profile("/work", {}) is None
+
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "0.5")
+    assert profiling.should_profile("/work", {}, rand=lambda: 0.2) == "sample"
+    assert profiling.should_profile("/work", {}, rand=lambda: 0.7) is None
+
+    monkeypatch.delenv("PROFILE_SAMPLE_RATE")
+    monkeypatch.delenv("PROFILE_ADMIN_TOKEN")
+    assert profiling.should_profile("/work", admin) is None
+
+
+def test_header_capture_includes_offloaded_work(profile_env):
+    client = _app().test_client()
+    assert "X-Profile-Id" not in client.get("/work").headers
+
+    response = client.get("/work", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    capture_id = response.headers["X-Profile-Id"]
+
+    with open(profile_env / f"{capture_id}.json") as f:
+        summary = json.load(f)
+    assert summary["path"] == "/work" and summary["status"] == 200
+    assert summary["trigger"] == "header"
+    assert any("_offloaded_work" in row["function"] for row in summary["top_functions"])
+    stats = pstats.Stats(str(profile_env / f"{capture_id}.prof"))
+    assert any(name == "_offloaded_work" for _, _, name in stats.stats)
+
+    assert [c["id"] for c in profiling.list_captures()] == [capture_id]
+    assert "top_functions" not in profiling.list_captures()[0]
+    # The capture lock is released for the next request
+    assert profiling._capture_lock.acquire(blocking=False)
+    profiling._capture_lock.release()
+
+
+def test_old_captures_are_pruned(profile_env, monkeypatch):
+    monkeypatch.setenv("PROFILE_MAX_CAPTURES", "2")
+    client = _app().test_client()
+    ids = [client.get("/work", headers={"X-Profile": "1", "X-Admin-Token": "secret"}).headers["X-Profile-Id"]
+           for _ in range(3)]
+    kept = sorted(name for name in os.listdir(profile_env) if name.endswith(".json"))
+    assert len(kept) == 2
+    assert f"{max(ids)}.json" in kept
+
+
+def test_capture_path_rejects_traversal(profile_env):
+    assert profiling.capture_path("../etc/passwd", ".json") is None
+    assert profiling.capture_path("missing", ".json") is None
@@ -0,0 +1,119 @@
+import json
+import logging
+import multiprocessing
+import threading
+import pytest
+from app.utils import logger as logger_module
+from app.utils import request_journal
+from app.utils.request_journal import RequestJournal, summarize_payload
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_summarize_payload_truncates_and_hashes():
+    transcript = "word " * 1000
+    short = summarize_payload({"transcript": transcript, "level": "short", "n": 3}, max_chars=20)
+    assert short["level"] == "short" and short["n"] == 3
+    assert short["transcript"]["chars"] == len(transcript)
+    assert short["transcript"]["head"] == transcript[:20]
+    hashed = summarize_payload({"transcript": "abc"}, mode="hash")
+    assert hashed["transcript"]["chars"] == 3 and "head" not in hashed["transcript"]
+    assert summarize_payload({"a": 1}, mode="omit") is None
+    assert summarize_payload(list(range(25)))[-1] == {"more_items": 15}
+    assert summarize_payload(b"raw body") == "raw body"
+
+
+def test_journal_writes_bounded_entries_off_thread(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RequestJournal(str(path), max_chars=10)
+    writer_threads = []
+    original = journal._file_handler.emit
+    journal._file_handler.emit = lambda record: writer_threads.append(threading.current_thread()) or original(record)
+    journal.record("/process-json", {"transcript": "x" * 5000})
+    journal.record("/process-json", "{bad", error="Malformed JSON")
+    journal.close()
+    lines = read_lines(path)
+    assert lines[0]["payload"]["transcript"]["chars"] == 5000
+    assert lines[1]["error"] == "Malformed JSON"
+    assert threading.main_thread() not in writer_threads
+
+
+def test_journal_sampling_keeps_errors(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RequestJournal(str(path), sample_rate=0.25, rng=lambda: 0.5)
+    assert not journal.record("/process-json", {"transcript": "ok"})
+    assert journal.record("/process-json", {"transcript": "bad"}, error="boom")
+    journal.close()
+    assert [l["payload"]["transcript"] for l in read_lines(path)] == ["bad"]
+
+
+def test_journal_rotates_by_size(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RequestJournal(str(path), max_bytes=2000, backup_count=2)
+    for i in range(100):
+        journal.record("/process-json", {"transcript": "y" * 150, "i": i})
+    journal.close()
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["journal.jsonl", "journal.jsonl.1", "journal.jsonl.2"]
+    assert all(p.stat().st_size <= 2000 for p in tmp_path.iterdir())
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path, monkeypatch):
+    monkeypatch.setattr(request_journal, "QUEUE_SIZE", 1)
+    journal = RequestJournal(str(tmp_path / "journal.jsonl"))
+    journal._listener.stop()  # nothing drains the queue
+    for _ in range(5):
+        journal.record("/process-json", {"transcript": "z"})
+    assert journal.dropped == 4
+    journal._file_handler.close()
+
+
+def _journal_from_worker(path, worker):
+    journal = RequestJournal(str(path), max_bytes=2000, backup_count=20)
+    assert not isinstance(journal._file_handler, logging.FileHandler)  # the master writes
+    for i in range(30):
+        journal.record("/process-json", {"transcript": "w" * 100, "worker": worker, "i": i})
+    journal.close()
+
+
+def _run_master(tmp_path):
+    # A forked stand-in for the gunicorn master with two journaling workers
+    logger_module.file_handler.close()
+    logger_module.file_handler.baseFilename = str(tmp_path / "server.log")
+    logger_module.enable_multiprocess_logging()
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=_journal_from_worker, args=(tmp_path / "journal.jsonl", n)) for n in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+    logger_module._shutdown()
+    if any(worker.exitcode != 0 for worker in workers):
+        raise SystemExit(1)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_workers_share_one_journal_writer(tmp_path):
+    master = multiprocessing.get_context("fork").Process(target=_run_master, args=(tmp_path,))
+    master.start()
+    master.join(30)
+    assert master.exitcode == 0
+    files = [p for p in tmp_path.iterdir() if p.name.startswith("journal.jsonl")]
+    assert len(files) > 1 and all(p.stat().st_size <= 2000 for p in files)
+    entries = [line["payload"] for p in files for line in read_lines(p)]
+    assert sorted((e["worker"], e["i"]) for e in entries) == [(w, i) for w in range(2) for i in range(30)]
+
+
+def test_process_json_uses_journal(monkeypatch):
+    from app import create_app
+    recorded = []
+
+    class FakeJournal:
+        def record(self, endpoint, payload, error=None):
+            recorded.append((endpoint, payload, error))
+    monkeypatch.setattr("app.routes.json_routes.get_request_journal", lambda: FakeJournal())
+    create_app().test_client().post("/process-json", json={})
+    assert recorded == [("/process-json", {}, None)]
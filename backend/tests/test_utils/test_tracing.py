@@ -0,0 +1,134 @@
+import threading
+from flask import Flask, jsonify
+from app.utils import tracing
+from app.utils.tracing import Trace, bind_context, span, traced
+
+
+def test_span_outside_request_is_noop():
+    assert tracing.current_trace() is None
+    with span("idle"):
+        pass
+    assert tracing.current_trace() is None
+
+
+def test_spans_are_recorded_and_summarized():
+    token = tracing.start_trace()
+    try:
+        with span("audio.convert", bytes=10):
+            pass
+        with span("audio.convert"):
+            pass
+
+        @traced("nlp.actions")
+        def work():
+            return 42
+
+        assert work() == 42
+        trace = tracing.current_trace()
+        summary = trace.summary()
+        assert list(summary) == ["audio.convert", "nlp.actions"]
+        assert summary["audio.convert"]["count"] == 2
+        assert trace.spans[0]["bytes"] == 10
+        header = trace.server_timing()
+        assert header.startswith("audio.convert;dur=")
+        assert "nlp.actions;dur=" in header and "total;dur=" in header
+    finally:
+        tracing.end_trace(token)
+
+
+def test_bind_context_carries_trace_to_threads():
+    token = tracing.start_trace()
+    try:
+        def worker():
+            with span("thread.work"):
+                pass
+        thread = threading.Thread(target=bind_context(worker))
+        thread.start()
+        thread.join()
+        unbound = threading.Thread(target=worker)
+        unbound.start()
+        unbound.join()
+        assert tracing.current_trace().summary()["thread.work"]["count"] == 1
+    finally:
+        tracing.end_trace(token)
+
+
+def test_trace_add_computes_offsets():
+    ticks = iter([10.0, 12.5])
+    trace = Trace(clock=lambda: next(ticks))
+    trace.add("stage", 10.5, 0.25)
+    assert trace.spans == [{"name": "stage", "start_ms": 500.0, "dur_ms": 250.0}]
+    assert trace.elapsed_ms() == 2500.0
+
+
+def test_flask_integration_sets_header_and_logs(monkeypatch):
+    events = []
+    monkeypatch.setattr(tracing, "log_event", events.append)
+    app = Flask(__name__)
+    tracing.init_tracing(app)
+
+    @app.route("/work")
+    def work():
+        with span("nlp.analyze"):
+            pass
+        return jsonify({"ok": True})
+
+    @app.route("/plain")
+    def plain():
+        return jsonify({"ok": True})
+
+    client = app.test_client()
+    response = client.get("/work")
+    assert "nlp.analyze;dur=" in response.headers["Server-Timing"]
+    assert "total;dur=" in response.headers["Server-Timing"]
+    tracing.get_stage_writer().flush()
+    assert events[0]["type"] == "request_stages"
+    assert events[0]["path"] == "/work"
+    assert events[0]["stages"]["nlp.analyze"]["count"] == 1
+
+    response = client.get("/plain")
+    assert response.headers["Server-Timing"].startswith("total;dur=")
+    tracing.get_stage_writer().flush()
+    assert len(events) == 1
+
+
+def test_server_timing_header_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(tracing, "log_event", lambda event: None)
+    monkeypatch.setenv("SERVER_TIMING_HEADER", "0")
+    app = Flask(__name__)
+    tracing.init_tracing(app)
+    app.add_url_rule("/x", "x", lambda: "ok")
+    assert "Server-Timing" not in app.test_client().get("/x").headers
+
+
+def test_stage_events_are_sampled_but_errors_always_logged(monkeypatch):
+    events = []
+    monkeypatch.setattr(tracing, "log_event", events.append)
+    monkeypatch.setenv("REQUEST_STAGES_SAMPLE_RATE", "0")
+    app = Flask(__name__)
+    tracing.init_tracing(app)
+
+    @app.route("/work/<int:status>")
+    def work(status):
+        with span("nlp.analyze"):
+            pass
+        return jsonify({"ok": status < 500}), status
+
+    client = app.test_client()
+    client.get("/work/200")
+    client.get("/work/503")
+    tracing.get_stage_writer().flush()
+    assert [event["status"] for event in events] == [503]
+
+
+def test_stage_writer_drops_when_queue_is_full(monkeypatch):
+    release = threading.Event()
+    written = []
+    monkeypatch.setattr(tracing, "log_event", lambda event: (release.wait(5), written.append(event)))
+    writer = tracing.StageEventWriter(size=1)
+    results = [writer.submit({"n": n}) for n in range(3)]
+    assert not all(results)
+    assert writer.dropped == results.count(False)
+    release.set()
+    writer.flush()
+    assert len(written) == results.count(True)